@@ -0,0 +1,33 @@
+"""add (conversation_id, sequence_number) index to transcript_messages
+
+Revision ID: c7e2a9d41f58
+Revises: 5d4d7a65f44b
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "c7e2a9d41f58"
+down_revision: Union[str, None] = "5d4d7a65f44b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transcript_messages_conversation_sequence",
+        "transcript_messages",
+        ["conversation_id", "sequence_number"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_transcript_messages_conversation_sequence",
+        table_name="transcript_messages",
+        if_exists=True,
+    )
@@ -0,0 +1,77 @@
+"""incremental analytics aggregation: partial aggregates, checkpoint and log keyset index
+
+Revision ID: 8b3f1d6e2c47
+Revises: c7e2a9d41f58
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "8b3f1d6e2c47"
+down_revision: Union[str, None] = "c7e2a9d41f58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table, prefix in (
+        ("agent_execution_daily_stats", "response_ms"),
+        ("node_execution_daily_stats", "execution_ms"),
+    ):
+        op.add_column(table, sa.Column(f"p50_{prefix}", sa.Float(), nullable=True))
+        op.add_column(table, sa.Column(f"p95_{prefix}", sa.Float(), nullable=True))
+        op.add_column(table, sa.Column("aggregation_state", postgresql.JSONB(), nullable=True))
+
+    op.create_table(
+        "analytics_aggregation_checkpoints",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("last_logged_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_log_id", sa.UUID(), nullable=False),
+        sa.Column("created_by", sa.UUID(), nullable=True),
+        sa.Column("updated_by", sa.UUID(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+            nullable=True,
+        ),
+        sa.Column("is_deleted", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+
+    # Keyset pagination of the aggregation task
+    op.create_index(
+        "ix_agent_response_logs_logged_at_id",
+        "agent_response_logs",
+        ["logged_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_agent_response_logs_logged_at_id",
+        table_name="agent_response_logs",
+        if_exists=True,
+    )
+    op.drop_table("analytics_aggregation_checkpoints")
+    for table, prefix in (
+        ("agent_execution_daily_stats", "response_ms"),
+        ("node_execution_daily_stats", "execution_ms"),
+    ):
+        op.drop_column(table, "aggregation_state")
+        op.drop_column(table, f"p95_{prefix}")
+        op.drop_column(table, f"p50_{prefix}")
@@ -201,6 +201,16 @@ async def _cleanup_websocket_services():
         logger.error(f"Error during SocketConnectionManager cleanup: {e}")
 
 
+async def _flush_analytics():
+    """Write pending realtime analytics counters before Redis and the databases close."""
+    from app.services.analytics_realtime import get_analytics_write_behind
+
+    try:
+        await get_analytics_write_behind().close()
+    except Exception as e:
+        logger.error(f"Error flushing realtime analytics: {e}")
+
+
 # --------------------------------------------------------------------------- #
 # Lifespan handler                                                            #
 # --------------------------------------------------------------------------- #
@@ -244,6 +254,7 @@ async def _lifespan(app: FastAPI):
 
         # Clean up services in reverse dependency order
         await _cleanup_websocket_services()
+        await _flush_analytics()
         await _cleanup_redis_services(app, redis_string, redis_binary)
         await multi_tenant_manager.close_all()
 
@@ -11,6 +11,7 @@ from app.auth.dependencies import auth, permissions
 from app.cache.redis_cache import invalidate_agent_cache
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 from app.modules.workflow.registry import RegistryItem
 from app.schemas.agent import QueryRequest
 from app.services.agent_config import AgentConfigService
@@ -69,11 +70,14 @@ async def run_query_agent_logic(
         agent_id: str,
         session_message: str,
         metadata: Optional[Dict[str, Any]] = None,
+        event_channel: Optional[WorkflowEventChannel] = None,
         ):
     """
     Run a query against an agent.
 
     Fetches agent from database on demand - always gets latest configuration.
+    When an event channel is given, token deltas of the answer are published on it
+    while the workflow runs.
     """
 
     # Fetch agent from database and execute
@@ -87,7 +91,8 @@ async def run_query_agent_logic(
 
     result = await agent.execute(
             session_message=session_message,
-            metadata=metadata
+            metadata=metadata,
+            event_channel=event_channel,
             )
     logger.debug("Workflow Final Result: %s", truncate_for_log(redact_sensitive_substrings(str(result))))
 
@@ -164,12 +164,21 @@ async def invalidate_cache(namespace: str, value: Any) -> bool:
         return False
 
 
+def _invalidate_compiled_workflow(agent_id: UUID) -> None:
+    """Drop this worker's compiled engine for the agent (other workers detect the new version)."""
+    from app.modules.workflow.engine.workflow_cache import invalidate_compiled_workflow
+
+    invalidate_compiled_workflow(agent_id)
+
+
 async def invalidate_agent_cache(agent_id: UUID, user_id: UUID):
     await invalidate_cache("agents:get_by_id_full", agent_id)
     await invalidate_cache("agents:get_by_user_id", user_id)
+    _invalidate_compiled_workflow(agent_id)
 
 async def invalidate_only_agent_cache(agent_id: UUID):
     await invalidate_cache("agents:get_by_id_full", agent_id)
+    _invalidate_compiled_workflow(agent_id)
 
 async def clear_conversation_memory_cache(conversation_id: UUID) -> None:
     """
@@ -205,6 +214,10 @@ async def invalidate_conversation_cache(conversation_id: UUID):
 async def invalidate_llm_provider_cache(provider_id: UUID | None):
     if provider_id:
         await invalidate_cache("llm_providers:get_by_id", str(provider_id))
+        # Drop this worker's warm client (other workers detect the changed config)
+        from app.modules.workflow.llm.client_pool import invalidate_chat_model
+
+        invalidate_chat_model(provider_id)
 
     await invalidate_cache("llm_providers:get_all", None)
 
@@ -18,6 +18,8 @@ class ProjectSettings(BaseSettings):
     REDIS_PASSWORD: Optional[str] = None  # Auth; included in REDIS_URL when set
     REDIS_USER: Optional[str] = None  # Auth; included in REDIS_URL when set
     REDIS_FOR_CONVERSATION: bool = True
+    # Tokenizer families whose counts are stored with every conversation message (comma-separated)
+    CONVERSATION_TOKEN_FAMILIES: str = "approx,tiktoken:o200k_base,tiktoken:cl100k_base"
     REDIS_SSL: Optional[bool] = False
     REDIS_OVERRIDE_URL: Optional[str] = None
 
@@ -77,11 +79,23 @@ class ProjectSettings(BaseSettings):
 
     # Explicit prefork concurrency (number of child worker processes). Leave None to
     # use Celery's default (CPU count) — but for the prefork "default" worker set a
-    # modest value (e.g. 2-4): each child holds its own DB/Redis connections, and
-    # background tasks use NullPool (a fresh connection per query), so unbounded
+    # modest value (e.g. 2-4): each child holds its own DB/Redis connections (up to
+    # CELERY_DB_POOL_SIZE + CELERY_DB_MAX_OVERFLOW per tenant database), so unbounded
     # concurrency can exhaust Postgres max_connections / Redis maxclients.
     CELERY_WORKER_CONCURRENCY: int | None = None
 
+    # Run all tasks of a worker process on one event loop, so DB pools and HTTP/Redis
+    # clients survive between tasks. False creates a loop per task (asyncio.run) and
+    # closes that task's DB connections when it ends.
+    CELERY_REUSE_EVENT_LOOP: bool = True
+    # Per-tenant DB pool of a Celery worker process (0 = NullPool, a connection per session)
+    CELERY_DB_POOL_SIZE: int = 5
+    CELERY_DB_MAX_OVERFLOW: int = 5
+    # Tenants (and master) a periodic task processes at once in run_task_for_all_tenants,
+    # and how long one tenant may run before it is cancelled and reported (0 = no limit)
+    CELERY_TENANT_CONCURRENCY: int = 4
+    CELERY_TENANT_TIMEOUT_SECONDS: int = 0
+
     # === Conversation Cleanup Settings ===
     CONVERSATION_CLEANUP_STALE_MINUTES: int = 30
 
@@ -162,6 +176,8 @@ class ProjectSettings(BaseSettings):
     DB_MAX_OVERFLOW: int = 100
     DB_POOL_TIMEOUT: int = 30  # seconds
     DB_POOL_RECYCLE: int = 1800  # seconds
+    # Connecting through pgbouncer in transaction mode: disables asyncpg's prepared statement caches
+    DB_PGBOUNCER: bool = False
 
     # === Multi-Tenancy ===
     MULTI_TENANT_ENABLED: bool = False
@@ -219,6 +235,9 @@ class ProjectSettings(BaseSettings):
     # === WebSocket Configuration ===
     USE_WS: bool = True  # Enable/disable WebSocket backend (connect, broadcast, rooms)
     WS_INTERNAL_SECRET: Optional[str] = None  # Shared secret for internal WS service auth
+    # Redis fan-in: "rooms" subscribes only to the channels of rooms with local connections,
+    # "pattern" subscribes to websocket:* (every room's traffic reaches every instance)
+    WS_REDIS_SUBSCRIBE_MODE: str = "rooms"
 
     # === Rate Limiting Configuration ===
     RATE_LIMIT_ENABLED: bool = False
@@ -260,6 +279,78 @@ class ProjectSettings(BaseSettings):
     # Conversation history max messages for chat input node
     CONVERSATION_HISTORY_NODE_MAX_MESSAGES: int = 100
 
+    # Compiled workflow engines kept per worker process (LRU, shared across tenants)
+    WORKFLOW_ENGINE_CACHE_MAX_SIZE: int = 500
+    # Max nodes running concurrently within one workflow execution (0 = unlimited)
+    WORKFLOW_MAX_CONCURRENT_NODES: int = 32
+    # Per-node-type caps within one execution, e.g. "agentNode:4,llmModelNode:4,sqlNode:2,pythonCodeNode:2"
+    WORKFLOW_NODE_TYPE_CONCURRENCY: Optional[str] = None
+    # Stream agent answers to the conversation WebSocket as partial-message frames
+    CONVERSATION_STREAMING_ENABLED: bool = True
+
+    # Pre-forked sandbox processes for Python code / data mapper nodes (0 = fork one per run)
+    PYTHON_EXEC_POOL_SIZE: int = 2
+    # Runs a pooled sandbox process serves before it is replaced (it is also replaced after
+    # any error or timeout). 1 (default) gives every run its own pre-forked process. Above 1
+    # a process serves later runs of the same tenant, possibly other agents and users: only
+    # module and class attributes are reset between runs, so state kept on module-level
+    # objects (e.g. json._default_encoder) or in library options (pd.set_option) carries over
+    PYTHON_EXEC_WORKER_MAX_JOBS: int = 1
+
+    # Warm chat model clients kept per worker process (LRU, keyed by tenant and provider)
+    LLM_CLIENT_POOL_MAX_SIZE: int = 200
+    # Keep-alive HTTP pool shared by OpenAI-compatible chat model clients
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_HTTP_TIMEOUT: float = 600.0
+
+    # Masked texts + token maps of PII-enabled agents kept per worker process (LRU), so
+    # chat history is only analyzed for messages not seen before
+    PII_MASK_CACHE_MAX_SIZE: int = 5000
+
+    # Loaded LEGRA knowledge bases kept per worker process for search (LRU)
+    LEGRA_INDEX_CACHE_MAX_SIZE: int = 16
+    # LEGRA search: "graph" expands hits along the kNN graph and communities, "flat" is plain top-k
+    LEGRA_RETRIEVAL_MODE: str = "graph"
+    # Time allowed for graph expansion per LEGRA search (milliseconds after the seed search)
+    LEGRA_RETRIEVAL_BUDGET_MS: float = 50.0
+
+    # Knowledge base search fan-out: per-provider and per-KB timeouts (seconds, 0 disables)
+    RAG_SEARCH_PROVIDER_TIMEOUT: float = 10.0
+    RAG_SEARCH_KB_TIMEOUT: float = 15.0
+    # How provider results of one KB are merged: "score" (weighted scores) or "rrf"
+    RAG_SEARCH_MERGE_STRATEGY: str = "score"
+    RAG_SEARCH_RRF_K: int = 60
+
+    # Shared HuggingFace embedding models: inference threads and query micro-batching
+    EMBEDDING_INFERENCE_WORKERS: int = 2
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+    EMBEDDING_MAX_BATCH_SIZE: int = 64
+    # Persistent embedding cache (SQLite, shared by the worker processes of a host, LRU)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = str(DATA_VOLUME / "embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Per-chat RAG stores (ThreadScopedRAG) kept per tenant and worker: LRU size and idle TTL
+    THREAD_RAG_MAX_SERVICES: int = 256
+    THREAD_RAG_IDLE_TTL_SECONDS: int = 1800  # 0 disables idle eviction
+    # Where in-process vector stores (FAISS) of chats persist; empty keeps them in memory only
+    THREAD_RAG_PERSIST_DIR: str = str(DATA_VOLUME / "thread_rag")
+
+    # Realtime analytics counters are written behind in batches (see services/analytics_realtime.py)
+    ANALYTICS_WRITE_BEHIND_ENABLED: bool = True
+    ANALYTICS_FLUSH_INTERVAL_MS: int = 1000
+    ANALYTICS_FLUSH_MAX_EVENTS: int = 500
+    # Buffer pending events in Redis (shared by the API workers, survives restarts) instead of memory
+    ANALYTICS_WRITE_BEHIND_REDIS: bool = False
+    # Daily aggregation task: merge only logs newer than the checkpoint into the persisted partial
+    # aggregates (off re-aggregates every affected date), log rows streamed per batch, and how far
+    # behind now it reads so rows of still-open transactions are not skipped
+    ANALYTICS_AGGREGATION_INCREMENTAL: bool = True
+    ANALYTICS_AGGREGATION_BATCH_SIZE: int = 5000
+    ANALYTICS_AGGREGATION_LAG_SECONDS: int = 60
+
     @property
     def _zendesk_base(self) -> str:
         return f"https://{self.ZENDESK_SUBDOMAIN}.zendesk.com/api/v2"
@@ -325,6 +416,17 @@ class ProjectSettings(BaseSettings):
         password = quote(self.DB_PASS or "", safe="")
         return unquote(f"postgresql+psycopg2://{user}:{password}@{self.DB_HOST}/{tenant_db}")
 
+    def workflow_node_type_concurrency(self) -> dict[str, int]:
+        """Parse WORKFLOW_NODE_TYPE_CONCURRENCY into {node_type: limit}."""
+        limits: dict[str, int] = {}
+        if not self.WORKFLOW_NODE_TYPE_CONCURRENCY:
+            return limits
+        for item in self.WORKFLOW_NODE_TYPE_CONCURRENCY.split(","):
+            node_type, _, limit = item.partition(":")
+            if node_type.strip() and limit.strip().isdigit():
+                limits[node_type.strip()] = int(limit.strip())
+        return limits
+
     def microsoft_sso_allowed_origins(self) -> list[str]:
         """Origins (scheme://host[:port]) allowed as targets for the post-SSO browser redirect."""
         raw: list[str] = []
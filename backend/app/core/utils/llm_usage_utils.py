@@ -76,7 +76,7 @@ def extract_usage_from_aimessage(message: Any) -> Optional[Dict[str, int]]:
     Extract token usage from a LangChain AIMessage.
 
     Args:
-        message: AIMessage instance (from llm.ainvoke) with response_metadata
+        message: AIMessage (from llm.ainvoke) or aggregated AIMessageChunk (from llm.astream)
 
     Returns:
         Dict with input_tokens, output_tokens, total_tokens, or None if not found.
@@ -84,15 +84,15 @@ def extract_usage_from_aimessage(message: Any) -> Optional[Dict[str, int]]:
     if message is None:
         return None
 
-    metadata = None
-    if hasattr(message, "response_metadata"):
-        metadata = getattr(message, "response_metadata", None)
-    elif hasattr(message, "usage_metadata"):
-        metadata = getattr(message, "usage_metadata", None)
-        if metadata and not isinstance(metadata, dict):
-            metadata = {"usage_metadata": metadata} if metadata else None
+    usage = None
+    metadata = getattr(message, "response_metadata", None)
+    if metadata:
+        usage = extract_usage_from_response_metadata(metadata)
 
-    if not metadata:
-        return None
+    # Streamed messages carry usage only in LangChain's standard usage_metadata
+    if usage is None:
+        usage_metadata = getattr(message, "usage_metadata", None)
+        if usage_metadata:
+            usage = extract_usage_from_response_metadata(dict(usage_metadata))
 
-    return extract_usage_from_response_metadata(metadata)
+    return usage
@@ -6,13 +6,17 @@ This module provides token counting functionality with provider-specific strateg
 - Other providers: Use character-based approximation (1 token ≈ 3.75 characters)
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 from abc import ABC, abstractmethod
 
 
 logger = logging.getLogger(__name__)
 
+# Tokenizer family names (see TokenCounter.family)
+APPROXIMATE_FAMILY = "approx"
+TIKTOKEN_FAMILY_PREFIX = "tiktoken:"
+
 
 class TokenCounter(ABC):
     """Base class for token counting strategies"""
@@ -30,6 +34,16 @@ class TokenCounter(ABC):
         """
         pass
 
+    @property
+    def family(self) -> str:
+        """
+        Tokenizer family of this counter.
+
+        Counters of the same family produce identical counts, so counts computed
+        once (e.g. stored with conversation messages) can be reused across models.
+        """
+        return APPROXIMATE_FAMILY
+
 
 class TiktokenCounter(TokenCounter):
     """OpenAI-specific token counter using tiktoken library"""
@@ -37,14 +51,16 @@ class TiktokenCounter(TokenCounter):
     # Cache for tiktoken encodings
     _encoding_cache: Dict[str, Any] = {}
 
-    def __init__(self, model: str):
+    def __init__(self, model: str, encoding_name: Optional[str] = None):
         """
         Initialize tiktoken counter for a specific model.
 
         Args:
             model: OpenAI model name (e.g., "gpt-4o", "gpt-3.5-turbo")
+            encoding_name: Explicit tiktoken encoding; resolved from the model if omitted
         """
         self.model = model.lower()
+        self._encoding_name = encoding_name
         self.encoding = self._get_encoding()
 
     def _get_encoding(self):
@@ -61,8 +77,14 @@ class TiktokenCounter(TokenCounter):
     @property
     def encoding_name(self) -> str:
         """Get the appropriate encoding name for the model"""
-        from app.core.utils.gpt_utils import get_openai_encoding_name
-        return get_openai_encoding_name(self.model)
+        if self._encoding_name is None:
+            from app.core.utils.gpt_utils import get_openai_encoding_name
+            self._encoding_name = get_openai_encoding_name(self.model)
+        return self._encoding_name
+
+    @property
+    def family(self) -> str:
+        return f"{TIKTOKEN_FAMILY_PREFIX}{self.encoding_name}"
 
     def count_tokens(self, text: str) -> int:
         """
@@ -126,6 +148,28 @@ def get_token_counter(provider: str, model: str) -> TokenCounter:
     return ApproximateTokenCounter()
 
 
+def get_token_counter_for_family(family: str) -> TokenCounter:
+    """
+    Get a token counter for a tokenizer family name.
+
+    Args:
+        family: Family name as returned by TokenCounter.family
+            (e.g. "approx", "tiktoken:o200k_base")
+
+    Returns:
+        TokenCounter instance of that family
+
+    Raises:
+        ValueError: If the family is unknown
+    """
+    if family == APPROXIMATE_FAMILY:
+        return ApproximateTokenCounter()
+    if family.startswith(TIKTOKEN_FAMILY_PREFIX):
+        encoding_name = family[len(TIKTOKEN_FAMILY_PREFIX):]
+        return TiktokenCounter(encoding_name, encoding_name=encoding_name)
+    raise ValueError(f"Unknown tokenizer family: {family}")
+
+
 def count_message_tokens(
     messages: List[Dict[str, Any]], counter: TokenCounter
 ) -> int:
@@ -1,5 +1,6 @@
 from app.db.models.agent_execution_daily_stats import AgentExecutionDailyStatsModel
 from app.db.models.agent_response_log import AgentResponseLogModel
+from app.db.models.analytics_aggregation_checkpoint import AnalyticsAggregationCheckpointModel
 
 # from app.db.models.api_key_permission import ApiKeyPermissionModel
 from app.db.models.api_key import ApiKeyModel
@@ -82,6 +83,7 @@ __all__ = [
     "AgentResponseLogModel",
     "AgentExecutionDailyStatsModel",
     "NodeExecutionDailyStatsModel",
+    "AnalyticsAggregationCheckpointModel",
     "CustomerModel",
     "DataSourceModel",
     "LanguageModel",
@@ -122,6 +124,7 @@ models = [
     AgentResponseLogModel,
     AgentExecutionDailyStatsModel,
     NodeExecutionDailyStatsModel,
+    AnalyticsAggregationCheckpointModel,
     UserModel,
     NotificationRecipientModel,
     NotificationModel,
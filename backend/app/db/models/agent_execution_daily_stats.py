@@ -2,7 +2,7 @@ from datetime import date, datetime
 from uuid import UUID
 
 from sqlalchemy import Date, DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -74,6 +74,16 @@ class AgentExecutionDailyStatsModel(Base):
         nullable=True,
     )
 
+    p50_response_ms: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+
+    p95_response_ms: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+
     total_nodes_executed: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
@@ -145,3 +155,11 @@ class AgentExecutionDailyStatsModel(Base):
         DateTime(timezone=True),
         nullable=False,
     )
+
+    # Mergeable partial aggregates (counts, sums, min/max, quantile sketch, conversation ids)
+    # written by the aggregation task so later logs can be merged in incrementally
+    aggregation_state: Mapped[dict | None] = mapped_column(
+        JSONB,
+        nullable=True,
+        deferred=True,  # only read by the aggregation task, not by the analytics read paths
+    )
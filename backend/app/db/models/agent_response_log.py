@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, Text
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, Text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -18,6 +18,10 @@ class AgentResponseLogModel(Base):
     """
 
     __tablename__ = "agent_response_logs"
+    __table_args__ = (
+        # Keyset pagination of the analytics aggregation (ORDER BY logged_at, id)
+        Index("ix_agent_response_logs_logged_at_id", "logged_at", "id"),
+    )
 
     transcript_message_id: Mapped[UUID] = mapped_column(
         PGUUID(as_uuid=True),
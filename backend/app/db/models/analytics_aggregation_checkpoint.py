@@ -0,0 +1,35 @@
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AnalyticsAggregationCheckpointModel(Base):
+    """
+    Position in agent_response_logs up to which the daily stats are aggregated.
+
+    The incremental analytics aggregation only merges logs after
+    (last_logged_at, last_log_id) into the persisted partial aggregates.
+    """
+
+    __tablename__ = "analytics_aggregation_checkpoints"
+
+    name: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+        unique=True,
+    )
+
+    last_logged_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+    )
+
+    last_log_id: Mapped[UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        nullable=False,
+    )
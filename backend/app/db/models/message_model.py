@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
-from sqlalchemy import Computed, DateTime, Float, ForeignKey, LargeBinary, String, Text, Integer, UUID as SQLAlchemyUUID
+from sqlalchemy import Computed, DateTime, Float, ForeignKey, Index, LargeBinary, String, Text, Integer, UUID as SQLAlchemyUUID
 from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
@@ -10,6 +10,10 @@ from app.db.base import Base
 class TranscriptMessageModel(Base):
     """Individual message within a conversation transcript"""
     __tablename__ = 'transcript_messages'
+    __table_args__ = (
+            # Sequence allocation (MAX) and tail reads (ORDER BY ... DESC LIMIT) of a conversation
+            Index('ix_transcript_messages_conversation_sequence', 'conversation_id', 'sequence_number'),
+            )
 
     conversation_id: Mapped[UUID] = mapped_column(
             SQLAlchemyUUID,
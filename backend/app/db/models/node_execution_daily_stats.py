@@ -2,7 +2,7 @@ from datetime import date
 from uuid import UUID
 
 from sqlalchemy import Date, Float, ForeignKey, Integer, String, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -82,6 +82,16 @@ class NodeExecutionDailyStatsModel(Base):
         nullable=True,
     )
 
+    p50_execution_ms: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+
+    p95_execution_ms: Mapped[float | None] = mapped_column(
+        Float,
+        nullable=True,
+    )
+
     unique_conversations: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
@@ -102,3 +112,10 @@ class NodeExecutionDailyStatsModel(Base):
         default=0,
         server_default="0",
     )
+
+    # Mergeable partial aggregates, see AgentExecutionDailyStatsModel.aggregation_state
+    aggregation_state: Mapped[dict | None] = mapped_column(
+        JSONB,
+        nullable=True,
+        deferred=True,
+    )
@@ -1,6 +1,9 @@
+import asyncio
 import logging
+import os
 import re
-from typing import Dict
+from typing import Any, Dict
+from uuid import uuid4
 
 from sqlalchemy import NullPool, create_engine, text
 from sqlalchemy.ext.asyncio import (
@@ -29,24 +32,65 @@ def _is_safe_tenant_slug(tenant: str) -> bool:
     return bool(_TENANT_SLUG_RE.fullmatch(tenant))
 
 
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _connect_args() -> Dict[str, Any]:
+    """asyncpg options; pgbouncer in transaction mode cannot keep prepared statements per connection."""
+    if not settings.DB_PGBOUNCER:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
 class MultiTenantSessionManager:
     """Manages database sessions for multi-tenant applications"""
 
     _engines: Dict[str, AsyncEngine] = {}
     _session_factories: Dict[str, async_sessionmaker] = {}
+    # Event loop whose connections each pooled engine holds (asyncpg connections are loop-bound)
+    _engine_loops: Dict[str, asyncio.AbstractEventLoop | None] = {}
 
 
     async def initialize(self):
         """Initialize the multi-tenant session manager"""
         await self.run_db_init_actions("master")
 
+    @staticmethod
+    def _engine_key(tenant: str) -> str:
+        return tenant if not settings.BACKGROUND_TASK else tenant + "_background"
+
+    def _drop_engine(self, ktenant: str) -> None:
+        """Forget an engine whose connections belong to another loop or process, without closing them."""
+        engine = self._engines.pop(ktenant, None)
+        self._session_factories.pop(ktenant, None)
+        self._engine_loops.pop(ktenant, None)
+        if engine is not None:
+            engine.sync_engine.dispose(close=False)
 
     def get_tenant_engine(self, tenant: str | None = None) -> AsyncEngine:
         """Get or create engine for a specific tenant"""
         logger.debug(f"get_tenant_engine called with tenant_id: {tenant}")
         if tenant is None:
             tenant = "master"
-        ktenant = tenant if not settings.BACKGROUND_TASK else tenant + "_background"
+        ktenant = self._engine_key(tenant)
+
+        loop = _running_loop()
+        if ktenant in self._engines and loop is not None:
+            bound = self._engine_loops.get(ktenant)
+            if bound is None:
+                self._engine_loops[ktenant] = loop
+            elif bound is not loop:
+                # Celery tasks run without a reused worker loop get a loop per task
+                logger.info(f"Event loop changed, replacing engine for tenant: {tenant}")
+                self._drop_engine(ktenant)
 
         if ktenant not in self._engines:
             tenant_url = settings.get_tenant_database_url(tenant)
@@ -54,7 +98,7 @@ class MultiTenantSessionManager:
                     f"Creating new engine for tenant {tenant} with URL: {tenant_url}"
                     )
 
-            if settings.BACKGROUND_TASK:
+            if settings.BACKGROUND_TASK and settings.CELERY_DB_POOL_SIZE <= 0:
                 # Use NullPool for Celery - no connection pooling
                 logger.info(f"🔧 Creating NullPool engine for Celery, tenant: {tenant}")
                 self._engines[ktenant] = create_async_engine(
@@ -62,12 +106,22 @@ class MultiTenantSessionManager:
                         echo=False,
                         poolclass=NullPool,  # Creates fresh connection each time
                         pool_pre_ping=True,
+                        connect_args=_connect_args(),
                         )
 
-                # Print all engines
-                logger.info("=== Current Engines (BACKGROUND_TASK) ===")
-                for tenant_name, engine in self._engines.items():
-                    logger.info(f"Tenant: {tenant_name}, Engine: {engine}")
+            elif settings.BACKGROUND_TASK:
+                # Small per-tenant pool for Celery; a worker process runs one task at a time
+                logger.info(f"🔧 Creating pooled engine for Celery, tenant: {tenant}")
+                self._engines[ktenant] = create_async_engine(
+                        tenant_url,
+                        echo=False,
+                        pool_size=settings.CELERY_DB_POOL_SIZE,
+                        max_overflow=settings.CELERY_DB_MAX_OVERFLOW,
+                        pool_timeout=settings.DB_POOL_TIMEOUT,
+                        pool_recycle=settings.DB_POOL_RECYCLE,
+                        pool_pre_ping=True,
+                        connect_args=_connect_args(),
+                        )
 
             else:
                 # Normal pooling for FastAPI
@@ -81,13 +135,10 @@ class MultiTenantSessionManager:
                         pool_timeout=settings.DB_POOL_TIMEOUT,
                         pool_recycle=settings.DB_POOL_RECYCLE,
                         pool_pre_ping=True,
+                        connect_args=_connect_args(),
                         )
 
-                # Print all engines
-                logger.info("=== Current Engines (FastAPI) ===")
-                for tenant_name, engine in self._engines.items():
-                    print(f"Tenant: {tenant_name}, Engine: {engine}")
-
+            self._engine_loops[ktenant] = loop
             logger.info(f"Created engine for tenant: {tenant}")
 
         return self._engines[ktenant]
@@ -96,15 +147,33 @@ class MultiTenantSessionManager:
         """Get or create session factory for a specific tenant"""
         logger.debug(f"get_tenant_session_factory called with tenant: {tenant}")
 
-        if tenant not in self._session_factories:
-            engine = self.get_tenant_engine(tenant)
-            self._session_factories[tenant] = async_sessionmaker(
+        tenant = tenant or "master"
+        # Resolve the engine first: it may be replaced (new loop), dropping its factory
+        engine = self.get_tenant_engine(tenant)
+        ktenant = self._engine_key(tenant)
+        if ktenant not in self._session_factories:
+            self._session_factories[ktenant] = async_sessionmaker(
                 bind=engine,
                 expire_on_commit=False,
             )
             logger.info(f"Created session factory for tenant: {tenant}")
 
-        return self._session_factories[tenant]
+        return self._session_factories[ktenant]
+
+    async def dispose_loop_engines(self) -> None:
+        """Close the engines bound to the running loop (called before a per-task loop closes)."""
+        loop = _running_loop()
+        for ktenant in [k for k, bound in self._engine_loops.items() if bound is loop]:
+            engine = self._engines.pop(ktenant, None)
+            self._session_factories.pop(ktenant, None)
+            self._engine_loops.pop(ktenant, None)
+            if engine is not None:
+                await engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        """Drop inherited engines in a forked child; the parent keeps using their connections."""
+        for ktenant in list(self._engines):
+            self._drop_engine(ktenant)
 
     async def create_tenant_database(self, tenant: str = "master") -> bool:
         """Create a new tenant database with the same schema as master using Alembic (async version)"""
@@ -279,3 +348,6 @@ class MultiTenantSessionManager:
 
 # Global instance
 multi_tenant_manager = MultiTenantSessionManager()
+
+# Celery prefork children (and any other fork) must open their own connections
+os.register_at_fork(after_in_child=multi_tenant_manager.reset_after_fork)
@@ -13,7 +13,7 @@ from .config import (
 )
 
 
-from .providers import SearchResult, BaseDataProvider, FinalizableProvider
+from .providers import SearchResult, SearchResponse, SourceTiming, BaseDataProvider, FinalizableProvider
 from .providers.models import DataProviderInterface
 
 from .service import AgentRAGService
@@ -59,5 +59,7 @@ __all__ = [
 
     # Data classes
     "SearchResult",
+    "SearchResponse",
+    "SourceTiming",
     "DataProviderInterface",
 ]
@@ -14,12 +14,13 @@ import urllib.parse
 import urllib.request
 from typing import Any, Dict, List, Optional
 
-from app.core.config.settings import file_storage_settings
+from app.core.config.settings import file_storage_settings, settings
 from app.db.models import StorageProvider
 from app.modules.data.utils import FileTextExtractor
 from app.schemas.agent_knowledge import KBRead
 
-from .providers import SearchResult
+from .providers import SearchResponse, SearchResult
+from .search import timed, top_k
 from .service import AgentRAGService
 from .utils.doc import bulk_delete_documents, format_search_results
 
@@ -171,26 +172,78 @@ class AgentRAGServiceManager:
         Returns:
             Search results or formatted string
         """
-        all_results = []
-
-        for kb_obj in kb_objects:
-            service = await self.get_service(kb_obj)
-            if service:
-                try:
-                    results = await service.search(query, limit)
-                    all_results.extend(results)
-                except Exception as e:
-                    logger.error(f"Search failed for KB {kb_obj.id}: {e}")
-
-        # Sort by score and limit
-        all_results.sort(key=lambda x: x.score, reverse=True)
-        final_results = all_results[:limit]
+        response = await self.search_detailed(kb_objects, query, limit)
+        final_results = response.results
 
         if format_results:
             return format_search_results(final_results, include_metadata=False)
 
         return final_results
 
+    async def search_detailed(
+        self,
+        kb_objects: List[KBRead],
+        query: str,
+        limit: int = 5,
+        merge_strategy: Optional[str] = None,
+    ) -> SearchResponse:
+        """
+        Search multiple knowledge bases concurrently
+
+        Each KB search runs under RAG_SEARCH_KB_TIMEOUT (its providers under
+        RAG_SEARCH_PROVIDER_TIMEOUT); KBs that time out or fail are reported in
+        `sources` and the remaining results are still returned.
+
+        Args:
+            kb_objects: List of knowledge base objects
+            query: Search query
+            limit: Maximum results
+            merge_strategy: Provider merge strategy, see AgentRAGService.search_detailed
+
+        Returns:
+            Top results across all KBs plus per-KB and per-provider latency
+        """
+
+        async def search_kb(kb_obj: KBRead):
+            kb_id = str(kb_obj.id)
+            # Service initialization is not subject to the search timeout: cancelling
+            # it midway would only make the next search initialize again.
+            service = await self.get_service(kb_obj)
+            if not service:
+                return None, None
+            return await timed(
+                kb_id,
+                service.search_detailed(query, limit, merge_strategy=merge_strategy),
+                settings.RAG_SEARCH_KB_TIMEOUT,
+            )
+
+        outcomes = await asyncio.gather(*(search_kb(kb_obj) for kb_obj in kb_objects))
+
+        all_results: List[SearchResult] = []
+        response = SearchResponse()
+        for kb_response, timing in outcomes:
+            if timing is None:
+                continue
+            if kb_response is not None:
+                timing.result_count = len(kb_response.results)
+                all_results.extend(kb_response.results)
+                response.sources.extend(kb_response.sources)
+            response.sources.append(timing)
+
+        response.results = top_k(all_results, limit)
+        response.partial = any(timing.status != "ok" for timing in response.sources)
+        if response.partial:
+            logger.warning(
+                "Partial knowledge base search results: "
+                + ", ".join(f"{t.source}={t.status} ({t.latency_ms}ms)" for t in response.sources if t.status != "ok")
+            )
+        else:
+            logger.debug(
+                "Knowledge base search latency: "
+                + ", ".join(f"{t.source}={t.latency_ms}ms" for t in response.sources)
+            )
+        return response
+
     async def get_document_ids(self, kb_obj: KBRead) -> List[str]:
         """
         Get document IDs for a knowledge base
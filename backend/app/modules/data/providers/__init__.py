@@ -8,7 +8,7 @@ Each provider implements the BaseDataProvider interface.
 import importlib as _importlib
 from typing import TYPE_CHECKING
 
-from .models import SearchResult
+from .models import SearchResponse, SearchResult, SourceTiming
 from .base import BaseDataProvider, FinalizableProvider
 from .plain import PlainProvider
 # Config types are lightweight — the vector/legra/lightrag packages expose them eagerly
@@ -46,6 +46,8 @@ __all__ = [
     "BaseDataProvider",
     "FinalizableProvider",
     "SearchResult",
+    "SearchResponse",
+    "SourceTiming",
     "LegraProvider",
     "VectorProvider",
     "LightRAGProvider",
@@ -0,0 +1,254 @@
+"""
+Persistent cache of text embeddings shared by all embedders of a host.
+
+Re-syncing a document (Zendesk/S3/SharePoint re-imports delete and re-add it)
+used to re-embed every chunk although usually only a few paragraphs changed,
+and identical queries were re-embedded on every agent turn. Vectors are now
+stored in a local SQLite file keyed by (embedder namespace, hash of the
+whitespace/unicode-normalized text), so only unseen texts reach the model.
+
+The namespace identifies everything that changes the vectors (provider, model,
+normalization, query vs document encoding). Least recently used entries are
+evicted past EMBEDDING_CACHE_MAX_ENTRIES. Every worker process opens its own
+connection (lazily, so after a Celery prefork fork); SQLite WAL mode lets them
+share the file. Cache failures are logged and treated as misses — they never
+fail an embedding call.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    namespace TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, text_hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+# Hits refresh their LRU timestamp at most this often (avoids a write per lookup)
+_TOUCH_INTERVAL = 300.0
+
+# Eviction trims the cache to this fraction of max_entries
+_EVICT_TO = 0.9
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    """Hash of the text with unicode and whitespace differences normalized away."""
+    normalized = unicodedata.normalize("NFC", " ".join(text.split()))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embedding vectors (stored as float32)."""
+
+    def __init__(self, path: str, max_entries: int = 200_000, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._db.commit()
+            self._pid = os.getpid()
+            self._size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._db
+
+    def get_many(self, namespace: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector per text (None for misses)."""
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connect()
+                stale = []
+                unique = list(dict.fromkeys(hashes))
+                for i in range(0, len(unique), _SQL_CHUNK):
+                    chunk = unique[i:i + _SQL_CHUNK]
+                    rows = db.execute(
+                        "SELECT text_hash, vector, last_used FROM embeddings "
+                        f"WHERE namespace = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                        (namespace, *chunk),
+                    ).fetchall()
+                    for h, blob, last_used in rows:
+                        found[h] = np.frombuffer(blob, dtype=np.float32)
+                        if now - last_used > _TOUCH_INTERVAL:
+                            stale.append(h)
+                if stale:
+                    db.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE namespace = ? AND text_hash = ?",
+                        [(now, namespace, h) for h in stale],
+                    )
+                    db.commit()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache lookup failed, embedding without cache: {e}")
+
+        vectors = [found.get(h) for h in hashes]
+        hits = sum(1 for v in vectors if v is not None)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, namespace: str, texts: Sequence[str], vectors: Sequence[Any]) -> None:
+        """Store freshly computed vectors."""
+        if not self.enabled or not texts:
+            return
+
+        now = time.time()
+        rows = [
+            (namespace, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        try:
+            with self._lock:
+                db = self._connect()
+                before = db.total_changes
+                db.executemany(
+                    "INSERT OR IGNORE INTO embeddings (namespace, text_hash, vector, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                db.commit()
+                added = db.total_changes - before
+                self.writes += added
+                self._size += added
+                if self._size > self.max_entries:
+                    self._evict(db)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        # Other processes write to the same file: recount before trimming
+        self._size = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._size - int(self.max_entries * _EVICT_TO)
+        if self._size <= self.max_entries or excess <= 0:
+            return
+        db.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        db.commit()
+        self._size -= excess
+        self.evictions += excess
+
+    async def get_or_embed(
+        self,
+        namespace: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        Vectors for texts, embedding only the ones not cached yet.
+
+        Embedders signal failure by returning fewer vectors than texts; that
+        result is passed through unchanged and nothing is cached.
+        """
+        if not self.enabled:
+            return await embed(texts)
+
+        cached = await asyncio.to_thread(self.get_many, namespace, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        computed: Dict[str, List[float]] = {}
+        if missing:
+            vectors = await embed(missing)
+            if len(vectors) != len(missing) or not all(len(v) for v in vectors):
+                return vectors
+            await asyncio.to_thread(self.put_many, namespace, missing, vectors)
+            computed = dict(zip(missing, vectors))
+
+        return [v.tolist() if v is not None else computed[t] for t, v in zip(texts, cached)]
+
+    def get_or_encode(
+        self,
+        namespace: str,
+        texts: List[str],
+        encode: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Synchronous variant for numpy embedders; returns a float32 matrix."""
+        if not self.enabled or not texts:
+            return encode(texts).astype(np.float32)
+
+        cached = self.get_many(namespace, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        computed: Dict[str, np.ndarray] = {}
+        if missing:
+            vectors = np.asarray(encode(missing), dtype=np.float32)
+            self.put_many(namespace, missing, vectors)
+            computed = dict(zip(missing, vectors))
+
+        return np.stack([v if v is not None else computed[t] for t, v in zip(texts, cached)])
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM embeddings")
+            db.commit()
+            self._size = 0
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process and the (approximate) shared size."""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": self._size,
+            "max_size": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_embedding_cache = EmbeddingCache(
+    path=settings.EMBEDDING_CACHE_PATH,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    enabled=settings.EMBEDDING_CACHE_ENABLED,
+)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return _embedding_cache
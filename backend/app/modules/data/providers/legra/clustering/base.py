@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 import igraph as ig
 
@@ -14,9 +14,10 @@ class Clusterer(ABC):
     """
 
     @abstractmethod
-    def find_partition(self, graph: ig.Graph) -> List[int]:
+    def find_partition(self, graph: ig.Graph, initial_membership: Optional[List[int]] = None) -> List[int]:
         """
         Given an igraph Graph, return a list of community labels, one per vertex
-        index.
+        index. ``initial_membership`` (e.g. the labels of a previous run) is a
+        starting point for clusterers that support warm starts.
         """
         raise NotImplementedError
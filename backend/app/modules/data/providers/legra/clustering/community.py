@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 import igraph as ig
 import leidenalg as la
@@ -21,13 +21,15 @@ class LeidenClusterer(Clusterer):
             raise ValueError("resolution_parameter must be > 0")
         self.resolution = resolution_parameter
 
-    def find_partition(self, graph: ig.Graph) -> List[int]:
+    def find_partition(self, graph: ig.Graph, initial_membership: Optional[List[int]] = None) -> List[int]:
         """
-        Use leidenalg find_partition with RBConfigurationVertexPartition.
+        Use leidenalg find_partition with RBConfigurationVertexPartition,
+        optionally starting from ``initial_membership`` instead of singletons.
         """
         partition = la.find_partition(
             graph,
             la.RBConfigurationVertexPartition,
+            initial_membership=initial_membership,
             resolution_parameter=self.resolution,
         )
         # partition.membership is a list of community membership per node index
@@ -39,9 +41,9 @@ class LouvainClusterer(Clusterer):
     Community detection via the built-in igraph Louvain algorithm.
     """
 
-    def find_partition(self, graph: ig.Graph) -> List[int]:
+    def find_partition(self, graph: ig.Graph, initial_membership: Optional[List[int]] = None) -> List[int]:
         """
-        Use igraph's community_multilevel (Louvain) method.
+        Use igraph's community_multilevel (Louvain) method (no warm start).
         """
         clustering = graph.community_multilevel()
         # membership: a list where idx → community ID
@@ -17,6 +17,36 @@ DEFAULT_METRIC: Final[str] = "cosine"
 # Default community‐detection resolution parameter
 DEFAULT_RESOLUTION: Final[float] = 1.0
 
+# Root directory of persisted knowledge bases (one sub-directory per KB)
+DATA_DIR: Final[Path] = Path("legra_data")
+
+# Per-KB version stamp rewritten by every Legra.save (generation counter)
+VERSION_FILE: Final[str] = "version.json"
+
+# kNN graph: search exactly up to this many chunks, above it use a persisted IVF index
+KNN_EXACT_MAX_ROWS: Final[int] = 50_000
+
+# IVF lists probed per kNN graph query (recall vs. finalize time)
+KNN_IVF_NPROBE: Final[int] = 16
+
+# Rebuild the kNN graph from scratch when added + removed chunks exceed this share of the KB
+KNN_FULL_REBUILD_RATIO: Final[float] = 0.5
+
+# Graph-expanded retrieval: weight of the graph/community support vs. query similarity
+GRAPH_EXPANSION_WEIGHT: Final[float] = 0.3
+
+# Graph-expanded retrieval: communities (by centroid) whose members become candidates
+GRAPH_EXPANSION_COMMUNITIES: Final[int] = 2
+
+# Graph-expanded retrieval: candidates re-scored against the query per search
+GRAPH_EXPANSION_MAX_CANDIDATES: Final[int] = 2048
+
+# Segmented ingestion store: compact once a KB has this many segments ...
+COMPACTION_MAX_SEGMENTS: Final[int] = 64
+
+# ... or once this fraction of stored rows belongs to deleted/replaced documents
+COMPACTION_MAX_DEAD_RATIO: Final[float] = 0.3
+
 # Path to a cache directory (for embeddings, indexes, etc.)
 CACHE_DIR: Final[Path] = Path(".cache/graphrag")
 
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from collections import defaultdict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, cast
@@ -16,12 +17,15 @@ from transformers import AutoTokenizer
 from . import embedding
 from .chunking.base import Chunker
 from .clustering.base import Clusterer
-from .config import DEFAULT_METRIC, DEFAULT_N_NEIGHBORS
+from .config import DATA_DIR, DEFAULT_METRIC, DEFAULT_N_NEIGHBORS, VERSION_FILE
 from .embedding.base import Embedder
 from .generation.base import Generator
+from .graph.expansion import GraphExpansion
 from .graph.knn_graph import KNNGraphBuilder
+from .graph.neighbors import KNNState, row_keys
 from .index.base import Indexer
 from .retrieval.base import Retriever
+from .storage import SegmentStore
 from .utils import get_logger
 
 _logger = get_logger(__name__)
@@ -31,6 +35,54 @@ __all__ = [
 ]
 
 
+def _replace_atomically(path: Path, write) -> None:
+    """
+    Write `path` through a temporary file and rename it into place.
+
+    Readers never observe a partially written file, and memory-mapped readers
+    keep their (old) inode intact instead of seeing it truncated.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _save_json(path: Path, data: Any, **kwargs) -> None:
+    def write(tmp: Path) -> None:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, **kwargs)
+
+    _replace_atomically(path, write)
+
+
+def _save_npy(path: Path, array: npt.NDArray) -> None:
+    def write(tmp: Path) -> None:
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+
+    _replace_atomically(path, write)
+
+
+def _bump_version(kb_path: Path, full: bool) -> int:
+    """
+    Increment the KB generation in version.json (written last, after all data files).
+
+    Search-side caches compare this stamp to decide whether a loaded snapshot
+    is still current, without re-reading the data files.
+    """
+    stamp_file = kb_path / VERSION_FILE
+    generation = 0
+    try:
+        with open(stamp_file, encoding="utf-8") as f:
+            generation = int(json.load(f)["generation"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    generation += 1
+    _save_json(stamp_file, {"generation": generation, "full": full, "saved_at": time.time()})
+    return generation
+
+
 class Legra:
     """
     Main orchestrator for Legra.
@@ -78,6 +130,10 @@ class Legra:
         # Internal storage
         self.docs_meta: List[Dict[str, Any]] = []
         self.emb_matrix: npt.NDArray | None = None
+        # Neighbour lists of the last graph build (persisted for incremental finalize)
+        self.knn_state: KNNState | None = None
+        # CSR adjacency and communities for graph-expanded retrieval
+        self.graph_expansion: GraphExpansion | None = None
 
         self.community_summaries: Dict[int, str] = {}
 
@@ -123,7 +179,9 @@ class Legra:
     def add_document(self, doc_id: str, extracted_text: str, metadata: dict) -> None:
         """
         Append `doc_id` to the knowledge-base identified by metadata['kb_id'].
-        Only embeddings & docs_meta are updated.  Index/graph will be rebuilt later.
+        The chunks are written as a new segment of the KB's SegmentStore; the
+        existing corpus is never reloaded or rewritten. Index/graph are rebuilt
+        from the live segments at finalization.
         """
         # Handle updates
         self.delete_document(doc_id)
@@ -134,18 +192,8 @@ class Legra:
 
         _logger.info(f"Adding document {doc_id} to KB {kb_id} …")
 
-        # ------------------------------------------------------------------ #
-        # 0. Load existing embeddings & meta for this KB (if they exist)     #
-        # ------------------------------------------------------------------ #
-        kb_dir = Path("legra_data").joinpath(kb_id)
-        if kb_dir.exists():
-            with open(kb_dir / "docs_meta.json", encoding="utf-8") as f:
-                existing_meta: list[dict] = json.load(f)
-            existing_embs: np.ndarray = np.load(kb_dir / "emb_matrix.npy")
-        else:
-            existing_meta = []
-            existing_embs = np.empty((0, self.embedder.dimension), dtype=np.float32)
-            kb_dir.mkdir(parents=True, exist_ok=True)
+        kb_dir = DATA_DIR / str(kb_id)
+        store = SegmentStore(kb_dir).open()
 
         # ------------------------------------------------------------------ #
         # 1. Chunk the new document                                          #
@@ -164,40 +212,35 @@ class Legra:
                 "doc_id": doc_id,
                 "chunk_ix": ix,
                 "text": txt,
-                "embedding": emb,  # kept in RAM, stripped before save()
                 }
-            for ix, (txt, emb) in enumerate(zip(chunks, new_embs))
+            for ix, txt in enumerate(chunks)
             ]
 
         # ------------------------------------------------------------------ #
-        # 4. Concatenate with previous corpus                                #
+        # 4. Append as a new segment (cost independent of the corpus size)   #
         # ------------------------------------------------------------------ #
-        self.docs_meta = existing_meta + new_meta
-        self.emb_matrix = (
-            new_embs if existing_embs.size == 0
-            else np.vstack([existing_embs, new_embs])
-        )
-
-        _logger.info(f"KB {kb_id} now has {len(self.docs_meta)} chunks total.")
+        store.append(new_meta, new_embs)
+        self._save_config(kb_dir)
+        _logger.info(f"KB {kb_id} now has {store.stats()['live_rows']} chunks total.")
 
         # ------------------------------------------------------------------ #
-        # 5. Persist embeddings + meta         #
+        # 5. Finalize, or leave the search snapshot untouched                #
         # ------------------------------------------------------------------ #
         if metadata.get("finalize", False):
-            # index / graph
             _logger.info("Finalizing KB.")
-
-            self.complete_index_graph(kb_id)
-            self.save(kb_id, full=True)
-        else :
-            self.save(kb_id, full=False)  # writes docs_meta.json + emb_matrix.npy
+            store.compact()
+            self.docs_meta, self.emb_matrix = store.materialize()
+            self.complete_index_graph(kb_id)  # saves the full snapshot
+        else:
+            store.compact_in_background()
             _logger.info("Embeddings saved.")
 
 
     def delete_document(self, doc_id: str) -> bool:
         """
         Delete all chunks belonging to `doc_id` from the knowledge base `kb_id`.
-        • Only docs_meta.json and emb_matrix.npy are rewritten.
+        • A tombstone is appended to the KB's segment log; segments are only
+          rewritten by compaction.
         • The FAISS index / graph / community files are deleted because they are
           now stale; your separate “re-index” endpoint will recreate them later.
         Returns
@@ -207,76 +250,56 @@ class Legra:
         """
         kb_id = (doc_id.split("#", 1)[0])[3:] # remove part after # and remove 'KB:' to extract kb_id
 
-        kb_dir = Path("legra_data") / kb_id
+        kb_dir = DATA_DIR / kb_id
         if not kb_dir.exists():
             _logger.warning(f"delete_document: KB {kb_id} does not exist.")
             return False
 
         try:
             # -----------------------------------------------------------------
-            # 1. Load current meta + embeddings
+            # 1. Tombstone the document's segments
             # -----------------------------------------------------------------
-            with open(kb_dir / "docs_meta.json", encoding="utf-8") as f:
-                meta: List[Dict[str, Any]] = json.load(f)
-
-            emb = np.load(kb_dir / "emb_matrix.npy")
-
-            # -----------------------------------------------------------------
-            # 2. Build mask of rows to *keep*
-            # -----------------------------------------------------------------
-            keep_mask = [m["doc_id"] != doc_id for m in meta]
-            if all(keep_mask):
+            store = SegmentStore(kb_dir).open()
+            if not store.delete_document(doc_id):
                 _logger.info(f"delete_document: {doc_id} not found in KB {kb_id}.")
                 return True  # nothing to delete
 
-            # Filter metadata and embeddings
-            new_meta = [m for m, keep in zip(meta, keep_mask) if keep]
-            new_emb = emb[keep_mask]
-
             # If KB becomes empty, wipe directory entirely
-            if not new_meta:
-                import shutil
-
-                shutil.rmtree(kb_dir)
+            remaining = store.stats()["live_rows"]
+            if not remaining:
+                store.destroy()
                 _logger.info(f"delete_document: removed last document; "
                              f"KB {kb_id} directory deleted.")
                 return True
 
             # -----------------------------------------------------------------
-            # 3. Save stripped corpus back to disk
+            # 2. Remove stale index / graph files
             # -----------------------------------------------------------------
-            # Strip embeddings before saving docs_meta.json
-            meta_for_save = [{k: v for k, v in m.items() if k != "embedding"}
-                             for m in new_meta]
-
-            with open(kb_dir / "docs_meta.json", "w", encoding="utf-8") as f:
-                json.dump(meta_for_save, f, ensure_ascii=False, indent=2)
-
-            np.save(kb_dir / "emb_matrix.npy", new_emb)
-
-            # -----------------------------------------------------------------
-            # 4. Remove stale index / graph files
-            # -----------------------------------------------------------------
-            for stale in ("faiss_index.bin", "graph.graphml",
+            for stale in ("faiss_index.bin", "graph.graphml", "graph_expansion.npz",
                           "community_summaries.json"):
                 p = kb_dir / stale
                 if p.exists():
                     p.unlink()
+            _bump_version(kb_dir, full=False)
 
             # -----------------------------------------------------------------
-            # 5. Refresh in-memory state of *this* instance
+            # 3. Refresh in-memory state of *this* instance
             # -----------------------------------------------------------------
-            self.docs_meta = new_meta
-            self.emb_matrix = new_emb
+            if self.emb_matrix is not None and len(self.emb_matrix) == len(self.docs_meta):
+                keep_mask = [m["doc_id"] != doc_id for m in self.docs_meta]
+                self.docs_meta = [m for m, keep in zip(self.docs_meta, keep_mask) if keep]
+                self.emb_matrix = self.emb_matrix[keep_mask]
 
             # the index / graph / labels are now invalid; clear them
             if hasattr(self, "indexer"):
                 self.indexer.index = None
             self.graph = None
             self.community_labels = None
+            self.graph_expansion = None
 
+            store.compact_in_background()
             _logger.info(f"delete_document: removed {doc_id} from KB {kb_id}. "
-                         f"{len(new_meta)} chunks remain.")
+                         f"{remaining} chunks remain.")
             return True
 
         except Exception as e:
@@ -289,27 +312,33 @@ class Legra:
         _logger.info("Building vector index...")
         self.indexer.build_index(self.emb_matrix)
 
-        # 2. Build graph
+        # 2. Build graph, reusing the neighbour lists of the previous finalize
         _logger.info("Constructing kNN graph...")
-        graph, edges = self.graph_builder.fit(self.emb_matrix)
+        previous = KNNState.load(DATA_DIR / str(kb_id))
+        graph, edges, knn_state = self.graph_builder.fit_incremental(
+            self.emb_matrix,
+            row_keys(self.docs_meta),
+            previous,
+            model=getattr(self.embedder, "model_name", ""),
+        )
         self.graph = graph
         self.edges = edges
+        self.knn_state = knn_state
 
-        # 3. Cluster if provided
+        # 3. Cluster if provided, starting from the previous communities
         if self.clusterer is not None:
             _logger.info("Running community detection...")
-            labels = self.clusterer.find_partition(graph)
+            labels = self.clusterer.find_partition(
+                graph, initial_membership=knn_state.warm_start_labels(previous)
+            )
             for idx, label in enumerate(labels):
                 self.docs_meta[idx]["community"] = label
             self.community_labels = labels
+            knn_state.labels = np.asarray(labels, dtype=np.int64)
+        self.graph_expansion = GraphExpansion.build(knn_state, self.emb_matrix, knn_state.labels)
 
         # 4. Prepare retriever if not provided
-        if self.retriever is None:
-            from .retrieval.neighbor_retriever import NeighborRetriever
-
-            self.retriever = NeighborRetriever(
-                    embedder=self.embedder, indexer=self.indexer, docs_meta=self.docs_meta
-                    )
+        self._attach_retriever()
         _logger.info("Vector index completed.")
         _logger.info("Saving full indexed graph...")
         self.save(kb_id, True)
@@ -359,9 +388,10 @@ class Legra:
 
         # 5. Build graph
         _logger.info("Constructing kNN graph...")
-        graph, edges = self.graph_builder.fit(embeddings)
+        graph, edges, knn_state = self.graph_builder.fit_incremental(embeddings, row_keys(meta_list))
         self.graph = graph
         self.edges = edges
+        self.knn_state = knn_state
 
         # 6. Cluster if provided
         if self.clusterer is not None:
@@ -370,16 +400,26 @@ class Legra:
             for idx, label in enumerate(labels):
                 self.docs_meta[idx]["community"] = label
             self.community_labels = labels
+            knn_state.labels = np.asarray(labels, dtype=np.int64)
+        self.graph_expansion = GraphExpansion.build(knn_state, embeddings, knn_state.labels)
 
         # 7. Prepare retriever if not provided
-        if self.retriever is None:
-            from .retrieval.neighbor_retriever import NeighborRetriever
+        self._attach_retriever()
+
+        _logger.info("Indexing pipeline completed.")
 
+    def _attach_retriever(self) -> None:
+        """Create the default retriever if none was provided and hand it the graph arrays."""
+        from .retrieval.neighbor_retriever import NeighborRetriever
+
+        if self.retriever is None:
             self.retriever = NeighborRetriever(
                 embedder=self.embedder, indexer=self.indexer, docs_meta=self.docs_meta
             )
-
-        _logger.info("Indexing pipeline completed.")
+        if isinstance(self.retriever, NeighborRetriever):
+            self.retriever.docs_meta = self.docs_meta
+            self.retriever.expansion = self.graph_expansion
+            self.retriever.emb_matrix = self.emb_matrix
 
     def generate_node_summaries(
         self,
@@ -502,10 +542,12 @@ class Legra:
           - emb_matrix.npy
           - faiss_index.bin (if using FaissFlatIndexer)
           - graph.graphml
+          - knn_graph.npz, knn_ivf.index (neighbour lists, if built incrementally)
+          - graph_expansion.npz (adjacency/communities for graph-expanded retrieval)
           - community_summaries.json (if any)
+          - version.json (generation stamp, bumped on every save)
         """
-        base = Path("legra_data")
-        path = base.joinpath(path)
+        path = DATA_DIR.joinpath(path)
         path.mkdir(parents=True, exist_ok=True)
 
         # Save docs_meta without embeddings
@@ -516,15 +558,48 @@ class Legra:
             meta_copy.pop("embedding", None)
             docs_meta_to_save.append(meta_copy)
 
-        with open(path / "docs_meta.json", "w", encoding="utf-8") as f:
-            json.dump(docs_meta_to_save, f, ensure_ascii=False, indent=2)
+        _save_json(path / "docs_meta.json", docs_meta_to_save, ensure_ascii=False, indent=2)
+
+        # Save embeddings matrix
+        _save_npy(path / "emb_matrix.npy", self.emb_matrix)
+
+        self._save_config(path)
+
+        if full:
+            # If we have indexed and created the graph
+            # Save index if FaissFlatIndexer
+            if isinstance(self.indexer, Indexer) and hasattr(self.indexer, "index"):
+                try:
+                    _replace_atomically(
+                        path / "faiss_index.bin",
+                        lambda tmp: faiss.write_index(self.indexer.index, str(tmp)),
+                    )
+                except Exception:
+                    pass
+
+            # Save graph to GraphML
+            _replace_atomically(path / "graph.graphml", lambda tmp: self.graph.write_graphml(str(tmp)))
+
+            # Neighbour lists for the next incremental finalize
+            if self.knn_state is not None:
+                self.knn_state.save(path)
+            if self.graph_expansion is not None:
+                self.graph_expansion.save(path)
+
+            # Save community summaries if exist
+            if self.community_summaries:
+                with open(path / "community_summaries.json", "w", encoding="utf-8") as f:
+                    json.dump(self.community_summaries, f, ensure_ascii=False, indent=2)
+
+        # Written last: readers treat a new generation as "data files changed"
+        _bump_version(path, full=full)
+
 
+    def _save_config(self, path: Path) -> None:
+        """Write the small component configs (legra/embedder/generator/retriever.json)."""
         with open(path / "legra.json", "w", encoding="utf-8") as f:
             json.dump({"max_tokens": self.max_tokens}, f)
 
-        # Save embeddings matrix
-        np.save(path / "emb_matrix.npy", self.emb_matrix)
-
         with open(path / "embedder.json", "w", encoding="utf-8") as f:
             json.dump(
                 {"class": self.embedder.__class__.__name__,
@@ -551,45 +626,52 @@ class Legra:
             with open(path / "retriever.json", "w", encoding="utf-8") as f:
                 json.dump(retriever_config, f, ensure_ascii=False, indent=2)
 
-        if full:
-            # If we have indexed and created the graph
-            # Save index if FaissFlatIndexer
-            if isinstance(self.indexer, Indexer) and hasattr(self.indexer, "index"):
-                try:
-                    faiss.write_index(self.indexer.index, str(path / "faiss_index.bin"))
-                except Exception:
-                    pass
-
-            # Save graph to GraphML
-            self.graph.write_graphml(str(path / "graph.graphml"))
-
-            # Save community summaries if exist
-            if self.community_summaries:
-                with open(path / "community_summaries.json", "w", encoding="utf-8") as f:
-                    json.dump(self.community_summaries, f, ensure_ascii=False, indent=2)
-
 
     @classmethod
-    def load(cls, path: str | Path, load_reason: str = "search") -> "Legra":
+    def load(
+        cls,
+        path: str | Path,
+        load_reason: str = "search",
+        load_generator: bool = True,
+    ) -> "Legra":
         """
         Load a knowledge-base snapshot from disk.
 
+        For searches the embedding matrix is memory-mapped read-only (it is only
+        needed again when the index is rebuilt). ``load_generator=False`` skips
+        loading the generation model for retrieval-only use. Other load reasons
+        (finalization) compact the KB's segments and read the live corpus from
+        them instead of the last docs_meta.json/emb_matrix.npy snapshot.
+
         Directory layout (some files may be missing):
-            docs_meta.json                # REQUIRED
-            emb_matrix.npy                # REQUIRED
+            docs_meta.json                # REQUIRED unless segmented
+            emb_matrix.npy                # REQUIRED unless segmented
+            segments.jsonl, segments/     # OPTIONAL  (SegmentStore)
             faiss_index.bin               # OPTIONAL
             graph.graphml                 # OPTIONAL
+            knn_graph.npz, knn_ivf.index  # OPTIONAL  (read by the next finalize)
+            graph_expansion.npz           # OPTIONAL  (graph-expanded retrieval)
             community_summaries.json      # OPTIONAL
             embedder.json                 # REQUIRED
             legra.json                    # REQUIRED  (contains max_tokens)
+            version.json                  # OPTIONAL  (generation stamp)
         """
-        kb_path = Path("legra_data").joinpath(path)
+        kb_path = DATA_DIR.joinpath(path)
 
         # 1. docs_meta + embeddings  ------------------------------------
-        with open(kb_path / "docs_meta.json", encoding="utf-8") as f:
-            docs_meta: List[Dict[str, Any]] = json.load(f)
+        docs_meta: List[Dict[str, Any]]
+        emb_matrix: npt.NDArray
+        store = SegmentStore(kb_path)
+        if load_reason != "search" and store.exists():
+            store.compact()
+            docs_meta, emb_matrix = store.materialize()
+        else:
+            with open(kb_path / "docs_meta.json", encoding="utf-8") as f:
+                docs_meta = json.load(f)
 
-        emb_matrix: npt.NDArray = np.load(kb_path / "emb_matrix.npy")
+            emb_matrix = np.load(
+                kb_path / "emb_matrix.npy", mmap_mode="r" if load_reason == "search" else None
+            )
 
         # 2. (optional) graph  ------------------------------------------
         graph_file = kb_path / "graph.graphml"
@@ -608,7 +690,7 @@ class Legra:
 
         gen_file = kb_path / "generator.json"
         generator: Optional[Generator] = None
-        if gen_file.exists():
+        if load_generator and gen_file.exists():
             with open(gen_file, encoding="utf-8") as f:
                 gconf = json.load(f)
             generator_cls = getattr(hf_generation, gconf["class"])
@@ -643,7 +725,9 @@ class Legra:
             retriever = retriever_cls(
                     embedder=embedder,
                     indexer=indexer,
-                    docs_meta=docs_meta
+                    docs_meta=docs_meta,
+                    expansion=GraphExpansion.load(kb_path) if load_reason == "search" else None,
+                    emb_matrix=emb_matrix,
                     )
         else:
             retriever = None
@@ -699,10 +783,19 @@ class Legra:
         return self
 
 
-    def query(self, query_text: str, top_k: int = 5, generate: bool = True, **gen_kwargs) -> str:
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        generate: bool = True,
+        retrieval_mode: str = "flat",
+        budget_ms: Optional[float] = None,
+        **gen_kwargs,
+    ) -> str:
         """
         Query pipeline:
-          1. Retrieve top_k chunks via retriever
+          1. Retrieve top_k chunks via retriever ("flat" search, or "graph" to
+             also expand along the kNN graph and communities within budget_ms)
           2. Build a context string from retrieved chunks
           3. If a generator is configured, call generator.generate()
              else return raw chunks concatenated.
@@ -712,7 +805,10 @@ class Legra:
             raise RuntimeError("Retriever is missing.")
 
         # 1. Retrieve
-        results = self.retriever.retrieve(query_text, top_k)
+        if retrieval_mode == "flat":
+            results = self.retriever.retrieve(query_text, top_k)
+        else:
+            results = self.retriever.retrieve(query_text, top_k, mode=retrieval_mode, budget_ms=budget_ms)
         # 2. Build context
         context_pieces = [r["text"] for r in results]
         context = "\n".join(context_pieces)
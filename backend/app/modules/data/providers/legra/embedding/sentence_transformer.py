@@ -5,6 +5,7 @@ import numpy.typing as npt
 from openai import OpenAI
 from sentence_transformers import SentenceTransformer
 
+from ...embedding_cache import get_embedding_cache
 from .base import Embedder
 
 __all__ = [
@@ -69,6 +70,12 @@ class SentenceTransformerEmbedder(Embedder):
         if prefix:
             texts = [f"{prefix}; {text}" for text in texts]
 
+        # Only texts missing from the persistent embedding cache reach the model
+        return get_embedding_cache().get_or_encode(
+            f"sentence-transformers:{self.model_name}", texts, self._encode
+        )
+
+    def _encode(self, texts: List[str]) -> npt.NDArray:
         embs = self._model.encode(texts, convert_to_numpy=True)
         return embs.astype(np.float32)
 
@@ -1,5 +1,10 @@
+from .expansion import GraphExpansion
 from .knn_graph import KNNGraphBuilder
+from .neighbors import IncrementalKNN, KNNState
 
 __all__ = [
+    'GraphExpansion',
+    'IncrementalKNN',
     'KNNGraphBuilder',
+    'KNNState',
 ]
@@ -0,0 +1,172 @@
+"""
+Query-time view of the LEGRA chunk graph.
+
+The kNN graph and Leiden communities are built at finalize but were only ever
+written to graph.graphml. For retrieval they are precomputed into flat arrays
+(``graph_expansion.npz``) that can be gathered with NumPy without touching
+igraph:
+
+  * a symmetric CSR adjacency (``indptr``/``indices``) with the cosine
+    similarity of each edge's chunks as weight, and
+  * the members of each community (CSR as well) and their normalized
+    centroids, searched with a small flat faiss index.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+import numpy.typing as npt
+
+from .neighbors import KNNState, _save_atomically
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'GraphExpansion',
+]
+
+EXPANSION_FILE = "graph_expansion.npz"
+
+# Rows normalized per batch while building (bounds the temporary copies)
+_BATCH = 65536
+
+
+def _normalized(emb_matrix: npt.NDArray, rows: npt.NDArray[np.int64]) -> npt.NDArray[np.float32]:
+    vectors = np.asarray(emb_matrix[rows], dtype=np.float32)
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def _csr(groups: npt.NDArray[np.int64], n_groups: int) -> npt.NDArray[np.int64]:
+    """indptr of sorted group ids."""
+    indptr = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, minlength=n_groups), out=indptr[1:])
+    return indptr
+
+
+@dataclass
+class GraphExpansion:
+    """Adjacency and communities of a KB's chunks, indexed by docs_meta row."""
+
+    indptr: npt.NDArray[np.int64]
+    indices: npt.NDArray[np.int32]
+    weights: npt.NDArray[np.float32]
+    community_indptr: npt.NDArray[np.int64]
+    community_members: npt.NDArray[np.int32]
+    centroids: npt.NDArray[np.float32]
+    _centroid_index: Optional[faiss.Index] = field(default=None, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def n_communities(self) -> int:
+        return len(self.community_indptr) - 1
+
+    @classmethod
+    def build(
+        cls,
+        state: KNNState,
+        emb_matrix: npt.NDArray,
+        labels: Optional[npt.NDArray[np.int64]] = None,
+    ) -> "GraphExpansion":
+        n = len(state)
+        edges = state.edges()
+        weights = np.empty(len(edges), dtype=np.float32)
+        for start in range(0, len(edges), _BATCH):
+            pair = edges[start:start + _BATCH]
+            weights[start:start + _BATCH] = np.einsum(
+                "ij,ij->i", _normalized(emb_matrix, pair[:, 0]), _normalized(emb_matrix, pair[:, 1])
+            )
+
+        # Both directions of every edge, grouped by source row
+        src = np.concatenate([edges[:, 0], edges[:, 1]])
+        dst = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(src, kind="stable")
+        indptr = _csr(src[order], n)
+
+        dim = emb_matrix.shape[1]
+        if labels is None or len(labels) != n:
+            labels = np.empty(0, dtype=np.int64)
+        labels = np.asarray(labels, dtype=np.int64)
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+        members = np.argsort(labels, kind="stable")
+        centroids = np.zeros((n_communities, dim), dtype=np.float32)
+        for start in range(0, len(labels), _BATCH):
+            rows = np.arange(start, min(start + _BATCH, len(labels)))
+            np.add.at(centroids, labels[rows], _normalized(emb_matrix, rows))
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+
+        return cls(
+            indptr=indptr,
+            indices=dst[order].astype(np.int32),
+            weights=np.concatenate([weights, weights])[order],
+            community_indptr=_csr(labels[members], n_communities),
+            community_members=members.astype(np.int32),
+            centroids=centroids,
+        )
+
+    def neighbors(
+        self, rows: npt.NDArray[np.int64]
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int32], npt.NDArray[np.float32]]:
+        """All edges of ``rows`` as (position in rows, neighbour row, weight)."""
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        origin = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + starts[origin]
+        return origin, self.indices[offsets], self.weights[offsets]
+
+    def nearest_communities(
+        self, query: npt.NDArray[np.float32], count: int
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        """The ``count`` communities whose centroid is closest to the normalized query."""
+        if not self.n_communities or count <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self._centroid_index is None:
+            index = faiss.IndexFlatIP(self.centroids.shape[1])
+            index.add(self.centroids)
+            self._centroid_index = index
+        sims, found = self._centroid_index.search(query.reshape(1, -1), min(count, self.n_communities))
+        return found[0], sims[0]
+
+    def members(self, communities: npt.NDArray[np.int64]) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]:
+        """Members of ``communities`` as (position in communities, row)."""
+        starts = self.community_indptr[communities]
+        counts = self.community_indptr[communities + 1] - starts
+        origin = np.repeat(np.arange(len(communities)), counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + starts[origin]
+        return origin, self.community_members[offsets]
+
+    def save(self, kb_path: Path) -> None:
+        def write(tmp: Path) -> None:
+            # A file object, since np.savez appends ".npz" to other paths
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    indptr=self.indptr,
+                    indices=self.indices,
+                    weights=self.weights,
+                    community_indptr=self.community_indptr,
+                    community_members=self.community_members,
+                    centroids=self.centroids,
+                )
+
+        _save_atomically(kb_path / EXPANSION_FILE, write)
+
+    @classmethod
+    def load(cls, kb_path: Path) -> Optional["GraphExpansion"]:
+        """The persisted arrays of a KB, or None (finalized before they existed, or unreadable)."""
+        expansion_file = kb_path / EXPANSION_FILE
+        if not expansion_file.exists():
+            return None
+        try:
+            with np.load(expansion_file) as data:
+                return cls(**{name: data[name] for name in data.files})
+        except Exception as exc:
+            logger.warning(f"Ignoring unreadable graph expansion arrays in {kb_path}: {exc}")
+            return None
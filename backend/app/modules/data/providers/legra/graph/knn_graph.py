@@ -1,8 +1,10 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import igraph as ig
+import numpy as np
 import numpy.typing as npt
-from sklearn.neighbors import NearestNeighbors
+
+from .neighbors import IncrementalKNN, KNNState
 
 __all__ = [
     'KNNGraphBuilder',
@@ -14,20 +16,24 @@ class KNNGraphBuilder:
     Build an undirected kNN graph from an embedding matrix.
 
     - Each node corresponds to one embedding vector.
-    - Edges connect nodes if they are among each other's top-k nearest
+    - Edges connect nodes if either is among the other's top-k nearest
       neighbors.
+
+    Neighbours are found with faiss (exact for small corpora, IVF above
+    KNN_EXACT_MAX_ROWS). ``fit_incremental`` reuses the neighbour lists of the
+    previous build and only queries added rows and rows that lost a neighbour.
     """
 
     def __init__(self, n_neighbors: int = 10, metric: str = "cosine"):
         self.n_neighbors = n_neighbors
         self.metric = metric
-        # We optionally keep a fitted sklearn NearestNeighbors for
-        # reproducibility
-        self._nbrs: NearestNeighbors = NearestNeighbors(
-            n_neighbors=self.n_neighbors,
-            metric=self.metric,
-        )
+        self._knn = IncrementalKNN(n_neighbors=n_neighbors, metric=metric)
 
+    @staticmethod
+    def _to_graph(state: KNNState) -> Tuple[ig.Graph, List[Tuple[int, int]]]:
+        edges = [tuple(edge) for edge in state.edges().tolist()]
+        graph = ig.Graph(n=len(state), edges=edges, directed=False)
+        return graph, edges
 
     def fit(self, emb_matrix: npt.NDArray) -> Tuple[ig.Graph, List[Tuple[int, int]]]:
         """
@@ -37,23 +43,21 @@ class KNNGraphBuilder:
         if N < 2:  # nothing to connect
             return ig.Graph(n=N), []
 
-        # Fit the index once
-        self._nbrs.fit(emb_matrix)
-
-        # Choose a legal number of neighbours
-        k_builtin = getattr(self._nbrs, "n_neighbors", 10)
-        k = min(k_builtin, N - 1)  # ▸ ensures k ≤ N - 1
-
-        # Query neighbours
-        distances, indices = self._nbrs.kneighbors(emb_matrix, n_neighbors=k)
-
-        # Build undirected edge list
-        edges: List[Tuple[int, int]] = []
-        for i, nbrs in enumerate(indices):
-            for j in nbrs:
-                if i < j:
-                    edges.append((i, j))
-
-        graph = ig.Graph(n=N, edges=edges, directed=False)
-        return graph, edges
+        state = self._knn.build(emb_matrix, np.arange(N, dtype=np.int64))
+        return self._to_graph(state)
 
+    def fit_incremental(
+        self,
+        emb_matrix: npt.NDArray,
+        keys: npt.NDArray[np.int64],
+        previous: Optional[KNNState] = None,
+        model: str = "",
+    ) -> Tuple[ig.Graph, List[Tuple[int, int]], KNNState]:
+        """
+        Build the k-NN graph of emb_matrix, reusing the neighbour lists of
+        ``previous`` for rows whose content key (see ``neighbors.row_keys``) is
+        unchanged. Returns the graph, its edges and the state to persist.
+        """
+        state = self._knn.update(previous, emb_matrix, keys, model=model)
+        graph, edges = self._to_graph(state)
+        return graph, edges, state
@@ -0,0 +1,433 @@
+"""
+Incremental k-nearest-neighbour lists for the LEGRA chunk graph.
+
+Finalizing a KB used to fit an exact NearestNeighbors model over the whole
+embedding matrix and query every row, then re-cluster from scratch. The
+neighbour lists are now persisted with the KB (``knn_graph.npz``), each row
+identified by a stable id and a content key (doc_id, chunk_ix, text), so the
+next finalize only queries:
+
+  * rows that were added since the last finalize, and
+  * rows that had a neighbour among the deleted/replaced rows,
+
+and inserts the new rows into the lists of existing rows they are closer to
+than those rows' current k-th neighbour.
+
+Small KBs are searched exactly (flat index). Above ``KNN_EXACT_MAX_ROWS`` rows
+an IVF index keyed by the stable ids is persisted next to the lists
+(``knn_ivf.index``); new rows are added to it and deleted rows removed, and it
+is retrained once the corpus outgrows the size it was trained on.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import faiss
+import numpy as np
+import numpy.typing as npt
+
+from ..config import KNN_EXACT_MAX_ROWS, KNN_FULL_REBUILD_RATIO, KNN_IVF_NPROBE
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    'IncrementalKNN',
+    'KNNState',
+    'row_keys',
+]
+
+STATE_FILE = "knn_graph.npz"
+INDEX_FILE = "knn_ivf.index"
+
+# Rows searched per faiss call while building
+_SEARCH_BATCH = 16384
+
+
+def row_keys(docs_meta: Sequence[Dict[str, Any]]) -> npt.NDArray[np.int64]:
+    """64-bit content key of every chunk row: same document, position and text."""
+    keys = np.empty(len(docs_meta), dtype=np.int64)
+    for i, meta in enumerate(docs_meta):
+        digest = hashlib.blake2b(
+            f"{meta.get('doc_id')}\x1f{meta.get('chunk_ix')}\x1f{meta.get('text', '')}".encode("utf-8"),
+            digest_size=8,
+        ).digest()
+        keys[i] = int.from_bytes(digest, "little", signed=True)
+    return keys
+
+
+def _save_atomically(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+@dataclass
+class KNNState:
+    """Neighbour lists of a corpus, row-aligned with its docs_meta / emb_matrix."""
+
+    ids: npt.NDArray[np.int64]  # stable id of every row
+    keys: npt.NDArray[np.int64]  # content key of every row (see row_keys)
+    neighbors: npt.NDArray[np.int64]  # (N, k) stable ids of the nearest rows, -1 padded
+    sims: npt.NDArray[np.float32]  # (N, k) similarities, descending, -inf padded
+    next_id: int
+    fingerprint: str  # embedder/metric/k the lists were built with
+    labels: Optional[npt.NDArray[np.int64]] = None  # community per row, once clustered
+    index: Any = None  # persisted IVF index (faiss.Index) keyed by stable id
+    trained_rows: int = 0
+    # Set by IncrementalKNN.update: previous row of every current row (-1 = new)
+    previous_rows: Optional[npt.NDArray[np.int64]] = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def positions(self) -> npt.NDArray[np.int64]:
+        """Lookup table stable id -> row (-1 for ids no longer present)."""
+        pos = np.full(self.next_id, -1, dtype=np.int64)
+        pos[self.ids] = np.arange(len(self.ids))
+        return pos
+
+    def edges(self) -> npt.NDArray[np.int64]:
+        """Undirected edge list (E, 2) over row numbers, one edge per neighbour pair."""
+        n, k = self.neighbors.shape
+        if not n or not k:
+            return np.empty((0, 2), dtype=np.int64)
+        rows = np.repeat(np.arange(n), k)
+        cols = self.positions()[np.maximum(self.neighbors.ravel(), 0)]
+        valid = (self.neighbors.ravel() >= 0) & (cols >= 0) & (cols != rows)
+        low = np.minimum(rows[valid], cols[valid])
+        high = np.maximum(rows[valid], cols[valid])
+        pairs = np.unique(low * n + high)
+        return np.stack([pairs // n, pairs % n], axis=1)
+
+    def warm_start_labels(self, previous: Optional["KNNState"]) -> Optional[List[int]]:
+        """
+        Initial community per row for a warm-started clustering: the previous
+        label of kept rows, the label of the closest labelled neighbour for new
+        rows, and a fresh community for rows with neither.
+        """
+        if previous is None or previous.labels is None or self.previous_rows is None:
+            return None
+        labels = np.full(len(self), -1, dtype=np.int64)
+        kept = self.previous_rows >= 0
+        labels[kept] = previous.labels[self.previous_rows[kept]]
+
+        pos = self.positions()
+        for row in np.flatnonzero(~kept):
+            for neighbor in self.neighbors[row]:
+                if neighbor >= 0 and labels[pos[neighbor]] >= 0:
+                    labels[row] = labels[pos[neighbor]]
+                    break
+        unlabelled = labels < 0
+        labels[unlabelled] = labels.max(initial=-1) + 1 + np.arange(int(unlabelled.sum()))
+        # Leiden expects community ids in [0, N)
+        return np.unique(labels, return_inverse=True)[1].tolist()
+
+    def save(self, kb_path: Path) -> None:
+        labels = self.labels if self.labels is not None else np.empty(0, dtype=np.int64)
+
+        def write_state(tmp: Path) -> None:
+            # A file object, since np.savez appends ".npz" to other paths
+            with open(tmp, "wb") as f:
+                np.savez(
+                    f,
+                    ids=self.ids,
+                    keys=self.keys,
+                    neighbors=self.neighbors,
+                    sims=self.sims,
+                    labels=labels,
+                    next_id=np.int64(self.next_id),
+                    trained_rows=np.int64(self.trained_rows),
+                    fingerprint=np.array(self.fingerprint),
+                )
+
+        _save_atomically(kb_path / STATE_FILE, write_state)
+        index_file = kb_path / INDEX_FILE
+        if self.index is not None:
+            _save_atomically(index_file, lambda tmp: faiss.write_index(self.index, str(tmp)))
+        elif index_file.exists():
+            index_file.unlink()
+
+    @classmethod
+    def load(cls, kb_path: Path) -> Optional["KNNState"]:
+        """The persisted lists of a KB, or None (never finalized, or unreadable)."""
+        state_file = kb_path / STATE_FILE
+        if not state_file.exists():
+            return None
+        try:
+            with np.load(state_file) as data:
+                labels = data["labels"]
+                state = cls(
+                    ids=data["ids"],
+                    keys=data["keys"],
+                    neighbors=data["neighbors"],
+                    sims=data["sims"],
+                    labels=labels if len(labels) == len(data["ids"]) else None,
+                    next_id=int(data["next_id"]),
+                    trained_rows=int(data["trained_rows"]),
+                    fingerprint=str(data["fingerprint"]),
+                )
+            index_file = kb_path / INDEX_FILE
+            if index_file.exists():
+                state.index = faiss.read_index(str(index_file))
+            return state
+        except Exception as exc:
+            logger.warning(f"Ignoring unreadable kNN state in {kb_path}: {exc}")
+            return None
+
+
+class IncrementalKNN:
+    """
+    Builds and updates KNNState neighbour lists with faiss.
+
+    Metrics: "cosine" (inner product of normalized vectors), "ip"/"inner_product"
+    and "euclidean"/"l2" (similarity = -distance).
+    """
+
+    def __init__(
+        self,
+        n_neighbors: int = 10,
+        metric: str = "cosine",
+        exact_max_rows: int = KNN_EXACT_MAX_ROWS,
+        nprobe: int = KNN_IVF_NPROBE,
+        full_rebuild_ratio: float = KNN_FULL_REBUILD_RATIO,
+    ) -> None:
+        if metric not in ("cosine", "ip", "inner_product", "euclidean", "l2"):
+            raise ValueError(f"Unsupported kNN graph metric: {metric}")
+        self.n_neighbors = n_neighbors
+        self.metric = metric
+        self.exact_max_rows = exact_max_rows
+        self.nprobe = nprobe
+        self.full_rebuild_ratio = full_rebuild_ratio
+
+    @property
+    def _l2(self) -> bool:
+        return self.metric in ("euclidean", "l2")
+
+    def fingerprint(self, model: str = "") -> str:
+        return f"{model}|{self.metric}|{self.n_neighbors}"
+
+    # ------------------------------------------------------------------ #
+    # Index                                                              #
+    # ------------------------------------------------------------------ #
+    def _prepare(self, emb_matrix: npt.NDArray) -> npt.NDArray[np.float32]:
+        vectors = np.ascontiguousarray(emb_matrix, dtype=np.float32)
+        if self.metric == "cosine":
+            vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        return vectors
+
+    def _new_index(self, vectors: npt.NDArray[np.float32], ids: npt.NDArray[np.int64]) -> tuple:
+        """Index of all rows keyed by stable id; returns (index, persist, trained_rows)."""
+        n, dim = vectors.shape
+        metric = faiss.METRIC_L2 if self._l2 else faiss.METRIC_INNER_PRODUCT
+        if n <= self.exact_max_rows:
+            flat = faiss.IndexFlatL2(dim) if self._l2 else faiss.IndexFlatIP(dim)
+            index = faiss.IndexIDMap2(flat)
+            index.add_with_ids(vectors, ids)
+            return index, False, n
+
+        nlist = int(min(max(4 * np.sqrt(n), 16), 65536))
+        quantizer = faiss.IndexFlatL2(dim) if self._l2 else faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        sample = np.random.default_rng(0).choice(n, size=min(n, nlist * 64), replace=False)
+        index.train(vectors[np.sort(sample)])
+        index.add_with_ids(vectors, ids)
+        return index, True, n
+
+    def _search(self, index, vectors: npt.NDArray[np.float32], self_ids: npt.NDArray[np.int64]) -> tuple:
+        """Top-k (ids, sims) of every vector, excluding the row itself."""
+        k = self.n_neighbors
+        if hasattr(index, "nprobe"):
+            index.nprobe = self.nprobe
+        out_ids = np.full((len(vectors), k), -1, dtype=np.int64)
+        out_sims = np.full((len(vectors), k), -np.inf, dtype=np.float32)
+        for start in range(0, len(vectors), _SEARCH_BATCH):
+            stop = start + _SEARCH_BATCH
+            dists, found = index.search(vectors[start:stop], k + 1)
+            sims = -dists if self._l2 else dists
+            # Drop the row itself (and padding), keep the best k of the rest
+            keep = (found != self_ids[start:stop, None]) & (found >= 0)
+            order = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+            taken_ids = np.take_along_axis(found, order, axis=1)
+            taken_keep = np.take_along_axis(keep, order, axis=1)
+            out_ids[start:stop] = np.where(taken_keep, taken_ids, -1)
+            out_sims[start:stop] = np.where(taken_keep, np.take_along_axis(sims, order, axis=1), -np.inf)
+        return out_ids, out_sims
+
+    # ------------------------------------------------------------------ #
+    # Build / update                                                     #
+    # ------------------------------------------------------------------ #
+    def build(self, emb_matrix: npt.NDArray, keys: npt.NDArray[np.int64], model: str = "") -> KNNState:
+        """Neighbour lists of every row, from scratch."""
+        n = len(emb_matrix)
+        ids = np.arange(n, dtype=np.int64)
+        state = KNNState(
+            ids=ids,
+            keys=np.asarray(keys, dtype=np.int64),
+            neighbors=np.full((n, self.n_neighbors), -1, dtype=np.int64),
+            sims=np.full((n, self.n_neighbors), -np.inf, dtype=np.float32),
+            next_id=n,
+            fingerprint=self.fingerprint(model),
+        )
+        if n < 2:
+            return state
+        vectors = self._prepare(emb_matrix)
+        index, persist, trained_rows = self._new_index(vectors, ids)
+        state.neighbors, state.sims = self._search(index, vectors, ids)
+        state.index = index if persist else None
+        state.trained_rows = trained_rows if persist else 0
+        return state
+
+    def update(
+        self,
+        previous: Optional[KNNState],
+        emb_matrix: npt.NDArray,
+        keys: npt.NDArray[np.int64],
+        model: str = "",
+    ) -> KNNState:
+        """
+        Neighbour lists of the current corpus, reusing ``previous`` for rows
+        whose content did not change. Falls back to a full build when there is
+        no usable previous state or most of the corpus changed.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        n = len(emb_matrix)
+        if previous is None or previous.fingerprint != self.fingerprint(model) or not len(previous):
+            state = self.build(emb_matrix, keys, model)
+            state.previous_rows = self._match(previous, keys) if previous is not None else None
+            return state
+
+        previous_rows = self._match(previous, keys)
+        kept = previous_rows >= 0
+        kept_old = np.zeros(len(previous), dtype=bool)
+        kept_old[previous_rows[kept]] = True
+        removed_ids = previous.ids[~kept_old]
+        added = int((~kept).sum())
+
+        if added + len(removed_ids) > self.full_rebuild_ratio * max(n, 1):
+            state = self.build(emb_matrix, keys, model)
+            state.previous_rows = previous_rows
+            return state
+
+        ids = np.empty(n, dtype=np.int64)
+        ids[kept] = previous.ids[previous_rows[kept]]
+        ids[~kept] = previous.next_id + np.arange(added)
+        neighbors = np.full((n, self.n_neighbors), -1, dtype=np.int64)
+        sims = np.full((n, self.n_neighbors), -np.inf, dtype=np.float32)
+        neighbors[kept] = previous.neighbors[previous_rows[kept]]
+        sims[kept] = previous.sims[previous_rows[kept]]
+
+        state = KNNState(
+            ids=ids,
+            keys=keys,
+            neighbors=neighbors,
+            sims=sims,
+            next_id=previous.next_id + added,
+            fingerprint=previous.fingerprint,
+            previous_rows=previous_rows,
+        )
+        if n < 2:
+            return state
+
+        # Rows to (re)query: new ones and those that lost a neighbour
+        dirty = kept & np.isin(neighbors, removed_ids).any(axis=1)
+        affected = np.flatnonzero(~kept | dirty)
+        if not len(affected):
+            state.index, state.trained_rows = previous.index, previous.trained_rows
+            return state
+
+        vectors = self._prepare(emb_matrix)
+        index = previous.index
+        if index is not None and index.d == vectors.shape[1] and self.exact_max_rows < n <= 4 * previous.trained_rows:
+            if len(removed_ids):
+                index.remove_ids(removed_ids)
+            new_rows = np.flatnonzero(~kept)
+            if len(new_rows):
+                index.add_with_ids(vectors[new_rows], ids[new_rows])
+            state.index, state.trained_rows = index, previous.trained_rows
+        else:
+            index, persist, trained_rows = self._new_index(vectors, ids)
+            state.index = index if persist else None
+            state.trained_rows = trained_rows if persist else 0
+
+        found_ids, found_sims = self._search(index, vectors[affected], ids[affected])
+        neighbors[affected] = found_ids
+        sims[affected] = found_sims
+        new_rows = np.flatnonzero(~kept)
+        if state.index is None and len(new_rows):
+            # Exact: every unchanged row looks for closer neighbours among the new rows
+            clean = np.flatnonzero(kept & ~dirty)
+            new_index, _, _ = self._new_index(vectors[new_rows], ids[new_rows])
+            candidate_ids, candidate_sims = self._search(new_index, vectors[clean], ids[clean])
+            self._merge(state, clean, candidate_ids, candidate_sims)
+        else:
+            # Approximate: only rows the new rows found as their own neighbours
+            self._insert_reverse(state, affected, found_ids, found_sims, skip=~kept | dirty)
+        logger.info(
+            f"kNN graph update: {added} added, {len(removed_ids)} removed, "
+            f"{len(affected)} of {n} rows re-queried"
+        )
+        return state
+
+    @staticmethod
+    def _match(previous: KNNState, keys: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """Previous row of every current row with the same content key (-1 if none)."""
+        result = np.full(len(keys), -1, dtype=np.int64)
+        if not len(previous) or not len(keys):
+            return result
+        order = np.argsort(previous.keys, kind="stable")
+        sorted_keys = previous.keys[order]
+        loc = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        found = sorted_keys[loc] == keys
+        result[found] = order[loc[found]]
+        # A previous row is reused at most once
+        _, first = np.unique(result[found], return_index=True)
+        duplicate = np.ones(int(found.sum()), dtype=bool)
+        duplicate[first] = False
+        result[np.flatnonzero(found)[duplicate]] = -1
+        return result
+
+    @staticmethod
+    def _merge(
+        state: KNNState,
+        rows: npt.NDArray[np.int64],
+        candidate_ids: npt.NDArray[np.int64],
+        candidate_sims: npt.NDArray[np.float32],
+    ) -> None:
+        """Keep the best k of each row's current neighbours and its candidates."""
+        k = state.neighbors.shape[1]
+        all_ids = np.concatenate([state.neighbors[rows], candidate_ids], axis=1)
+        all_sims = np.concatenate([state.sims[rows], candidate_sims], axis=1)
+        order = np.argsort(-all_sims, axis=1, kind="stable")[:, :k]
+        state.neighbors[rows] = np.take_along_axis(all_ids, order, axis=1)
+        state.sims[rows] = np.take_along_axis(all_sims, order, axis=1)
+
+    @staticmethod
+    def _insert_reverse(
+        state: KNNState,
+        rows: npt.NDArray[np.int64],
+        found_ids: npt.NDArray[np.int64],
+        found_sims: npt.NDArray[np.float32],
+        skip: npt.NDArray[np.bool_],
+    ) -> None:
+        """Make re-queried rows neighbours of the rows they are closer to than their k-th neighbour."""
+        pos = state.positions()
+        for row, row_neighbors, row_sims in zip(rows, found_ids, found_sims):
+            row_id = state.ids[row]
+            for neighbor, sim in zip(row_neighbors, row_sims):
+                if neighbor < 0:
+                    continue
+                target = pos[neighbor]
+                if skip[target] or sim <= state.sims[target, -1] or row_id in state.neighbors[target]:
+                    continue
+                # Replace the worst entry and keep the list sorted
+                at = int(np.searchsorted(-state.sims[target], -sim, side="right"))
+                state.neighbors[target, at + 1:] = state.neighbors[target, at:-1].copy()
+                state.sims[target, at + 1:] = state.sims[target, at:-1].copy()
+                state.neighbors[target, at] = row_id
+                state.sims[target, at] = sim
@@ -0,0 +1,166 @@
+"""
+In-process cache of loaded LEGRA knowledge bases for search.
+
+Loading a KB (docs_meta.json, embedding matrix, FAISS index, graph, embedder)
+used to happen on every query and dominated search latency. Snapshots are now
+kept per KB and validated on each lookup against the KB's version stamp
+(version.json, rewritten atomically by every Legra.save), which costs reading a
+few bytes; only a changed stamp triggers a reload. KBs written before stamps
+existed are validated against the data files' stats instead.
+
+Kept light on purpose: the heavy Legra core is imported only when a KB is loaded.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config.settings import settings
+
+from .config import DATA_DIR, VERSION_FILE
+
+logger = logging.getLogger(__name__)
+
+# Files whose stats identify a snapshot when version.json is missing
+_DATA_FILES = ("docs_meta.json", "emb_matrix.npy", "faiss_index.bin", "graph.graphml")
+
+
+@dataclass
+class _CachedKB:
+    stamp: Tuple
+    legra: Any  # Legra (imported lazily)
+
+
+def kb_version_stamp(kb_id: str) -> Optional[Tuple]:
+    """Cheap identity of the KB's on-disk snapshot, or None if the KB does not exist."""
+    kb_path = DATA_DIR / kb_id
+    try:
+        # A few bytes; file mtimes alone are too coarse to tell quick saves apart
+        with open(kb_path / VERSION_FILE, encoding="utf-8") as f:
+            version = json.load(f)
+        return ("v", version.get("generation"), version.get("saved_at"))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError):
+        logger.warning(f"Unreadable LEGRA version stamp for KB {kb_id}, using file stats")
+
+    stats = []
+    for name in _DATA_FILES:
+        try:
+            st = os.stat(kb_path / name)
+            stats.append((name, st.st_ino, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            continue
+    return ("f", *stats) if stats else None
+
+
+class LegraIndexCache:
+    """LRU cache of search-ready Legra instances keyed by knowledge base id."""
+
+    def __init__(self, max_size: int = 16):
+        self._max_size = max_size
+        self._entries: "OrderedDict[str, _CachedKB]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes loads of the same KB so concurrent searches load it once
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, kb_id: str):
+        """Return the loaded KB, reloading it only if its on-disk version changed."""
+        kb_id = str(kb_id)
+        stamp = kb_version_stamp(kb_id)
+        if stamp is None:
+            self.invalidate(kb_id)
+            raise FileNotFoundError(f"LEGRA knowledge base {kb_id} does not exist")
+
+        cached = self._lookup(kb_id, stamp)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(kb_id, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            cached = self._lookup(kb_id, stamp, count=False)
+            if cached is not None:
+                return cached
+
+            legra = self._load(kb_id)
+            # Stamp the snapshot with the version observed before loading: a save
+            # racing with the load then simply triggers another reload next time.
+            with self._lock:
+                self._entries[kb_id] = _CachedKB(stamp=stamp, legra=legra)
+                self._entries.move_to_end(kb_id)
+                while len(self._entries) > self._max_size:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._load_locks.pop(evicted, None)
+                    self._evictions += 1
+
+        logger.debug(f"Loaded LEGRA knowledge base {kb_id} into the index cache")
+        return legra
+
+    def _load(self, kb_id: str):
+        from .core import Legra
+
+        return Legra.load(kb_id, load_reason="search", load_generator=False)
+
+    def _lookup(self, kb_id: str, stamp: Tuple, count: bool = True):
+        with self._lock:
+            cached = self._entries.get(kb_id)
+            if cached is not None and cached.stamp == stamp:
+                self._entries.move_to_end(kb_id)
+                if count:
+                    self._hits += 1
+                return cached.legra
+            if count:
+                if cached is not None:
+                    self._stale += 1
+                self._misses += 1
+            return None
+
+    def invalidate(self, kb_id: str) -> bool:
+        """Drop the cached snapshot of a KB."""
+        with self._lock:
+            removed = self._entries.pop(str(kb_id), None) is not None
+            if removed:
+                self._invalidations += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_legra_index_cache = LegraIndexCache(max_size=settings.LEGRA_INDEX_CACHE_MAX_SIZE)
+
+
+def get_legra_index_cache() -> LegraIndexCache:
+    return _legra_index_cache
+
+
+def invalidate_legra_index(kb_id: str) -> bool:
+    return _legra_index_cache.invalidate(kb_id)
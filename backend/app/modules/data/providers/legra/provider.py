@@ -4,9 +4,15 @@ LEGRA Provider Implementation
 Implements the BaseDataProvider interface for LEGRA-based graph search.
 """
 
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
-from .config import LegraConfig
+
+from app.core.config.settings import settings
+
+from .config import DATA_DIR, LegraConfig
+from .index_cache import get_legra_index_cache, invalidate_legra_index
+from .storage import SegmentStore
 from ..base import FinalizableProvider, SearchResult
 from ..legra import FaissFlatIndexer, HuggingFaceGenerator, Legra, LeidenClusterer, SemanticChunker, \
     SentenceTransformerEmbedder
@@ -120,6 +126,7 @@ class LegraProvider(FinalizableProvider):
 
         try:
             self.legra_instance.delete_document(doc_id)
+            invalidate_legra_index(str(self.knowledge_base_id))
 
             logger.warning(
                 f"LEGRA doesn't support direct document deletion for {doc_id}")
@@ -136,6 +143,10 @@ class LegraProvider(FinalizableProvider):
             return []
 
         try:
+            store = SegmentStore(DATA_DIR / str(self.knowledge_base_id))
+            if store.exists():
+                return store.document_ids()
+
             ids = [m["doc_id"] for m in self.legra_instance.docs_meta if m.get(
                 "kb_id") == self.knowledge_base_id]
             return list(dict.fromkeys(ids))
@@ -157,8 +168,20 @@ class LegraProvider(FinalizableProvider):
             return []
 
         try:
-            self.legra_instance = Legra.load(str(self.knowledge_base_id))
-            results = self.legra_instance.query(query, mode=mode, generate=False)
+            # Shared, version-checked snapshot; reloaded only after the KB changes on disk.
+            # Loading and querying are blocking (disk, embedding, FAISS), so they run in a
+            # worker thread and searches of other KBs/providers proceed concurrently.
+            def run_query():
+                legra = get_legra_index_cache().get(str(self.knowledge_base_id))
+                return legra.query(
+                    query,
+                    mode=mode,
+                    generate=False,
+                    retrieval_mode=settings.LEGRA_RETRIEVAL_MODE,
+                    budget_ms=settings.LEGRA_RETRIEVAL_BUDGET_MS,
+                )
+
+            results = await asyncio.to_thread(run_query)
 
             # Convert LEGRA results to SearchResult format
             search_results = []
@@ -234,6 +257,7 @@ class LegraProvider(FinalizableProvider):
             self.legra_instance.clusterer =  LeidenClusterer(resolution_parameter=0.5)
             self.legra_instance.complete_index_graph(
                 str(self.knowledge_base_id))
+            invalidate_legra_index(str(self.knowledge_base_id))
             return True
 
         except Exception as e:
@@ -252,7 +276,12 @@ class LegraProvider(FinalizableProvider):
         if self._initialized and self.legra_instance:
             try:
                 # Get LEGRA-specific stats
-                stats.update({"num_docs": len(self.legra_instance.docs_meta)})
+                store = SegmentStore(DATA_DIR / str(self.knowledge_base_id))
+                if store.exists():
+                    segment_stats = store.stats()
+                    stats.update({"num_docs": segment_stats["live_rows"], "segments": segment_stats["segments"]})
+                else:
+                    stats.update({"num_docs": len(self.legra_instance.docs_meta)})
             except Exception as e:
                 logger.error(f"Failed to get LEGRA stats: {e}")
 
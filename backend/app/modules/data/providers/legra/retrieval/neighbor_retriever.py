@@ -1,6 +1,12 @@
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional
 
+import numpy as np
+import numpy.typing as npt
+
+from ..config import GRAPH_EXPANSION_COMMUNITIES, GRAPH_EXPANSION_MAX_CANDIDATES, GRAPH_EXPANSION_WEIGHT
 from ..embedding import Embedder
+from ..graph.expansion import GraphExpansion
 from ..index import Indexer
 from ..retrieval import Retriever
 
@@ -16,6 +22,18 @@ class NeighborRetriever(Retriever):
       - an Embedder to turn query -> embedding
       - an Indexer that has been built on all chunk embeddings
       - docs_meta: a list of metadata dicts, one per indexed chunk
+
+    With a GraphExpansion and the embedding matrix, ``mode="graph"`` also
+    considers the kNN-graph neighbours of the seed hits and the members of the
+    communities closest to the query, and ranks all candidates by
+
+        (1 - GRAPH_EXPANSION_WEIGHT) * similarity(query, chunk)
+        + GRAPH_EXPANSION_WEIGHT * support
+
+    where support is the best seed score times the edge similarity (neighbours)
+    or the query-centroid similarity (community members). Expansion stops at
+    ``budget_ms`` after the seed search; the seeds alone are returned if it is
+    already spent.
     """
 
     def __init__(
@@ -23,24 +41,96 @@ class NeighborRetriever(Retriever):
         embedder: Embedder,
         indexer: Indexer,
         docs_meta: List[Dict[str, Any]],
+        expansion: Optional[GraphExpansion] = None,
+        emb_matrix: Optional[npt.NDArray] = None,
     ) -> None:
         self.embedder = embedder
         self.indexer = indexer
         # List of dicts with keys 'doc_id','chunk_ix','text','embedding', etc.
         self.docs_meta = docs_meta
+        self.expansion = expansion
+        self.emb_matrix = emb_matrix
 
-    def retrieve(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+    def retrieve(
+        self,
+        query: str,
+        top_k: int,
+        mode: str = "flat",
+        budget_ms: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
         # 1) Embed the query
         q_emb = self.embedder.encode([query])  # shape (1, D)
         # 2) Search index
         distances, indices = self.indexer.search(q_emb, top_k)  # shapes (1, k), (1, k)
         distances = distances[0]
         indices = indices[0]
+
+        if (
+            mode == "graph"
+            and self.expansion is not None
+            and self.emb_matrix is not None
+            and len(self.expansion) == len(self.docs_meta)
+        ):
+            deadline = started + budget_ms / 1000 if budget_ms is not None else float("inf")
+            distances, indices = self._expand(q_emb[0], distances, indices, top_k, deadline)
+
         results: List[Dict[str, Any]] = []
 
         for dist, idx in zip(distances, indices):
+            if idx < 0:
+                continue
             meta = self.docs_meta[idx].copy()
             meta["distance"] = float(dist)
             results.append(meta)
 
         return results
+
+    def _expand(
+        self,
+        q_emb: npt.NDArray,
+        seed_scores: npt.NDArray[np.float32],
+        seeds: npt.NDArray[np.int64],
+        top_k: int,
+        deadline: float,
+    ) -> tuple:
+        """Re-rank the seeds together with their graph neighbours and community members."""
+        valid = seeds >= 0
+        seeds, seed_scores = seeds[valid].astype(np.int64), seed_scores[valid]
+        if time.perf_counter() >= deadline or not len(seeds):
+            return seed_scores, seeds
+
+        query = np.asarray(q_emb, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        candidates = [seeds]
+        support = [seed_scores.astype(np.float32)]
+
+        origin, rows, weights = self.expansion.neighbors(seeds)
+        candidates.append(rows.astype(np.int64))
+        support.append(seed_scores[origin] * weights)
+
+        if time.perf_counter() < deadline:
+            communities, centroid_sims = self.expansion.nearest_communities(query, GRAPH_EXPANSION_COMMUNITIES)
+            origin, rows = self.expansion.members(communities)
+            candidates.append(rows.astype(np.int64))
+            support.append(centroid_sims[origin])
+
+        # Deduplicate, keeping the best support per chunk
+        candidates = np.concatenate(candidates)
+        support = np.concatenate(support).astype(np.float32)
+        order = np.lexsort((-support, candidates))
+        candidates, support = candidates[order], support[order]
+        first = np.ones(len(candidates), dtype=bool)
+        first[1:] = candidates[1:] != candidates[:-1]
+        candidates, support = candidates[first], support[first]
+        if len(candidates) > GRAPH_EXPANSION_MAX_CANDIDATES:
+            keep = np.sort(np.argpartition(-support, GRAPH_EXPANSION_MAX_CANDIDATES)[:GRAPH_EXPANSION_MAX_CANDIDATES])
+            candidates, support = candidates[keep], support[keep]
+
+        # Candidates are sorted by row, so memory-mapped embeddings are read in order
+        vectors = np.asarray(self.emb_matrix[candidates], dtype=np.float32)
+        similarity = vectors @ query / (np.linalg.norm(vectors, axis=1) + 1e-12)
+        scores = (1 - GRAPH_EXPANSION_WEIGHT) * similarity + GRAPH_EXPANSION_WEIGHT * support
+
+        best = np.argsort(-scores, kind="stable")[:top_k]
+        return scores[best], candidates[best]
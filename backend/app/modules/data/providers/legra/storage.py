@@ -0,0 +1,366 @@
+"""
+Append-only segmented storage for LEGRA corpora.
+
+Ingesting a document used to load docs_meta.json and emb_matrix.npy, stack the
+new chunks on top and rewrite both files, making an N-document ingestion O(N^2)
+in I/O. Documents are now stored as segments and never rewritten:
+
+    <kb>/segments/000001.npy     # float32 embeddings of one added document
+    <kb>/segments/000001.jsonl   # one metadata line per chunk (no embeddings)
+    <kb>/segments.jsonl          # commit log: segment and tombstone records
+
+A segment becomes visible once its record is appended to the commit log, so a
+crash mid-write leaves at most orphan files (removed by the next compaction).
+Deleting or replacing a document appends a tombstone hiding the rows of its
+existing segments. Compaction merges live rows into a single segment and swaps
+in a new log; it runs in a background thread once a KB accumulates too many
+segments or dead rows, and before finalization materializes the corpus for the
+index and graph build.
+
+Writers of a KB are serialized across processes (the API and the Celery
+workers share the KB directories) with an flock on ``<kb>/segments.lock``.
+
+Only numpy and the standard library are used, keeping this module light.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .config import COMPACTION_MAX_DEAD_RATIO, COMPACTION_MAX_SEGMENTS
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = "segments.jsonl"
+LOCK_FILE = "segments.lock"
+SEGMENT_DIR = "segments"
+
+# Snapshot files of the pre-segment format (still written by Legra.save for search)
+LEGACY_META_FILE = "docs_meta.json"
+LEGACY_EMB_FILE = "emb_matrix.npy"
+
+
+class _KBLock:
+    """
+    Reentrant lock of one KB directory: a thread lock within the process and an
+    exclusive flock on its lock file across processes. The file lock is taken
+    once the directory exists (or ``create`` makes it) and released by the
+    outermost holder.
+    """
+
+    def __init__(self, kb_path: Path):
+        self.kb_path = kb_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    @contextmanager
+    def hold(self, create: bool = False) -> Iterator[None]:
+        with self._thread_lock:
+            if self._fd is None and (create or self.kb_path.is_dir()):
+                self.kb_path.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.kb_path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if not self._depth and self._fd is not None:
+                    os.close(self._fd)  # releases the flock
+                    self._fd = None
+
+
+# One lock per KB directory: appends, tombstones, compaction and reads of a KB
+# are serialized within the process and across processes.
+_kb_locks: Dict[str, _KBLock] = {}
+_kb_locks_guard = threading.Lock()
+_compacting: set = set()
+
+
+def _kb_lock(kb_path: Path) -> _KBLock:
+    key = str(kb_path.resolve())
+    with _kb_locks_guard:
+        lock = _kb_locks.get(key)
+        if lock is None:
+            lock = _kb_locks[key] = _KBLock(Path(key))
+        return lock
+
+
+class SegmentStore:
+    """Segmented, append-only chunk store of one knowledge base directory."""
+
+    def __init__(self, kb_path: Path):
+        self.kb_path = Path(kb_path)
+        self.log_path = self.kb_path / LOG_FILE
+        self.segment_path = self.kb_path / SEGMENT_DIR
+        self._lock = _kb_lock(self.kb_path)
+        self._reset_state()
+
+    # ------------------------------------------------------------------ #
+    # Commit log replay                                                  #
+    # ------------------------------------------------------------------ #
+    def _reset_state(self) -> None:
+        self._epoch: Optional[str] = None
+        self._log_offset = 0
+        self._log_inode: Optional[int] = None
+        self._log_head: Optional[bytes] = None
+        # segment id -> {"rows": int, "doc_ids": [str, ...] per row}
+        self._segments: Dict[int, Dict[str, Any]] = {}
+        # doc_id -> segment ids holding live rows of the document
+        self._doc_segments: Dict[str, List[int]] = {}
+        self._next_segment = 1
+        self._dead_rows = 0
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if "epoch" in record:
+            self._epoch = record["epoch"]
+        elif "segment" in record:
+            seg_id = int(record["segment"])
+            self._segments[seg_id] = record
+            for doc_id in dict.fromkeys(record["doc_ids"]):
+                self._doc_segments.setdefault(doc_id, []).append(seg_id)
+            self._next_segment = max(self._next_segment, seg_id + 1)
+        elif "tombstone" in record:
+            for seg_id in self._doc_segments.pop(record["tombstone"], []):
+                self._dead_rows += self._segments[seg_id]["doc_ids"].count(record["tombstone"])
+
+    def _refresh(self) -> None:
+        """Replay log records appended since the last read (full replay if the log was swapped)."""
+        try:
+            f = open(self.log_path, "rb")
+        except FileNotFoundError:
+            self._reset_state()
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            # Every log starts with its own epoch record; inode numbers of swapped logs can be reused
+            head = f.readline()
+            if st.st_ino != self._log_inode or st.st_size < self._log_offset or head != self._log_head:
+                self._reset_state()
+                self._log_inode = st.st_ino
+                self._log_head = head if head.endswith(b"\n") else None
+            if st.st_size == self._log_offset:
+                return
+            f.seek(self._log_offset)
+            data = f.read()
+
+        # Only consume complete lines; a concurrent writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._log_offset += end
+
+    def _append_log(self, record: Dict[str, Any]) -> None:
+        with open(self.log_path, "ab") as f:
+            f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._refresh()
+
+    # ------------------------------------------------------------------ #
+    # Public API                                                         #
+    # ------------------------------------------------------------------ #
+    def exists(self) -> bool:
+        return self.log_path.exists()
+
+    def open(self) -> "SegmentStore":
+        """Create the store, importing a pre-segment docs_meta.json/emb_matrix.npy corpus once."""
+        with self._lock.hold(create=True):
+            self._refresh()
+            if self._epoch is not None:
+                return self
+
+            self.kb_path.mkdir(parents=True, exist_ok=True)
+            self.segment_path.mkdir(exist_ok=True)
+            with open(self.log_path, "ab") as f:
+                f.write(json.dumps({"epoch": uuid.uuid4().hex}).encode("utf-8") + b"\n")
+            self._refresh()
+
+            meta_file = self.kb_path / LEGACY_META_FILE
+            emb_file = self.kb_path / LEGACY_EMB_FILE
+            if meta_file.exists() and emb_file.exists():
+                with open(meta_file, encoding="utf-8") as f:
+                    meta: List[Dict[str, Any]] = json.load(f)
+                if meta:
+                    self._write_segment(meta, np.load(emb_file))
+                    logger.info(f"Imported {len(meta)} chunks of {self.kb_path} into segmented storage")
+            return self
+
+    def has_document(self, doc_id: str) -> bool:
+        with self._lock.hold():
+            self._refresh()
+            return doc_id in self._doc_segments
+
+    def document_ids(self) -> List[str]:
+        with self._lock.hold():
+            self._refresh()
+            return list(self._doc_segments)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock.hold():
+            self._refresh()
+            total = sum(seg["rows"] for seg in self._segments.values())
+            return {
+                "segments": len(self._segments),
+                "documents": len(self._doc_segments),
+                "rows": total,
+                "live_rows": total - self._dead_rows,
+                "dead_rows": self._dead_rows,
+            }
+
+    def append(self, meta_rows: List[Dict[str, Any]], embeddings: npt.NDArray) -> int:
+        """Persist a batch of chunks as a new segment; returns the segment id."""
+        if len(meta_rows) != len(embeddings):
+            raise ValueError("meta_rows and embeddings must have the same length")
+        with self._lock.hold(create=True):
+            self.open()
+            return self._write_segment(meta_rows, embeddings)
+
+    def delete_document(self, doc_id: str) -> bool:
+        """Tombstone every stored chunk of a document; False if it was not stored."""
+        with self._lock.hold():
+            self._refresh()
+            if doc_id not in self._doc_segments:
+                return False
+            self._append_log({"tombstone": doc_id})
+            return True
+
+    def materialize(self) -> Tuple[List[Dict[str, Any]], npt.NDArray]:
+        """Live chunk metadata and the matching embedding matrix, in insertion order."""
+        with self._lock.hold():
+            self._refresh()
+            live_segments = {seg_id for seg_ids in self._doc_segments.values() for seg_id in seg_ids}
+
+            meta: List[Dict[str, Any]] = []
+            blocks: List[npt.NDArray] = []
+            dim = 0
+            for seg_id in sorted(self._segments):
+                if seg_id not in live_segments:
+                    continue
+                seg_meta, seg_emb = self._read_segment(seg_id)
+                dim = seg_emb.shape[1] if seg_emb.ndim == 2 else dim
+                keep = [seg_id in self._doc_segments.get(m["doc_id"], ()) for m in seg_meta]
+                if all(keep):
+                    meta.extend(seg_meta)
+                    blocks.append(seg_emb)
+                else:
+                    meta.extend(m for m, k in zip(seg_meta, keep) if k)
+                    blocks.append(seg_emb[np.asarray(keep, dtype=bool)])
+
+            emb = np.vstack(blocks) if blocks else np.empty((0, dim), dtype=np.float32)
+            return meta, emb
+
+    def needs_compaction(self) -> bool:
+        with self._lock.hold():
+            self._refresh()
+            total = sum(seg["rows"] for seg in self._segments.values())
+            if len(self._segments) > COMPACTION_MAX_SEGMENTS:
+                return True
+            return bool(total) and self._dead_rows / total > COMPACTION_MAX_DEAD_RATIO
+
+    def compact(self) -> None:
+        """Merge all live rows into one segment and swap in a fresh commit log."""
+        with self._lock.hold():
+            self._refresh()
+            if len(self._segments) <= 1 and not self._dead_rows:
+                return
+
+            old_segments = list(self._segments)
+            meta, emb = self.materialize()
+            seg_id = self._next_segment
+
+            if meta:
+                self._write_segment_files(seg_id, meta, emb)
+            records = [{"epoch": uuid.uuid4().hex}]
+            if meta:
+                records.append(self._segment_record(seg_id, meta))
+
+            tmp = self.log_path.with_name(LOG_FILE + ".tmp")
+            with open(tmp, "wb") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            os.replace(tmp, self.log_path)
+
+            # Drop superseded and orphan segment files
+            for path in self.segment_path.iterdir():
+                if path.stem != f"{seg_id:06d}":
+                    path.unlink(missing_ok=True)
+
+            self._reset_state()
+            self._refresh()
+            logger.info(
+                f"Compacted {len(old_segments)} segments of {self.kb_path} into one ({len(meta)} live chunks)"
+            )
+
+    def compact_in_background(self) -> bool:
+        """Start a compaction thread if thresholds are exceeded and none is running for this KB."""
+        key = str(self.kb_path.resolve())
+        with _kb_locks_guard:
+            if key in _compacting or not self.needs_compaction():
+                return False
+            _compacting.add(key)
+
+        def run() -> None:
+            try:
+                SegmentStore(self.kb_path).compact()
+            except Exception as e:
+                logger.error(f"Background compaction of {self.kb_path} failed: {e}")
+            finally:
+                with _kb_locks_guard:
+                    _compacting.discard(key)
+
+        threading.Thread(target=run, name=f"legra-compact-{self.kb_path.name}", daemon=True).start()
+        return True
+
+    def destroy(self) -> None:
+        """Remove the whole knowledge base directory."""
+        with self._lock.hold():
+            shutil.rmtree(self.kb_path, ignore_errors=True)
+            self._reset_state()
+
+    # ------------------------------------------------------------------ #
+    # Segment files                                                      #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _segment_record(seg_id: int, meta_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"segment": seg_id, "rows": len(meta_rows), "doc_ids": [m["doc_id"] for m in meta_rows]}
+
+    def _write_segment_files(self, seg_id: int, meta_rows: List[Dict[str, Any]], embeddings: npt.NDArray) -> None:
+        self.segment_path.mkdir(parents=True, exist_ok=True)
+        base = self.segment_path / f"{seg_id:06d}"
+        with open(base.with_suffix(".npy"), "wb") as f:
+            np.save(f, np.asarray(embeddings, dtype=np.float32))
+        with open(base.with_suffix(".jsonl"), "w", encoding="utf-8") as f:
+            for row in meta_rows:
+                row = {k: v for k, v in row.items() if k != "embedding"}
+                f.write(json.dumps(row, ensure_ascii=False, default=str))
+                f.write("\n")
+
+    def _write_segment(self, meta_rows: List[Dict[str, Any]], embeddings: npt.NDArray) -> int:
+        seg_id = self._next_segment
+        self._write_segment_files(seg_id, meta_rows, embeddings)
+        # Commit point: the segment exists once its record is in the log
+        self._append_log(self._segment_record(seg_id, meta_rows))
+        return seg_id
+
+    def _read_segment(self, seg_id: int) -> Tuple[List[Dict[str, Any]], npt.NDArray]:
+        base = self.segment_path / f"{seg_id:06d}"
+        with open(base.with_suffix(".jsonl"), encoding="utf-8") as f:
+            meta = [json.loads(line) for line in f if line.strip()]
+        return meta, np.load(base.with_suffix(".npy"))
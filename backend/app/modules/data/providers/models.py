@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, Literal
+from typing import Dict, Any, List, Optional, Literal
 from pydantic import BaseModel, Field
 
 
@@ -14,6 +14,23 @@ class SearchResult(BaseModel):
         default=None, description="Number of chunks for this result")
 
 
+class SourceTiming(BaseModel):
+    """Outcome of one knowledge base or provider search within a fan-out"""
+    source: str = Field(description="Searched source, 'kb_id' or 'kb_id/provider'")
+    status: Literal["ok", "timeout", "error"] = Field(default="ok")
+    latency_ms: float = Field(default=0.0, description="Wall time of the search")
+    result_count: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+
+
+class SearchResponse(BaseModel):
+    """Merged search results plus per-source latency and status"""
+    results: List[SearchResult] = Field(default_factory=list)
+    sources: List[SourceTiming] = Field(default_factory=list)
+    partial: bool = Field(
+        default=False, description="True if a source timed out or failed")
+
+
 class DataProviderInterface(BaseModel):
     """Interface definition for data providers"""
     provider_type: Literal["vector", "legra"] = Field(
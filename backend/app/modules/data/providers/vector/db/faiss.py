@@ -1,210 +1,241 @@
 """
 FAISS vector database implementation
+
+Vectors live in an IndexIDMap2 under stable int64 ids, with an inverted
+chunk ID -> internal id map and value -> chunk IDs indexes for the filter
+fields, so deletes touch only the affected vectors. Deleted vectors are
+tombstoned and dropped in bulk once they exceed MAX_DEAD_RATIO (remove_ids on
+flat indexes, a rebuild for HNSW, which cannot remove in place) instead of
+rewriting the index on every delete. Chunk content and metadata are
+kept in a SQLite sidecar next to the index; every add/delete is committed there
+together with a write-ahead log of vector operations, and the index file is only
+rewritten at checkpoints (every `checkpoint_every` operations and on close). On
+load, the index file is brought up to date by replaying the log.
 """
 
+import json
 import logging
 import os
 import pickle
-from typing import List, Dict, Any
+import sqlite3
+from typing import Any, Dict, List, Optional, Set
+
 import numpy as np
 
 from .base import BaseVectorDB, VectorDBConfig, SearchResult
 
 logger = logging.getLogger(__name__)
 
+# Metadata fields with an inverted value -> chunk ids index (extend via
+# extra_params["filter_index_fields"]); other filter fields are matched by scan.
+DEFAULT_FILTER_INDEX_FIELDS = ("doc_id", "kb_id")
+DEFAULT_CHECKPOINT_EVERY = 10000
+# Tombstoned (HNSW) vectors tolerated before the index is compacted
+MAX_DEAD_RATIO = 0.3
+# Filtered searches over at most this many candidates are scored exactly
+MAX_EXACT_CANDIDATES = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    internal_id INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    metadata TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    internal_id INTEGER NOT NULL,
+    vector BLOB
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
 
 class FaissVectorDB(BaseVectorDB):
     """FAISS vector database provider"""
-    
+
     def __init__(self, config: VectorDBConfig):
         super().__init__(config)
+        self.faiss = None
         self.index = None
-        self.id_map = {}  # Maps internal index to document ID
-        self.metadata_map = {}  # Maps document ID to metadata
-        self.content_map = {}  # Maps document ID to content
+        self.id_map: Dict[int, str] = {}  # Maps internal id to chunk ID
+        self.internal_ids: Dict[str, int] = {}  # Maps chunk ID to internal id
+        self.metadata_map: Dict[str, Dict[str, Any]] = {}  # Maps chunk ID to metadata
+        # field -> value -> chunk IDs, for the indexed metadata fields
+        self.filter_index: Dict[str, Dict[Any, Set[str]]] = {}
         self.dimension = None
         self.next_id = 0
-    
+        self._tombstones: Set[int] = set()  # Deleted vectors still stored in the index
+        self._pending_ops = 0  # WAL operations not yet in the index file
+        self._db: Optional[sqlite3.Connection] = None
+
+        extra = config.extra_params or {}
+        self.filter_index_fields = tuple(
+            dict.fromkeys([*DEFAULT_FILTER_INDEX_FIELDS, *extra.get("filter_index_fields", [])])
+        )
+        self.checkpoint_every = int(extra.get("checkpoint_every", DEFAULT_CHECKPOINT_EVERY))
+
     async def initialize(self) -> bool:
         """Initialize the FAISS index"""
         try:
             import faiss
             self.faiss = faiss
-            
+
+            self._open_db()
             # Load existing index if it exists
             if self.config.persist_directory:
                 self._load_index()
-            
+
             logger.info("Initialized FAISS vector database")
             return True
-            
+
         except ImportError:
             logger.error("FAISS not installed. Install with: pip install faiss-cpu or faiss-gpu")
             return False
         except Exception as e:
             logger.error(f"Failed to initialize FAISS: {e}")
             return False
-    
+
     async def create_collection(self, dimension: int) -> bool:
-        """Create a new FAISS index"""
+        """Create a new FAISS index (a loaded index of the same dimension is kept)"""
         try:
             if not self.faiss:
                 if not await self.initialize():
                     return False
-            
+
+            if self.index is not None and self.dimension == dimension:
+                return True
+            if self.index is not None:
+                logger.warning(
+                    f"FAISS collection {self.config.collection_name} has dimension {self.dimension}, "
+                    f"recreating it with dimension {dimension}"
+                )
+
+            self._reset()
+            self._clear_db()
             self.dimension = dimension
-            
-            # Create index based on configuration
-            if self.config.index_type == "flat":
-                if self.config.distance_metric == "cosine":
-                    # Normalize vectors for cosine similarity
-                    self.index = self.faiss.IndexFlatIP(dimension)
-                elif self.config.distance_metric == "euclidean":
-                    self.index = self.faiss.IndexFlatL2(dimension)
-                else:
-                    self.index = self.faiss.IndexFlatIP(dimension)  # Default to inner product
-            
-            elif self.config.index_type == "hnsw":
-                # HNSW index for faster search
-                if self.config.distance_metric == "cosine":
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m)
-                    self.index.hnsw.efConstruction = self.config.hnsw_ef_construction
-                    self.index.hnsw.efSearch = self.config.hnsw_ef_search
-                elif self.config.distance_metric == "euclidean":
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m, self.faiss.METRIC_L2)
-                    self.index.hnsw.efConstruction = self.config.hnsw_ef_construction
-                    self.index.hnsw.efSearch = self.config.hnsw_ef_search
-                else:
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m)
-            
-            else:
-                # Default to flat index
-                self.index = self.faiss.IndexFlatIP(dimension)
-            
-            # Reset mappings
-            self.id_map = {}
-            self.metadata_map = {}
-            self.content_map = {}
-            self.next_id = 0
-            
+            self.index = self._new_index(dimension)
+            self._set_state(dimension=dimension, next_id=0, checkpoint=0)
+            self._db.commit()
+
             logger.info(f"Created FAISS index with dimension {dimension}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to create FAISS index: {e}")
             return False
-    
+
     async def delete_collection(self) -> bool:
         """Delete the collection"""
         try:
-            self.index = None
-            self.id_map = {}
-            self.metadata_map = {}
-            self.content_map = {}
-            self.next_id = 0
-            
+            self._reset()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
             # Delete persisted files
             if self.config.persist_directory:
-                index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-                metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-                
-                for file_path in [index_file, metadata_file]:
+                for file_path in self._persisted_files():
                     if os.path.exists(file_path):
                         os.remove(file_path)
-            
+            if self.faiss:
+                self._open_db()
+
             logger.info("Deleted FAISS collection")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to delete FAISS collection: {e}")
             return False
-    
+
     async def add_vectors(
-        self, 
-        ids: List[str], 
-        vectors: List[List[float]], 
+        self,
+        ids: List[str],
+        vectors: List[List[float]],
         metadatas: List[Dict[str, Any]],
         contents: List[str]
     ) -> bool:
-        """Add vectors to the index"""
+        """Add (or replace) vectors in the index"""
         try:
             if not self.index:
                 logger.error("Index not initialized")
                 return False
-            
-            # Convert to numpy array
-            vectors_np = np.array(vectors, dtype=np.float32)
-            
-            # Normalize vectors if using cosine similarity
-            if self.config.distance_metric == "cosine":
-                norms = np.linalg.norm(vectors_np, axis=1, keepdims=True)
-                norms = np.where(norms == 0, 1, norms)  # Avoid division by zero
-                vectors_np = vectors_np / norms
-            
-            # Add vectors to index
-            start_idx = self.index.ntotal
-            self.index.add(vectors_np)
-            
-            # Update mappings
-            for i, doc_id in enumerate(ids):
-                internal_id = start_idx + i
-                self.id_map[internal_id] = doc_id
-                self.metadata_map[doc_id] = metadatas[i]
-                self.content_map[doc_id] = contents[i]
-            
-            self.next_id = self.index.ntotal
-            
-            # Persist if configured
+
+            vectors_np = self._prepare(vectors)
+            if vectors_np.shape != (len(ids), self.index.d):
+                raise ValueError(f"Expected {len(ids)} vectors of dimension {self.index.d}, got {vectors_np.shape}")
+
+            # Re-added chunk IDs replace their previous vectors
+            replaced = [self.internal_ids[doc_id] for doc_id in ids if doc_id in self.internal_ids]
+            internal = np.arange(self.next_id, self.next_id + len(ids), dtype=np.int64)
+
+            # The sidecar commits first; the index and maps only change once it has
+            self._delete_rows(replaced)
+            self._db.executemany(
+                "INSERT INTO chunks (internal_id, id, metadata, content) VALUES (?, ?, ?, ?)",
+                [
+                    (internal_id, doc_id, json.dumps(metadata, default=str), content)
+                    for internal_id, doc_id, metadata, content in zip(internal.tolist(), ids, metadatas, contents)
+                ],
+            )
             if self.config.persist_directory:
-                self._save_index()
-            
+                self._db.executemany(
+                    "INSERT INTO wal (op, internal_id, vector) VALUES ('add', ?, ?)",
+                    [(internal_id, vector.tobytes()) for internal_id, vector in zip(internal.tolist(), vectors_np)],
+                )
+            self._set_state(next_id=self.next_id + len(ids))
+            self._db.commit()
+
+            self._drop(replaced)
+            self.index.add_with_ids(vectors_np, internal)
+            self.next_id += len(ids)
+            for internal_id, doc_id, metadata in zip(internal.tolist(), ids, metadatas):
+                self._track(internal_id, doc_id, metadata)
+            self._count_ops(len(ids))
+
             logger.info(f"Added {len(ids)} vectors to FAISS index")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to add vectors to FAISS: {e}")
+            if self._db is not None:
+                self._db.rollback()
             return False
-    
+
     async def delete_vectors(self, ids: List[str]) -> bool:
-        """Delete vectors by IDs (FAISS doesn't support deletion, so we rebuild)"""
+        """Delete vectors by IDs"""
         try:
             if not self.index:
                 logger.error("Index not initialized")
                 return False
-            
-            # Remove from mappings
-            internal_ids_to_remove = []
-            for internal_id, doc_id in self.id_map.items():
-                if doc_id in ids:
-                    internal_ids_to_remove.append(internal_id)
-            
-            for internal_id in internal_ids_to_remove:
-                doc_id = self.id_map[internal_id]
-                del self.id_map[internal_id]
-                if doc_id in self.metadata_map:
-                    del self.metadata_map[doc_id]
-                if doc_id in self.content_map:
-                    del self.content_map[doc_id]
-            
-            # For FAISS, we need to rebuild the index without deleted vectors
-            # This is expensive but necessary since FAISS doesn't support deletion
-            if internal_ids_to_remove:
-                self._rebuild_index()
-            
-            logger.info(f"Deleted {len(ids)} vectors from FAISS index")
+
+            removed = [self.internal_ids[doc_id] for doc_id in set(ids) if doc_id in self.internal_ids]
+            self._delete_rows(removed)
+            self._db.commit()
+
+            self._drop(removed)
+            self._count_ops(len(removed))
+
+            logger.info(f"Deleted {len(removed)} vectors from FAISS index")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to delete vectors from FAISS: {e}")
+            if self._db is not None:
+                self._db.rollback()
             return False
 
     async def delete_vectors_by_metadata(self, filter_dict: Dict[str, Any]) -> bool:
         """
         Delete vectors by metadata filters (FAISS implementation)
-        
+
         Args:
             filter_dict: Dictionary of metadata field-value pairs to filter by
-            
+
         Returns:
             Success status
         """
@@ -214,19 +245,10 @@ class FaissVectorDB(BaseVectorDB):
                 return True
 
             # Find IDs that match the metadata filters
-            ids_to_delete = []
-            for doc_id, metadata in self.metadata_map.items():
-                if metadata:
-                    matches = True
-                    for key, value in filter_dict.items():
-                        if metadata.get(key) != value:
-                            matches = False
-                            break
-                    if matches:
-                        ids_to_delete.append(doc_id)
+            ids_to_delete = self._filter_ids(filter_dict)
 
             if ids_to_delete:
-                return await self.delete_vectors(ids_to_delete)
+                return await self.delete_vectors(list(ids_to_delete))
             else:
                 logger.info("No vectors found matching metadata filters")
                 return True
@@ -236,196 +258,441 @@ class FaissVectorDB(BaseVectorDB):
             return False
 
     async def search(
-        self, 
-        query_vector: List[float], 
+        self,
+        query_vector: List[float],
         limit: int = 5,
         filter_dict: Dict[str, Any] = None
     ) -> List[SearchResult]:
         """Search for similar vectors"""
         try:
-            if not self.index or self.index.ntotal == 0:
+            if not self.index or not self.id_map:
                 return []
-            
-            # Convert query to numpy array
-            query_np = np.array([query_vector], dtype=np.float32)
-            
-            # Normalize if using cosine similarity
-            if self.config.distance_metric == "cosine":
-                norm = np.linalg.norm(query_np)
-                if norm > 0:
-                    query_np = query_np / norm
-            
-            # Search the index
-            distances, indices = self.index.search(query_np, min(limit * 2, self.index.ntotal))
-            
+
+            query_np = self._prepare([query_vector])
+            candidates = self._filter_ids(filter_dict) if filter_dict else None
+            if candidates is not None and not candidates:
+                return []
+
+            if candidates is not None and len(candidates) <= MAX_EXACT_CANDIDATES:
+                hits = self._search_exact(query_np[0], [self.internal_ids[c] for c in candidates], limit)
+            else:
+                hits = self._search_index(query_np, limit, candidates)
+
             # Convert results
+            contents = self._contents([internal_id for internal_id, _ in hits])
             search_results = []
-            for i, (distance, internal_id) in enumerate(zip(distances[0], indices[0])):
-                if internal_id == -1:  # Invalid result
-                    continue
-                
-                doc_id = self.id_map.get(internal_id)
-                if not doc_id:
-                    continue
-                
-                # Apply filters if provided
-                if filter_dict:
-                    metadata = self.metadata_map.get(doc_id, {})
-                    if not self._matches_filter(metadata, filter_dict):
-                        continue
-                
+            for internal_id, distance in hits:
+                doc_id = self.id_map[internal_id]
+
                 # Convert distance to score
                 if self.config.distance_metric == "cosine":
-                    score = distance  # Inner product for cosine (higher is better)
+                    # Inner product for cosine (higher is better); float error can exceed 1
+                    score = min(max(distance, 0.0), 1.0)
                 else:
                     score = 1.0 / (1.0 + distance)  # Convert L2 distance to similarity
-                
+
                 result = SearchResult(
                     id=doc_id,
-                    content=self.content_map.get(doc_id, ""),
+                    content=contents.get(internal_id, ""),
                     metadata=self.metadata_map.get(doc_id, {}),
                     score=score,
                     distance=distance
                 )
                 search_results.append(result)
-                
-                if len(search_results) >= limit:
-                    break
-            
+
             return search_results
-            
+
         except Exception as e:
             logger.error(f"Failed to search FAISS index: {e}")
             return []
-    
+
     async def get_by_ids(self, ids: List[str]) -> List[SearchResult]:
         """Get vectors by their IDs"""
         try:
-            search_results = []
-            for doc_id in ids:
-                if doc_id in self.metadata_map:
-                    result = SearchResult(
-                        id=doc_id,
-                        content=self.content_map.get(doc_id, ""),
-                        metadata=self.metadata_map.get(doc_id, {}),
-                        score=1.0,
-                        distance=0.0
-                    )
-                    search_results.append(result)
-            
-            return search_results
-            
+            internal = [self.internal_ids[doc_id] for doc_id in ids if doc_id in self.internal_ids]
+            contents = self._contents(internal)
+            return [
+                SearchResult(
+                    id=self.id_map[internal_id],
+                    content=contents.get(internal_id, ""),
+                    metadata=self.metadata_map.get(self.id_map[internal_id], {}),
+                    score=1.0,
+                    distance=0.0
+                )
+                for internal_id in internal
+            ]
+
         except Exception as e:
             logger.error(f"Failed to get vectors by IDs from FAISS: {e}")
             return []
-    
+
     async def get_all_ids(self, filter_dict: Dict[str, Any] = None) -> List[str]:
         """Get all document IDs in the collection"""
         try:
             if filter_dict:
-                # Apply filter
-                filtered_ids = []
-                for doc_id, metadata in self.metadata_map.items():
-                    if self._matches_filter(metadata, filter_dict):
-                        filtered_ids.append(doc_id)
-                return filtered_ids
-            else:
-                return list(self.metadata_map.keys())
-            
+                return list(self._filter_ids(filter_dict))
+            return list(self.metadata_map.keys())
+
         except Exception as e:
             logger.error(f"Failed to get all IDs from FAISS: {e}")
             return []
-    
+
     async def count(self, filter_dict: Dict[str, Any] = None) -> int:
         """Count documents in the collection"""
         ids = await self.get_all_ids(filter_dict)
         return len(ids)
-    
+
+    def close(self):
+        """Write pending changes to the index file and close the sidecar"""
+        try:
+            if self._pending_ops:
+                self._checkpoint()
+        except Exception as e:
+            logger.error(f"Failed to checkpoint FAISS index: {e}")
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def flush(self) -> None:
+        """Write the index file now instead of at the next checkpoint"""
+        if self._pending_ops:
+            self._checkpoint()
+
     def _matches_filter(self, metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
         """Check if metadata matches filter criteria"""
         for key, value in filter_dict.items():
             if key not in metadata or metadata[key] != value:
                 return False
         return True
-    
-    def _rebuild_index(self):
-        """Rebuild the index without deleted vectors"""
-        if not self.index or self.index.ntotal == 0:
+
+    # ------------------------------------------------------------------ #
+    # In-memory state                                                    #
+    # ------------------------------------------------------------------ #
+    def _reset(self) -> None:
+        self.index = None
+        self.id_map = {}
+        self.internal_ids = {}
+        self.metadata_map = {}
+        self.filter_index = {}
+        self.dimension = None
+        self.next_id = 0
+        self._tombstones = set()
+        self._pending_ops = 0
+
+    def _new_index(self, dimension: int):
+        """Empty IndexIDMap2 over the configured base index"""
+        metric = self.faiss.METRIC_L2 if self.config.distance_metric == "euclidean" else self.faiss.METRIC_INNER_PRODUCT
+        if self.config.index_type == "hnsw":
+            # HNSW index for faster search
+            base = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m, metric)
+            base.hnsw.efConstruction = self.config.hnsw_ef_construction
+            base.hnsw.efSearch = self.config.hnsw_ef_search
+        elif metric == self.faiss.METRIC_L2:
+            base = self.faiss.IndexFlatL2(dimension)
+        else:
+            # Inner product on normalized vectors for cosine similarity
+            base = self.faiss.IndexFlatIP(dimension)
+        return self.faiss.IndexIDMap2(base)
+
+    def _supports_remove(self) -> bool:
+        return not isinstance(self.faiss.downcast_index(self.index.index), self.faiss.IndexHNSW)
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors_np = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+        # Normalize vectors if using cosine similarity
+        if self.config.distance_metric == "cosine":
+            norms = np.linalg.norm(vectors_np, axis=1, keepdims=True)
+            norms = np.where(norms == 0, 1, norms)  # Avoid division by zero
+            vectors_np = vectors_np / norms
+        return vectors_np
+
+    def _indexed_values(self, metadata: Dict[str, Any]):
+        for field in self.filter_index_fields:
+            value = metadata.get(field)
+            if isinstance(value, (str, int, float, bool)):
+                yield field, value
+
+    def _track(self, internal_id: int, doc_id: str, metadata: Dict[str, Any]) -> None:
+        self.id_map[internal_id] = doc_id
+        self.internal_ids[doc_id] = internal_id
+        self.metadata_map[doc_id] = metadata
+        for field, value in self._indexed_values(metadata):
+            self.filter_index.setdefault(field, {}).setdefault(value, set()).add(doc_id)
+
+    def _untrack(self, internal_id: int) -> None:
+        doc_id = self.id_map.pop(internal_id)
+        self.internal_ids.pop(doc_id, None)
+        metadata = self.metadata_map.pop(doc_id, {})
+        for field, value in self._indexed_values(metadata):
+            values = self.filter_index.get(field, {})
+            ids = values.get(value)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del values[value]
+
+    def _delete_rows(self, internal_ids: List[int]) -> None:
+        """Delete vectors from the sidecar and log their removal (not committed)"""
+        rows = [(internal_id,) for internal_id in internal_ids]
+        self._db.executemany("DELETE FROM chunks WHERE internal_id = ?", rows)
+        if self.config.persist_directory:
+            self._db.executemany("INSERT INTO wal (op, internal_id) VALUES ('remove', ?)", rows)
+
+    def _drop(self, internal_ids: List[int]) -> None:
+        """Remove committed deletions from the index and maps"""
+        if not internal_ids:
             return
-        
-        # Get all remaining vectors
-        remaining_vectors = []
-        remaining_ids = []
-        remaining_metadatas = []
-        remaining_contents = []
-        
-        for internal_id, doc_id in self.id_map.items():
-            if doc_id in self.metadata_map:
-                # Get vector from index
-                vector = self.index.reconstruct(internal_id)
-                remaining_vectors.append(vector)
-                remaining_ids.append(doc_id)
-                remaining_metadatas.append(self.metadata_map[doc_id])
-                remaining_contents.append(self.content_map[doc_id])
-        
-        # Recreate index
-        if remaining_vectors:
-            self.create_collection(self.dimension)
-            self.add_vectors(remaining_ids, remaining_vectors, remaining_metadatas, remaining_contents)
-    
-    def _save_index(self):
-        """Save the index and metadata to disk"""
+        self._tombstones.update(internal_ids)
+        for internal_id in internal_ids:
+            self._untrack(internal_id)
+        if len(self._tombstones) > MAX_DEAD_RATIO * self.index.ntotal:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop all tombstoned vectors from the index at once"""
+        dropped = len(self._tombstones)
+        if self._supports_remove():
+            self.index.remove_ids(np.fromiter(self._tombstones, dtype=np.int64, count=dropped))
+        else:
+            stored_ids = self.faiss.vector_to_array(self.index.id_map)
+            vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+            live = np.fromiter((int(i) in self.id_map for i in stored_ids), dtype=bool, count=len(stored_ids))
+            index = self._new_index(self.dimension)
+            if live.any():
+                index.add_with_ids(vectors[live], stored_ids[live])
+            self.index = index
+        self._tombstones = set()
+        logger.info(f"Compacted FAISS index: dropped {dropped} deleted vectors, {self.index.ntotal} remain")
+        # The index file must not keep the dropped vectors around
+        self._pending_ops += 1
+
+    # ------------------------------------------------------------------ #
+    # Filtering and search                                               #
+    # ------------------------------------------------------------------ #
+    def _filter_ids(self, filter_dict: Dict[str, Any]) -> Set[str]:
+        """Chunk IDs matching all filters, using the inverted index where possible"""
+        candidates: Optional[Set[str]] = None
+        remaining: Dict[str, Any] = {}
+        for key, value in filter_dict.items():
+            if key in self.filter_index_fields and isinstance(value, (str, int, float, bool)):
+                ids = self.filter_index.get(key, {}).get(value, set())
+                candidates = set(ids) if candidates is None else candidates & ids
+            else:
+                remaining[key] = value
+
+        if candidates is None:
+            candidates = self.metadata_map.keys()
+        if not remaining:
+            return set(candidates)
+        return {
+            doc_id for doc_id in candidates
+            if self._matches_filter(self.metadata_map.get(doc_id, {}), remaining)
+        }
+
+    def _search_exact(self, query: np.ndarray, internal: List[int], limit: int):
+        """Exact scores over a small candidate set"""
+        vectors = np.vstack([self.index.reconstruct(internal_id) for internal_id in internal])
+        if self.config.distance_metric == "euclidean":
+            distances = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(distances)[:limit]
+        else:
+            distances = vectors @ query
+            order = np.argsort(-distances)[:limit]
+        return [(internal[i], float(distances[i])) for i in order]
+
+    def _search_index(self, query_np: np.ndarray, limit: int, candidates: Optional[Set[str]]):
+        """ANN/flat search, over-fetching for tombstones and filtered-out results"""
+        ntotal = self.index.ntotal
+        live = max(len(self.id_map), 1)
+        k = limit * 2 * ntotal / live
+        if candidates is not None:
+            k *= live / max(len(candidates), 1)
+        k = min(ntotal, max(limit, int(k) + 1))
+
+        params = None
+        if candidates is not None and self._supports_remove():
+            selector = self.faiss.IDSelectorBatch(
+                np.fromiter((self.internal_ids[c] for c in candidates), dtype=np.int64, count=len(candidates))
+            )
+            params = self.faiss.SearchParameters(sel=selector)
+            k = min(ntotal, limit)
+
+        distances, indices = self.index.search(query_np, k, params=params)
+        hits = []
+        for distance, internal_id in zip(distances[0], indices[0]):
+            doc_id = self.id_map.get(int(internal_id))
+            if doc_id is None:  # Invalid or deleted
+                continue
+            if candidates is not None and doc_id not in candidates:
+                continue
+            hits.append((int(internal_id), float(distance)))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def _contents(self, internal_ids: List[int]) -> Dict[int, str]:
+        if not internal_ids:
+            return {}
+        placeholders = ",".join("?" * len(internal_ids))
+        rows = self._db.execute(
+            f"SELECT internal_id, content FROM chunks WHERE internal_id IN ({placeholders})", internal_ids
+        )
+        return dict(rows.fetchall())
+
+    # ------------------------------------------------------------------ #
+    # Persistence                                                        #
+    # ------------------------------------------------------------------ #
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.config.persist_directory, f"{self.config.collection_name}{suffix}")
+
+    def _persisted_files(self) -> List[str]:
+        files = [self._path(".index"), self._path(".sqlite"), self._path("_metadata.pkl")]
+        return files + [self._path(".sqlite-wal"), self._path(".sqlite-shm"), self._path(".index.tmp")]
+
+    def _open_db(self) -> None:
+        if self._db is not None:
+            return
+        if self.config.persist_directory:
+            os.makedirs(self.config.persist_directory, exist_ok=True)
+            self._db = sqlite3.connect(self._path(".sqlite"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        else:
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def _clear_db(self) -> None:
+        self._db.executescript("DELETE FROM chunks; DELETE FROM wal; DELETE FROM state;")
+
+    def _set_state(self, **values: Any) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in values.items()],
+        )
+
+    def _get_state(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM state")}
+
+    def _count_ops(self, ops: int) -> None:
+        """Count committed operations; write the index file every `checkpoint_every` of them"""
         if not self.config.persist_directory:
             return
-        
-        os.makedirs(self.config.persist_directory, exist_ok=True)
-        
-        # Save FAISS index
-        index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-        self.faiss.write_index(self.index, index_file)
-        
-        # Save metadata
-        metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-        metadata = {
-            "id_map": self.id_map,
-            "metadata_map": self.metadata_map,
-            "content_map": self.content_map,
-            "next_id": self.next_id,
-            "dimension": self.dimension
-        }
-        with open(metadata_file, "wb") as f:
-            pickle.dump(metadata, f)
-    
+        self._pending_ops += ops
+        if self._pending_ops >= self.checkpoint_every:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        """Write the index file atomically, then truncate the WAL it now contains"""
+        if not self.config.persist_directory or self.index is None:
+            return
+        seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM wal").fetchone()[0]
+        index_file = self._path(".index")
+        self.faiss.write_index(self.index, index_file + ".tmp")
+        os.replace(index_file + ".tmp", index_file)
+
+        self._set_state(checkpoint=seq)
+        self._db.execute("DELETE FROM wal WHERE seq <= ?", (seq,))
+        self._db.commit()
+        self._pending_ops = 0
+        logger.debug(f"Checkpointed FAISS index {self.config.collection_name} ({self.index.ntotal} vectors)")
+
     def _load_index(self):
         """Load the index and metadata from disk"""
         if not self.config.persist_directory:
             return
-        
-        index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-        metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-        
-        if os.path.exists(index_file) and os.path.exists(metadata_file):
-            try:
-                # Load FAISS index
+
+        state = self._get_state()
+        if "dimension" not in state:
+            self._migrate_pickle()
+            return
+
+        try:
+            self.dimension = state["dimension"]
+            self.next_id = state.get("next_id", 0)
+            for internal_id, doc_id, metadata in self._db.execute("SELECT internal_id, id, metadata FROM chunks"):
+                self._track(internal_id, doc_id, json.loads(metadata))
+
+            index_file = self._path(".index")
+            if os.path.exists(index_file):
                 self.index = self.faiss.read_index(index_file)
-                
-                # Load metadata
-                with open(metadata_file, "rb") as f:
-                    metadata = pickle.load(f)
-                
-                self.id_map = metadata["id_map"]
-                self.metadata_map = metadata["metadata_map"]
-                self.content_map = metadata["content_map"]
-                self.next_id = metadata["next_id"]
-                self.dimension = metadata["dimension"]
-                
-                logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors")
-                
-            except Exception as e:
-                logger.error(f"Failed to load FAISS index: {e}")
-                # Reset on load failure
-                self.index = None
-                self.id_map = {}
-                self.metadata_map = {}
-                self.content_map = {}
-                self.next_id = 0
+            else:
+                self.index = self._new_index(self.dimension)
+            replayed = self._replay_wal()
+
+            stored_ids = self.faiss.vector_to_array(self.index.id_map).tolist()
+            self._tombstones = {internal_id for internal_id in stored_ids if internal_id not in self.id_map}
+            logger.info(f"Loaded FAISS index with {len(self.id_map)} vectors ({replayed} replayed from WAL)")
+            if replayed:
+                self._checkpoint()
+
+        except Exception as e:
+            logger.error(f"Failed to load FAISS index: {e}")
+            # Reset on load failure
+            self._reset()
+
+    def _replay_wal(self) -> int:
+        """Apply WAL operations missing from the index file"""
+        rows = self._db.execute("SELECT op, internal_id, vector FROM wal ORDER BY seq").fetchall()
+        if not rows:
+            return 0
+
+        # The index file may already contain some operations if a checkpoint was
+        # interrupted after writing it; never add an id twice. Removed ids need no
+        # replay: vectors missing from the chunks table load as tombstones.
+        stored = set(self.faiss.vector_to_array(self.index.id_map).tolist())
+        add_ids, add_vectors = [], []
+        for op, internal_id, vector in rows:
+            if op == "add" and internal_id in self.id_map and internal_id not in stored:
+                add_ids.append(internal_id)
+                add_vectors.append(np.frombuffer(vector, dtype=np.float32))
+                stored.add(internal_id)
+
+        if add_ids:
+            self.index.add_with_ids(np.vstack(add_vectors), np.array(add_ids, dtype=np.int64))
+        return len(rows)
+
+    def _migrate_pickle(self) -> None:
+        """Import a collection saved by the previous index + pickle format"""
+        index_file = self._path(".index")
+        metadata_file = self._path("_metadata.pkl")
+        if not (os.path.exists(index_file) and os.path.exists(metadata_file)):
+            return
+
+        try:
+            old_index = self.faiss.read_index(index_file)
+            with open(metadata_file, "rb") as f:
+                metadata = pickle.load(f)
+
+            self.dimension = metadata["dimension"]
+            self.index = self._new_index(self.dimension)
+            # Positions of the old sequential index become the stable ids; a chunk ID
+            # added several times keeps its latest vector.
+            latest: Dict[str, int] = {}
+            for position, doc_id in metadata["id_map"].items():
+                if doc_id in metadata["metadata_map"]:
+                    latest[doc_id] = max(latest.get(doc_id, -1), position)
+            positions = sorted(latest.values())
+            if positions:
+                vectors = np.vstack([old_index.reconstruct(int(p)) for p in positions])
+                self.index.add_with_ids(vectors, np.array(positions, dtype=np.int64))
+            self.next_id = max(metadata["id_map"], default=-1) + 1
+
+            rows = []
+            for position in positions:
+                doc_id = metadata["id_map"][position]
+                self._track(position, doc_id, metadata["metadata_map"][doc_id])
+                rows.append((position, doc_id, json.dumps(self.metadata_map[doc_id], default=str),
+                             metadata["content_map"].get(doc_id, "")))
+            self._db.executemany("INSERT INTO chunks (internal_id, id, metadata, content) VALUES (?, ?, ?, ?)", rows)
+            self._set_state(dimension=self.dimension, next_id=self.next_id, checkpoint=0)
+            self._db.commit()
+            self._checkpoint()
+            os.remove(metadata_file)
+            logger.info(f"Migrated FAISS collection {self.config.collection_name} ({len(rows)} vectors) to the sidecar format")
+
+        except Exception as e:
+            logger.error(f"Failed to migrate FAISS index: {e}")
+            self._reset()
+            self._clear_db()
+            self._db.commit()
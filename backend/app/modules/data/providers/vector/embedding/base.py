@@ -143,6 +143,18 @@ class BaseEmbedder(ABC):
         # Default implementation is the same as embed_text
         return await self.embed_text(query)
 
+    def cache_namespace(self, kind: str = "document") -> str:
+        """Embedding cache namespace: everything that changes the produced vectors"""
+        config = self.config
+        return ":".join(str(part) for part in (
+            config.type,
+            config.model_id or config.model_name,
+            config.base_url or "",
+            config.normalize_embeddings,
+            config.max_length or "",
+            kind,
+        ))
+
     def _normalize_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
         """Normalize embeddings to unit vectors"""
         if self.config.normalize_embeddings:
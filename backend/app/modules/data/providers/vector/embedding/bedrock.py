@@ -7,6 +7,7 @@ import logging
 from typing import List
 
 from app.core.config.settings import settings
+from ...embedding_cache import get_embedding_cache
 from .base import BaseEmbedder, EmbeddingConfig
 
 logger = logging.getLogger(__name__)
@@ -79,8 +80,10 @@ class BedrockEmbedder(BaseEmbedder):
                 raise RuntimeError("Failed to initialize Bedrock client")
 
         try:
-            # Use LangChain's embed_documents method for batch processing
-            embeddings = await self.client.aembed_documents(texts)
+            # Use LangChain's embed_documents method for batch processing (uncached texts only)
+            embeddings = await get_embedding_cache().get_or_embed(
+                self.cache_namespace(), texts, self.client.aembed_documents
+            )
             return embeddings
 
         except Exception as e:
@@ -101,6 +104,17 @@ class BedrockEmbedder(BaseEmbedder):
             if not await self.initialize():
                 raise RuntimeError("Failed to initialize Bedrock client")
 
+        # Failed attempts return [] and are not cached
+        embeddings = await get_embedding_cache().get_or_embed(
+            self.cache_namespace("query"), [query], self._embed_queries
+        )
+        return embeddings[0] if embeddings else []
+
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return [await self._embed_query_with_retry(query) for query in queries]
+
+    async def _embed_query_with_retry(self, query: str) -> List[float]:
+        """Embed a query, retrying with a fresh client on timeouts"""
         max_retries = settings.BEDROCK_MAX_RETRY_QUERY_EMBEDDING
         timeout_seconds = settings.BEDROCK_TIMEOUT_QUERY_EMBEDDING_SECONDS
 
@@ -5,31 +5,30 @@ HuggingFace embedding provider implementation
 import logging
 from typing import List
 
-from langchain_huggingface import HuggingFaceEmbeddings
-
+from ...embedding_cache import get_embedding_cache
 from .base import BaseEmbedder, EmbeddingConfig
+from .registry import get_embedding_registry
 
 logger = logging.getLogger(__name__)
 
 
 class HuggingFaceEmbedder(BaseEmbedder):
-    """HuggingFace embedding provider using LangChain"""
-    
+    """HuggingFace embedding provider using a process-wide shared LangChain model"""
+
     def __init__(self, config: EmbeddingConfig):
         super().__init__(config)
         self.embeddings = None
-    
+
     async def get_dimension(self) -> int:
         """Get the dimension of the embeddings"""
         if self._dimension is None:
             # Initialize if not done already
             if not self.embeddings:
                 await self.initialize()
-            
-            # Get dimension by embedding a test text
+
+            # Get dimension by embedding a test text (once per shared model)
             try:
-                test_embedding = await self.embeddings.aembed_query("test")
-                self._dimension = len(test_embedding)
+                self._dimension = await self.embeddings.get_dimension()
             except Exception as e:
                 logger.error(f"Failed to get embedding dimension: {e}")
                 # Common dimensions for popular models
@@ -40,82 +39,75 @@ class HuggingFaceEmbedder(BaseEmbedder):
                     "sentence-transformers/all-mpnet-base-v2": 768,
                 }
                 self._dimension = dimension_map.get(self.config.model_name, 768)
-        
+
         return self._dimension
-    
+
     async def initialize(self) -> bool:
-        """Initialize the HuggingFace embedding model"""
+        """Initialize the HuggingFace embedding model (loaded once per process)"""
         try:
-            model_kwargs = {
-                'device': self.config.device
-            }
-            
-            encode_kwargs = {
-                'normalize_embeddings': self.config.normalize_embeddings,
-                'batch_size': self.config.batch_size
-            }
-            
-            if self.config.max_length:
-                encode_kwargs['max_length'] = self.config.max_length
-            
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=self.config.model_name,
-                model_kwargs=model_kwargs,
-                encode_kwargs=encode_kwargs
-            )
-            
+            self.embeddings = get_embedding_registry().get(self.config)
+            await self.embeddings.load()
+
             logger.info(f"Initialized HuggingFace embeddings with model: {self.config.model_name}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to initialize HuggingFace embeddings: {e}")
+            self.embeddings = None
             return False
-    
+
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for a list of texts
-        
+
         Args:
             texts: List of texts to embed
-            
+
         Returns:
             List of embedding vectors
         """
         if not texts:
             return []
-        
+
         if not self.embeddings:
             if not await self.initialize():
                 raise RuntimeError("Failed to initialize embeddings model")
-        
+
         try:
-            # Use LangChain's embed_documents method for batch processing
-            embeddings = await self.embeddings.aembed_documents(texts)
+            # Only uncached texts are embedded; small requests are micro-batched
+            embeddings = await get_embedding_cache().get_or_embed(
+                self.cache_namespace(), texts, self.embeddings.embed_documents
+            )
             return embeddings
-            
+
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
             return []
-    
+
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return [await self.embeddings.embed_query(query) for query in queries]
+
     async def embed_query(self, query: str) -> List[float]:
         """
         Generate embedding for a query
-        
+
         Args:
             query: Query text to embed
-            
+
         Returns:
             Embedding vector
         """
         if not self.embeddings:
             if not await self.initialize():
                 raise RuntimeError("Failed to initialize embeddings model")
-        
+
         try:
-            # Use LangChain's embed_query method which may have different preprocessing
-            embedding = await self.embeddings.aembed_query(query)
-            return embedding
-            
+            # Coalesced with concurrent queries into one encode call on a cache miss
+            embeddings = await get_embedding_cache().get_or_embed(
+                self.cache_namespace("query"), [query], self._embed_queries
+            )
+            return embeddings[0] if embeddings else []
+
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e}")
             return []
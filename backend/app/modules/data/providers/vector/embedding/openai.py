@@ -6,6 +6,7 @@ import logging
 from typing import List
 
 
+from ...embedding_cache import get_embedding_cache
 from .base import BaseEmbedder, EmbeddingConfig
 
 logger = logging.getLogger(__name__)
@@ -76,14 +77,19 @@ class OpenAIEmbedder(BaseEmbedder):
                 raise RuntimeError("Failed to initialize OpenAI client")
         
         try:
-            # Use LangChain's embed_documents method for batch processing
-            embeddings = await self.client.aembed_documents(texts)
+            # Use LangChain's embed_documents method for batch processing (uncached texts only)
+            embeddings = await get_embedding_cache().get_or_embed(
+                self.cache_namespace(), texts, self.client.aembed_documents
+            )
             return embeddings
             
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
             return []
     
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return [await self.client.aembed_query(query) for query in queries]
+    
     async def embed_query(self, query: str) -> List[float]:
         """
         Generate embedding for a query
@@ -99,9 +105,11 @@ class OpenAIEmbedder(BaseEmbedder):
                 raise RuntimeError("Failed to initialize OpenAI client")
         
         try:
-            # Use LangChain's embed_query method
-            embedding = await self.client.aembed_query(query)
-            return embedding
+            # Use LangChain's embed_query method on a cache miss
+            embeddings = await get_embedding_cache().get_or_embed(
+                self.cache_namespace("query"), [query], self._embed_queries
+            )
+            return embeddings[0] if embeddings else []
             
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e}")
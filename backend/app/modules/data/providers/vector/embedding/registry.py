@@ -0,0 +1,233 @@
+"""
+Process-wide registry of HuggingFace embedding models.
+
+Every VectorProvider (one per knowledge base, one per ThreadScopedRAG chat)
+used to load its own copy of the same sentence-transformer. Models are now
+loaded once per (model, device, normalize, max_length) and shared; inference
+runs in a dedicated thread pool (torch releases the GIL during encoding) so the
+event loop is never blocked.
+
+Small requests (queries, short documents) arriving within
+EMBEDDING_BATCH_WINDOW_MS are coalesced into one encode call of up to
+EMBEDDING_MAX_BATCH_SIZE texts; larger requests are encoded on their own.
+
+Kept light on purpose: langchain_huggingface (and torch) is imported only
+when a model is loaded.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config.settings import settings
+
+from .base import EmbeddingConfig
+
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, str, bool, Optional[int]]
+
+
+def model_key(config: EmbeddingConfig) -> ModelKey:
+    """Settings that change the produced vectors (batch_size does not)."""
+    return (config.model_name, config.device, config.normalize_embeddings, config.max_length)
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: asyncio.Future
+
+
+@dataclass
+class _PendingBatch:
+    requests: List[_Request] = field(default_factory=list)
+    size: int = 0
+    handle: Optional[asyncio.TimerHandle] = None
+
+
+class SharedEmbeddingModel:
+    """One loaded embedding model, shared by all embedders configured for it."""
+
+    def __init__(
+        self,
+        config: EmbeddingConfig,
+        executor: ThreadPoolExecutor,
+        batch_window: float,
+        max_batch_size: int,
+    ):
+        self.key = model_key(config)
+        self._config = config
+        self._executor = executor
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._embeddings: Any = None  # HuggingFaceEmbeddings
+        self._load_lock = threading.Lock()
+        self._dimension: Optional[int] = None
+        # Pending micro-batch per event loop (futures are bound to their loop)
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingBatch]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._embeddings is not None
+
+    def _load_sync(self) -> Any:
+        with self._load_lock:
+            if self._embeddings is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                encode_kwargs = {
+                    'normalize_embeddings': self._config.normalize_embeddings,
+                    'batch_size': self._config.batch_size
+                }
+                if self._config.max_length:
+                    encode_kwargs['max_length'] = self._config.max_length
+
+                self._embeddings = HuggingFaceEmbeddings(
+                    model_name=self._config.model_name,
+                    model_kwargs={'device': self._config.device},
+                    encode_kwargs=encode_kwargs
+                )
+                logger.info(f"Loaded shared HuggingFace embedding model {self._config.model_name}")
+        return self._embeddings
+
+    async def load(self) -> None:
+        if self._embeddings is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._load_sync)
+
+    async def get_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = len(await self.embed_query("test"))
+        return self._dimension
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self._max_batch_size:
+            self.requests += 1
+            return await self._encode(texts)
+        return await self._submit(texts)
+
+    async def embed_query(self, text: str) -> List[float]:
+        # No query-specific encode kwargs are configured, so HuggingFaceEmbeddings
+        # encodes queries exactly like documents and both can share a batch.
+        return (await self._submit([text]))[0]
+
+    async def _encode(self, texts: List[str]) -> List[List[float]]:
+        await self.load()
+        self.batches += 1
+        self.texts += len(texts)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._embeddings.embed_documents, texts
+        )
+
+    async def _submit(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = _PendingBatch()
+        batch.requests.append(_Request(texts=texts, future=future))
+        batch.size += len(texts)
+
+        if batch.size >= self._max_batch_size:
+            self._flush(loop)
+        elif batch.handle is None:
+            batch.handle = loop.call_later(self._batch_window, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.handle is not None:
+            batch.handle.cancel()
+        task = loop.create_task(self._run_batch(batch.requests))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, requests: List[_Request]) -> None:
+        texts = [text for request in requests for text in request.texts]
+        try:
+            vectors = await self._encode(texts)
+        except Exception as e:
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in requests:
+            if not request.future.done():
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+
+
+class EmbeddingModelRegistry:
+    """Loaded embedding models of this worker process, keyed by model_key()."""
+
+    def __init__(self, max_workers: int = 2, batch_window_ms: float = 5.0, max_batch_size: int = 64):
+        self._max_workers = max_workers
+        self._batch_window = batch_window_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._models: Dict[ModelKey, SharedEmbeddingModel] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self, config: EmbeddingConfig) -> SharedEmbeddingModel:
+        """Shared model for an embedding config (loaded lazily on first use)."""
+        key = model_key(config)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if self._executor is None:
+                    # Created on first use, i.e. after a Celery prefork fork
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="embedding"
+                    )
+                model = self._models[key] = SharedEmbeddingModel(
+                    config, self._executor, self._batch_window, self._max_batch_size
+                )
+            return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Loaded models and micro-batching counters."""
+        with self._lock:
+            models = list(self._models.values())
+        batches = sum(m.batches for m in models)
+        texts = sum(m.texts for m in models)
+        return {
+            "models": len(models),
+            "loaded": sum(1 for m in models if m.loaded),
+            "requests": sum(m.requests for m in models),
+            "batches": batches,
+            "texts": texts,
+            "avg_batch_size": round(texts / batches, 2) if batches else 0.0,
+        }
+
+
+_embedding_registry = EmbeddingModelRegistry(
+    max_workers=settings.EMBEDDING_INFERENCE_WORKERS,
+    batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+)
+
+
+def get_embedding_registry() -> EmbeddingModelRegistry:
+    return _embedding_registry
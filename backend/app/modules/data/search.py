@@ -0,0 +1,100 @@
+"""
+Search fan-out helpers shared by AgentRAGService and AgentRAGServiceManager
+
+Providers of a knowledge base, and the knowledge bases attached to an agent, are
+searched concurrently. Each search runs under its own timeout and reports its
+latency; a slow or failing source yields a partial result instead of failing
+(or delaying) the whole search.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from .providers.models import SearchResult, SourceTiming
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def timed(
+    source: str,
+    awaitable: Awaitable[T],
+    timeout: Optional[float] = None,
+) -> Tuple[Optional[T], SourceTiming]:
+    """
+    Await a search with an optional timeout (seconds, None or <= 0 disables it).
+
+    Returns the search value (None on timeout/error) and its timing record.
+    """
+    start = time.perf_counter()
+    timing = SourceTiming(source=source)
+    value: Optional[T] = None
+    try:
+        if timeout and timeout > 0:
+            value = await asyncio.wait_for(awaitable, timeout)
+        else:
+            value = await awaitable
+    except asyncio.TimeoutError:
+        timing.status = "timeout"
+        logger.warning(f"Search of {source} timed out after {timeout}s")
+    except Exception as e:
+        timing.status = "error"
+        timing.error = str(e)
+        logger.error(f"Search of {source} failed: {e}")
+    timing.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+    return value, timing
+
+
+def top_k(results: Iterable[SearchResult], limit: int) -> List[SearchResult]:
+    """Highest-scoring results, best first (stable for equal scores)."""
+    results = list(results)
+    if limit <= 0 or limit >= len(results):
+        return sorted(results, key=lambda r: r.score, reverse=True)
+    return heapq.nlargest(limit, results, key=lambda r: r.score)
+
+
+def dedupe_top_k(results: Iterable[SearchResult], limit: int) -> List[SearchResult]:
+    """top_k after keeping only the highest-scoring result per id."""
+    best: Dict[str, SearchResult] = {}
+    for result in results:
+        existing = best.get(result.id)
+        if existing is None or result.score > existing.score:
+            best[result.id] = result
+    return top_k(best.values(), limit)
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Dict[str, Sequence[SearchResult]],
+    limit: int,
+    k: int = 60,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[SearchResult]:
+    """
+    Fuse per-provider rankings: score(d) = sum over providers of w / (k + rank).
+
+    Scores of different providers are not comparable (cosine similarity vs. rank
+    heuristics), ranks are. The fused score replaces the provider score; the
+    original one is kept in metadata["provider_score"].
+    """
+    fused: Dict[str, float] = {}
+    first_seen: Dict[str, SearchResult] = {}
+    for name, results in ranked_lists.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, result in enumerate(top_k(results, 0), start=1):
+            fused[result.id] = fused.get(result.id, 0.0) + weight / (k + rank)
+            first_seen.setdefault(result.id, result)
+
+    merged = [
+        first_seen[doc_id].model_copy(
+            update={
+                "score": score,
+                "metadata": {**first_seen[doc_id].metadata, "provider_score": first_seen[doc_id].score},
+            }
+        )
+        for doc_id, score in fused.items()
+    ]
+    return top_k(merged, limit)
@@ -2,14 +2,18 @@
 Data Source Service - Main orchestrator for vector and LEGRA providers
 """
 
+import asyncio
 import logging
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
+from app.core.config.settings import settings
+
 from .config import AgentRAGConfig, KbRAGConfig
 # VectorProvider / LegraProvider / LightRAGProvider are imported lazily where they are
 # instantiated: importing them pulls torch/sentence_transformers/faiss (vector, legra)
 # and the lightrag library, which must not be loaded in a Celery prefork master process.
-from .providers import SearchResult, BaseDataProvider, PlainProvider
+from .providers import SearchResponse, SearchResult, BaseDataProvider, PlainProvider
+from .search import dedupe_top_k, reciprocal_rank_fusion, timed
 
 if TYPE_CHECKING:  # for type hints only — never imported at runtime
     from .providers import LegraProvider
@@ -238,48 +242,78 @@ class AgentRAGService:
         Returns:
             Merged and sorted search results
         """
+        response = await self.search_detailed(query, limit, doc_ids, provider_weights)
+        return response.results
+
+    async def search_detailed(
+        self,
+        query: str,
+        limit: int = 5,
+        doc_ids: Optional[List[str]] = None,
+        provider_weights: Optional[Dict[str, float]] = None,
+        merge_strategy: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> SearchResponse:
+        """
+        Search all enabled providers concurrently and merge their results
+
+        Args:
+            query: Search query
+            limit: Maximum number of results
+            doc_ids: Optional list of document IDs to restrict search
+            provider_weights: Optional weights for each provider's results
+            merge_strategy: "score" (weighted scores) or "rrf" (reciprocal rank
+                fusion); defaults to RAG_SEARCH_MERGE_STRATEGY
+            timeout: Per-provider timeout in seconds; defaults to
+                RAG_SEARCH_PROVIDER_TIMEOUT
+
+        Returns:
+            Merged results plus per-provider latency and status
+        """
         if not self._initialized:
             logger.error("DataSourceService not initialized")
-            return []
-
-        all_results = []
+            return SearchResponse()
 
         # Default weights
         if provider_weights is None:
             provider_weights = {"vector": 1.0, "legra": 1.0, "lightrag": 1.0}
-
-        # Search vector provider if available
-        for provider in self.data_provider:
-            try:
-                vector_results = await provider.search(query, limit, doc_ids)
+        if timeout is None:
+            timeout = settings.RAG_SEARCH_PROVIDER_TIMEOUT
+
+        outcomes = await asyncio.gather(*(
+            timed(f"{self.knowledge_base_id}/{provider.name}", provider.search(query, limit, doc_ids), timeout)
+            for provider in self.data_provider
+        ))
+
+        ranked: Dict[str, List[SearchResult]] = {}
+        sources = []
+        for provider, (results, timing) in zip(self.data_provider, outcomes):
+            timing.result_count = len(results or [])
+            sources.append(timing)
+            ranked[provider.name] = results or []
+
+        if (merge_strategy or settings.RAG_SEARCH_MERGE_STRATEGY) == "rrf" and len(ranked) > 1:
+            merged = reciprocal_rank_fusion(ranked, limit, k=settings.RAG_SEARCH_RRF_K, weights=provider_weights)
+        else:
+            all_results = []
+            for name, results in ranked.items():
                 # Apply weight to scores
-                weight = provider_weights.get(provider.name, 1.0)
-                for result in vector_results:
+                weight = provider_weights.get(name, 1.0)
+                for result in results:
                     result.score *= weight
-                all_results.extend(vector_results)
-            except Exception as e:
-                logger.error(f"Vector provider search failed: {e}")
-
-        # Merge results, avoiding duplicates and sorting by score
-        merged_results = self._merge_search_results(all_results)
-
-        # Return top results
-        return merged_results[:limit]
+                all_results.extend(results)
+            # Merge results, avoiding duplicates and keeping the top results
+            merged = self._merge_search_results(all_results, limit)
+
+        return SearchResponse(
+            results=merged,
+            sources=sources,
+            partial=any(timing.status != "ok" for timing in sources),
+        )
 
-    def _merge_search_results(self, results: List[SearchResult]) -> List[SearchResult]:
+    def _merge_search_results(self, results: List[SearchResult], limit: int = 0) -> List[SearchResult]:
         """Merge search results, handling duplicates by keeping highest score"""
-        result_map = {}
-
-        for result in results:
-            existing = result_map.get(result.id)
-            if existing is None or result.score > existing.score:
-                result_map[result.id] = result
-
-        # Sort by score descending
-        merged = list(result_map.values())
-        merged.sort(key=lambda x: x.score, reverse=True)
-
-        return merged
+        return dedupe_top_k(results, limit)
 
     async def finalize_legra(self) -> bool:
         """Finalize LEGRA provider (build index and graph)"""
@@ -318,6 +352,16 @@ class AgentRAGService:
         """Check if service is initialized"""
         return self._initialized
 
+    def close(self) -> None:
+        """Close all providers (connections, pending index writes)"""
+        for provider in self.data_provider:
+            try:
+                provider.close()
+            except Exception as e:
+                logger.warning(f"Error closing {provider.name} provider for KB {self.knowledge_base_id}: {e}")
+        self.data_provider = []
+        self._initialized = False
+
     def has_vector_provider(self) -> bool:
         """Check if vector provider is available"""
         return any(provider.name == "vector" for provider in self.data_provider)
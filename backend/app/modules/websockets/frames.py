@@ -0,0 +1,77 @@
+"""
+Wire format of WebSocket broadcasts relayed through Redis.
+
+The publisher serializes the client frame ({"type", "payload"}) exactly once and
+prepends a small routing header on its own line:
+
+    {"type": "...", "room_id": "...", "tenant_id": "...", "required_topic": ...}\\n{"type": "...", "payload": {...}}
+
+Relays (the websocket service and SocketConnectionManager's subscriber) only
+parse the header and send the frame text as-is to every recipient. JSON
+encoders never emit a raw newline, so the first newline always ends the header.
+Messages without a header (the previous single-object format) are still accepted.
+"""
+
+import json
+from typing import Any, Hashable, NamedTuple
+
+import orjson
+
+# Datetimes go through default=str so frames match the previous json.dumps(..., default=str)
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class RelayMessage(NamedTuple):
+    msg_type: str | None
+    room_id: Hashable | None
+    tenant_id: str | None
+    required_topic: str | None
+    frame: str
+
+
+def encode_client_frame(msg_type: str, payload: dict[str, Any]) -> str:
+    """Serialize the frame clients receive."""
+    message = {"type": msg_type, "payload": payload}
+    try:
+        return orjson.dumps(message, default=str, option=_ORJSON_OPTIONS).decode()
+    except TypeError:
+        # e.g. integers beyond 64 bits, which orjson rejects
+        return json.dumps(message, default=str)
+
+
+def encode_relay_message(
+    frame: str,
+    *,
+    msg_type: str,
+    room_id: Hashable,
+    tenant_id: str | None,
+    required_topic: str | None,
+) -> str:
+    """Prepend the routing header to a pre-serialized client frame."""
+    header = orjson.dumps(
+        {"type": msg_type, "room_id": room_id, "tenant_id": tenant_id, "required_topic": required_topic},
+        default=str,
+    ).decode()
+    return f"{header}\n{frame}"
+
+
+def decode_relay_message(data: str | bytes) -> RelayMessage:
+    """Split a relayed message into its routing header and client frame."""
+    if isinstance(data, bytes):
+        data = data.decode()
+    header, separator, frame = data.partition("\n")
+    if separator:
+        routing = orjson.loads(header)
+        return RelayMessage(
+            routing.get("type"), routing.get("room_id"), routing.get("tenant_id"), routing.get("required_topic"), frame
+        )
+
+    # Previous format: one object carrying both the routing fields and the payload
+    message = json.loads(data)
+    return RelayMessage(
+        message.get("type"),
+        message.get("room_id"),
+        message.get("tenant_id"),
+        message.get("required_topic"),
+        encode_client_frame(message.get("type"), message.get("payload", {})),
+    )
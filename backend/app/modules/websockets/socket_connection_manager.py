@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 from contextvars import Context, copy_context
 from dataclasses import dataclass, field
@@ -12,9 +11,13 @@ from uuid import UUID
 from fastapi.websockets import WebSocket
 
 from app.core.config.settings import settings
+from app.modules.websockets.frames import decode_relay_message, encode_client_frame, encode_relay_message
 
 logger = logging.getLogger(__name__)
 
+REDIS_CHANNEL_PREFIX = "websocket:"
+REDIS_CHANNEL_PATTERN = f"{REDIS_CHANNEL_PREFIX}*"
+
 
 @dataclass(slots=True)
 class Connection:
@@ -40,6 +43,10 @@ class SocketConnectionManager:
     When Redis is not available:
     - Falls back to local-only broadcasting (single server mode)
     - Maintains backward compatibility with existing deployments
+
+    The subscriber only listens to the channels of rooms with local connections: a
+    room's channel is subscribed when its first connection joins and unsubscribed when
+    the last one leaves (WS_REDIS_SUBSCRIBE_MODE=pattern listens to websocket:* instead).
     """
 
     def __init__(self, redis_client=None) -> None:
@@ -48,6 +55,10 @@ class SocketConnectionManager:
         self._redis_client = redis_client
         self._redis_subscriber_task: asyncio.Task | None = None
         self._shutdown_event = asyncio.Event()
+        self._subscribe_pattern = settings.WS_REDIS_SUBSCRIBE_MODE == "pattern"
+        self._pubsub = None
+        self._pubsub_command_lock = asyncio.Lock()
+        self._pubsub_commands: set[asyncio.Task] = set()
 
     @staticmethod
     def _normalize_room_id(room_id: Hashable) -> str:
@@ -113,7 +124,10 @@ class SocketConnectionManager:
         logger.debug(f"[CONNECT] Captured context for user {user_id}")
 
         async with self._lock:
-            self._rooms.setdefault(tenant_aware_room_id, []).append(
+            if tenant_aware_room_id not in self._rooms:
+                self._rooms[tenant_aware_room_id] = []
+                self._schedule_pubsub_command("subscribe", tenant_aware_room_id)
+            self._rooms[tenant_aware_room_id].append(
                 Connection(raw_websocket, user_id, permissions, tenant_id, set(topics), captured_context)
             )
             logger.info(
@@ -142,6 +156,7 @@ class SocketConnectionManager:
                 self._rooms[tenant_aware_room_id] = [c for c in conns if c.websocket is not websocket]
                 if not self._rooms[tenant_aware_room_id]:
                     del self._rooms[tenant_aware_room_id]
+                    self._schedule_pubsub_command("unsubscribe", tenant_aware_room_id)
                     logger.debug(f"Room {tenant_aware_room_id} removed (no connections)")
             else:
                 # Search all rooms for this websocket (for unexpected disconnects)
@@ -163,6 +178,7 @@ class SocketConnectionManager:
 
                 for room_id_key in rooms_to_remove:
                     del self._rooms[room_id_key]
+                    self._schedule_pubsub_command("unsubscribe", room_id_key)
                     logger.debug(f"Room {room_id_key} removed (no connections)")
 
     async def get_connection_stats(self) -> dict:
@@ -218,19 +234,21 @@ class SocketConnectionManager:
             payload["takeover_user_id"] = str(current_user_id)
 
         tenant_aware_room_id = self._get_tenant_aware_room_id(room_id, tenant_id)
+        # Serialized once; relays forward this text unchanged to every recipient
+        frame = encode_client_frame(msg_type, payload)
 
         # Publish to Redis for multi-server broadcasting (if available)
         if self._redis_client:
             try:
                 redis_channel = self._get_redis_channel(tenant_aware_room_id)
-                message_data = {
-                    "type": msg_type,
-                    "payload": payload,
-                    "required_topic": required_topic,
-                    "room_id": self._normalize_room_id(room_id),
-                    "tenant_id": tenant_id,
-                }
-                await self._redis_client.publish(redis_channel, json.dumps(message_data, default=str))
+                message = encode_relay_message(
+                    frame,
+                    msg_type=msg_type,
+                    room_id=self._normalize_room_id(room_id),
+                    tenant_id=tenant_id,
+                    required_topic=required_topic,
+                )
+                await self._redis_client.publish(redis_channel, message)
                 logger.info(
                     f"[BROADCAST] Published to Redis channel: {redis_channel} | "
                     f"Room: {tenant_aware_room_id} | Type: {msg_type} | Topic: {required_topic}"
@@ -244,7 +262,7 @@ class SocketConnectionManager:
         await self._broadcast_local(
             tenant_aware_room_id=tenant_aware_room_id,
             msg_type=msg_type,
-            payload=payload,
+            frame=frame,
             required_topic=required_topic,
             room_id=room_id,
             tenant_id=tenant_id,
@@ -254,16 +272,15 @@ class SocketConnectionManager:
         self,
         tenant_aware_room_id: Hashable,
         msg_type: str,
-        payload: dict,
+        frame: str,
         required_topic: str | None = None,
         room_id: Hashable | None = None,
         tenant_id: str | None = None,
     ) -> None:
         """
-        Broadcast a message to local WebSocket connections only.
-        Used for single-server mode or as fallback when Redis is unavailable.
+        Send a pre-serialized frame to local WebSocket connections only.
+        Used for single-server mode, as fallback when Redis is unavailable, and by the Redis subscriber.
         """
-        message = json.dumps({"type": msg_type, "payload": payload}, default=str)
         targets = list(self._rooms.get(tenant_aware_room_id, []))
 
         logger.info(
@@ -283,7 +300,7 @@ class SocketConnectionManager:
 
                     def _send_sync():
                         """Sync wrapper to run async send in context"""
-                        return asyncio.create_task(conn.websocket.send_text(message))
+                        return asyncio.create_task(conn.websocket.send_text(frame))
 
                     # Run in the captured context
                     task = conn.context.run(_send_sync)
@@ -291,7 +308,7 @@ class SocketConnectionManager:
                     logger.debug(f"[BROADCAST_LOCAL] ✅ Sent within captured context to user {conn.user_id}")
                 else:
                     # Fallback: send without context (might fail)
-                    await conn.websocket.send_text(message)
+                    await conn.websocket.send_text(frame)
                     logger.debug(f"[BROADCAST_LOCAL] ✅ Sent without context to user {conn.user_id}")
 
             except Exception as exc:
@@ -304,7 +321,41 @@ class SocketConnectionManager:
 
     def _get_redis_channel(self, tenant_aware_room_id: Hashable) -> str:
         """Get Redis Pub/Sub channel name for a room."""
-        return f"websocket:{tenant_aware_room_id}"
+        return f"{REDIS_CHANNEL_PREFIX}{tenant_aware_room_id}"
+
+    def _schedule_pubsub_command(self, command: str, tenant_aware_room_id: Hashable) -> None:
+        """(Un)subscribe a room's channel on the live subscriber, if any (called under self._lock)."""
+        if self._pubsub is None:
+            # The subscriber loop subscribes to all current rooms once it connects
+            return
+        task = asyncio.create_task(
+            self._run_pubsub_command(self._pubsub, command, self._get_redis_channel(tenant_aware_room_id))
+        )
+        self._pubsub_commands.add(task)
+        task.add_done_callback(self._pubsub_commands.discard)
+
+    async def _run_pubsub_command(self, pubsub, command: str, channel: str) -> None:
+        # Serialized so a room's subscribe/unsubscribe reach Redis in the order they happened
+        async with self._pubsub_command_lock:
+            if pubsub is not self._pubsub:
+                return
+            try:
+                await getattr(pubsub, command)(channel)
+            except Exception as exc:
+                logger.warning(f"Redis {command} {channel} failed: {exc}")
+
+    async def _subscribe_rooms(self, pubsub) -> None:
+        async with self._lock, self._pubsub_command_lock:
+            if self._subscribe_pattern:
+                await pubsub.psubscribe(REDIS_CHANNEL_PATTERN)
+                logger.info(f"Subscribed to Redis pattern: {REDIS_CHANNEL_PATTERN}")
+                return
+            await pubsub.connect()
+            self._pubsub = pubsub
+            channels = [self._get_redis_channel(room_id) for room_id in self._rooms]
+            if channels:
+                await pubsub.subscribe(*channels)
+            logger.info(f"Subscribed to {len(channels)} Redis room channels")
 
     async def initialize_redis_subscriber(self) -> None:
         """
@@ -345,15 +396,14 @@ class SocketConnectionManager:
         try:
             pubsub = self._redis_client.pubsub()
 
-            # Subscribe to pattern that matches all websocket channels
-            await pubsub.psubscribe("websocket:*")
-            logger.info("Subscribed to Redis pattern: websocket:*")
+            # Subscribe to the channels of the rooms with local connections
+            await self._subscribe_rooms(pubsub)
 
             while not self._shutdown_event.is_set():
                 try:
                     message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
 
-                    if message and message["type"] == "pmessage":
+                    if message and message["type"] in ("message", "pmessage"):
                         await self._handle_redis_message(message)
 
                 except asyncio.TimeoutError:
@@ -369,9 +419,13 @@ class SocketConnectionManager:
             logger.error(f"Redis subscriber loop error: {exc}")
         finally:
             # Ensure pubsub connection is always closed to prevent leaks
+            self._pubsub = None
             if pubsub is not None:
                 try:
-                    await pubsub.punsubscribe("websocket:*")
+                    if self._subscribe_pattern:
+                        await pubsub.punsubscribe(REDIS_CHANNEL_PATTERN)
+                    else:
+                        await pubsub.unsubscribe()
                     await pubsub.close()
                     logger.info("Redis pubsub connection closed successfully")
                 except Exception as exc:
@@ -384,13 +438,8 @@ class SocketConnectionManager:
         """
         try:
             channel = message["channel"]
-            data = json.loads(message["data"])
-
-            msg_type = data.get("type")
-            payload = data.get("payload", {})
-            required_topic = data.get("required_topic")
-            room_id = data.get("room_id")
-            tenant_id = data.get("tenant_id")
+            # Only the routing header is parsed; the client frame is forwarded as-is
+            msg_type, room_id, tenant_id, required_topic, frame = decode_relay_message(message["data"])
 
             tenant_aware_room_id = self._get_tenant_aware_room_id(room_id, tenant_id)
 
@@ -404,7 +453,7 @@ class SocketConnectionManager:
             await self._broadcast_local(
                 tenant_aware_room_id=tenant_aware_room_id,
                 msg_type=msg_type,
-                payload=payload,
+                frame=frame,
                 required_topic=required_topic,
                 room_id=room_id,
                 tenant_id=tenant_id,
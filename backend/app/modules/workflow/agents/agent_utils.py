@@ -383,3 +383,34 @@ def parse_react_action(text: str) -> Dict[str, Any]:
 
 
 
+
+
+# ==================== STREAMING UTILITIES ====================
+
+def with_stream_usage(model: Any) -> Any:
+    """The chat model with token usage reported on streamed responses, where its client supports it
+
+    langchain-openai only adds usage to streams when ``stream_usage`` is set (it turns it
+    on itself only for default clients); without it streamed answers record zero tokens.
+    """
+    if "stream_usage" in getattr(type(model), "model_fields", {}) and not getattr(model, "stream_usage", None):
+        return model.model_copy(update={"stream_usage": True})
+    return model
+
+
+def extract_text_delta(chunk: Any) -> str:
+    """Extract the text part of a streamed message chunk (tool call blocks are ignored)"""
+    content = getattr(chunk, "content", None)
+    if not content:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict) and block.get("type") == "text":
+                parts.append(block.get("text", ""))
+        return "".join(parts)
+    return ""
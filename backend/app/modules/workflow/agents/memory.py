@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Union, Optional
+from typing import Dict, Any, List, Union, Optional, TYPE_CHECKING
 import logging
 from datetime import datetime
 import json
@@ -6,9 +6,73 @@ from redis.asyncio import Redis
 from app.dependencies.dependency_injection import RedisString
 from app.core.config.settings import settings
 
+if TYPE_CHECKING:
+    from app.core.utils.token_utils import TokenCounter
+
 
 logger = logging.getLogger(__name__)
 
+# TTL of all Redis keys of a conversation (30 days)
+CONVERSATION_TTL = 86400 * 30
+
+# Field of stored Redis messages holding their token count per tokenizer family
+TOKEN_COUNTS_FIELD = "token_counts"
+
+# Tokenizer families counted when a message is written, by family name. Seeded from
+# CONVERSATION_TOKEN_FAMILIES; families queried by get_chat_history_within_tokens
+# are added so that later messages carry their counts as well.
+_token_counters: Optional[Dict[str, "TokenCounter"]] = None
+
+
+def _message_token_text(message_data: Dict[str, Any]) -> str:
+    """Text a message is counted as for token budgets"""
+    return f"{message_data['role']}: {message_data['content']}"
+
+
+def _get_token_counters() -> Dict[str, "TokenCounter"]:
+    global _token_counters
+    if _token_counters is None:
+        from app.core.utils.token_utils import get_token_counter_for_family
+
+        counters = {}
+        for family in settings.CONVERSATION_TOKEN_FAMILIES.split(","):
+            family = family.strip()
+            if not family:
+                continue
+            try:
+                counters[family] = get_token_counter_for_family(family)
+            except Exception as e:
+                logger.warning(f"Not storing {family} token counts with messages: {e}")
+        _token_counters = counters
+    return _token_counters
+
+
+def count_message_tokens(message_data: Dict[str, Any]) -> Dict[str, int]:
+    """Token count of a message for every write-time tokenizer family"""
+    text = _message_token_text(message_data)
+    return {
+        family: counter.count_tokens(text)
+        for family, counter in _get_token_counters().items()
+    }
+
+
+def _stored_token_count(
+    token_counts: Optional[Dict[str, int]], message_data: Dict[str, Any], counter: "TokenCounter"
+) -> int:
+    """Stored token count of a message, counting only when none was stored for the family"""
+    family = counter.family
+    if token_counts and family in token_counts:
+        return token_counts[family]
+    _get_token_counters().setdefault(family, counter)
+    return counter.count_tokens(_message_token_text(message_data))
+
+
+def _load_message(message_json: str) -> Dict[str, Any]:
+    """Parse a stored Redis message, dropping its storage-only fields"""
+    message_data = json.loads(message_json)
+    message_data.pop(TOKEN_COUNTS_FIELD, None)
+    return message_data
+
 
 class Message:
     """Message class"""
@@ -19,6 +83,8 @@ class Message:
         self.content: Any = content
         self.message_type: str = message_type
         self.timestamp: str = datetime.now().isoformat()
+        # Token count per tokenizer family, filled on first use (not serialized)
+        self.token_counts: Dict[str, int] = {}
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert the message to a dictionary"""
@@ -284,16 +350,18 @@ class InMemoryConversationMemory(BaseConversationMemory):
             raise ValueError("Token budget must be positive")
 
         counter = get_token_counter(provider, model)
+        family = counter.family
         selected_messages = []
         current_tokens = 0
 
         # Iterate from most recent to oldest
         for message in reversed(self.messages):
-            # Count tokens for this message
+            # Count tokens for this message (once per tokenizer family)
             message_dict = message.to_dict()
-            message_tokens = counter.count_tokens(
-                f"{message_dict['role']}: {message_dict['content']}"
-            )
+            message_tokens = message.token_counts.get(family)
+            if message_tokens is None:
+                message_tokens = counter.count_tokens(_message_token_text(message_dict))
+                message.token_counts[family] = message_tokens
 
             # Check if adding this message would exceed budget
             if current_tokens + message_tokens > token_budget:
@@ -536,49 +604,46 @@ class RedisConversationMemory(BaseConversationMemory):
             self.redis_client = injector.get(RedisString)
         return self.redis_client
 
-    async def _initialize_conversation(self) -> None:
-        """Initialize conversation data in Redis if it doesn't exist"""
-        redis = await self._get_redis()
-
-        # Check if conversation exists
+    def _queue_initialize_conversation(self, pipe: Any) -> None:
+        """Queue creation of the conversation info unless this instance already did it"""
         if self.initialized:
             return
-        exists = await redis.exists(self._conversation_key)
-        if not exists:
-            # Initialize conversation metadata
-            conversation_data = {
-                "thread_id": self.thread_id,
-                "created_at": self.created_at,
-                "last_updated": self.last_updated,
-                "executions_count": self.executions_count,
-            }
-            # type: ignore
-            await redis.hset(self._conversation_key, mapping=conversation_data)
-            # type: ignore
-            await redis.expire(self._conversation_key, 86400 * 30)
-        self.initialized = True
+        # HSETNX leaves an existing conversation untouched, no EXISTS round-trip needed
+        pipe.hsetnx(self._conversation_key, "thread_id", self.thread_id)
+        pipe.hsetnx(self._conversation_key, "created_at", self.created_at)
+        pipe.hsetnx(self._conversation_key, "last_updated", self.last_updated)
+        pipe.hsetnx(self._conversation_key, "executions_count", self.executions_count)
+        pipe.expire(self._conversation_key, CONVERSATION_TTL)
+
+    async def _append_messages(self, messages: List[Message]) -> None:
+        """
+        Append messages in a single MULTI/EXEC round-trip.
 
-    async def add_message(self, message: Message) -> None:
-        """Add a message to the conversation in Redis"""
-        try:
-            await self._initialize_conversation()
-            redis = await self._get_redis()
+        Token counts of every write-time tokenizer family are stored with each
+        message so token budget queries never re-tokenize the history.
+        """
+        redis = await self._get_redis()
 
-            # Create message data
+        message_jsons = []
+        for message in messages:
             message_data = message.to_dict()
-            message_json = json.dumps(message_data)
+            message_data[TOKEN_COUNTS_FIELD] = count_message_tokens(message_data)
+            message_jsons.append(json.dumps(message_data))
 
-            # Add message to Redis list
-            await redis.lpush(self._message_key, message_json)  # type: ignore
-
-            # Update last_updated timestamp
-            self.last_updated = message.timestamp
-            # type: ignore
-            await redis.hset(self._conversation_key, "last_updated", self.last_updated)
+        pipe = redis.pipeline(transaction=True)
+        self._queue_initialize_conversation(pipe)
+        pipe.lpush(self._message_key, *message_jsons)
+        pipe.hset(self._conversation_key, "last_updated", messages[-1].timestamp)
+        pipe.expire(self._message_key, CONVERSATION_TTL)
+        await pipe.execute()
 
-            # Set TTL for message list (30 days)
-            await redis.expire(self._message_key, 86400 * 30)  # type: ignore
+        self.initialized = True
+        self.last_updated = messages[-1].timestamp
 
+    async def add_message(self, message: Message) -> None:
+        """Add a message to the conversation in Redis"""
+        try:
+            await self._append_messages([message])
             logger.debug(f"Added message to Redis for thread {self.thread_id}")
 
         except Exception as e:
@@ -587,6 +652,18 @@ class RedisConversationMemory(BaseConversationMemory):
             )
             raise
 
+    async def add_input_output(self, input: str, output: str) -> None:
+        """Add an input and output to the conversation in one round-trip"""
+        try:
+            await self._append_messages([Message("user", input), Message("assistant", output)])
+            logger.debug(f"Added input/output to Redis for thread {self.thread_id}")
+
+        except Exception as e:
+            logger.error(
+                f"Failed to add input/output to Redis for thread {self.thread_id}: {e}"
+            )
+            raise
+
     async def add_user_message(self, content: str) -> None:
         """Add a user message to the conversation"""
         await self.add_message(Message("user", content))
@@ -663,7 +740,7 @@ class RedisConversationMemory(BaseConversationMemory):
             # type: ignore
             await redis.hset(self._conversation_key, mapping=conversation_data)
             # type: ignore
-            await redis.expire(self._conversation_key, 86400 * 30)
+            await redis.expire(self._conversation_key, CONVERSATION_TTL)
 
             logger.debug(f"Cleared conversation data for thread {self.thread_id}")
 
@@ -676,14 +753,16 @@ class RedisConversationMemory(BaseConversationMemory):
     async def set_metadata(self, key: str, value: Any) -> None:
         """Set metadata for the conversation in Redis"""
         try:
-            await self._initialize_conversation()
             redis = await self._get_redis()
 
             # Store metadata as JSON
             metadata_json = json.dumps(value)
-            # type: ignore
-            await redis.hset(self._metadata_key, key, metadata_json)
-            await redis.expire(self._metadata_key, 86400 * 30)  # type: ignore
+            pipe = redis.pipeline(transaction=True)
+            self._queue_initialize_conversation(pipe)
+            pipe.hset(self._metadata_key, key, metadata_json)
+            pipe.expire(self._metadata_key, CONVERSATION_TTL)
+            await pipe.execute()
+            self.initialized = True
 
             logger.debug(f"Set metadata {key} for thread {self.thread_id}")
 
@@ -769,10 +848,9 @@ class RedisConversationMemory(BaseConversationMemory):
                 logger.warning(f"Failed to parse message from Redis: {e}")
                 continue
 
-            # Count tokens for this message
-            message_tokens = counter.count_tokens(
-                f"{message_data['role']}: {message_data['content']}"
-            )
+            # Token counts are stored at write time; only older messages are counted here
+            token_counts = message_data.pop(TOKEN_COUNTS_FIELD, None)
+            message_tokens = _stored_token_count(token_counts, message_data, counter)
 
             # Check if adding this message would exceed budget
             if current_tokens + message_tokens > token_budget:
@@ -869,7 +947,7 @@ class RedisConversationMemory(BaseConversationMemory):
         to_compact = []
         for message_json in reversed(to_compact_jsons):  # Reverse to get chronological order
             try:
-                message_data = json.loads(message_json)
+                message_data = _load_message(message_json)
                 to_compact.append(message_data)
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse message from Redis: {e}")
@@ -896,7 +974,7 @@ class RedisConversationMemory(BaseConversationMemory):
             messages = []
             for msg_json in reversed(all_msgs):  # Reverse for chronological order
                 try:
-                    messages.append(json.loads(msg_json))
+                    messages.append(_load_message(msg_json))
                 except json.JSONDecodeError as e:
                     logger.warning(f"Failed to parse message: {e}")
             return messages
@@ -916,7 +994,7 @@ class RedisConversationMemory(BaseConversationMemory):
         messages = []
         for msg_json in reversed(message_jsons):  # Reverse for chronological order
             try:
-                messages.append(json.loads(msg_json))
+                messages.append(_load_message(msg_json))
             except json.JSONDecodeError as e:
                 logger.warning(f"Failed to parse message: {e}")
 
@@ -1088,7 +1166,7 @@ class RedisConversationMemory(BaseConversationMemory):
             messages = []
             for msg_json in reversed(raw):
                 try:
-                    messages.append(json.loads(msg_json))
+                    messages.append(_load_message(msg_json))
                 except json.JSONDecodeError as e:
                     logger.warning(f"Failed to parse message in get_messages_by_range: {e}")
             return messages
@@ -1136,14 +1214,16 @@ class RedisConversationMemory(BaseConversationMemory):
     async def set_stateful_value(self, key: str, value: Any) -> None:
         """Set a stateful parameter value in Redis"""
         try:
-            await self._initialize_conversation()
             redis = await self._get_redis()
             # Store value as JSON
             value_json = json.dumps(value)
-            # type: ignore
-            await redis.hset(self._stateful_key, key, value_json)
-            # Set TTL for stateful values (30 days, same as conversation)
-            await redis.expire(self._stateful_key, 86400 * 30)  # type: ignore
+            pipe = redis.pipeline(transaction=True)
+            self._queue_initialize_conversation(pipe)
+            pipe.hset(self._stateful_key, key, value_json)
+            # Set TTL for stateful values (same as conversation)
+            pipe.expire(self._stateful_key, CONVERSATION_TTL)
+            await pipe.execute()
+            self.initialized = True
             logger.debug(f"Set stateful value {key} for thread {self.thread_id}")
         except Exception as e:
             logger.error(
@@ -13,8 +13,13 @@ Set the OPENAI_API_KEY environment variable before use.
 
 import asyncio
 import logging
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from injector import inject
 
@@ -97,6 +102,8 @@ def _create_config(
         collection_name=f"chat_{chat_id}",
         host=ov.get("vector_db_host") or None,
         port=int(ov["vector_db_port"]) if ov.get("vector_db_port") else None,
+        # In-process backends (FAISS) persist here so evicted chats can be reloaded
+        persist_directory=settings.THREAD_RAG_PERSIST_DIR or None,
     )
 
     separators_raw = ov.get("chunk_separators", "\\n\\n,\\n, ,")
@@ -122,20 +129,75 @@ def _create_config(
     )
 
 
+@dataclass
+class _ThreadStore:
+    service: AgentRAGService
+    last_used: float
+    active: int = 0  # operations currently using the service (never evicted meanwhile)
+
+
+# Live ThreadScopedRAG instances (one per tenant) for the cache gauges
+_instances: "weakref.WeakSet[ThreadScopedRAG]" = weakref.WeakSet()
+
+
+def get_thread_rag_stats() -> Dict[str, Any]:
+    """Per-chat RAG stores of this worker, summed over tenants."""
+    totals = {"tenants": 0, "size": 0, "active": 0, "hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+    for instance in list(_instances):
+        stats = instance.get_cache_stats()
+        totals["tenants"] += 1
+        for key in ("size", "active", "hits", "misses", "evictions", "expirations"):
+            totals[key] += stats[key]
+    totals["max_size_per_tenant"] = settings.THREAD_RAG_MAX_SERVICES
+    return totals
+
+
 @inject
 class ThreadScopedRAG:
     """
     Manages an AgentRAGService instance for each chat (by chat_id/thread_id).
     Allows adding messages and retrieving relevant context for RAG.
     Tenant-scoped singleton - each tenant gets their own instance.
+
+    Services are kept in an LRU bounded by THREAD_RAG_MAX_SERVICES and are
+    evicted after THREAD_RAG_IDLE_TTL_SECONDS without use; evicted services
+    are closed and recreated lazily on the chat's next access (the vectors live
+    in the vector DB, or under THREAD_RAG_PERSIST_DIR for in-process FAISS).
     """
 
     def __init__(self):
-        self._services: Dict[str, AgentRAGService] = {}
+        self._services: "OrderedDict[str, _ThreadStore]" = OrderedDict()
         self._initialization_locks: Dict[str, asyncio.Lock] = {}
         self._lock = asyncio.Lock()
+        self._max_services = settings.THREAD_RAG_MAX_SERVICES
+        self._idle_ttl = settings.THREAD_RAG_IDLE_TTL_SECONDS
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        _instances.add(self)
         logger.info("ThreadScopedRAG initialized (tenant-scoped)")
 
+    @asynccontextmanager
+    async def _service(
+        self,
+        chat_id: str,
+        config_overrides: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Optional[AgentRAGService]]:
+        """Get the chat's service and keep it from being evicted while in use."""
+        service = await self._get_service(chat_id, config_overrides)
+        store = self._services.get(chat_id) if service else None
+        if store is None or store.service is not service:
+            yield service
+            return
+
+        store.active += 1
+        try:
+            yield service
+        finally:
+            store.active -= 1
+            store.last_used = time.monotonic()
+
     async def _get_service(
         self,
         chat_id: str,
@@ -145,9 +207,9 @@ class ThreadScopedRAG:
         Get or create an AgentRAGService for a chat.
 
         Config overrides are applied only on cache miss (first creation for this
-        chat_id). Once a service is cached, its config is locked for the lifetime
-        of the chat — subsequent calls with different overrides will use the
-        existing service unchanged.
+        chat_id). Once a service is cached, its config is locked until the
+        service is evicted — subsequent calls with different overrides will use
+        the existing service unchanged.
 
         Args:
             chat_id: Chat identifier
@@ -156,16 +218,20 @@ class ThreadScopedRAG:
         Returns:
             AgentRAGService instance or None if creation fails
         """
+        await self._evict_expired()
+
         # Return existing service if available and initialized
-        if chat_id in self._services:
-            service = self._services[chat_id]
-            if service.is_initialized():
-                return service
+        store = self._services.get(chat_id)
+        if store is not None:
+            if store.service.is_initialized():
+                self._hits += 1
+                store.last_used = time.monotonic()
+                self._services.move_to_end(chat_id)
+                return store.service
             else:
                 # Remove failed service
                 logger.warning(f"Removing uninitialized service for chat {chat_id}")
-                if chat_id in self._services:
-                    del self._services[chat_id]
+                self._services.pop(chat_id, None)
 
         # Ensure we have a lock for this chat
         if chat_id not in self._initialization_locks:
@@ -176,9 +242,12 @@ class ThreadScopedRAG:
         # Use lock to prevent concurrent initialization
         async with self._initialization_locks[chat_id]:
             # Double-check pattern - service might have been created while waiting
-            if chat_id in self._services and self._services[chat_id].is_initialized():
-                return self._services[chat_id]
+            store = self._services.get(chat_id)
+            if store is not None and store.service.is_initialized():
+                self._hits += 1
+                return store.service
 
+            self._misses += 1
             try:
                 # Create service, applying any user-supplied overrides
                 config = _create_config(chat_id, config_overrides)
@@ -191,14 +260,77 @@ class ThreadScopedRAG:
                     return None
 
                 # Cache the service
-                self._services[chat_id] = service
+                self._services[chat_id] = _ThreadStore(service=service, last_used=time.monotonic())
                 logger.info(f"[ThreadScopedRAG] Created and cached AgentRAGService for chat {chat_id}")
-                return service
-
             except Exception as e:
                 logger.error(f"Error creating AgentRAGService for chat {chat_id}: {e}")
                 return None
 
+        await self._evict_overflow(keep=chat_id)
+        return service
+
+    async def _evict_expired(self) -> None:
+        """Close services idle for longer than the TTL."""
+        if self._idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self._idle_ttl
+        expired = [
+            chat_id for chat_id, store in self._services.items()
+            if store.last_used < cutoff and not store.active
+        ]
+        for chat_id in expired:
+            self._expirations += 1
+            await self.evict(chat_id)
+
+    async def _evict_overflow(self, keep: str) -> None:
+        """Close least recently used services beyond the size bound."""
+        excess = len(self._services) - self._max_services
+        if excess <= 0:
+            return
+        # Oldest first; services in use are skipped and retried on the next insert
+        victims = [
+            chat_id for chat_id, store in self._services.items()
+            if not store.active and chat_id != keep
+        ][:excess]
+        for chat_id in victims:
+            self._evictions += 1
+            await self.evict(chat_id)
+
+    async def evict(self, chat_id: str) -> bool:
+        """
+        Drop a chat's service from the cache and close its providers.
+
+        The chat's vectors are kept; the service is recreated on next access.
+        """
+        store = self._services.pop(chat_id, None)
+        lock = self._initialization_locks.get(chat_id)
+        if lock is not None and not lock.locked():
+            del self._initialization_locks[chat_id]
+        if store is None:
+            return False
+
+        try:
+            # Providers may flush to disk (e.g. FAISS checkpoints) on close
+            await asyncio.to_thread(store.service.close)
+        except Exception as e:
+            logger.warning(f"Error closing AgentRAGService for chat {chat_id}: {e}")
+        logger.debug(f"[ThreadScopedRAG] Evicted AgentRAGService for chat {chat_id}")
+        return True
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Live per-chat stores of this tenant and cache counters."""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._services),
+            "max_size": self._max_services,
+            "active": sum(1 for store in self._services.values() if store.active),
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
     async def add_message(
         self,
         chat_id: str,
@@ -218,23 +350,23 @@ class ThreadScopedRAG:
             config_overrides: Optional embedding/vectordb/chunking overrides (applied
                 only on first service creation for this chat_id)
         """
-        service = await self._get_service(chat_id, config_overrides)
-        if not service:
-            logger.error(f"Could not get service for chat {chat_id}")
-            return
+        async with self._service(chat_id, config_overrides) as service:
+            if not service:
+                logger.error(f"Could not get service for chat {chat_id}")
+                return
 
-        try:
-            metadata = {
-                "message_id": message_id,
-                "chat_id": chat_id,
-                "is_chunked": False,
-                **(extra_metadata or {}),
-            }
-            result = await service.add_document(message_id, message, metadata, legra_finalize=False)
-            if not any(result.values()):
-                logger.warning(f"Failed to add message {message_id} to chat {chat_id}")
-        except Exception as e:
-            logger.error(f"Error adding message {message_id} to chat {chat_id}: {e}")
+            try:
+                metadata = {
+                    "message_id": message_id,
+                    "chat_id": chat_id,
+                    "is_chunked": False,
+                    **(extra_metadata or {}),
+                }
+                result = await service.add_document(message_id, message, metadata, legra_finalize=False)
+                if not any(result.values()):
+                    logger.warning(f"Failed to add message {message_id} to chat {chat_id}")
+            except Exception as e:
+                logger.error(f"Error adding message {message_id} to chat {chat_id}: {e}")
 
     async def add_long_message(
         self,
@@ -257,23 +389,23 @@ class ThreadScopedRAG:
             filename: Optional filename for file content
             config_overrides: Rag related configurations to override defaults
         """
-        service = await self._get_service(chat_id, config_overrides)
-        if not service:
-            logger.error(f"Could not get service for chat {chat_id}")
-            return
+        async with self._service(chat_id, config_overrides) as service:
+            if not service:
+                logger.error(f"Could not get service for chat {chat_id}")
+                return
 
-        try:
-            metadata = {
-                "message_id": message_id,
-                "chat_id": chat_id,
-                "is_chunked": chunk_long_messages,
-                "filename": filename,
-            }
-            result = await service.add_document(message_id, message, metadata, legra_finalize=False)
-            if not any(result.values()):
-                logger.warning(f"Failed to add message {message_id} to chat {chat_id}")
-        except Exception as e:
-            logger.error(f"Error adding long message {message_id} to chat {chat_id}: {e}")
+            try:
+                metadata = {
+                    "message_id": message_id,
+                    "chat_id": chat_id,
+                    "is_chunked": chunk_long_messages,
+                    "filename": filename,
+                }
+                result = await service.add_document(message_id, message, metadata, legra_finalize=False)
+                if not any(result.values()):
+                    logger.warning(f"Failed to add message {message_id} to chat {chat_id}")
+            except Exception as e:
+                logger.error(f"Error adding long message {message_id} to chat {chat_id}: {e}")
 
     async def add_file_content(
         self,
@@ -326,49 +458,53 @@ class ThreadScopedRAG:
         Returns:
             List of dicts with 'content' and 'metadata' keys
         """
-        service = await self._get_service(chat_id, config_overrides)
-        if not service:
-            logger.error(f"Could not get service for chat {chat_id}")
-            return []
+        async with self._service(chat_id, config_overrides) as service:
+            if not service:
+                logger.error(f"Could not get service for chat {chat_id}")
+                return []
 
-    async def purge_chat(self, chat_id: str) -> Dict[str, bool]:
-        """
-        GDPR helper: remove all chat-scoped retrieval artifacts (e.g. embeddings)
-        for the given chat_id.
-        """
-        service = await self._get_service(chat_id, config_overrides=None)
-        if not service:
-            logger.error(f"Could not get service for chat {chat_id}")
-            return {}
-        try:
-            return await service.delete_by_metadata({"chat_id": chat_id})
-        except Exception as e:
-            logger.error(f"Error purging chat {chat_id}: {e}")
-            return {}
+            try:
+                # Search using AgentRAGService
+                search_results: List[SearchResult] = await service.search(query, limit=top_k)
 
-        try:
-            # Search using AgentRAGService
-            search_results: List[SearchResult] = await service.search(query, limit=top_k)
+                if not search_results:
+                    return []
 
-            if not search_results:
-                return []
+                # Convert SearchResult to backward-compatible format
+                retrieved_docs = []
+                for result in search_results:
+                    # Extract metadata from SearchResult
+                    metadata = result.metadata.copy() if result.metadata else {}
 
-            # Convert SearchResult to backward-compatible format
-            retrieved_docs = []
-            for result in search_results:
-                # Extract metadata from SearchResult
-                metadata = result.metadata.copy() if result.metadata else {}
+                    # Ensure backward compatibility with original format
+                    retrieved_docs.append(
+                        {
+                            "content": result.content,
+                            "metadata": metadata,
+                        }
+                    )
 
-                # Ensure backward compatibility with original format
-                retrieved_docs.append(
-                    {
-                        "content": result.content,
-                        "metadata": metadata,
-                    }
-                )
+                return retrieved_docs
 
-            return retrieved_docs
+            except Exception as e:
+                logger.error(f"Error retrieving from chat {chat_id}: {e}")
+                return []
 
-        except Exception as e:
-            logger.error(f"Error retrieving from chat {chat_id}: {e}")
-            return []
+    async def purge_chat(self, chat_id: str) -> Dict[str, bool]:
+        """
+        GDPR helper: remove all chat-scoped retrieval artifacts (e.g. embeddings)
+        for the given chat_id.
+        """
+        async with self._service(chat_id, config_overrides=None) as service:
+            if not service:
+                logger.error(f"Could not get service for chat {chat_id}")
+                return {}
+            try:
+                result = await service.delete_by_metadata({"chat_id": chat_id})
+            except Exception as e:
+                logger.error(f"Error purging chat {chat_id}: {e}")
+                return {}
+
+        # Nothing left worth keeping warm
+        await self.evict(chat_id)
+        return result
@@ -1,10 +1,10 @@
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import logging
 import uuid
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages.base import BaseMessage
 from langchain_core.tools import StructuredTool
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessageChunk, HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain.agents import create_agent
 from langchain.agents.middleware.types import AgentMiddleware
 from langgraph.types import Command
@@ -13,7 +13,9 @@ from app.modules.workflow.agents.base_tool_agent import BaseToolAgent
 from app.modules.workflow.agents.agent_utils import (
     create_error_response,
     create_success_response,
+    extract_text_delta,
     parse_json_response,
+    with_stream_usage,
 )
 import json
 
@@ -159,8 +161,9 @@ class ReActAgentLC(BaseToolAgent):
     def _create_langgraph_agent(self):
         """Create the LangGraph React agent executor"""
         # Create the agent with system prompt
+        # Usage must also come back when the graph streams the model (on_token / stream())
         agent_executor = create_agent(
-            model=self.llm_model,
+            model=with_stream_usage(self.llm_model),
             tools=self.lc_tools,
             system_prompt=self.system_prompt,
             middleware=[RetryOnToolErrorMiddleware()],
@@ -250,7 +253,11 @@ class ReActAgentLC(BaseToolAgent):
                 logger.debug(f"Executing LangGraph ReAct agent with query: {query}")
 
             # Execute the agent and get the final result
-            result = await self.agent_executor.ainvoke(input_data, config=config)
+            on_token = kwargs.get("on_token")
+            if on_token is not None:
+                result = await self._invoke_streaming(input_data, config, on_token)
+            else:
+                result = await self.agent_executor.ainvoke(input_data, config=config)
 
             if self.verbose:
                 logger.debug(f"LangGraph agent result: {result}")
@@ -495,6 +502,22 @@ class ReActAgentLC(BaseToolAgent):
                 str(e), self._get_agent_name(), thread_id=thread_id
             )
 
+    async def _invoke_streaming(
+        self, input_data: Dict[str, Any], config: Dict[str, Any], on_token: Callable[[str], None]
+    ) -> Dict[str, Any]:
+        """Run the agent graph forwarding model text deltas to on_token; returns the final graph state"""
+        result: Dict[str, Any] = {}
+        async for mode, data in self.agent_executor.astream(
+            input_data, config=config, stream_mode=["messages", "values"]
+        ):
+            if mode == "values":
+                result = data
+                continue
+            chunk, _metadata = data
+            if isinstance(chunk, AIMessageChunk) and not chunk.tool_call_chunks:
+                on_token(extract_text_delta(chunk))
+        return result
+
     async def stream(self, query: str, chat_history: Optional[List] = None, **kwargs):
         """Stream the agent's reasoning and action process"""
         chat_history = chat_history or []
@@ -8,7 +8,7 @@ import logging
 import time
 from app.core.utils.sensitive_data_utils import redact_sensitive_substrings
 from app.core.utils.string_utils import truncate_for_log
-from app.modules.workflow.engine.utils import replace_config_vars, extract_code_params
+from app.modules.workflow.engine.utils import ConfigTemplatePlan, replace_config_vars, extract_code_params
 from app.modules.workflow.engine.workflow_state import WorkflowState
 
 logger = logging.getLogger(__name__)
@@ -73,10 +73,21 @@ class BaseNode(ABC):
     def get_node_config(self, node_id: str):
         """Get the node config and type."""
         workflow = self.state.workflow
-        node_config = next(node for node in workflow["nodes"] if node["id"] == node_id)
+        nodes_by_id = workflow.get("nodes_by_id")
+        if nodes_by_id is not None and node_id in nodes_by_id:
+            node_config = nodes_by_id[node_id]
+        else:
+            node_config = next(node for node in workflow["nodes"] if node["id"] == node_id)
         node_type = node_config.get("type", "")
         return node_config, node_type
 
+    def get_template_plan(self) -> Optional[ConfigTemplatePlan]:
+        """Get the substitution plan compiled by the engine for this node's data, if any."""
+        plans = self.state.workflow.get("template_plans") if self.state.workflow else None
+        if not plans:
+            return None
+        return plans.get(self.node_id)
+
     def get_handlers(self) -> list:
         """Get the node handlers from configuration."""
         return self.node_data.get("handlers", [])
@@ -119,6 +130,14 @@ class BaseNode(ABC):
         """Get the conversation memory."""
         return self.state.get_memory()
 
+    def is_streaming(self) -> bool:
+        """Whether this node's token deltas are streamed to the client."""
+        return self.state.is_streaming_node(self.node_id)
+
+    def emit_token(self, text: str) -> None:
+        """Stream a token delta of this node's output (no-op when not streaming)."""
+        self.state.emit_token(self.node_id, text)
+
     def get_session_context(self) -> dict:
         """Get the session context (session data) from workflow state."""
         return self.state.get_session()
@@ -347,6 +366,7 @@ class BaseNode(ABC):
                 state=self.state,
                 source_output=source_output,
                 direct_input=direct_input,
+                plan=self.get_template_plan(),
             )
 
             # Log replacements for debugging
@@ -270,8 +270,11 @@ class AgentNode(PIIAnonymizerMixin, BaseNode):
                     self.get_memory(), config, provider_id, system_prompt, prompt
                 )
 
-            # Invoke the agent
-            result = await agent.invoke(prompt, chat_history=chat_history)
+            # Invoke the agent; agents that support it stream their answer tokens
+            invoke_kwargs = {}
+            if isinstance(agent, ReActAgentLC) and self.is_streaming() and not config.get("piiMasking"):
+                invoke_kwargs["on_token"] = self.emit_token
+            result = await agent.invoke(prompt, chat_history=chat_history, **invoke_kwargs)
             logger.debug("Agent result: %s", result)
 
             from app.modules.workflow.engine.llm_usage_tracking import merge_llm_usage_from_result
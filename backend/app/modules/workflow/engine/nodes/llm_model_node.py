@@ -12,6 +12,7 @@ from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.utils.token_utils import calculate_history_tokens
 from app.core.utils.llm_usage_utils import extract_usage_from_aimessage
+from app.modules.workflow.agents.agent_utils import extract_text_delta, with_stream_usage
 from app.modules.workflow.agents.cot_agent import ChainOfThoughtAgent
 from app.modules.workflow.engine import BaseNode
 from app.modules.workflow.engine.pii_anonymizer_mixin import PIIAnonymizerMixin
@@ -240,7 +241,12 @@ class LLMModelNode(PIIAnonymizerMixin, BaseNode):
                 message_content.extend(attachments_message_content)
 
             # Process the input through the model
-            response = await llm.ainvoke([SystemMessage(content=system_prompt), HumanMessage(content=message_content)])
+            messages = [SystemMessage(content=system_prompt), HumanMessage(content=message_content)]
+            if self.is_streaming() and not config.get("piiMasking"):
+                # Masked output is only unmasked after the node completes, so it is never streamed
+                response = await self._stream_model_response(llm, messages)
+            else:
+                response = await llm.ainvoke(messages)
             result = response.content
 
             # Extract and record token usage
@@ -265,6 +271,22 @@ class LLMModelNode(PIIAnonymizerMixin, BaseNode):
             error_message = f"Error: {str(e)}"
             return error_message
 
+    async def _stream_model_response(self, llm, messages: list):
+        """
+        Stream the completion, forwarding text deltas, and return the aggregated message.
+
+        The aggregated chunk carries the same content and usage metadata as the
+        message ainvoke would have returned.
+        """
+        response = None
+        async for chunk in with_stream_usage(llm).astream(messages):
+            self.emit_token(extract_text_delta(chunk))
+            response = chunk if response is None else response + chunk
+
+        if response is None:
+            return await llm.ainvoke(messages)
+        return response
+
     def _convert_attachment_to_base64(self, attachment_local_path: str) -> str:
         """Convert attachment local path to base64"""
         import os
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +94,71 @@ def _get_engines():
     return AnalyzerEngine(nlp_engine=_PatternOnlyNlpEngine())
 
 
+class PIIMaskCache:
+    """
+    LRU cache of mask() results keyed by a hash of (entities, language, text).
+
+    Chat history is re-masked on every turn of a PII-enabled agent; with the
+    cache only messages that were not seen before reach the Presidio analyzer.
+    Masking is deterministic per text, so an entry is valid for any thread.
+    """
+
+    def __init__(self, max_size: int = 5000):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[str, Tuple[dict, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(text: str, entities: list[str], language: str) -> Tuple[Any, ...]:
+        return (tuple(entities), language, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[str, Tuple[dict, ...]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: Tuple[Any, ...], masked: str, items: list[dict]) -> None:
+        if self._max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (masked, tuple(items))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_mask_cache = PIIMaskCache(max_size=settings.PII_MASK_CACHE_MAX_SIZE)
+
+
+def get_pii_mask_cache() -> PIIMaskCache:
+    return _mask_cache
+
+
 class PIIAnonymizer:
     """
     Masks PII in text before it reaches the LLM and restores it afterwards.
@@ -99,26 +169,25 @@ class PIIAnonymizer:
     masked_text, token_map = service.mask(user_text)
     # ... LLM call with masked_text ...
     restored = service.unmask(llm_response, token_map)
+
+    mask() results are cached per text (see PIIMaskCache). All methods are
+    blocking; async callers run them in a worker thread.
     """
 
-    def __init__(self, entities: list[str] | None = None, language: str = "en") -> None:
+    def __init__(
+        self,
+        entities: list[str] | None = None,
+        language: str = "en",
+        cache: PIIMaskCache | None = None,
+    ) -> None:
         self._entities = entities or DEFAULT_ENTITIES
         self._language = language
+        self._cache = cache if cache is not None else _mask_cache
 
-    def mask(self, text: str) -> tuple[str, dict[str, Any]]:
-        """
-        Replace PII spans with unique anonymization tokens.
-        Returns (masked_text, token_map). Pass token_map unchanged to unmask().
-        Returns (text, {}) when no PII is detected.
-        """
-        if not text:
-            return text, {}
-
+    def _detect(self, text: str, entities: list[str]) -> list:
+        """Non-overlapping Presidio detections in text, ordered by start offset."""
         analyzer = _get_engines()
-        results = analyzer.analyze(text=text, entities=self._entities, language=self._language)
-
-        if not results:
-            return text, {}
+        results = analyzer.analyze(text=text, entities=entities, language=self._language)
 
         # Presidio may return multiple detections for overlapping spans
         # (e.g., a phone number also matching US_DRIVER_LICENSE).  Keep only
@@ -133,24 +202,58 @@ class PIIAnonymizer:
             ):
                 continue
             deduplicated.append(result)
+        return sorted(deduplicated, key=lambda r: r.start)
+
+    @staticmethod
+    def _replace_spans(text: str, spans: list, replacements: list[str]) -> str:
+        """Rebuild text in one pass with each (sorted, disjoint) span replaced."""
+        parts: list[str] = []
+        position = 0
+        for span, replacement in zip(spans, replacements):
+            parts.append(text[position:span.start])
+            parts.append(replacement)
+            position = span.end
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def mask(self, text: str) -> tuple[str, dict[str, Any]]:
+        """
+        Replace PII spans with unique anonymization tokens.
+        Returns (masked_text, token_map). Pass token_map unchanged to unmask().
+        Returns (text, {}) when no PII is detected.
+        """
+        if not text:
+            return text, {}
 
-        # Process right-to-left so earlier offsets stay valid after each substitution.
-        # Each entity type gets its own counter so two different emails become
-        # <EMAIL_ADDRESS_1> and <EMAIL_ADDRESS_2> and can be independently restored.
+        key = self._cache.key(text, self._entities, self._language)
+        cached = self._cache.get(key)
+        if cached is not None:
+            masked, items = cached
+            return masked, {"items": list(items)} if items else {}
+
+        spans = self._detect(text, self._entities)
+        if not spans:
+            self._cache.put(key, text, [])
+            return text, {}
+
+        # Tokens are numbered right-to-left per entity type, so two different
+        # emails become johndoe1@example.com / johndoe2@example.com and can be
+        # independently restored.
         entity_counters: dict[str, int] = {}
-        items: list[dict[str, Any]] = []
-        masked = text
-
-        for result in sorted(deduplicated, key=lambda r: r.start, reverse=True):
-            entity_counters[result.entity_type] = entity_counters.get(result.entity_type, 0) + 1
-            counter = entity_counters[result.entity_type]
-            generator = _FAKE_VALUE_TEMPLATES.get(result.entity_type)
-            token = generator(counter) if generator else f"<{result.entity_type}_{counter}>"
-            original = text[result.start:result.end]
-            masked = masked[:result.start] + token + masked[result.end:]
-            items.append({"token": token, "original": original, "entity_type": result.entity_type})
-
-        items.reverse()  # restore left-to-right order
+        tokens: list[str] = [""] * len(spans)
+        for i in range(len(spans) - 1, -1, -1):
+            entity_type = spans[i].entity_type
+            entity_counters[entity_type] = entity_counters.get(entity_type, 0) + 1
+            counter = entity_counters[entity_type]
+            generator = _FAKE_VALUE_TEMPLATES.get(entity_type)
+            tokens[i] = generator(counter) if generator else f"<{entity_type}_{counter}>"
+
+        masked = self._replace_spans(text, spans, tokens)
+        items = [
+            {"token": token, "original": text[span.start:span.end], "entity_type": span.entity_type}
+            for span, token in zip(spans, tokens)
+        ]
+        self._cache.put(key, masked, items)
         logger.debug("PIIAnonymizer.mask: %d PII span(s) masked", len(items))
         return masked, {"items": items}
 
@@ -164,29 +267,12 @@ class PIIAnonymizer:
         if not text:
             return text
 
-        target_entities = entities or self._entities
-        analyzer = _get_engines()
-        results = analyzer.analyze(text=text, entities=target_entities, language=self._language)
-
-        if not results:
+        spans = self._detect(text, entities or self._entities)
+        if not spans:
             return text
 
-        results = sorted(results, key=lambda r: (-r.score, r.start))
-        deduplicated: list = []
-        for result in results:
-            if any(
-                result.start < existing.end and result.end > existing.start
-                for existing in deduplicated
-            ):
-                continue
-            deduplicated.append(result)
-
-        redacted = text
-        for result in sorted(deduplicated, key=lambda r: r.start, reverse=True):
-            redacted = redacted[:result.start] + "[REDACTED]" + redacted[result.end:]
-
-        logger.debug("PIIAnonymizer.redact: %d PII span(s) redacted", len(deduplicated))
-        return redacted
+        logger.debug("PIIAnonymizer.redact: %d PII span(s) redacted", len(spans))
+        return self._replace_spans(text, spans, ["[REDACTED]"] * len(spans))
 
     def unmask(self, text: str, token_map: dict[str, Any]) -> str:
         """
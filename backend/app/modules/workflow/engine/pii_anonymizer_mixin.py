@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any, Dict, List, Union
 
@@ -36,7 +37,8 @@ def _wrap_history_method(method_name: str, original_fn: Any) -> Any:
         if not config.get("piiMasking"):
             return history
 
-        masked, token_map = _mask_history(history)
+        # Presidio is synchronous; unchanged messages are served from the mask cache
+        masked, token_map = await asyncio.to_thread(_mask_history, history)
 
         if token_map:
             logger.debug(
@@ -75,6 +77,8 @@ class PIIAnonymizerMixin:
 
     systemPrompt is intentionally excluded — it is operator-authored.
     The token map is local to each execute() call and never persisted.
+    Masking runs in a worker thread so the event loop keeps serving other
+    requests; per-message results are cached in-process (PIIMaskCache).
     """
 
     _PII_FIELDS: tuple[str, ...] = ("userPrompt",)
@@ -105,7 +109,7 @@ class PIIAnonymizerMixin:
             for field_name in self._PII_FIELDS:
                 value = config.get(field_name)
                 if isinstance(value, str) and value:
-                    masked_value, token_map = _service.mask(value)
+                    masked_value, token_map = await asyncio.to_thread(_service.mask, value)
                     if token_map:
                         logger.debug(
                             "[PII] %s masked, %d replacement(s): %r",
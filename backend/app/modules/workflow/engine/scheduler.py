@@ -0,0 +1,190 @@
+"""
+Dependency-driven scheduler for workflow execution.
+
+Nodes become ready when every required predecessor has produced an output
+(an indegree count kept per node), and ready nodes are started from a FIFO
+queue as long as the per-execution and per-node-type concurrency limits allow.
+Each node runs at most once per execution and no recursion is involved, so wide
+or deep graphs neither re-scan the graph nor grow the call stack.
+
+The scheduler is independent of node implementations: the engine supplies
+callables to run a node, read outputs and evaluate custom join rules.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SchedulerLimits:
+    """Concurrency limits for one workflow execution (0 or missing means unlimited)."""
+
+    max_concurrency: int = 0
+    node_type_limits: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class WorkflowGraph:
+    """Static view of the workflow the scheduler needs (built once per compiled engine)."""
+
+    node_types: Dict[str, str]
+    successors: Dict[str, List[str]]
+    # Predecessors whose output gates a node (tool providers are excluded)
+    required_sources: Dict[str, List[str]]
+    # Nodes whose readiness is decided by the node itself (e.g. partial aggregators)
+    custom_join_nodes: Set[str] = field(default_factory=set)
+
+
+class WorkflowScheduler:
+    """
+    Run a workflow graph from a start node with a Kahn-style ready queue.
+
+    Args:
+        graph: Static graph description
+        run_node: Coroutine executing a node; returns its output. Receives
+            ``isolated=True`` when other nodes may run at the same time.
+        has_output: Whether a node currently has an output in the state
+        is_ready: Final readiness check for nodes in ``graph.custom_join_nodes``
+        limits: Concurrency limits for this execution
+        deferred_exceptions: Exception types that stop nothing immediately but are
+            re-raised once all in-flight work has drained (workflow pauses)
+    """
+
+    def __init__(
+        self,
+        graph: WorkflowGraph,
+        run_node: Callable[[str, bool], Awaitable[Any]],
+        has_output: Callable[[str], bool],
+        is_ready: Optional[Callable[[str], bool]] = None,
+        limits: Optional[SchedulerLimits] = None,
+        deferred_exceptions: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.graph = graph
+        self._run_node = run_node
+        self._has_output = has_output
+        self._is_ready = is_ready
+        self.limits = limits or SchedulerLimits()
+        self._deferred_exceptions = deferred_exceptions
+
+        # node_id -> predecessors still missing an output (the "indegree")
+        self._pending: Dict[str, Set[str]] = {}
+        self._scheduled: Set[str] = set()
+        self._ready: Deque[str] = deque()
+        self._running: Dict[asyncio.Task, str] = {}
+        self._running_by_type: Dict[str, int] = {}
+        self._deferred: Optional[BaseException] = None
+
+        self.executed: List[str] = []
+
+    async def run(self, start_node_id: str) -> None:
+        """Execute from ``start_node_id`` until no node is ready or running."""
+        # The start node runs unconditionally; its failures propagate to the caller.
+        self._scheduled.add(start_node_id)
+        output = await self._run_node(start_node_id, False)
+        self.executed.append(start_node_id)
+        self._on_completed(start_node_id, output)
+
+        while self._ready or self._running:
+            self._launch_ready()
+            if not self._running:
+                # Queued nodes can only be blocked by running ones, so this is unreachable
+                # with sane limits; bail out rather than spin.
+                break
+
+            done, _ = await asyncio.wait(self._running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                node_id = self._running.pop(task)
+                node_type = self.graph.node_types.get(node_id, "")
+                self._running_by_type[node_type] -= 1
+                self._handle_result(node_id, task)
+
+        if self._deferred is not None:
+            raise self._deferred
+
+    def _handle_result(self, node_id: str, task: asyncio.Task) -> None:
+        try:
+            output = task.result()
+        except self._deferred_exceptions as e:
+            if self._deferred is None:
+                self._deferred = e
+            return
+        except Exception as e:
+            logger.error(f"Error in parallel execution of node {node_id}: {e}")
+            return
+
+        self.executed.append(node_id)
+        self._on_completed(node_id, output)
+
+    def _on_completed(self, node_id: str, output: Any) -> None:
+        """Release successors selected by the node and enqueue those that became ready."""
+        if isinstance(output, dict) and "next_nodes" in output:
+            next_nodes = output.get("next_nodes") or []
+        else:
+            next_nodes = self.graph.successors.get(node_id, [])
+
+        produced = self._has_output(node_id)
+        for target_id in next_nodes:
+            if target_id in self._scheduled:
+                continue
+
+            pending = self._pending.get(target_id)
+            if pending is None:
+                pending = {
+                    source_id
+                    for source_id in self.graph.required_sources.get(target_id, [])
+                    if not self._has_output(source_id)
+                }
+                self._pending[target_id] = pending
+            elif produced:
+                pending.discard(node_id)
+
+            if target_id in self.graph.custom_join_nodes:
+                ready = self._is_ready(target_id) if self._is_ready else not pending
+            else:
+                ready = not pending
+
+            if ready:
+                self._scheduled.add(target_id)
+                self._ready.append(target_id)
+            else:
+                logger.debug(f"Node {target_id} requirements not satisfied, waiting on {sorted(pending)}")
+
+    def _has_capacity(self, node_type: str, in_flight: int) -> bool:
+        max_concurrency = self.limits.max_concurrency
+        if max_concurrency and in_flight >= max_concurrency:
+            return False
+        type_limit = self.limits.node_type_limits.get(node_type)
+        if type_limit and self._running_by_type.get(node_type, 0) >= type_limit:
+            return False
+        return True
+
+    def _launch_ready(self) -> None:
+        """Start queued nodes in FIFO order, skipping over nodes whose type is saturated."""
+        if not self._ready:
+            return
+
+        in_flight = len(self._running)
+        launch: List[str] = []
+        blocked: Deque[str] = deque()
+        while self._ready:
+            node_id = self._ready.popleft()
+            node_type = self.graph.node_types.get(node_id, "")
+            if not self._has_capacity(node_type, in_flight):
+                blocked.append(node_id)
+                continue
+            launch.append(node_id)
+            in_flight += 1
+            self._running_by_type[node_type] = self._running_by_type.get(node_type, 0) + 1
+        self._ready = blocked
+
+        # A node shares the caller's request scope only when it is the sole node
+        # in flight; anything launched alongside other work gets its own scope.
+        isolated = in_flight > 1
+        for node_id in launch:
+            task = asyncio.create_task(self._run_node(node_id, isolated))
+            self._running[task] = node_id
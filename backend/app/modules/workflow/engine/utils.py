@@ -494,11 +494,168 @@ def _encode_replacement_value(replacement_value: Any, var_name: str, json_string
         return string_replacement
 
 
+_VAR_RE = re.compile(r"{{([^\s{}]+)}}")
+
+# Plan node kinds
+_STATIC = 0
+_TEMPLATE = 1
+_DICT = 2
+_LIST = 3
+
+
+class ConfigTemplatePlan:
+    """
+    Pre-compiled substitution plan for a node's configuration.
+
+    Compiling walks the config once and records where ``{{variable}}`` slots
+    occur. Subtrees without variables are kept by reference, so resolving a
+    plan only rebuilds the containers on the path to a slot and never
+    serializes the config.
+
+    Attributes:
+        source: The config object the plan was compiled from
+        variables: Unique variable names in first-occurrence order
+        code_context_vars: Variables whose first occurrence is inside a code field
+        supported: False when the config must go through the JSON text path
+    """
+
+    __slots__ = ("source", "variables", "code_context_vars", "supported", "_root", "_after_code_key")
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.variables: list[str] = []
+        self.code_context_vars: set[str] = set()
+        self.supported = True
+        self._after_code_key = False
+        self._root = self._compile(source)
+
+    @property
+    def has_variables(self) -> bool:
+        return bool(self.variables)
+
+    def _register_var(self, var_name: str, in_code_field: bool) -> None:
+        if var_name in self.variables:
+            return
+        self.variables.append(var_name)
+        if in_code_field:
+            self.code_context_vars.add(var_name)
+
+    def _compile(self, value: Any) -> tuple:
+        # Traversal order matches json.dumps, so "first occurrence" and the
+        # code-field detection of _is_in_code_field_context (the closest preceding
+        # JSON string is a code field key) mean the same thing as in the JSON path.
+        if isinstance(value, str):
+            in_code_field = self._after_code_key
+            self._after_code_key = False
+            if "{{" not in value:
+                return (_STATIC, value)
+            parts: list[str] = []
+            last = 0
+            for match in _VAR_RE.finditer(value):
+                var_name = match.group(1)
+                self._register_var(var_name, in_code_field)
+                parts.append(value[last:match.start()])
+                parts.append(var_name)
+                last = match.end()
+            if not parts:
+                return (_STATIC, value)
+            parts.append(value[last:])
+            return (_TEMPLATE, parts)
+
+        if isinstance(value, dict):
+            entries = []
+            dynamic = False
+            for key, item in value.items():
+                if isinstance(key, str) and _VAR_RE.search(key):
+                    self.supported = False
+                self._after_code_key = key in CODE_FIELD_NAMES
+                child = self._compile(item)
+                dynamic = dynamic or child[0] != _STATIC
+                entries.append((key, item, child))
+            if not dynamic:
+                return (_STATIC, value)
+            return (_DICT, entries)
+
+        if isinstance(value, (list, tuple)):
+            entries = []
+            dynamic = False
+            for item in value:
+                child = self._compile(item)
+                dynamic = dynamic or child[0] != _STATIC
+                entries.append((item, child))
+            if not dynamic:
+                return (_STATIC, value)
+            return (_LIST, entries)
+
+        return (_STATIC, value)
+
+    def resolve(self, encoded: dict[str, str]) -> Any:
+        """Build the resolved config from pre-encoded variable values."""
+        return self._resolve_node(self._root, encoded)
+
+    def _resolve_node(self, node: tuple, encoded: dict[str, str]) -> Any:
+        kind = node[0]
+        if kind == _STATIC:
+            return node[1]
+        if kind == _TEMPLATE:
+            parts = node[1]
+            if len(parts) == 3 and not parts[0] and not parts[2]:
+                return encoded[parts[1]]
+            return "".join(
+                part if index % 2 == 0 else encoded[part] for index, part in enumerate(parts)
+            )
+        if kind == _DICT:
+            return {
+                key: item if child[0] == _STATIC else self._resolve_node(child, encoded)
+                for key, item, child in node[1]
+            }
+        return [
+            item if child[0] == _STATIC else self._resolve_node(child, encoded)
+            for item, child in node[1]
+        ]
+
+
+def compile_config_template(config: Any) -> ConfigTemplatePlan:
+    """Compile a node configuration into a reusable substitution plan."""
+    return ConfigTemplatePlan(config)
+
+
+class _CodeContextEncodingError(ValueError):
+    """A code-context replacement is not a self-contained JSON string fragment."""
+
+
+def _encode_plan_value(replacement_value: Any, var_name: str, in_code_field: bool) -> str:
+    """
+    Encode a resolved value as the text that ends up inside the config string.
+
+    Mirrors _encode_replacement_value for string context, expressed on the
+    decoded string instead of on JSON text.
+    """
+    if isinstance(replacement_value, str):
+        return replacement_value
+
+    try:
+        json_encoded = json.dumps(replacement_value)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Failed to JSON encode replacement value for {var_name}: {e}. Using string representation.")
+        return str(replacement_value)
+
+    if not in_code_field:
+        return json_encoded
+
+    fragment = _convert_json_escapes_for_code_context(json_encoded.replace('"', '\\"'))
+    try:
+        return json.loads(f'"{fragment}"')
+    except json.JSONDecodeError as e:
+        raise _CodeContextEncodingError(str(e)) from e
+
+
 def replace_config_vars(
     config: dict,
     state: WorkflowState,
     source_output: Any,
     direct_input: Optional[dict] = None,
+    plan: Optional[ConfigTemplatePlan] = None,
 ) -> tuple[dict, dict]:
     """
     Replace both @value and {{value}} patterns in a string with values from a dictionary.
@@ -513,6 +670,8 @@ def replace_config_vars(
         state: The workflow state object
         source_output: The source node's output
         direct_input: Optional direct input dictionary
+        plan: Optional pre-compiled plan for ``config`` (see compile_config_template).
+            Compiled on the fly when omitted.
 
     Returns:
         tuple: (resolved_config, replacements_made)
@@ -522,6 +681,56 @@ def replace_config_vars(
     if not config:
         return config, {}
 
+    if plan is None or plan.source is not config:
+        plan = compile_config_template(config)
+
+    if not plan.has_variables:
+        return config, {}
+
+    if direct_input is None:
+        direct_input = {}
+
+    if not plan.supported:
+        return _replace_config_vars_json(config, state, source_output, direct_input)
+
+    # Resolve and encode each unique variable once; slots only look them up.
+    replacements_made = {}
+    encoded: dict[str, str] = {}
+    try:
+        for var_name in plan.variables:
+            replacement_value, was_resolved = _resolve_variable_value(
+                var_name, state, source_output, direct_input
+            )
+            if was_resolved:
+                replacements_made[var_name] = replacement_value
+                encoded[var_name] = _encode_plan_value(
+                    replacement_value, var_name, var_name in plan.code_context_vars
+                )
+            else:
+                encoded[var_name] = f"{{{{{var_name}}}}}"
+    except _CodeContextEncodingError:
+        return _replace_config_vars_json(config, state, source_output, direct_input)
+
+    return plan.resolve(encoded), replacements_made
+
+
+def _replace_config_vars_json(
+    config: dict,
+    state: WorkflowState,
+    source_output: Any,
+    direct_input: Optional[dict] = None,
+) -> tuple[dict, dict]:
+    """
+    Reference implementation: serialize the config to JSON, substitute variables
+    in the text and parse it back.
+
+    Used when a config cannot be expressed as a ConfigTemplatePlan (variables in
+    dictionary keys, or a code-context encoding that only makes sense at the JSON
+    text level). Semantics are identical to replace_config_vars.
+    """
+    if not config:
+        return config, {}
+
     if direct_input is None:
         direct_input = {}
 
@@ -0,0 +1,143 @@
+"""
+Process-wide cache of compiled workflow engines.
+
+Building a WorkflowEngine (edge maps, node lookups, topological order, resolved
+node classes) only depends on the workflow graph, which changes rarely compared
+to how often an agent is queried. Engines are cached per tenant and agent and are
+keyed by a version fingerprint of the workflow (id, version, updated_at), so a
+stale entry is never served even if an explicit invalidation is missed on
+another worker: the next execution simply recompiles.
+
+Invalidated explicitly when an agent or its workflow is updated or deleted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CachedEngine:
+    fingerprint: str
+    engine: Any  # WorkflowEngine (imported lazily to avoid import cycles)
+
+
+def workflow_fingerprint(workflow_config: Dict[str, Any]) -> str:
+    """
+    Version stamp of a workflow config.
+
+    Uses (id, version, updated_at) when updated_at is available; otherwise falls
+    back to a content hash of the graph so ad-hoc configs are still cached safely.
+    """
+    updated_at = workflow_config.get("updated_at")
+    if updated_at is not None:
+        return f"{workflow_config.get('id')}:{workflow_config.get('version')}:{updated_at}"
+
+    payload = json.dumps(
+        {"nodes": workflow_config.get("nodes"), "edges": workflow_config.get("edges")},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompiledWorkflowCache:
+    """LRU cache of ready-to-execute WorkflowEngine instances keyed by (tenant, agent_id)."""
+
+    def __init__(self, max_size: int = 500):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], _CachedEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get_engine(self, agent_id: str, workflow_config: Dict[str, Any]):
+        """Return a cached engine for the agent's workflow, compiling it on a miss."""
+        from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+
+        key = (get_tenant_context(), str(agent_id))
+        fingerprint = workflow_fingerprint(workflow_config)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached.fingerprint == fingerprint:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return cached.engine
+                self._stale += 1
+            self._misses += 1
+
+        # Compile outside the lock; concurrent misses for the same key just race
+        # to store equivalent engines.
+        engine = WorkflowEngine(workflow_config)
+
+        with self._lock:
+            self._entries[key] = _CachedEngine(fingerprint=fingerprint, engine=engine)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        logger.debug(f"Compiled workflow engine cached for agent {agent_id} (tenant {key[0]})")
+        return engine
+
+    def invalidate(self, agent_id: Any, tenant: Optional[str] = None) -> bool:
+        """Drop the cached engine of an agent (current tenant by default)."""
+        key = (tenant or get_tenant_context(), str(agent_id))
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self._invalidations += 1
+        if removed:
+            logger.debug(f"Invalidated compiled workflow for agent {agent_id} (tenant {key[0]})")
+        return removed
+
+    def clear(self, tenant: Optional[str] = None) -> None:
+        """Drop all cached engines, or only those of one tenant."""
+        with self._lock:
+            if tenant is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == tenant]:
+                del self._entries[key]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_compiled_workflow_cache = CompiledWorkflowCache(max_size=settings.WORKFLOW_ENGINE_CACHE_MAX_SIZE)
+
+
+def get_compiled_workflow_cache() -> CompiledWorkflowCache:
+    return _compiled_workflow_cache
+
+
+def invalidate_compiled_workflow(agent_id: Any, tenant: Optional[str] = None) -> bool:
+    return _compiled_workflow_cache.invalidate(agent_id, tenant)
@@ -5,12 +5,13 @@ Workflow engine for building and executing workflows with state management.
 import asyncio
 import logging
 import uuid
-from collections import defaultdict
-from typing import Any, Dict, List, Optional, Set
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
 
 from fastapi_injector import RequestScopeFactory
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config.settings import settings
 from app.core.tenant_scope import get_tenant_context, set_tenant_context
 from app.dependencies.injector import injector
 from app.modules.workflow.engine.base_node import BaseNode
@@ -52,6 +53,9 @@ from app.modules.workflow.engine.nodes import (
     WorkflowExecutorNode,
     ZendeskToolNode,
 )
+from app.modules.workflow.engine.scheduler import SchedulerLimits, WorkflowGraph, WorkflowScheduler
+from app.modules.workflow.engine.utils import compile_config_template
+from app.modules.workflow.engine.workflow_events import STREAMING_NODE_TYPES, WorkflowEventChannel
 from app.modules.workflow.engine.workflow_state import WorkflowPausedException, WorkflowState
 from app.modules.workflow.utils import process_path_based_input_data
 
@@ -67,7 +71,7 @@ class WorkflowEngine:
     - Execute workflows with state tracking
     - Handle special nodes (router, aggregator)
     - Execute from specific starting nodes
-    - Parallel execution support
+    - Dependency-driven parallel execution with concurrency limits
     """
 
     # Class-level node registry - initialized once when module loads
@@ -191,6 +195,10 @@ class WorkflowEngine:
         # Build edge mappings for efficient lookup
         self._build_edge_mappings()
 
+        # Resolve everything that only depends on the graph shape, so an engine
+        # can be cached and reused across executions (see workflow_cache.py)
+        self._compile()
+
         logger.info(
             f"Initialized workflow engine for workflow: {self.workflow_id} ({self.workflow['metadata']['name']})"
         )
@@ -214,6 +222,106 @@ class WorkflowEngine:
         self.workflow["source_edges"] = dict(source_edges)
         self.workflow["target_edges"] = dict(target_edges)
 
+    def _compile(self) -> None:
+        """
+        Precompute per-node lookups, template plans and the topological order of the graph.
+
+        The results are read-only after construction, which makes a single
+        engine instance safe to share between concurrent executions.
+        """
+        nodes_by_id = {node["id"]: node for node in self.workflow["nodes"]}
+        self.workflow["nodes_by_id"] = nodes_by_id
+
+        # Node id -> node class (None for unknown types, reported on execution)
+        self._node_classes: Dict[str, Optional[type]] = {
+            node_id: self.__class__._node_registry.get(node.get("type", ""))
+            for node_id, node in nodes_by_id.items()
+        }
+
+        self.topological_order = self._compute_topological_order(nodes_by_id)
+
+        self._scheduler_graph = self._build_scheduler_graph(nodes_by_id)
+
+        # LLM/agent nodes wired straight into a chat output stream their tokens
+        self.workflow["streaming_nodes"] = frozenset(
+            edge["source"]
+            for edge in self.workflow["edges"]
+            if nodes_by_id.get(edge["source"], {}).get("type") in STREAMING_NODE_TYPES
+            and nodes_by_id.get(edge["target"], {}).get("type") == "chatOutputNode"
+        )
+
+        # Node id -> substitution plan for the node's data (used by BaseNode.execute)
+        self.workflow["template_plans"] = {
+            node_id: compile_config_template(node.get("data", {}))
+            for node_id, node in nodes_by_id.items()
+        }
+
+    def _build_scheduler_graph(self, nodes_by_id: Dict[str, Any]) -> WorkflowGraph:
+        """Successors, gating predecessors and custom join nodes for the scheduler."""
+        source_edges = self.workflow["source_edges"]
+        target_edges = self.workflow["target_edges"]
+
+        node_types = {node_id: node.get("type", "") for node_id, node in nodes_by_id.items()}
+        successors = {
+            node_id: [edge["target"] for edge in source_edges.get(node_id, [])]
+            for node_id in nodes_by_id
+        }
+
+        # Mirrors BaseNode.get_source_nodes: tool providers never gate execution
+        required_sources: Dict[str, List[str]] = {}
+        for node_id in nodes_by_id:
+            sources = []
+            for edge in target_edges.get(node_id, []):
+                source_id = edge.get("source")
+                if not source_id:
+                    continue
+                source_type = node_types.get(source_id, "")
+                if "toolBuilderNode" in source_type or "mcpNode" in source_type:
+                    continue
+                sources.append(source_id)
+            required_sources[node_id] = sources
+
+        custom_join_nodes = {
+            node_id
+            for node_id, node_class in self._node_classes.items()
+            if node_class is not None
+            and node_class.check_if_requirement_satisfied is not BaseNode.check_if_requirement_satisfied
+        }
+
+        return WorkflowGraph(
+            node_types=node_types,
+            successors=successors,
+            required_sources=required_sources,
+            custom_join_nodes=custom_join_nodes,
+        )
+
+    def _compute_topological_order(self, nodes_by_id: Dict[str, Any]) -> List[str]:
+        """Kahn ordering of the nodes; nodes that are part of a cycle are appended last."""
+        source_edges = self.workflow["source_edges"]
+        indegree = {node_id: 0 for node_id in nodes_by_id}
+        for edges in source_edges.values():
+            for edge in edges:
+                if edge["target"] in indegree:
+                    indegree[edge["target"]] += 1
+
+        queue = deque(node_id for node_id, degree in indegree.items() if degree == 0)
+        order: List[str] = []
+        while queue:
+            node_id = queue.popleft()
+            order.append(node_id)
+            for edge in source_edges.get(node_id, []):
+                target_id = edge["target"]
+                if target_id not in indegree:
+                    continue
+                indegree[target_id] -= 1
+                if indegree[target_id] == 0:
+                    queue.append(target_id)
+
+        if len(order) < len(nodes_by_id):
+            ordered = set(order)
+            order.extend(node_id for node_id in nodes_by_id if node_id not in ordered)
+        return order
+
     def get_workflow(self) -> Dict[str, Any]:
         """Get the workflow configuration."""
         return self.workflow
@@ -224,6 +332,7 @@ class WorkflowEngine:
         input_data: Optional[Dict[str, Any]] = None,
         thread_id: str = str(uuid.uuid4()),
         persist: Optional[bool] = True,
+        event_channel: Optional[WorkflowEventChannel] = None,
     ) -> WorkflowState:
         """
         Execute workflow starting from a specific node.
@@ -233,6 +342,8 @@ class WorkflowEngine:
             input_data: Input data for the workflow
             thread_id: Thread ID for this execution
             persist: Whether to persist conversation to memory
+            event_channel: Optional channel receiving token deltas of nodes that
+                feed a chat output node; closing it is left to the caller
 
         Returns:
             WorkflowState with execution results
@@ -250,7 +361,7 @@ class WorkflowEngine:
                     f"Multiple starting nodes found: {start_node_ids}")
 
         # Verify start node exists
-        if start_node_id not in [node["id"] for node in self.workflow["nodes"]]:
+        if start_node_id not in self.workflow["nodes_by_id"]:
             raise ValueError(f"Start node not found: {start_node_id}")
 
         initial_values = process_path_based_input_data(input_data)
@@ -261,6 +372,7 @@ class WorkflowEngine:
             thread_id=thread_id or str(uuid.uuid4()),
             initial_values=initial_values,
         )
+        state.event_channel = event_channel
 
         try:
             state.start_execution()
@@ -268,10 +380,7 @@ class WorkflowEngine:
 
             # Execute from the specified node
             try:
-                await self._execute_from_node_recursive(
-                    start_node_id, state, set(),
-                    skip_requirement_check=True,
-                )
+                await self._execute_scheduled(start_node_id, state)
 
                 state.complete_execution()
 
@@ -323,113 +432,59 @@ class WorkflowEngine:
 
         return starting_nodes
 
-    async def _execute_from_node_recursive(
-        self, node_id: str, state: WorkflowState, visited: Set[str],
-        skip_requirement_check: bool = False,
-    ) -> None:
-        """Recursively execute nodes starting from a specific node."""
-        if node_id in visited:
-            return  # Avoid cycles
-
-        visited.add(node_id)
-
-        node_output: Optional[dict] = None
-
-        # Check if aggregator requirements are satisfied
-        # (skip for the starting node — its upstream nodes may not have run)
-        node = self.executable_node(node_id, state)
-        if skip_requirement_check:
-            node_output = await self._execute_single_node(node_id, state)
-        elif node.check_if_requirement_satisfied():
-            node_output = await self._execute_single_node(node_id, state)
-        else:
-            # Requirements not satisfied, skip execution and continue flow
-            logger.debug(
-                f"Node {node_id} requirements not satisfied, skipping execution"
-            )
-            return
-
-        # Handle next nodes based on execution result
-        if node_output and "next_nodes" in node_output:
-            next_nodes = node_output.get("next_nodes", [])
-        else:
-            next_nodes = self._find_next_nodes(node_id)
-
-        # Find and execute next nodes in parallel
-        if next_nodes:
-            # Capture tenant context from the main request scope
-            tenant_id = get_tenant_context()
-
-            async def execute_node_isolated(
-                next_node_id: str,
-                visited_set: Set[str],
-                tenant: str,
-                run_in_new_scope: bool,
-            ):
-                """
-                Execute a node, optionally inside a fresh request scope.
-
-                Important:
-                - When executing multiple next-nodes in parallel, we MUST isolate request-scoped
-                  dependencies (especially AsyncSession). Sharing a single AsyncSession across
-                  concurrent tasks will raise:
-                  "This session is provisioning a new connection; concurrent operations are not permitted".
-                """
-                if not run_in_new_scope:
-                    return await self._execute_from_node_recursive(
-                        next_node_id, state, visited_set
-                    )
+    def _build_scheduler_limits(self) -> SchedulerLimits:
+        """Concurrency limits for one execution (WORKFLOW_MAX_CONCURRENT_NODES / WORKFLOW_NODE_TYPE_CONCURRENCY)."""
+        return SchedulerLimits(
+            max_concurrency=settings.WORKFLOW_MAX_CONCURRENT_NODES,
+            node_type_limits=settings.workflow_node_type_concurrency(),
+        )
 
-                request_scope_factory = injector.get(RequestScopeFactory)
-                async with request_scope_factory.create_scope():
-                    # Preserve tenant context in the new scope
-                    set_tenant_context(tenant)
+    async def _execute_scheduled(self, start_node_id: str, state: WorkflowState) -> None:
+        """Execute the graph from a node with the dependency-driven scheduler."""
+        # Capture tenant context from the main request scope
+        tenant_id = get_tenant_context()
+
+        async def run_node(node_id: str, isolated: bool) -> Any:
+            """
+            Execute a node, optionally inside a fresh request scope.
+
+            Important:
+            - When nodes run concurrently we MUST isolate request-scoped dependencies
+              (especially AsyncSession). Sharing a single AsyncSession across
+              concurrent tasks will raise:
+              "This session is provisioning a new connection; concurrent operations are not permitted".
+            """
+            if not isolated:
+                return await self._execute_single_node(node_id, state)
+
+            request_scope_factory = injector.get(RequestScopeFactory)
+            async with request_scope_factory.create_scope():
+                # Preserve tenant context in the new scope
+                set_tenant_context(tenant_id)
+                try:
+                    return await self._execute_single_node(node_id, state)
+                finally:
+                    # Ensure any DI-created session is closed for this scope.
+                    # (AsyncSession usually doesn't open a connection until first use, so this
+                    # is cheap even for "no DB" nodes.)
                     try:
-                        return await self._execute_from_node_recursive(
-                            next_node_id, state, visited_set
-                        )
-                    finally:
-                        # Ensure any DI-created session is closed for this scope.
-                        # (AsyncSession usually doesn't open a connection until first use, so this
-                        # is cheap even for "no DB" nodes.)
-                        try:
-                            session = injector.get(AsyncSession)
-                            await session.close()
-                        except Exception:  # pylint: disable=broad-except
-                            pass
-
-            # Create tasks for all next nodes
-            next_tasks = []
-            for next_node_id in next_nodes:
-                # Create a copy of visited set for each task to avoid conflicts
-                task_visited = visited.copy()
-
-                task = asyncio.create_task(
-                    execute_node_isolated(
-                        next_node_id=next_node_id,
-                        visited_set=task_visited,
-                        tenant=tenant_id,
-                        # Only isolate when we are actually running parallel branches.
-                        run_in_new_scope=(len(next_nodes) > 1),
-                    )
-                )
-                next_tasks.append(task)
-
-            # Execute all next nodes in parallel
-            # Use return_exceptions=True to handle any individual task failures gracefully
-            results = await asyncio.gather(*next_tasks, return_exceptions=True)
-
-            # Re-raise WorkflowPausedException before logging other errors
-            for result in results:
-                if isinstance(result, WorkflowPausedException):
-                    raise result
-
-            # Log any other exceptions that occurred during parallel execution
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(
-                        f"Error in parallel execution of node {next_nodes[i]}: {result}"
-                    )
+                        session = injector.get(AsyncSession)
+                        await session.close()
+                    except Exception:  # pylint: disable=broad-except
+                        pass
+
+        def is_ready(node_id: str) -> bool:
+            return self.executable_node(node_id, state).check_if_requirement_satisfied()
+
+        scheduler = WorkflowScheduler(
+            graph=self._scheduler_graph,
+            run_node=run_node,
+            has_output=lambda node_id: state.get_node_output(node_id) is not None,
+            is_ready=is_ready,
+            limits=self._build_scheduler_limits(),
+            deferred_exceptions=(WorkflowPausedException,),
+        )
+        await scheduler.run(start_node_id)
 
     def _find_next_nodes(self, node_id: str) -> List[str]:
         """Find next nodes connected to the current node."""
@@ -443,8 +498,9 @@ class WorkflowEngine:
 
     def get_node_config(self, node_id: str):
         """Get the node config and type."""
-        node_config = next(
-            node for node in self.workflow["nodes"] if node["id"] == node_id)
+        node_config = self.workflow["nodes_by_id"].get(node_id)
+        if node_config is None:
+            raise ValueError(f"Node not found: {node_id}")
         node_type = node_config.get("type", "")
         return node_config, node_type
 
@@ -453,7 +509,7 @@ class WorkflowEngine:
     ) -> BaseNode:
         """Create an executable node instance."""
         node_config, node_type = self.get_node_config(node_id)
-        node_class = self.__class__._node_registry.get(node_type)
+        node_class = self._node_classes.get(node_id)
         if not node_class:
             raise ValueError(
                 f"Unknown node type: {node_type}, skipping node {node_id}")
@@ -0,0 +1,69 @@
+"""
+Per-execution event channel used to stream workflow output while it runs.
+
+LLM/agent nodes that feed a chat output node publish token deltas on the channel
+of their execution; a single consumer (the conversation WebSocket relay) drains
+it in order. Publishing never blocks a node: deltas that queue up while the
+consumer is busy are merged into one event before being handed out.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+# Node types able to emit token deltas
+STREAMING_NODE_TYPES = ("llmModelNode", "agentNode")
+
+_EMPTY = object()
+
+
+@dataclass
+class WorkflowEvent:
+    """A single streamed event of a workflow execution."""
+
+    type: str  # "delta"
+    node_id: str
+    text: str = ""
+
+
+class WorkflowEventChannel:
+    """Unbounded, single-consumer queue of WorkflowEvent with delta coalescing."""
+
+    def __init__(self) -> None:
+        self._queue: "asyncio.Queue[Optional[WorkflowEvent]]" = asyncio.Queue()
+        self._closed = False
+        self.deltas_emitted = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def emit_delta(self, node_id: str, text: str) -> None:
+        """Publish a token delta of a node (ignored once the channel is closed)."""
+        if self._closed or not text:
+            return
+        self.deltas_emitted += 1
+        self._queue.put_nowait(WorkflowEvent(type="delta", node_id=node_id, text=text))
+
+    def close(self) -> None:
+        """Signal the end of the execution; pending events are still delivered."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[WorkflowEvent]:
+        """Yield events until the channel is closed, merging consecutive deltas of a node."""
+        event = await self._queue.get()
+        while event is not None:
+            follower = _EMPTY
+            while not self._queue.empty():
+                queued = self._queue.get_nowait()
+                if queued is not None and queued.type == "delta" and queued.node_id == event.node_id:
+                    event = WorkflowEvent(type="delta", node_id=event.node_id, text=event.text + queued.text)
+                    continue
+                follower = queued
+                break
+
+            yield event
+            event = await self._queue.get() if follower is _EMPTY else follower
@@ -6,12 +6,13 @@ import logging
 import time
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 
 from app.modules.workflow.agents.memory import (
     BaseConversationMemory,
     ConversationMemory,
 )
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +91,9 @@ class WorkflowState:
         # LLM token usage and cost tracking (per request)
         self.llm_usage: list[dict] = []
 
+        # Streaming: token deltas of nodes feeding a chat output (set by the engine)
+        self.event_channel: Optional[WorkflowEventChannel] = None
+
         # Edge data and execution context
         self.source_edges = workflow.get("source_edges", {}) if workflow else {}
         self.target_edges = workflow.get("target_edges", {}) if workflow else {}
@@ -182,6 +186,9 @@ class WorkflowState:
 
     def get_node_config(self, node_id: str) -> dict:
         """Get the config for a specific node"""
+        nodes_by_id = self.workflow.get("nodes_by_id")
+        if nodes_by_id is not None and node_id in nodes_by_id:
+            return nodes_by_id[node_id]
         return next(node for node in self.workflow["nodes"] if node["id"] == node_id)
 
     def get_node_config_data(self, node_id: str) -> dict:
@@ -453,6 +460,17 @@ class WorkflowState:
         """Get the conversation memory for this workflow execution"""
         return self.memory
 
+    def is_streaming_node(self, node_id: str) -> bool:
+        """Whether token deltas of a node are forwarded to the execution's event channel"""
+        if self.event_channel is None or self.event_channel.closed:
+            return False
+        return node_id in (self.workflow or {}).get("streaming_nodes", ())
+
+    def emit_token(self, node_id: str, text: str) -> None:
+        """Publish a token delta of a node if the node is streamed in this execution"""
+        if self.is_streaming_node(node_id):
+            self.event_channel.emit_delta(node_id, text)
+
     def record_workflow_output(self, output: Any) -> None:
         """Record the final output of the workflow execution"""
         self.output = output
@@ -0,0 +1,185 @@
+"""
+Process-wide pool of ready-to-use chat model clients.
+
+Building a chat model (decrypting credentials, init_chat_model, a fresh SDK
+client and its HTTP connection pool) used to happen on every LLM call, so each
+agent/SQL/compaction call paid object construction plus a TLS handshake. Models
+are now kept warm per tenant and provider, keyed by a fingerprint of the stored
+provider configuration: any change to the provider row yields a new fingerprint,
+so a stale client is never served even when an explicit invalidation is missed
+on another worker.
+
+OpenAI-compatible clients additionally share one keep-alive httpx pool per event
+loop. Entries are bound to the loop they were built on and rebuilt when used
+from another loop (e.g. Celery tasks running their own loop).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledModel:
+    fingerprint: str
+    model: Any  # BaseChatModel
+    loop: Optional[asyncio.AbstractEventLoop]
+
+
+def provider_fingerprint(provider_name: Optional[str], model_name: Optional[str], connection_data: Any) -> str:
+    """Hash of the stored provider configuration (credentials stay encrypted)."""
+    payload = json.dumps(
+        {"provider": provider_name, "model": model_name, "connection_data": connection_data},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ChatModelPool:
+    """LRU cache of chat model instances keyed by (tenant, provider_id)."""
+
+    def __init__(self, max_size: int = 200):
+        self._max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], _PooledModel]" = OrderedDict()
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    async def get_or_create(
+        self,
+        provider_id: Any,
+        fingerprint: str,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the pooled model of a provider, building it with ``factory`` on a miss."""
+        key = (get_tenant_context(), str(provider_id))
+        loop = _running_loop()
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                if cached.fingerprint == fingerprint and cached.loop is loop:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return cached.model
+                self._stale += 1
+            self._misses += 1
+
+        # Build outside the lock; concurrent misses for the same key just race
+        # to store equivalent clients.
+        model = await factory()
+
+        with self._lock:
+            self._entries[key] = _PooledModel(fingerprint=fingerprint, model=model, loop=loop)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        logger.debug(f"Pooled chat model for llm provider {provider_id} (tenant {key[0]})")
+        return model
+
+    def shared_http_client(self) -> Optional[httpx.AsyncClient]:
+        """Keep-alive httpx client shared by pooled models on the running event loop."""
+        loop = _running_loop()
+        if loop is None:
+            return None
+
+        with self._lock:
+            client = self._http_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=httpx.Timeout(settings.LLM_HTTP_TIMEOUT, connect=10.0),
+                )
+                self._http_clients[loop] = client
+            return client
+
+    def invalidate(self, provider_id: Any, tenant: Optional[str] = None) -> bool:
+        """Drop the pooled model of a provider (current tenant by default)."""
+        key = (tenant or get_tenant_context(), str(provider_id))
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self._invalidations += 1
+        if removed:
+            logger.debug(f"Invalidated pooled chat model for llm provider {provider_id} (tenant {key[0]})")
+        return removed
+
+    def clear(self, tenant: Optional[str] = None) -> None:
+        """Drop all pooled models, or only those of one tenant."""
+        with self._lock:
+            if tenant is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == tenant]:
+                del self._entries[key]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, pool size and shared HTTP connection usage."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            http_clients = [client for client in self._http_clients.values() if not client.is_closed]
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "http_clients": len(http_clients),
+                "http_connections": sum(_open_connections(client) for client in http_clients),
+            }
+
+
+def _open_connections(client: httpx.AsyncClient) -> int:
+    """Connections currently held by an httpx client's pool (0 if not introspectable)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else 0
+
+
+_chat_model_pool = ChatModelPool(max_size=settings.LLM_CLIENT_POOL_MAX_SIZE)
+
+
+def get_chat_model_pool() -> ChatModelPool:
+    return _chat_model_pool
+
+
+def invalidate_chat_model(provider_id: Any, tenant: Optional[str] = None) -> bool:
+    return _chat_model_pool.invalidate(provider_id, tenant)
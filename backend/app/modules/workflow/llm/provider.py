@@ -1,8 +1,6 @@
 from __future__ import annotations
 
-import json
 import logging
-import os
 from typing import TYPE_CHECKING, Any, Dict, Optional
 from urllib.parse import urlparse
 import copy
@@ -12,6 +10,7 @@ if TYPE_CHECKING:  # type hints only — langchain_core.language_models pulls to
     from langchain_core.language_models import BaseChatModel
 from app.core.utils.encryption_utils import decrypt_key
 from app.core.utils.enums.open_ai_fine_tuning_enum import JobStatus
+from app.modules.workflow.llm.client_pool import get_chat_model_pool, provider_fingerprint
 from app.schemas.dynamic_form_schemas import LLM_FORM_SCHEMAS_DICT
 from app.services.llm_providers import LlmProviderService
 from app.services.open_ai_fine_tuning import OpenAIFineTuningService
@@ -19,10 +18,15 @@ from app.services.open_ai_fine_tuning import OpenAIFineTuningService
 logger = logging.getLogger(__name__)
 
 
+# Providers whose clients accept a caller-owned httpx pool (after provider mapping)
+_SHARED_HTTP_CLIENT_PROVIDERS = ("openai", "azure_openai")
+
+
 async def build_chat_model(
     provider_name: Optional[str],
     connection_data: Dict[str, Any],
     model_name: Optional[str],
+    http_async_client: Optional[httpx.AsyncClient] = None,
 ) -> BaseChatModel:
     cd = dict(connection_data)
     original_provider = (provider_name or "").lower()
@@ -45,10 +49,14 @@ async def build_chat_model(
         if "base_url" not in cd:
             cd["base_url"] = "https://openrouter.ai/api/v1"
 
-    if provider == "openai" and original_provider == "openai":
-        os.environ["OPENAI_API_KEY"] = cd.get("api_key", "")
-        if cd.get("organization"):
-            os.environ["OPENAI_ORG_ID"] = cd["organization"]
+    # Credentials are passed to the client explicitly (never through os.environ,
+    # which is shared by all tenants of the process).
+    if provider in _SHARED_HTTP_CLIENT_PROVIDERS:
+        # langchain-openai only reports usage on streams by default for its own
+        # clients (no custom base_url or http client); token accounting needs it always
+        cd.setdefault("stream_usage", True)
+        if http_async_client is not None:
+            cd["http_async_client"] = http_async_client
 
     model_kwargs = {
         "model_provider": provider,
@@ -174,26 +182,33 @@ class LLMProvider:
         )
         await assert_provider_residency(regions, app_settings_service)
 
-        try:
-            # Validate connection data
-            validated_data = json.loads(
-                json.dumps(llm_provider.connection_data)
-            )  # clone the data
+        pool = get_chat_model_pool()
+        fingerprint = provider_fingerprint(
+            llm_provider.llm_model_provider,
+            llm_provider.llm_model,
+            llm_provider.connection_data,
+        )
 
-            validated_data.pop("masked_api_key", None)
+        async def _build() -> BaseChatModel:
+            connection_data = dict(llm_provider.connection_data or {})
+            connection_data.pop("masked_api_key", None)
 
             # Decrypt api_key for providers that need it
             original_provider = (llm_provider.llm_model_provider or "").lower()
-            if original_provider not in ["vllm", "vllm_fine_tuned", "ollama"] and "api_key" in validated_data:
-                validated_data["api_key"] = decrypt_key(validated_data["api_key"])
-
+            if original_provider not in ["vllm", "vllm_fine_tuned", "ollama"] and "api_key" in connection_data:
+                connection_data["api_key"] = decrypt_key(connection_data["api_key"])
 
             llm = await build_chat_model(
                 provider_name=llm_provider.llm_model_provider,
-                connection_data=validated_data,
+                connection_data=connection_data,
                 model_name=llm_provider.llm_model,
+                http_async_client=pool.shared_http_client(),
             )
             logger.info(f"Created LLM with init_chat_model for llm provider with ID: {llm_provider.id}")
+            return llm
+
+        try:
+            llm = await pool.get_or_create(llm_provider.id, fingerprint, _build)
         except Exception as e:
             logger.error(f"Failed to initialize LLM instance: {str(e)}")
             raise
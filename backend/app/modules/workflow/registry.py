@@ -1,10 +1,11 @@
 """Registry for managing initialized agents"""
 
 import logging
-from typing import Union
+from typing import Optional, Union
 
 from app.db.models import AgentModel
 from app.schemas.agent import AgentRead
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 
 
 logger = logging.getLogger(__name__)
@@ -31,18 +32,24 @@ class RegistryItem:
             self.agent_name = agent.name
             self.workflow_model = agent.workflow.to_dict() if agent.workflow else None
 
-        from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+        from app.modules.workflow.engine.workflow_cache import get_compiled_workflow_cache
 
-        # Only create workflow engine if workflow exists
+        # Only create workflow engine if workflow exists. Engines are compiled once
+        # per workflow version and reused across executions.
         if self.workflow_model is not None:
-            self.workflow_engine = WorkflowEngine(self.workflow_model)
+            self.workflow_engine = get_compiled_workflow_cache().get_engine(self.agent_id, self.workflow_model)
             logger.debug(f"Workflow model: {self.workflow_model}")
         else:
             self.workflow_engine = None
             logger.warning(f"Agent {self.agent_name} ({self.agent_id}) has no workflow assigned")
 
-    async def execute(self, session_message: str, metadata: dict) -> dict:
-        """Execute a workflow, optionally resuming from a specific node."""
+    async def execute(
+        self,
+        session_message: str,
+        metadata: dict,
+        event_channel: Optional[WorkflowEventChannel] = None,
+    ) -> dict:
+        """Execute a workflow, optionally resuming from a specific node and streaming token deltas."""
         if self.workflow_engine is None:
             raise ValueError(
                 f"Cannot execute workflow for agent {self.agent_name} ({self.agent_id}): "
@@ -61,6 +68,7 @@ class RegistryItem:
             start_node_id=start_node_id,
             input_data=input_data,
             thread_id=thread_id,
+            event_channel=event_channel,
         )
 
         return state.format_state_as_response()
@@ -0,0 +1,278 @@
+"""
+Pool of pre-forked processes for sandboxed Python code execution.
+
+Python code, data mapper and ML nodes used to fork a fresh isolated process for
+every run, so the fork of a large API/Celery process sat on the critical path of
+nearly every workflow turn. The pool forks workers ahead of time: each one clears
+its environment and applies resource limits once at start, then waits for jobs on
+a pipe and runs them one at a time.
+
+A worker only ever serves one tenant: it is bound to the tenant of its first
+job, and a tenant that finds only other tenants' workers idle retires one and
+gets a fresh process. After every job the worker's ``reset`` hook undoes what it
+can of the job's changes (see _reset_pooled_process for what that covers); a
+worker that cannot be reset is replaced.
+
+A worker is also replaced after PYTHON_EXEC_WORKER_MAX_JOBS runs, after any run
+that returned an error (sandbox violations included), when it dies, and when a
+run exceeds the timeout (it is killed, as before). Replacements are forked on a
+background thread so callers normally find an idle worker waiting.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerTimeout(Exception):
+    """The job did not finish in time; its worker was killed."""
+
+
+class WorkerCrashed(Exception):
+    """The worker exited without returning a result."""
+
+
+class UnpicklableJob(Exception):
+    """The job arguments cannot be sent to a pre-forked worker."""
+
+
+@dataclass
+class _Worker:
+    process: Any  # multiprocessing.Process
+    conn: Connection
+    jobs: int = 0
+    # Tenant of the jobs this worker ran (meaningful once jobs > 0)
+    tenant: Optional[str] = None
+
+
+def _worker_main(
+    conn: Connection,
+    setup: Callable[[int], None],
+    runner: Callable[..., Dict[str, Any]],
+    reset: Optional[Callable[[], bool]],
+    max_jobs: int,
+) -> None:
+    """Entry point of a pooled process: set up the sandbox once, then serve jobs."""
+    setup(max_jobs)
+    for _ in range(max_jobs):
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        result = runner(*job)
+        reusable = "error" not in result and (reset is None or reset())
+        try:
+            conn.send((result, reusable))
+        except Exception:
+            # Unpicklable result; the parent sees the pipe close
+            return
+        if not reusable:
+            return
+
+
+class SandboxProcessPool:
+    """Pre-forked worker processes that each run one job at a time."""
+
+    def __init__(
+        self,
+        setup: Callable[[int], None],
+        runner: Callable[..., Dict[str, Any]],
+        *,
+        size: int,
+        max_jobs: int,
+        timeout: float,
+        reset: Optional[Callable[[], bool]] = None,
+    ):
+        self._setup = setup
+        self._runner = runner
+        self._reset = reset
+        self._size = size
+        self._max_jobs = max(1, max_jobs)
+        self._timeout = timeout
+        # fork so workers inherit already-loaded modules (see _execute_python_code_sync)
+        self._ctx = multiprocessing.get_context("fork")
+        self.pid = os.getpid()
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        # Serializes forks so no worker inherits the child end of another worker's pipe
+        self._fork_lock = threading.Lock()
+        self._refilling = False
+        self._closed = False
+        self._runs = 0
+        self._cold_starts = 0
+        self._recycled = 0
+        self._timeouts = 0
+        self._crashes = 0
+        self._tenant_switches = 0
+
+    def run(self, job: Tuple[Any, ...], tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Run ``runner(*job)`` on a worker that never ran another tenant's jobs and return its result."""
+        worker = self._checkout(tenant)
+        while worker is not None and not worker.process.is_alive():
+            self._discard(worker)
+            worker = self._checkout(tenant)
+        if worker is None:
+            with self._lock:
+                self._cold_starts += 1
+            worker = self._fork()
+        if worker.jobs + 1 >= self._max_jobs:
+            # This worker will not come back; start forking its replacement now
+            self._refill()
+
+        try:
+            worker.conn.send(job)
+        except Exception as exc:
+            # Pickling happens before anything is written, so the worker is still clean
+            self._release(worker)
+            raise UnpicklableJob(str(exc)) from exc
+
+        worker.jobs += 1
+        worker.tenant = tenant
+        with self._lock:
+            self._runs += 1
+        try:
+            result, reusable = self._receive(worker)
+        except (WorkerTimeout, WorkerCrashed):
+            self._refill()
+            raise
+        if not reusable or worker.jobs >= self._max_jobs:
+            self._discard(worker)
+            self._refill()
+        else:
+            self._release(worker)
+        return result
+
+    def _checkout(self, tenant: Optional[str]) -> Optional[_Worker]:
+        """An idle worker of ``tenant``, else an unused one; None if a new one must be forked."""
+        with self._lock:
+            for ix in range(len(self._idle) - 1, -1, -1):
+                if self._idle[ix].jobs and self._idle[ix].tenant == tenant:
+                    return self._idle.pop(ix)
+            for ix in range(len(self._idle) - 1, -1, -1):
+                if not self._idle[ix].jobs:
+                    return self._idle.pop(ix)
+            if not self._idle:
+                return None
+            # Only other tenants' workers are idle: retire the oldest, the refill forks a fresh one
+            stale = self._idle.pop(0)
+            self._tenant_switches += 1
+        self._kill(stale)
+        self._refill()
+        return None
+
+    def _receive(self, worker: _Worker) -> Tuple[Dict[str, Any], bool]:
+        deadline = time.monotonic() + self._timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._kill(worker)
+                with self._lock:
+                    self._timeouts += 1
+                raise WorkerTimeout()
+            try:
+                if worker.conn.poll(min(remaining, 1.0)):
+                    return worker.conn.recv()
+            except (EOFError, OSError):
+                pass
+            else:
+                if worker.process.is_alive():
+                    continue
+            self._kill(worker)
+            with self._lock:
+                self._crashes += 1
+            raise WorkerCrashed()
+
+    def _fork(self) -> _Worker:
+        with self._fork_lock:
+            parent_conn, child_conn = self._ctx.Pipe()
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(child_conn, self._setup, self._runner, self._reset, self._max_jobs),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+        return _Worker(process=process, conn=parent_conn)
+
+    def _refill(self) -> None:
+        """Fork replacements on a background thread until ``size`` workers are idle."""
+        with self._lock:
+            if self._refilling or self._closed or len(self._idle) >= self._size:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill_loop, name="sandbox-pool-refill", daemon=True).start()
+
+    def _refill_loop(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle) >= self._size:
+                        return
+                try:
+                    worker = self._fork()
+                except Exception as exc:
+                    logger.warning(f"Could not fork sandbox worker: {exc}")
+                    return
+                with self._lock:
+                    if not self._closed:
+                        self._idle.append(worker)
+                        continue
+                self._kill(worker)
+                return
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < self._size:
+                self._idle.append(worker)
+                return
+        self._kill(worker)
+
+    def _discard(self, worker: _Worker) -> None:
+        """Retire a worker that exits on its own (max jobs reached, error, died)."""
+        with self._lock:
+            self._recycled += 1
+        worker.conn.close()
+        # Reaped without blocking; multiprocessing joins finished children on the next fork
+        worker.process.join(timeout=0)
+
+    @staticmethod
+    def _kill(worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def close(self) -> None:
+        """Kill all idle workers; jobs in flight finish on their own."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._kill(worker)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "max_jobs_per_worker": self._max_jobs,
+                "runs": self._runs,
+                "cold_starts": self._cold_starts,
+                "recycled": self._recycled,
+                "timeouts": self._timeouts,
+                "crashes": self._crashes,
+                "tenant_switches": self._tenant_switches,
+            }
+
@@ -1,24 +1,47 @@
 import json
+import importlib
 import io
 import multiprocessing
+import operator
 import os
 import re
+import sys
 from contextlib import redirect_stdout, redirect_stderr
-from typing import Callable, Dict, Any, List, Union
+from typing import Callable, Dict, Any, List, Tuple, Union
 import logging
 import asyncio
+import threading
 
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
 from app.modules.workflow.sandbox import (
+    ALLOWED_MODULES,
+    ALLOWED_PACKAGES,
     make_sandboxed_namespace,
     validate_code_ast,
     SandboxViolation,
 )
+from app.modules.workflow.sandbox_pool import (
+    SandboxProcessPool,
+    UnpicklableJob,
+    WorkerCrashed,
+    WorkerTimeout,
+)
 
 logger = logging.getLogger(__name__)
 
 # Maximum wall-clock seconds for user-supplied Python code execution.
 _EXEC_TIMEOUT_SECONDS = 120
 
+_sandbox_pool: SandboxProcessPool | None = None
+_sandbox_pool_lock = threading.Lock()
+
+# State of a pooled sandbox process right after setup: the attributes of every
+# allowlisted module and of the mutable classes they define, and the modules loaded
+_clean_state: List[Tuple[Any, Tuple[str, ...], Tuple[Any, ...]]] = []
+_clean_modules: frozenset = frozenset()
+_Py_TPFLAGS_IMMUTABLETYPE = 1 << 8
+
 
 def add_executable_function(code: str) -> str:
     """Add an executable function to the code"""
@@ -43,18 +66,13 @@ def add_executable_function(code: str) -> str:
     return code + "\n" + "\n".join(template_lines)
 
 
-def _subprocess_worker(
-    code: str,
-    params: Dict[str, Any],
-    wrap_code: bool,
-    result_queue: "multiprocessing.Queue[Dict[str, Any]]",
-) -> None:
-    """Worker that runs inside an isolated subprocess.
+def _apply_process_limits(max_jobs: int = 1) -> None:
+    """Lock down a process that will run user code.
 
     Security controls applied here (in addition to the AST/builtins sandbox):
     - All environment variables cleared so user code cannot read secrets
       (JWT_SECRET_KEY, FERNET_KEY, DATABASE_URL, AWS credentials, etc.)
-    - OS-level resource limits applied on Linux (256 MB address space, CPU time cap)
+    - OS-level resource limits applied on Linux (CPU time cap per run)
     """
     # Strip all env vars — user code must not access container secrets
     os.environ.clear()
@@ -64,12 +82,29 @@ def _subprocess_worker(
     # the parent's entire virtual memory map (FastAPI, pandas, numpy, etc.) which
     # already exceeds any reasonable per-script cap, causing immediate MemoryError
     # on any allocation. Memory abuse is already mitigated by the import allowlist.
+    # The hard limit covers every run of a pooled process; _extend_cpu_limit
+    # moves the soft limit so each run gets its own _EXEC_TIMEOUT_SECONDS.
+    try:
+        import resource as _rl
+        _rl.setrlimit(_rl.RLIMIT_CPU, (_EXEC_TIMEOUT_SECONDS, _EXEC_TIMEOUT_SECONDS * max_jobs))
+    except Exception:
+        pass
+
+
+def _extend_cpu_limit() -> None:
+    """Allow the next run _EXEC_TIMEOUT_SECONDS of CPU on top of what earlier runs used."""
     try:
         import resource as _rl
-        _rl.setrlimit(_rl.RLIMIT_CPU, (_EXEC_TIMEOUT_SECONDS, _EXEC_TIMEOUT_SECONDS))
+        usage = _rl.getrusage(_rl.RUSAGE_SELF)
+        _, hard = _rl.getrlimit(_rl.RLIMIT_CPU)
+        soft = int(usage.ru_utime + usage.ru_stime) + 1 + _EXEC_TIMEOUT_SECONDS
+        _rl.setrlimit(_rl.RLIMIT_CPU, (min(soft, hard), hard))
     except Exception:
         pass
 
+
+def _run_user_code(code: str, params: Dict[str, Any], wrap_code: bool) -> Dict[str, Any]:
+    """Run user code in the AST/builtins sandbox of the current (isolated) process."""
     stdout_buffer = io.StringIO()
     stderr_buffer = io.StringIO()
 
@@ -87,40 +122,178 @@ def _subprocess_worker(
         errors = stderr_buffer.getvalue()
         if global_errors:
             errors = errors + "\nGlobal errors: " + str(global_errors)
-        result_queue.put({"result": result, "output": output, "errors": errors})
+        return {"result": result, "output": output, "errors": errors}
 
     except SandboxViolation as sv:
-        result_queue.put({
+        return {
             "error": f"Sandbox violation: {sv}",
             "traceback": "",
             "output": stdout_buffer.getvalue(),
             "errors": stderr_buffer.getvalue(),
-        })
+        }
     except SyntaxError as se:
-        result_queue.put({
+        return {
             "error": f"Syntax error: {se}",
             "traceback": "",
             "output": stdout_buffer.getvalue(),
             "errors": stderr_buffer.getvalue(),
-        })
+        }
     except Exception as e:
-        result_queue.put({
+        return {
             "error": str(e),
             "traceback": "",
             "output": stdout_buffer.getvalue(),
             "errors": stderr_buffer.getvalue(),
-        })
+        }
+
+
+def _is_allowlisted(module_name: str) -> bool:
+    return module_name.partition(".")[0] in ALLOWED_MODULES | ALLOWED_PACKAGES
+
+
+def _prepare_pooled_process(max_jobs: int) -> None:
+    """Setup of a pre-forked sandbox process, done before it waits for its first job."""
+    global _clean_state, _clean_modules
+    _apply_process_limits(max_jobs)
+    # Import the modules pre-seeded into the sandbox namespace (pandas, numpy, ...)
+    # and the rest of the allowlist now rather than inside a run
+    make_sandboxed_namespace({}, logger)
+    for name in ALLOWED_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    modules = [module for name, module in list(sys.modules.items()) if module is not None and _is_allowlisted(name)]
+    classes = {
+        id(value): value
+        for module in modules
+        for value in list(vars(module).values())
+        if isinstance(value, type) and not value.__flags__ & _Py_TPFLAGS_IMMUTABLETYPE
+    }
+    _clean_state = [
+        (owner, tuple(vars(owner)), tuple(vars(owner).values())) for owner in modules + list(classes.values())
+    ]
+    _clean_modules = frozenset(sys.modules)
+
+
+def _restore_attributes(owner: Any, names: Tuple[str, ...], values: Tuple[Any, ...]) -> None:
+    saved = dict(zip(names, values))
+    for name in [name for name in vars(owner) if name not in saved]:
+        delattr(owner, name)
+    current = vars(owner)
+    for name, value in saved.items():
+        if name not in current or current[name] is not value:
+            setattr(owner, name, value)
+
+
+def _reset_pooled_process() -> bool:
+    """Undo what a job did to the attributes of allowlisted modules and the classes they define.
+
+    Allowlisted modules first imported during the job (lazy submodules such as
+    numpy.rec) are unloaded, to be imported afresh when needed. State held by
+    objects (attributes of module-level instances, contents of containers,
+    library options) is not restored, which is why PYTHON_EXEC_WORKER_MAX_JOBS
+    defaults to one run per process. Returns False, and the worker is replaced,
+    if the attributes cannot be restored.
+    """
+    try:
+        for name in [name for name in sys.modules if name not in _clean_modules and _is_allowlisted(name)]:
+            del sys.modules[name]
+        for owner, names, values in _clean_state:
+            current = vars(owner)
+            if tuple(current) != names or not all(map(operator.is_, current.values(), values)):
+                _restore_attributes(owner, names, values)
+    except Exception as exc:
+        logger.debug("Could not reset pooled sandbox process: %s", exc)
+        return False
+    return True
+
+
+def _run_pooled_job(code: str, params: Dict[str, Any], wrap_code: bool) -> Dict[str, Any]:
+    """Job entry point inside a pooled sandbox process."""
+    _extend_cpu_limit()
+    return _run_user_code(code, params, wrap_code)
+
+
+def _subprocess_worker(
+    code: str,
+    params: Dict[str, Any],
+    wrap_code: bool,
+    result_queue: "multiprocessing.Queue[Dict[str, Any]]",
+) -> None:
+    """Worker that runs a single job inside a freshly forked isolated subprocess."""
+    _apply_process_limits()
+    result_queue.put(_run_user_code(code, params, wrap_code))
+
+
+def get_python_sandbox_pool() -> SandboxProcessPool | None:
+    """Pre-forked sandbox processes of this worker process (None when PYTHON_EXEC_POOL_SIZE is 0)."""
+    global _sandbox_pool
+    if settings.PYTHON_EXEC_POOL_SIZE <= 0:
+        return None
+    pool = _sandbox_pool
+    # Workers belong to the process that forked them; a forked app/Celery worker builds its own
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None or _sandbox_pool.pid != os.getpid():
+            _sandbox_pool = SandboxProcessPool(
+                _prepare_pooled_process,
+                _run_pooled_job,
+                size=settings.PYTHON_EXEC_POOL_SIZE,
+                max_jobs=settings.PYTHON_EXEC_WORKER_MAX_JOBS,
+                timeout=_EXEC_TIMEOUT_SECONDS,
+                reset=_reset_pooled_process,
+            )
+        return _sandbox_pool
+
+
+def _timeout_result() -> Dict[str, Any]:
+    logger.warning(
+        "User code execution timed out after %ds — subprocess killed",
+        _EXEC_TIMEOUT_SECONDS,
+    )
+    return {
+        "error": f"Execution timed out after {_EXEC_TIMEOUT_SECONDS} seconds",
+        "traceback": "",
+        "output": "",
+        "errors": "",
+    }
+
+
+def _no_result() -> Dict[str, Any]:
+    return {
+        "error": "Subprocess exited without returning a result",
+        "traceback": "",
+        "output": "",
+        "errors": "",
+    }
 
 
 def _execute_python_code_sync(
-    code: str, params: Dict[str, Any], wrap_code: bool = True
+    code: str, params: Dict[str, Any], wrap_code: bool = True, tenant: str | None = None
 ) -> Dict[str, Any]:
-    """Spawn an isolated subprocess to execute user-supplied Python code.
+    """Execute user-supplied Python code in an isolated subprocess.
 
-    The subprocess clears its environment and applies resource limits before
-    running the AST/builtins sandbox. Kills the process if it exceeds
+    Runs on a pre-forked sandbox process of ``tenant`` (default: the current
+    tenant context) when the pool is enabled, otherwise (or when the params
+    cannot be pickled) forks a process for this run. Either
+    way the process clears its environment and applies resource limits before
+    running the AST/builtins sandbox, and is killed if it exceeds
     _EXEC_TIMEOUT_SECONDS.
     """
+    pool = get_python_sandbox_pool()
+    if pool is not None:
+        try:
+            return pool.run((code, params, wrap_code), tenant=tenant or get_tenant_context())
+        except WorkerTimeout:
+            return _timeout_result()
+        except WorkerCrashed:
+            return _no_result()
+        except UnpicklableJob as exc:
+            logger.debug("Params cannot be sent to a pooled sandbox process (%s); forking one", exc)
+
     # fork (not spawn) so the child inherits already-loaded modules.
     # spawn re-imports everything from scratch, causing 2-5s overhead on macOS
     # and unnecessary work on Linux. fork is the Linux default; making it
@@ -138,26 +311,12 @@ def _execute_python_code_sync(
     if process.is_alive():
         process.kill()
         process.join()
-        logger.warning(
-            "User code execution timed out after %ds — subprocess killed",
-            _EXEC_TIMEOUT_SECONDS,
-        )
-        return {
-            "error": f"Execution timed out after {_EXEC_TIMEOUT_SECONDS} seconds",
-            "traceback": "",
-            "output": "",
-            "errors": "",
-        }
+        return _timeout_result()
 
     try:
         return result_queue.get_nowait()
     except Exception:
-        return {
-            "error": "Subprocess exited without returning a result",
-            "traceback": "",
-            "output": "",
-            "errors": "",
-        }
+        return _no_result()
 
 
 def sanitize_python_code(code: str) -> str:
@@ -192,8 +351,9 @@ async def execute_python_code(
         loop = asyncio.get_event_loop()
         # _execute_python_code_sync blocks for at most _EXEC_TIMEOUT_SECONDS
         # (subprocess is killed if it exceeds that), so run_in_executor won't hang.
+        # The tenant is resolved here: run_in_executor does not carry the context over.
         return await loop.run_in_executor(
-            None, _execute_python_code_sync, code, params, wrap_code
+            None, _execute_python_code_sync, code, params, wrap_code, get_tenant_context()
         )
     except Exception as e:
         logger.error("Error in async Python code execution: %s", type(e).__name__)
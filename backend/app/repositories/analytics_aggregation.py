@@ -1,21 +1,41 @@
 import logging
-from datetime import date, datetime, time, timezone
+from collections.abc import AsyncIterator, Iterable
+from datetime import date, datetime
+from typing import NamedTuple
 
 from app.core.utils.date_time_utils import utc_now
 from uuid import UUID
 
 from injector import inject
-from sqlalchemy import func, select
+from sqlalchemy import Row, func, select, tuple_
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models.agent_execution_daily_stats import AgentExecutionDailyStatsModel
 from app.db.models.agent_response_log import AgentResponseLogModel
+from app.db.models.analytics_aggregation_checkpoint import AnalyticsAggregationCheckpointModel
+from app.db.models.conversation import ConversationModel
 from app.db.models.node_execution_daily_stats import NodeExecutionDailyStatsModel
 from app.db.base import generate_sequential_uuid
 
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_NAME = "agent_response_logs"
+# Rows per multi-row upsert and keys per IN list; keeps statements below the driver's bind parameter limit
+WRITE_CHUNK_SIZE = 1000
+
+
+class LogPosition(NamedTuple):
+    """Keyset position in agent_response_logs, ordered by (logged_at, id)."""
+
+    logged_at: datetime
+    id: UUID
+
+
+def _chunks(items: list, size: int = WRITE_CHUNK_SIZE) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
 class AnalyticsAggregationRepository:
     @inject
@@ -34,24 +54,6 @@ class AnalyticsAggregationRepository:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_response_logs_since(
-        self, since: datetime, until: datetime, *, limit: int = 1000, offset: int = 0
-    ) -> list[AgentResponseLogModel]:
-        """Fetch a batch of agent response logs within [since, until] that are not soft-deleted."""
-        stmt = (
-            select(AgentResponseLogModel)
-            .where(
-                AgentResponseLogModel.logged_at >= since,
-                AgentResponseLogModel.logged_at <= until,
-                AgentResponseLogModel.is_deleted == 0,
-            )
-            .order_by(AgentResponseLogModel.logged_at)
-            .limit(limit)
-            .offset(offset)
-        )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
-
     async def get_affected_dates_since(
         self, since: datetime, until: datetime
     ) -> list[date]:
@@ -68,27 +70,127 @@ class AnalyticsAggregationRepository:
         result = await self.db.execute(stmt)
         return [row[0] for row in result.all()]
 
-    async def get_response_logs_for_date(
-        self, stat_date: date, *, limit: int = 10000, offset: int = 0
-    ) -> list[AgentResponseLogModel]:
-        """Fetch ALL agent response logs for a specific date."""
-        start_of_day = datetime.combine(stat_date, time.min, tzinfo=timezone.utc)
-        end_of_day = datetime.combine(stat_date, time.max, tzinfo=timezone.utc)
-        stmt = (
-            select(AgentResponseLogModel)
-            .where(
-                AgentResponseLogModel.logged_at >= start_of_day,
-                AgentResponseLogModel.logged_at <= end_of_day,
-                AgentResponseLogModel.is_deleted == 0,
+    async def iter_response_log_batches(
+        self,
+        since: datetime,
+        until: datetime,
+        *,
+        after: LogPosition | None = None,
+        batch_size: int = 5000,
+    ) -> AsyncIterator[list[Row]]:
+        """
+        Stream agent response logs within [since, until] in (logged_at, id) order.
+
+        Uses keyset pagination (resuming after the last row of the previous batch, or
+        ``after``) and only projects the columns the aggregation reads, so no ORM
+        objects or joined relationships are loaded.
+        """
+        position = after
+        while True:
+            stmt = (
+                select(
+                    AgentResponseLogModel.id,
+                    AgentResponseLogModel.logged_at,
+                    AgentResponseLogModel.conversation_id,
+                    AgentResponseLogModel.raw_response,
+                )
+                .where(
+                    AgentResponseLogModel.logged_at >= since,
+                    AgentResponseLogModel.logged_at <= until,
+                    AgentResponseLogModel.is_deleted == 0,
+                )
+                .order_by(AgentResponseLogModel.logged_at, AgentResponseLogModel.id)
+                .limit(batch_size)
+            )
+            if position is not None:
+                stmt = stmt.where(
+                    tuple_(AgentResponseLogModel.logged_at, AgentResponseLogModel.id)
+                    > tuple_(position.logged_at, position.id)
+                )
+            rows = list((await self.db.execute(stmt)).all())
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch_size:
+                return
+            position = LogPosition(rows[-1].logged_at, rows[-1].id)
+
+    async def get_conversation_snapshots(self, conversation_ids: Iterable[UUID]) -> dict[UUID, Row]:
+        """Return (id, status, thumbs_up_count, thumbs_down_count) of the given conversations by id."""
+        ids = list(conversation_ids)
+        snapshots = {}
+        for chunk in _chunks(ids):
+            stmt = select(
+                ConversationModel.id,
+                ConversationModel.status,
+                ConversationModel.thumbs_up_count,
+                ConversationModel.thumbs_down_count,
+            ).where(ConversationModel.id.in_(chunk))
+            for row in (await self.db.execute(stmt)).all():
+                snapshots[row.id] = row
+        return snapshots
+
+    async def get_agent_aggregation_states(self, keys: Iterable[tuple[UUID, date]]) -> dict[tuple, dict | None]:
+        """
+        Return the persisted partial aggregates of existing agent rows, keyed by (agent_id, stat_date).
+
+        Rows that exist without a partial aggregate map to None; missing rows are absent.
+        """
+        model = AgentExecutionDailyStatsModel
+        states = {}
+        for chunk in _chunks(list(keys)):
+            stmt = select(model.agent_id, model.stat_date, model.aggregation_state).where(
+                tuple_(model.agent_id, model.stat_date).in_(chunk)
+            )
+            for row in (await self.db.execute(stmt)).all():
+                states[(row.agent_id, row.stat_date)] = row.aggregation_state
+        return states
+
+    async def get_node_aggregation_states(self, keys: Iterable[tuple[UUID, str, date]]) -> dict[tuple, dict | None]:
+        """Same as get_agent_aggregation_states, keyed by (agent_id, node_type, stat_date)."""
+        model = NodeExecutionDailyStatsModel
+        states = {}
+        for chunk in _chunks(list(keys)):
+            stmt = select(model.agent_id, model.node_type, model.stat_date, model.aggregation_state).where(
+                tuple_(model.agent_id, model.node_type, model.stat_date).in_(chunk)
             )
-            .order_by(AgentResponseLogModel.logged_at)
-            .limit(limit)
-            .offset(offset)
+            for row in (await self.db.execute(stmt)).all():
+                states[(row.agent_id, row.node_type, row.stat_date)] = row.aggregation_state
+        return states
+
+    async def get_checkpoint(self) -> LogPosition | None:
+        """Return the last log merged by the incremental aggregation, if any."""
+        stmt = select(
+            AnalyticsAggregationCheckpointModel.last_logged_at,
+            AnalyticsAggregationCheckpointModel.last_log_id,
+        ).where(AnalyticsAggregationCheckpointModel.name == CHECKPOINT_NAME)
+        row = (await self.db.execute(stmt)).first()
+        return LogPosition(row.last_logged_at, row.last_log_id) if row else None
+
+    async def save_checkpoint(self, position: LogPosition) -> None:
+        """Move the checkpoint and commit, together with any stats upserted with commit=False."""
+        now = utc_now()
+        stmt = insert(AnalyticsAggregationCheckpointModel).values(
+            id=generate_sequential_uuid(),
+            name=CHECKPOINT_NAME,
+            last_logged_at=position.logged_at,
+            last_log_id=position.id,
+            is_deleted=0,
+            created_at=now,
+            updated_at=now,
         )
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalyticsAggregationCheckpointModel.name],
+            set_={
+                "last_logged_at": stmt.excluded.last_logged_at,
+                "last_log_id": stmt.excluded.last_log_id,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
 
-    async def upsert_agent_daily_stats(self, stats_list: list[dict]) -> None:
+    async def upsert_agent_daily_stats(self, stats_list: list[dict], *, commit: bool = True) -> None:
         """
         Upsert agent daily stats rows.
 
@@ -112,6 +214,8 @@ class AnalyticsAggregationRepository:
                     "min_response_ms": s.get("min_response_ms"),
                     "max_response_ms": s.get("max_response_ms"),
                     "total_response_ms": s.get("total_response_ms"),
+                    "p50_response_ms": s.get("p50_response_ms"),
+                    "p95_response_ms": s.get("p95_response_ms"),
                     "total_nodes_executed": s["total_nodes_executed"],
                     "avg_success_rate": s.get("avg_success_rate"),
                     "total_success_rate_sum": s.get("total_success_rate_sum"),
@@ -121,6 +225,7 @@ class AnalyticsAggregationRepository:
                     "in_progress_conversations": s.get("in_progress_conversations", 0),
                     "thumbs_up_count": s.get("thumbs_up_count", 0),
                     "thumbs_down_count": s.get("thumbs_down_count", 0),
+                    "aggregation_state": s.get("aggregation_state"),
                     "last_aggregated_at": now,
                     "is_deleted": 0,
                     "created_at": now,
@@ -128,34 +233,39 @@ class AnalyticsAggregationRepository:
                 }
             )
 
-        stmt = insert(AgentExecutionDailyStatsModel).values(rows)
-        stmt = stmt.on_conflict_do_update(
-            constraint="uq_agent_execution_daily_stats_agent_date",
-            set_={
-                "execution_count": stmt.excluded.execution_count,
-                "success_count": stmt.excluded.success_count,
-                "error_count": stmt.excluded.error_count,
-                "avg_response_ms": stmt.excluded.avg_response_ms,
-                "min_response_ms": stmt.excluded.min_response_ms,
-                "max_response_ms": stmt.excluded.max_response_ms,
-                "total_response_ms": stmt.excluded.total_response_ms,
-                "total_nodes_executed": stmt.excluded.total_nodes_executed,
-                "avg_success_rate": stmt.excluded.avg_success_rate,
-                "total_success_rate_sum": stmt.excluded.total_success_rate_sum,
-                "rag_used_count": stmt.excluded.rag_used_count,
-                "unique_conversations": stmt.excluded.unique_conversations,
-                "finalized_conversations": stmt.excluded.finalized_conversations,
-                "in_progress_conversations": stmt.excluded.in_progress_conversations,
-                "thumbs_up_count": stmt.excluded.thumbs_up_count,
-                "thumbs_down_count": stmt.excluded.thumbs_down_count,
-                "last_aggregated_at": stmt.excluded.last_aggregated_at,
-                "updated_at": stmt.excluded.updated_at,
-            },
-        )
-        await self.db.execute(stmt)
-        await self.db.commit()
+        for chunk in _chunks(rows):
+            stmt = insert(AgentExecutionDailyStatsModel).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_agent_execution_daily_stats_agent_date",
+                set_={
+                    "execution_count": stmt.excluded.execution_count,
+                    "success_count": stmt.excluded.success_count,
+                    "error_count": stmt.excluded.error_count,
+                    "avg_response_ms": stmt.excluded.avg_response_ms,
+                    "min_response_ms": stmt.excluded.min_response_ms,
+                    "max_response_ms": stmt.excluded.max_response_ms,
+                    "total_response_ms": stmt.excluded.total_response_ms,
+                    "p50_response_ms": stmt.excluded.p50_response_ms,
+                    "p95_response_ms": stmt.excluded.p95_response_ms,
+                    "total_nodes_executed": stmt.excluded.total_nodes_executed,
+                    "avg_success_rate": stmt.excluded.avg_success_rate,
+                    "total_success_rate_sum": stmt.excluded.total_success_rate_sum,
+                    "rag_used_count": stmt.excluded.rag_used_count,
+                    "unique_conversations": stmt.excluded.unique_conversations,
+                    "finalized_conversations": stmt.excluded.finalized_conversations,
+                    "in_progress_conversations": stmt.excluded.in_progress_conversations,
+                    "thumbs_up_count": stmt.excluded.thumbs_up_count,
+                    "thumbs_down_count": stmt.excluded.thumbs_down_count,
+                    "aggregation_state": stmt.excluded.aggregation_state,
+                    "last_aggregated_at": stmt.excluded.last_aggregated_at,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
 
-    async def upsert_node_daily_stats(self, stats_list: list[dict]) -> None:
+    async def upsert_node_daily_stats(self, stats_list: list[dict], *, commit: bool = True) -> None:
         """
         Upsert node daily stats rows.
 
@@ -183,28 +293,36 @@ class AnalyticsAggregationRepository:
                     "min_execution_ms": s.get("min_execution_ms"),
                     "max_execution_ms": s.get("max_execution_ms"),
                     "total_execution_ms": s.get("total_execution_ms"),
+                    "p50_execution_ms": s.get("p50_execution_ms"),
+                    "p95_execution_ms": s.get("p95_execution_ms"),
+                    "aggregation_state": s.get("aggregation_state"),
                     "is_deleted": 0,
                     "created_at": now,
                     "updated_at": now,
                 }
             )
 
-        stmt = insert(NodeExecutionDailyStatsModel).values(rows)
-        stmt = stmt.on_conflict_do_update(
-            constraint="uq_node_execution_daily_stats_agent_node_date",
-            set_={
-                "execution_count": stmt.excluded.execution_count,
-                "success_count": stmt.excluded.success_count,
-                "failure_count": stmt.excluded.failure_count,
-                "unique_conversations": stmt.excluded.unique_conversations,
-                "thumbs_up_count": stmt.excluded.thumbs_up_count,
-                "thumbs_down_count": stmt.excluded.thumbs_down_count,
-                "avg_execution_ms": stmt.excluded.avg_execution_ms,
-                "min_execution_ms": stmt.excluded.min_execution_ms,
-                "max_execution_ms": stmt.excluded.max_execution_ms,
-                "total_execution_ms": stmt.excluded.total_execution_ms,
-                "updated_at": stmt.excluded.updated_at,
-            },
-        )
-        await self.db.execute(stmt)
-        await self.db.commit()
+        for chunk in _chunks(rows):
+            stmt = insert(NodeExecutionDailyStatsModel).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_node_execution_daily_stats_agent_node_date",
+                set_={
+                    "execution_count": stmt.excluded.execution_count,
+                    "success_count": stmt.excluded.success_count,
+                    "failure_count": stmt.excluded.failure_count,
+                    "unique_conversations": stmt.excluded.unique_conversations,
+                    "thumbs_up_count": stmt.excluded.thumbs_up_count,
+                    "thumbs_down_count": stmt.excluded.thumbs_down_count,
+                    "avg_execution_ms": stmt.excluded.avg_execution_ms,
+                    "min_execution_ms": stmt.excluded.min_execution_ms,
+                    "max_execution_ms": stmt.excluded.max_execution_ms,
+                    "total_execution_ms": stmt.excluded.total_execution_ms,
+                    "p50_execution_ms": stmt.excluded.p50_execution_ms,
+                    "p95_execution_ms": stmt.excluded.p95_execution_ms,
+                    "aggregation_state": stmt.excluded.aggregation_state,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
@@ -86,6 +86,7 @@ class ConversationRepository:
         self,
         conversation_id: UUID,
         include_messages: bool = False,
+        for_update: bool = False,
     ) -> Optional[ConversationModel]:
         """
         Fetch conversation by ID with optional message loading
@@ -93,6 +94,8 @@ class ConversationRepository:
         Args:
             conversation_id: The conversation UUID
             include_messages: Whether to eager load messages
+            for_update: Lock the conversation row until the transaction commits
+                (and reload it, it may already be in the session)
         """
         query = select(ConversationModel).where(ConversationModel.id == conversation_id)
 
@@ -103,6 +106,9 @@ class ConversationRepository:
                 )
             )
 
+        if for_update:
+            query = query.with_for_update(of=ConversationModel).execution_options(populate_existing=True)
+
         # Point lookup by primary key: group-scope row filtering is meant for
         # list/analytics queries, not for operating on a specific known
         # conversation (already gated by conversation-scoped auth/permissions).
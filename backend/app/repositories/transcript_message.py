@@ -4,7 +4,7 @@ from injector import inject
 from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import defer, selectinload
 
 from app.auth.utils import get_current_user_id
 from app.db.models.message_model import MessageFeedbackModel, TranscriptMessageModel
@@ -26,6 +26,13 @@ class TranscriptMessageRepository:
         return messages
 
 
+    async def add_messages(self, messages: List[TranscriptMessageModel]) -> List[TranscriptMessageModel]:
+        """Add transcript messages to the current transaction without committing it"""
+        self.db.add_all(messages)
+        await self.db.flush()
+        return messages
+
+
     async def get_latest_sequence_number(
             self,
             conversation_id: UUID
@@ -58,6 +65,24 @@ class TranscriptMessageRepository:
         return list(result.scalars().all())
 
 
+    async def get_last_messages(
+            self,
+            conversation_id: UUID,
+            limit: int,
+            ) -> List[TranscriptMessageModel]:
+        """Get the last `limit` messages of a conversation in sequence order (without feedback and audio)"""
+        query = select(TranscriptMessageModel).where(
+                TranscriptMessageModel.conversation_id == conversation_id
+                ).order_by(TranscriptMessageModel.sequence_number.desc()).limit(limit)
+
+        query = query.options(defer(TranscriptMessageModel.audio_data))
+
+        result = await self.db.execute(query)
+        messages = list(result.scalars().all())
+        messages.reverse()
+        return messages
+
+
     async def get_message_by_message_id(
             self,
             message_id: UUID,
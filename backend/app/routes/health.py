@@ -37,3 +37,31 @@ async def ready():
             content={"service": "backend", "status": "not_ready", "error": str(e)},
         )
 
+
+
+@router.get("/health/caches")
+async def cache_stats():
+    """In-process cache statistics for this worker."""
+    from app.modules.workflow.agents.rag import get_thread_rag_stats
+    from app.modules.workflow.engine.pii_anonymizer import get_pii_mask_cache
+    from app.modules.workflow.engine.workflow_cache import get_compiled_workflow_cache
+    from app.modules.data.providers.embedding_cache import get_embedding_cache
+    from app.modules.data.providers.legra.index_cache import get_legra_index_cache
+    from app.modules.data.providers.vector.embedding.registry import get_embedding_registry
+    from app.modules.workflow.llm.client_pool import get_chat_model_pool
+    from app.modules.workflow.utils import get_python_sandbox_pool
+    from app.services.analytics_realtime import get_analytics_write_behind
+
+    sandbox_pool = get_python_sandbox_pool()
+    return {
+        "service": "backend",
+        "compiled_workflows": get_compiled_workflow_cache().get_cache_stats(),
+        "llm_clients": get_chat_model_pool().get_cache_stats(),
+        "legra_indexes": get_legra_index_cache().get_cache_stats(),
+        "embedding_models": get_embedding_registry().get_cache_stats(),
+        "embeddings": get_embedding_cache().get_cache_stats(),
+        "thread_rag": get_thread_rag_stats(),
+        "analytics_write_behind": get_analytics_write_behind().get_cache_stats(),
+        "python_sandbox": sandbox_pool.get_cache_stats() if sandbox_pool else None,
+        "pii_masks": get_pii_mask_cache().get_cache_stats(),
+    }
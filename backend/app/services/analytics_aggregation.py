@@ -1,18 +1,172 @@
 import json
 import logging
-from collections import defaultdict
-from datetime import date, datetime, timezone
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
 from uuid import UUID
 
 from injector import inject
+from sqlalchemy import Row
 
+from app.core.config.settings import settings
 from app.core.utils.date_time_utils import utc_now
 from app.core.utils.enums.conversation_status_enum import ConversationStatus
-from app.db.models.agent_response_log import AgentResponseLogModel
-from app.repositories.analytics_aggregation import AnalyticsAggregationRepository
+from app.core.utils.quantile_sketch import QuantileSketch
+from app.repositories.analytics_aggregation import AnalyticsAggregationRepository, LogPosition
 
 logger = logging.getLogger(__name__)
 
+SUCCESS_STATUSES = ("success", "completed")
+IN_PROGRESS_STATUSES = (ConversationStatus.IN_PROGRESS.value, ConversationStatus.TAKE_OVER.value)
+
+
+@dataclass
+class _Timings:
+    """Mergeable count/sum/min/max and quantile sketch of a series of durations (ms)."""
+
+    count: int = 0
+    total: float = 0.0
+    min: float | None = None
+    max: float | None = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "_Timings") -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def to_stats(self, suffix: str) -> dict:
+        """avg/min/max/total/p50/p95 columns, e.g. avg_response_ms for suffix 'response_ms'."""
+        has_values = self.count > 0
+        return {
+            f"avg_{suffix}": self.total / self.count if has_values else None,
+            f"min_{suffix}": self.min,
+            f"max_{suffix}": self.max,
+            f"total_{suffix}": self.total if has_values else None,
+            f"p50_{suffix}": self.sketch.quantile(0.5),
+            f"p95_{suffix}": self.sketch.quantile(0.95),
+        }
+
+    def to_state(self) -> dict:
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "_Timings":
+        return cls(state["count"], state["total"], state["min"], state["max"],
+                   QuantileSketch.from_dict(state["sketch"]))
+
+
+@dataclass
+class _AgentBucket:
+    """Partial aggregate of one agent_execution_daily_stats row."""
+
+    execution_count: int = 0
+    success_count: int = 0
+    error_count: int = 0
+    total_nodes_executed: int = 0
+    rag_used_count: int = 0
+    response_ms: _Timings = field(default_factory=_Timings)
+    success_rate_count: int = 0
+    success_rate_sum: float = 0.0
+    conversation_ids: set[str] = field(default_factory=set)
+
+    def merge(self, other: "_AgentBucket") -> None:
+        self.execution_count += other.execution_count
+        self.success_count += other.success_count
+        self.error_count += other.error_count
+        self.total_nodes_executed += other.total_nodes_executed
+        self.rag_used_count += other.rag_used_count
+        self.response_ms.merge(other.response_ms)
+        self.success_rate_count += other.success_rate_count
+        self.success_rate_sum += other.success_rate_sum
+        self.conversation_ids |= other.conversation_ids
+
+    def to_state(self) -> dict:
+        return {
+            "execution_count": self.execution_count,
+            "success_count": self.success_count,
+            "error_count": self.error_count,
+            "total_nodes_executed": self.total_nodes_executed,
+            "rag_used_count": self.rag_used_count,
+            "response_ms": self.response_ms.to_state(),
+            "success_rate_count": self.success_rate_count,
+            "success_rate_sum": self.success_rate_sum,
+            "conversation_ids": sorted(self.conversation_ids),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "_AgentBucket":
+        return cls(
+            execution_count=state["execution_count"],
+            success_count=state["success_count"],
+            error_count=state["error_count"],
+            total_nodes_executed=state["total_nodes_executed"],
+            rag_used_count=state["rag_used_count"],
+            response_ms=_Timings.from_state(state["response_ms"]),
+            success_rate_count=state["success_rate_count"],
+            success_rate_sum=state["success_rate_sum"],
+            conversation_ids=set(state["conversation_ids"]),
+        )
+
+
+@dataclass
+class _NodeBucket:
+    """Partial aggregate of one node_execution_daily_stats row."""
+
+    execution_count: int = 0
+    success_count: int = 0
+    failure_count: int = 0
+    execution_ms: _Timings = field(default_factory=_Timings)
+    conversation_ids: set[str] = field(default_factory=set)
+
+    def merge(self, other: "_NodeBucket") -> None:
+        self.execution_count += other.execution_count
+        self.success_count += other.success_count
+        self.failure_count += other.failure_count
+        self.execution_ms.merge(other.execution_ms)
+        self.conversation_ids |= other.conversation_ids
+
+    def to_state(self) -> dict:
+        return {
+            "execution_count": self.execution_count,
+            "success_count": self.success_count,
+            "failure_count": self.failure_count,
+            "execution_ms": self.execution_ms.to_state(),
+            "conversation_ids": sorted(self.conversation_ids),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "_NodeBucket":
+        return cls(
+            execution_count=state["execution_count"],
+            success_count=state["success_count"],
+            failure_count=state["failure_count"],
+            execution_ms=_Timings.from_state(state["execution_ms"]),
+            conversation_ids=set(state["conversation_ids"]),
+        )
+
+
+def _stat_date(logged_at: datetime) -> date:
+    return logged_at.astimezone(timezone.utc).date()
+
+
+def _as_float(value) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
 
 class AnalyticsAggregationService:
     @inject
@@ -23,17 +177,29 @@ class AnalyticsAggregationService:
         """
         Main entry point for the Celery task.
 
-        Strategy: Date-based re-aggregation
-        1. Find dates with new logs since last aggregation
-        2. For each affected date, fetch ALL logs and recompute complete stats
-        3. Upsert complete stats (safe to replace since we have full data)
+        Strategy: incremental merge, with date-based re-aggregation as the fallback
+        1. Once a checkpoint exists, stream only the logs after it and fold them into deltas
+        2. Merge the deltas into the partial aggregates persisted with each stats row
+        3. Upsert the merged rows and move the checkpoint in the same transaction
+
+        Without a checkpoint (first run, or ANALYTICS_AGGREGATION_INCREMENTAL off) every
+        date with new logs is re-aggregated from ALL its logs instead. Logs are streamed in
+        keyset-paginated batches and folded as they arrive, never held in memory.
         """
-        now = utc_now()
+        # Logs are only aggregated after a short lag so that rows of transactions still in
+        # flight (logged_at is set before commit) do not land behind the checkpoint
+        until = utc_now() - timedelta(seconds=settings.ANALYTICS_AGGREGATION_LAG_SECONDS)
+        checkpoint = await self.repo.get_checkpoint()
+        if settings.ANALYTICS_AGGREGATION_INCREMENTAL and checkpoint is not None:
+            return await self._aggregate_incremental(checkpoint, until)
+        return await self._aggregate_affected_dates(until)
+
+    async def _aggregate_affected_dates(self, until: datetime) -> dict:
         last_ts = await self.repo.get_last_aggregation_timestamp()
 
         if last_ts is not None:
             # Find which dates have new activity since last aggregation
-            affected_dates = await self.repo.get_affected_dates_since(last_ts, now)
+            affected_dates = await self.repo.get_affected_dates_since(last_ts, until)
             if not affected_dates:
                 logger.info("No new logs since last aggregation")
                 return {"agent_stats_upserted": 0, "node_stats_upserted": 0}
@@ -43,269 +209,273 @@ class AnalyticsAggregationService:
             if earliest is None:
                 logger.info("No logs found for aggregation")
                 return {"agent_stats_upserted": 0, "node_stats_upserted": 0}
-            affected_dates = await self.repo.get_affected_dates_since(earliest, now)
+            affected_dates = await self.repo.get_affected_dates_since(earliest, until)
 
         logger.info(f"Aggregating {len(affected_dates)} affected dates: {affected_dates}")
 
         # Process each date independently with complete data
-        all_agent_stats = []
-        all_node_stats = []
-
+        agent_buckets: dict[tuple, _AgentBucket] = {}
+        node_buckets: dict[tuple, _NodeBucket] = {}
+        last_position = None
         for stat_date in affected_dates:
-            agent_stats, node_stats = await self._aggregate_single_date(stat_date)
-            all_agent_stats.extend(agent_stats)
-            all_node_stats.extend(node_stats)
-
-        await self.repo.upsert_agent_daily_stats(all_agent_stats)
-        await self.repo.upsert_node_daily_stats(all_node_stats)
-
-        logger.info(
-            f"Analytics aggregation complete: {len(all_agent_stats)} agent rows, {len(all_node_stats)} node rows"
-        )
-        return {
-            "agent_stats_upserted": len(all_agent_stats),
-            "node_stats_upserted": len(all_node_stats),
-        }
-
-    async def _aggregate_single_date(self, stat_date: date) -> tuple[list[dict], list[dict]]:
+            position = await self._aggregate_single_date(stat_date, until, agent_buckets, node_buckets)
+            last_position = position or last_position
+
+        return await self._write_buckets(agent_buckets, node_buckets, last_position)
+
+    async def _aggregate_incremental(self, checkpoint: LogPosition, until: datetime) -> dict:
+        agent_buckets: dict[tuple, _AgentBucket] = {}
+        node_buckets: dict[tuple, _NodeBucket] = {}
+        last_position = None
+        async for rows in self.repo.iter_response_log_batches(
+            checkpoint.logged_at, until, after=checkpoint, batch_size=settings.ANALYTICS_AGGREGATION_BATCH_SIZE
+        ):
+            for row in rows:
+                self._fold_log(row, _stat_date(row.logged_at), agent_buckets, node_buckets)
+            last_position = LogPosition(rows[-1].logged_at, rows[-1].id)
+
+        if last_position is None:
+            logger.info("No new logs since last aggregation")
+            return {"agent_stats_upserted": 0, "node_stats_upserted": 0}
+
+        agent_states = await self.repo.get_agent_aggregation_states(agent_buckets)
+        node_states = await self.repo.get_node_aggregation_states(node_buckets)
+
+        # A row without a partial aggregate (written by the realtime counters, or before
+        # partial aggregates existed) cannot be merged into; unless its whole date lies after
+        # the checkpoint, re-aggregate that date from all its logs
+        checkpoint_date = _stat_date(checkpoint.logged_at)
+        stale_dates = sorted({
+            key[-1] for key, state in (*agent_states.items(), *node_states.items())
+            if state is None and key[-1] <= checkpoint_date
+        })
+        for key, state in agent_states.items():
+            if state is not None and key[-1] not in stale_dates:
+                merged = _AgentBucket.from_state(state)
+                merged.merge(agent_buckets[key])
+                agent_buckets[key] = merged
+        for key, state in node_states.items():
+            if state is not None and key[-1] not in stale_dates:
+                merged = _NodeBucket.from_state(state)
+                merged.merge(node_buckets[key])
+                node_buckets[key] = merged
+
+        if stale_dates:
+            logger.info(f"Re-aggregating {len(stale_dates)} dates without partial aggregates: {stale_dates}")
+        for stat_date in stale_dates:
+            for buckets in (agent_buckets, node_buckets):
+                for key in [key for key in buckets if key[-1] == stat_date]:
+                    del buckets[key]
+            await self._aggregate_single_date(stat_date, until, agent_buckets, node_buckets)
+
+        return await self._write_buckets(agent_buckets, node_buckets, last_position)
+
+    async def _aggregate_single_date(
+        self,
+        stat_date: date,
+        until: datetime,
+        agent_buckets: dict[tuple, _AgentBucket],
+        node_buckets: dict[tuple, _NodeBucket],
+    ) -> LogPosition | None:
         """
-        Aggregate ALL logs for a single date.
+        Fold ALL logs of a single date (up to ``until``) into the given buckets.
 
-        Returns tuple of (agent_stats_list, node_stats_list).
+        Returns the position of the last log folded, if any.
         """
-        # Fetch ALL logs for this date (paginated to avoid memory issues)
-        BATCH_SIZE = 10000
-        offset = 0
-        all_logs: list[AgentResponseLogModel] = []
-
-        while True:
-            logs = await self.repo.get_response_logs_for_date(stat_date, limit=BATCH_SIZE, offset=offset)
-            if not logs:
-                break
-            all_logs.extend(logs)
-            if len(logs) < BATCH_SIZE:
-                break
-            offset += BATCH_SIZE
-
-        if not all_logs:
-            return [], []
-
-        # Build buckets from all logs for this date
-        agent_buckets, node_buckets = self._build_buckets_from_logs(all_logs, stat_date)
-
-        # Convert buckets to stats dicts
-        agent_stats = self._build_agent_stats_from_buckets(agent_buckets)
-        node_stats = self._build_node_stats_from_buckets(node_buckets)
-
-        return agent_stats, node_stats
-
-    def _create_agent_bucket(self) -> dict:
-        """Factory for agent bucket accumulator."""
-        return {
-            "execution_count": 0,
-            "success_count": 0,
-            "error_count": 0,
-            "response_ms_values": [],
-            "total_nodes_executed": 0,
-            "node_success_rates": [],
-            "rag_used_count": 0,
-            "conversation_ids": set(),
-            "finalized_conversation_ids": set(),
-            "in_progress_conversation_ids": set(),
-            "thumbs_data": {},  # maps conversation_id -> (thumbs_up, thumbs_down)
-        }
-
-    def _create_node_bucket(self) -> dict:
-        """Factory for node bucket accumulator."""
-        return {
-            "execution_count": 0,
-            "success_count": 0,
-            "failure_count": 0,
-            "execution_ms_values": [],
-            "conversation_ids": set(),
-            "thumbs_data": {},
-        }
-
-    def _build_buckets_from_logs(
-        self, logs: list[AgentResponseLogModel], stat_date: date
-    ) -> tuple[dict[tuple, dict], dict[tuple, dict]]:
+        start_of_day = datetime.combine(stat_date, time.min, tzinfo=timezone.utc)
+        end_of_day = min(datetime.combine(stat_date, time.max, tzinfo=timezone.utc), until)
+        last_position = None
+        async for rows in self.repo.iter_response_log_batches(
+            start_of_day, end_of_day, batch_size=settings.ANALYTICS_AGGREGATION_BATCH_SIZE
+        ):
+            for row in rows:
+                self._fold_log(row, stat_date, agent_buckets, node_buckets)
+            last_position = LogPosition(rows[-1].logged_at, rows[-1].id)
+        return last_position
+
+    def _fold_log(
+        self,
+        log: Row,
+        stat_date: date,
+        agent_buckets: dict[tuple, _AgentBucket],
+        node_buckets: dict[tuple, _NodeBucket],
+    ) -> None:
         """
-        Process logs and build accumulator buckets.
+        Fold one (id, logged_at, conversation_id, raw_response) log row into the buckets.
 
-        Returns (agent_buckets, node_buckets) where:
-        - agent_buckets: keyed by (agent_id, stat_date)
-        - node_buckets: keyed by (agent_id, node_type, stat_date)
+        agent_buckets are keyed by (agent_id, stat_date), node_buckets by
+        (agent_id, node_type, stat_date).
         """
-        agent_buckets: dict[tuple, dict] = defaultdict(self._create_agent_bucket)
-        node_buckets: dict[tuple, dict] = defaultdict(self._create_node_bucket)
-
-        for log in logs:
-            try:
-                payload = json.loads(log.raw_response)
-            except (json.JSONDecodeError, TypeError):
-                logger.warning(f"Could not parse raw_response for log id={log.id}")
-                continue
+        try:
+            payload = json.loads(log.raw_response)
+        except (json.JSONDecodeError, TypeError):
+            logger.warning(f"Could not parse raw_response for log id={log.id}")
+            return
+
+        agent_id_raw = payload.get("agent_id")
+        if not agent_id_raw:
+            return
+
+        try:
+            agent_id = UUID(str(agent_id_raw))
+        except (ValueError, AttributeError):
+            return
+
+        ab = agent_buckets.get((agent_id, stat_date))
+        if ab is None:
+            ab = agent_buckets[(agent_id, stat_date)] = _AgentBucket()
+
+        # Execution status
+        status = (payload.get("status") or "").lower()
+        ab.execution_count += 1
+        if status in SUCCESS_STATUSES:
+            ab.success_count += 1
+        else:
+            ab.error_count += 1
+
+        # Conversation tracking; status and thumbs are read from the conversations when writing
+        conv_id_str = str(log.conversation_id) if log.conversation_id else None
+        if conv_id_str:
+            ab.conversation_ids.add(conv_id_str)
+
+        # Response timing — camelCase keys from row_agent_response.performance_metrics
+        row_response = payload.get("row_agent_response") or {}
+        perf = row_response.get("performance_metrics") or row_response.get("performanceMetrics") or {}
+        total_ms = _as_float(perf.get("totalExecutionTime") or perf.get("total_execution_time_ms"))
+        if total_ms is not None:
+            ab.response_ms.add(total_ms)
+
+        # RAG used — top-level boolean field
+        if payload.get("rag_used"):
+            ab.rag_used_count += 1
+
+        # Node-level stats — nodeExecutionStatus is a dict keyed by node UUID
+        state = row_response.get("state") or {}
+        node_statuses_raw = state.get("nodeExecutionStatus") or payload.get("nodeExecutionStatus") or {}
+
+        # Support both dict (keyed by UUID) and list formats
+        if isinstance(node_statuses_raw, dict):
+            node_list = list(node_statuses_raw.values())
+        else:
+            node_list = node_statuses_raw
 
-            agent_id_raw = payload.get("agent_id")
-            if not agent_id_raw:
+        success_nodes = 0
+        for node in node_list:
+            if not isinstance(node, dict):
                 continue
 
-            try:
-                agent_id = UUID(str(agent_id_raw))
-            except (ValueError, AttributeError):
-                continue
+            ntype = node.get("type") or node.get("node_type") or ""
+            nstatus = (node.get("status") or "").lower()
+            n_ms = _as_float(node.get("time_taken") or node.get("execution_time_ms"))
 
-            agent_key = (agent_id, stat_date)
-            ab = agent_buckets[agent_key]
+            ab.total_nodes_executed += 1
 
-            # Execution status
-            status = (payload.get("status") or "").lower()
-            ab["execution_count"] += 1
-            if status in ("success", "completed"):
-                ab["success_count"] += 1
-            else:
-                ab["error_count"] += 1
-
-            # Conversation tracking + thumbs (deduplicated by conversation_id)
-            conv_id = log.conversation_id
-            conv_id_str = str(conv_id) if conv_id else None
-            if conv_id_str and log.conversation is not None:
-                ab["conversation_ids"].add(conv_id_str)
-                conv_status = (log.conversation.status or "").lower()
-                if conv_status == ConversationStatus.FINALIZED.value:
-                    ab["finalized_conversation_ids"].add(conv_id_str)
-                elif conv_status in (
-                    ConversationStatus.IN_PROGRESS.value,
-                    ConversationStatus.TAKE_OVER.value,
-                ):
-                    ab["in_progress_conversation_ids"].add(conv_id_str)
-                if conv_id_str not in ab["thumbs_data"]:
-                    ab["thumbs_data"][conv_id_str] = (
-                        log.conversation.thumbs_up_count or 0,
-                        log.conversation.thumbs_down_count or 0,
-                    )
-
-            # Response timing — camelCase keys from row_agent_response.performance_metrics
-            row_response = payload.get("row_agent_response") or {}
-            perf = row_response.get("performance_metrics") or row_response.get("performanceMetrics") or {}
-            total_ms = perf.get("totalExecutionTime") or perf.get("total_execution_time_ms")
-            if total_ms is not None:
-                try:
-                    ab["response_ms_values"].append(float(total_ms))
-                except (TypeError, ValueError):
-                    pass
-
-            # RAG used — top-level boolean field
-            if payload.get("rag_used"):
-                ab["rag_used_count"] += 1
-
-            # Node-level stats — nodeExecutionStatus is a dict keyed by node UUID
-            state = row_response.get("state") or {}
-            node_statuses_raw = state.get("nodeExecutionStatus") or payload.get("nodeExecutionStatus") or {}
-
-            # Support both dict (keyed by UUID) and list formats
-            if isinstance(node_statuses_raw, dict):
-                node_list = list(node_statuses_raw.values())
+            nb = node_buckets.get((agent_id, ntype, stat_date))
+            if nb is None:
+                nb = node_buckets[(agent_id, ntype, stat_date)] = _NodeBucket()
+            nb.execution_count += 1
+
+            if conv_id_str:
+                nb.conversation_ids.add(conv_id_str)
+
+            if nstatus in SUCCESS_STATUSES:
+                nb.success_count += 1
+                success_nodes += 1
             else:
-                node_list = node_statuses_raw
-
-            for node in node_list:
-                if not isinstance(node, dict):
-                    continue
-
-                ntype = node.get("type") or node.get("node_type") or ""
-                nstatus = (node.get("status") or "").lower()
-                n_ms = node.get("time_taken") or node.get("execution_time_ms")
-
-                ab["total_nodes_executed"] += 1
-
-                node_key = (agent_id, ntype, stat_date)
-                nb = node_buckets[node_key]
-                nb["execution_count"] += 1
-
-                if conv_id_str:
-                    nb["conversation_ids"].add(conv_id_str)
-                    if conv_id_str not in nb["thumbs_data"] and log.conversation is not None:
-                        nb["thumbs_data"][conv_id_str] = (
-                            log.conversation.thumbs_up_count or 0,
-                            log.conversation.thumbs_down_count or 0,
-                        )
-
-                if nstatus in ("success", "completed"):
-                    nb["success_count"] += 1
-                else:
-                    nb["failure_count"] += 1
-
-                if n_ms is not None:
-                    try:
-                        nb["execution_ms_values"].append(float(n_ms))
-                    except (TypeError, ValueError):
-                        pass
-
-            # Node success rate for this log
-            if node_list:
-                total_nodes = len(node_list)
-                success_nodes = sum(
-                    1
-                    for n in node_list
-                    if isinstance(n, dict) and (n.get("status") or "").lower() in ("success", "completed")
-                )
-                ab["node_success_rates"].append(success_nodes / total_nodes)
-
-        return dict(agent_buckets), dict(node_buckets)
-
-    def _build_agent_stats_from_buckets(self, agent_buckets: dict[tuple, dict]) -> list[dict]:
+                nb.failure_count += 1
+
+            if n_ms is not None:
+                nb.execution_ms.add(n_ms)
+
+        # Node success rate for this log
+        if node_list:
+            ab.success_rate_count += 1
+            ab.success_rate_sum += success_nodes / len(node_list)
+
+    async def _write_buckets(
+        self,
+        agent_buckets: dict[tuple, _AgentBucket],
+        node_buckets: dict[tuple, _NodeBucket],
+        last_position: LogPosition | None,
+    ) -> dict:
+        """Upsert the buckets with their partial aggregates and move the checkpoint, in one transaction."""
+        conversation_ids = set()
+        for bucket in (*agent_buckets.values(), *node_buckets.values()):
+            conversation_ids |= bucket.conversation_ids
+        conversations = {
+            str(conversation_id): snapshot
+            for conversation_id, snapshot in (
+                await self.repo.get_conversation_snapshots(UUID(c) for c in conversation_ids)
+            ).items()
+        }
+
+        agent_stats = self._build_agent_stats_from_buckets(agent_buckets, conversations)
+        node_stats = self._build_node_stats_from_buckets(node_buckets, conversations)
+
+        await self.repo.upsert_agent_daily_stats(agent_stats, commit=False)
+        await self.repo.upsert_node_daily_stats(node_stats, commit=False)
+        if last_position is not None:
+            await self.repo.save_checkpoint(last_position)
+
+        logger.info(
+            f"Analytics aggregation complete: {len(agent_stats)} agent rows, {len(node_stats)} node rows"
+        )
+        return {
+            "agent_stats_upserted": len(agent_stats),
+            "node_stats_upserted": len(node_stats),
+        }
+
+    def _build_agent_stats_from_buckets(
+        self, agent_buckets: dict[tuple, _AgentBucket], conversations: dict[str, Row]
+    ) -> list[dict]:
         """Convert agent buckets to stats dictionaries for upsert."""
         agent_stats = []
         for (agent_id, stat_date), ab in agent_buckets.items():
-            ms_vals = ab["response_ms_values"]
-            success_rates = ab["node_success_rates"]
-            thumbs_values = list(ab["thumbs_data"].values())
+            snapshots = [conversations[c] for c in ab.conversation_ids if c in conversations]
+            statuses = [(s.status or "").lower() for s in snapshots]
+            has_rates = ab.success_rate_count > 0
             agent_stats.append(
                 {
                     "agent_id": agent_id,
                     "stat_date": stat_date,
-                    "execution_count": ab["execution_count"],
-                    "success_count": ab["success_count"],
-                    "error_count": ab["error_count"],
-                    "avg_response_ms": (sum(ms_vals) / len(ms_vals)) if ms_vals else None,
-                    "min_response_ms": min(ms_vals) if ms_vals else None,
-                    "max_response_ms": max(ms_vals) if ms_vals else None,
-                    "total_response_ms": sum(ms_vals) if ms_vals else None,
-                    "total_nodes_executed": ab["total_nodes_executed"],
-                    "avg_success_rate": (sum(success_rates) / len(success_rates)) if success_rates else None,
-                    "total_success_rate_sum": sum(success_rates) if success_rates else None,
-                    "rag_used_count": ab["rag_used_count"],
-                    "unique_conversations": len(ab["conversation_ids"]),
-                    "finalized_conversations": len(ab["finalized_conversation_ids"]),
-                    "in_progress_conversations": len(ab["in_progress_conversation_ids"]),
-                    "thumbs_up_count": sum(t[0] for t in thumbs_values),
-                    "thumbs_down_count": sum(t[1] for t in thumbs_values),
+                    "execution_count": ab.execution_count,
+                    "success_count": ab.success_count,
+                    "error_count": ab.error_count,
+                    **ab.response_ms.to_stats("response_ms"),
+                    "total_nodes_executed": ab.total_nodes_executed,
+                    "avg_success_rate": ab.success_rate_sum / ab.success_rate_count if has_rates else None,
+                    "total_success_rate_sum": ab.success_rate_sum if has_rates else None,
+                    "rag_used_count": ab.rag_used_count,
+                    "unique_conversations": len(snapshots),
+                    "finalized_conversations": statuses.count(ConversationStatus.FINALIZED.value),
+                    "in_progress_conversations": sum(s in IN_PROGRESS_STATUSES for s in statuses),
+                    "thumbs_up_count": sum(s.thumbs_up_count or 0 for s in snapshots),
+                    "thumbs_down_count": sum(s.thumbs_down_count or 0 for s in snapshots),
+                    "aggregation_state": ab.to_state(),
                 }
             )
         return agent_stats
 
-    def _build_node_stats_from_buckets(self, node_buckets: dict[tuple, dict]) -> list[dict]:
+    def _build_node_stats_from_buckets(
+        self, node_buckets: dict[tuple, _NodeBucket], conversations: dict[str, Row]
+    ) -> list[dict]:
         """Convert node buckets to stats dictionaries for upsert."""
         node_stats = []
         for (agent_id, node_type, stat_date), nb in node_buckets.items():
-            ms_vals = nb["execution_ms_values"]
-            node_thumbs = list(nb["thumbs_data"].values())
+            snapshots = [conversations[c] for c in nb.conversation_ids if c in conversations]
             node_stats.append(
                 {
                     "agent_id": agent_id,
                     "node_type": node_type,
                     "stat_date": stat_date,
-                    "execution_count": nb["execution_count"],
-                    "success_count": nb["success_count"],
-                    "failure_count": nb["failure_count"],
-                    "avg_execution_ms": (sum(ms_vals) / len(ms_vals)) if ms_vals else None,
-                    "min_execution_ms": min(ms_vals) if ms_vals else None,
-                    "max_execution_ms": max(ms_vals) if ms_vals else None,
-                    "total_execution_ms": sum(ms_vals) if ms_vals else None,
-                    "unique_conversations": len(nb["conversation_ids"]),
-                    "thumbs_up_count": sum(t[0] for t in node_thumbs),
-                    "thumbs_down_count": sum(t[1] for t in node_thumbs),
+                    "execution_count": nb.execution_count,
+                    "success_count": nb.success_count,
+                    "failure_count": nb.failure_count,
+                    **nb.execution_ms.to_stats("execution_ms"),
+                    "unique_conversations": len(nb.conversation_ids),
+                    "thumbs_up_count": sum(s.thumbs_up_count or 0 for s in snapshots),
+                    "thumbs_down_count": sum(s.thumbs_down_count or 0 for s in snapshots),
+                    "aggregation_state": nb.to_state(),
                 }
             )
         return node_stats
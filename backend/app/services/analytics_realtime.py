@@ -3,16 +3,32 @@ Real-time incremental analytics update.
 
 Fired as a background asyncio.create_task after each agent_response_log is saved.
 If this fails, the Celery worker's next run does a full recount — no data is lost.
+
+Updates are written behind: events are accumulated per (tenant, agent, date) and
+(tenant, agent, node type, date) and flushed as one multi-row
+INSERT ... ON CONFLICT DO UPDATE per table and tenant every
+ANALYTICS_FLUSH_INTERVAL_MS, after ANALYTICS_FLUSH_MAX_EVENTS events and on
+shutdown. A burst of executions of one agent thus locks its hot
+(agent_id, stat_date) row once per flush instead of once per execution.
+
+With ANALYTICS_WRITE_BEHIND_REDIS the pending events are kept in a Redis list
+shared by all API workers instead of process memory, so a crash or restart does
+not drop them; any worker's next flush writes them.
 """
 
+import asyncio
+import json
 import logging
-from datetime import datetime, timezone
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config.settings import settings
 from app.db.base import generate_sequential_uuid
 from app.db.models.agent import AgentModel
 from app.db.models.agent_execution_daily_stats import AgentExecutionDailyStatsModel
@@ -21,6 +37,9 @@ from app.db.models.node_execution_daily_stats import NodeExecutionDailyStatsMode
 
 logger = logging.getLogger(__name__)
 
+# Redis list holding pending events when ANALYTICS_WRITE_BEHIND_REDIS is enabled
+REDIS_EVENTS_KEY = "analytics:write_behind:events"
+
 
 def parse_agent_response_for_stats(agent_response: dict) -> dict | None:
     """
@@ -110,218 +129,331 @@ def parse_agent_response_for_stats(agent_response: dict) -> dict | None:
     }
 
 
-async def _increment_agent_daily_stats(session: AsyncSession, data: dict) -> None:
-    """
-    Upsert a single execution's contribution into agent_execution_daily_stats
-    using INSERT ... ON CONFLICT DO UPDATE with atomic += increments.
-    """
-    now = datetime.now(timezone.utc)
-    response_ms = data["response_ms"]
-    nodes = data["nodes"]
-
-    # Compute per-execution node success rate
-    node_success_rate = None
-    if nodes:
-        success_nodes = sum(1 for n in nodes if n["is_success"])
-        node_success_rate = success_nodes / len(nodes)
-
-    input_tokens = data.get("input_tokens")
-    output_tokens = data.get("output_tokens")
-    cost_usd = data.get("cost_usd") or 0.0
-
-    row = {
-        "id": generate_sequential_uuid(),
-        "agent_id": data["agent_id"],
-        "stat_date": data["stat_date"],
-        "execution_count": 1,
-        "success_count": 1 if data["is_success"] else 0,
-        "error_count": 0 if data["is_success"] else 1,
-        "avg_response_ms": response_ms,
-        "min_response_ms": response_ms,
-        "max_response_ms": response_ms,
-        "total_response_ms": response_ms,
-        "total_nodes_executed": data["total_nodes_executed"],
-        "avg_success_rate": node_success_rate,
-        "total_success_rate_sum": node_success_rate,
-        "rag_used_count": 1 if data["rag_used"] else 0,
-        "unique_conversations": 0,
-        "finalized_conversations": 0,
-        "in_progress_conversations": 0,
-        "thumbs_up_count": 0,
-        "thumbs_down_count": 0,
-        "total_input_tokens": input_tokens or 0,
-        "total_output_tokens": output_tokens or 0,
-        "total_cost_usd": cost_usd,
-        "last_aggregated_at": now,
-        "is_deleted": 0,
-        "created_at": now,
-        "updated_at": now,
+def _add_optional(a: float | None, b: float | None) -> float | None:
+    if a is None:
+        return b
+    return a if b is None else a + b
+
+
+def _min_optional(a: float | None, b: float | None) -> float | None:
+    if a is None:
+        return b
+    return a if b is None else min(a, b)
+
+
+def _max_optional(a: float | None, b: float | None) -> float | None:
+    if a is None:
+        return b
+    return a if b is None else max(a, b)
+
+
+@dataclass
+class _AgentDelta:
+    """Pending increments of one agent_execution_daily_stats row"""
+    execution_count: int = 0
+    success_count: int = 0
+    error_count: int = 0
+    total_nodes_executed: int = 0
+    rag_used_count: int = 0
+    total_input_tokens: int = 0
+    total_output_tokens: int = 0
+    total_cost_usd: float = 0.0
+    total_response_ms: float | None = None
+    min_response_ms: float | None = None
+    max_response_ms: float | None = None
+    total_success_rate_sum: float | None = None
+    unique_conversations: int = 0
+    finalized_conversations: int = 0
+    thumbs_up_count: int = 0
+    thumbs_down_count: int = 0
+
+
+@dataclass
+class _NodeDelta:
+    """Pending increments of one node_execution_daily_stats row"""
+    execution_count: int = 0
+    success_count: int = 0
+    failure_count: int = 0
+    total_execution_ms: float | None = None
+    min_execution_ms: float | None = None
+    max_execution_ms: float | None = None
+
+
+class _StatsBatch:
+    """Deltas of a set of events, aggregated per tenant and stats row."""
+
+    def __init__(self):
+        # tenant_id -> {(agent_id, stat_date): delta}
+        self.agents: dict[str, dict[tuple[UUID, date], _AgentDelta]] = {}
+        # tenant_id -> {(agent_id, node_type, stat_date): delta}
+        self.nodes: dict[str, dict[tuple[UUID, str, date], _NodeDelta]] = {}
+        self.events = 0
+
+    def __len__(self) -> int:
+        return self.events
+
+    def add(self, event: dict[str, Any]) -> None:
+        """Fold one event (see _execution_event and friends) into the batch"""
+        tenant_id = event["tenant_id"]
+        agent_id = UUID(event["agent_id"])
+        stat_date = date.fromisoformat(event["stat_date"])
+        delta = self.agents.setdefault(tenant_id, {}).setdefault((agent_id, stat_date), _AgentDelta())
+        self.events += 1
+
+        kind = event["kind"]
+        if kind == "conversation_started":
+            delta.unique_conversations += 1
+        elif kind == "conversation_finalized":
+            delta.finalized_conversations += 1
+        elif kind == "feedback":
+            if event["is_thumbs_up"]:
+                delta.thumbs_up_count += 1
+            else:
+                delta.thumbs_down_count += 1
+        elif kind == "execution":
+            self._add_execution(tenant_id, agent_id, stat_date, delta, event)
+
+    def _add_execution(
+        self, tenant_id: str, agent_id: UUID, stat_date: date, delta: _AgentDelta, event: dict[str, Any],
+    ) -> None:
+        response_ms = event["response_ms"]
+        nodes = event["nodes"]
+
+        delta.execution_count += 1
+        if event["is_success"]:
+            delta.success_count += 1
+        else:
+            delta.error_count += 1
+        delta.total_nodes_executed += event["total_nodes_executed"]
+        if event["rag_used"]:
+            delta.rag_used_count += 1
+        delta.total_input_tokens += event.get("input_tokens") or 0
+        delta.total_output_tokens += event.get("output_tokens") or 0
+        delta.total_cost_usd += event.get("cost_usd") or 0.0
+        delta.total_response_ms = _add_optional(delta.total_response_ms, response_ms)
+        delta.min_response_ms = _min_optional(delta.min_response_ms, response_ms)
+        delta.max_response_ms = _max_optional(delta.max_response_ms, response_ms)
+
+        # Per-execution node success rate
+        if nodes:
+            success_nodes = sum(1 for n in nodes if n["is_success"])
+            delta.total_success_rate_sum = _add_optional(
+                delta.total_success_rate_sum, success_nodes / len(nodes)
+            )
+
+        tenant_nodes = self.nodes.setdefault(tenant_id, {})
+        for node in nodes:
+            node_delta = tenant_nodes.setdefault((agent_id, node["type"], stat_date), _NodeDelta())
+            exec_ms = node["execution_ms"]
+            node_delta.execution_count += 1
+            if node["is_success"]:
+                node_delta.success_count += 1
+            else:
+                node_delta.failure_count += 1
+            node_delta.total_execution_ms = _add_optional(node_delta.total_execution_ms, exec_ms)
+            node_delta.min_execution_ms = _min_optional(node_delta.min_execution_ms, exec_ms)
+            node_delta.max_execution_ms = _max_optional(node_delta.max_execution_ms, exec_ms)
+
+
+def _execution_event(tenant_id: str, data: dict) -> dict[str, Any]:
+    """JSON-serializable event of one execution parsed by parse_agent_response_for_stats"""
+    return {
+        **data,
+        "kind": "execution",
+        "tenant_id": tenant_id,
+        "agent_id": str(data["agent_id"]),
+        "stat_date": data["stat_date"].isoformat(),
     }
 
-    stmt = insert(AgentExecutionDailyStatsModel).values(row)
-    tbl = AgentExecutionDailyStatsModel.__table__
 
-    update_set = {
-        "execution_count": tbl.c.execution_count + stmt.excluded.execution_count,
-        "success_count": tbl.c.success_count + stmt.excluded.success_count,
-        "error_count": tbl.c.error_count + stmt.excluded.error_count,
-        "total_nodes_executed": tbl.c.total_nodes_executed + stmt.excluded.total_nodes_executed,
-        "rag_used_count": tbl.c.rag_used_count + stmt.excluded.rag_used_count,
-        "total_input_tokens": func.coalesce(tbl.c.total_input_tokens, 0) + (input_tokens or 0),
-        "total_output_tokens": func.coalesce(tbl.c.total_output_tokens, 0) + (output_tokens or 0),
-        "total_cost_usd": func.coalesce(tbl.c.total_cost_usd, 0.0) + cost_usd,
-        "last_aggregated_at": stmt.excluded.last_aggregated_at,
-        "updated_at": stmt.excluded.updated_at,
+def _agent_event(tenant_id: str, agent_id: UUID, kind: str, **fields: Any) -> dict[str, Any]:
+    return {
+        "kind": kind,
+        "tenant_id": tenant_id,
+        "agent_id": str(agent_id),
+        "stat_date": datetime.now(timezone.utc).date().isoformat(),
+        **fields,
     }
 
-    if response_ms is not None:
-        update_set["total_response_ms"] = (
-            func.coalesce(tbl.c.total_response_ms, 0.0) + response_ms
-        )
-        update_set["avg_response_ms"] = (
-            (func.coalesce(tbl.c.total_response_ms, 0.0) + response_ms)
-            / (tbl.c.execution_count + 1)
-        )
-        update_set["min_response_ms"] = func.least(
-            func.coalesce(tbl.c.min_response_ms, response_ms), response_ms
-        )
-        update_set["max_response_ms"] = func.greatest(
-            func.coalesce(tbl.c.max_response_ms, response_ms), response_ms
-        )
-
-    if node_success_rate is not None:
-        update_set["total_success_rate_sum"] = (
-            func.coalesce(tbl.c.total_success_rate_sum, 0.0) + node_success_rate
-        )
-        update_set["avg_success_rate"] = (
-            (func.coalesce(tbl.c.total_success_rate_sum, 0.0) + node_success_rate)
-            / (tbl.c.execution_count + 1)
-        )
 
-    stmt = stmt.on_conflict_do_update(
-        constraint="uq_agent_execution_daily_stats_agent_date",
-        set_=update_set,
-    )
-    await session.execute(stmt)
+def _add_nullable(column, excluded):
+    """column + excluded, where NULL on either side means "nothing to add" """
+    return func.coalesce(column + excluded, excluded, column)
 
 
-async def _increment_node_daily_stats(session: AsyncSession, data: dict) -> None:
+async def _upsert_agent_daily_stats(
+    session: AsyncSession, deltas: dict[tuple[UUID, date], _AgentDelta],
+) -> None:
     """
-    Upsert each node's contribution into node_execution_daily_stats
-    using INSERT ... ON CONFLICT DO UPDATE with atomic += increments.
+    Add the deltas to agent_execution_daily_stats in one
+    INSERT ... ON CONFLICT DO UPDATE with atomic += increments.
     """
     now = datetime.now(timezone.utc)
-
-    for node in data["nodes"]:
-        exec_ms = node["execution_ms"]
-
-        row = {
+    rows = []
+    # Sorted so concurrent flushes lock the rows in the same order
+    for (agent_id, stat_date), d in sorted(deltas.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        rows.append({
             "id": generate_sequential_uuid(),
-            "agent_id": data["agent_id"],
-            "node_type": node["type"],
-            "stat_date": data["stat_date"],
-            "execution_count": 1,
-            "success_count": 1 if node["is_success"] else 0,
-            "failure_count": 0 if node["is_success"] else 1,
-            "avg_execution_ms": exec_ms,
-            "min_execution_ms": exec_ms,
-            "max_execution_ms": exec_ms,
-            "total_execution_ms": exec_ms,
+            "agent_id": agent_id,
+            "stat_date": stat_date,
+            "execution_count": d.execution_count,
+            "success_count": d.success_count,
+            "error_count": d.error_count,
+            "avg_response_ms": (
+                d.total_response_ms / d.execution_count if d.total_response_ms is not None else None
+            ),
+            "min_response_ms": d.min_response_ms,
+            "max_response_ms": d.max_response_ms,
+            "total_response_ms": d.total_response_ms,
+            "total_nodes_executed": d.total_nodes_executed,
+            "avg_success_rate": (
+                d.total_success_rate_sum / d.execution_count if d.total_success_rate_sum is not None else None
+            ),
+            "total_success_rate_sum": d.total_success_rate_sum,
+            "rag_used_count": d.rag_used_count,
+            "unique_conversations": d.unique_conversations,
+            "finalized_conversations": d.finalized_conversations,
+            "in_progress_conversations": max(d.unique_conversations - d.finalized_conversations, 0),
+            "thumbs_up_count": d.thumbs_up_count,
+            "thumbs_down_count": d.thumbs_down_count,
+            "total_input_tokens": d.total_input_tokens,
+            "total_output_tokens": d.total_output_tokens,
+            "total_cost_usd": d.total_cost_usd,
+            "last_aggregated_at": now,
             "is_deleted": 0,
             "created_at": now,
             "updated_at": now,
-        }
-
-        stmt = insert(NodeExecutionDailyStatsModel).values(row)
-        tbl = NodeExecutionDailyStatsModel.__table__
+        })
 
-        update_set = {
-            "execution_count": tbl.c.execution_count + stmt.excluded.execution_count,
-            "success_count": tbl.c.success_count + stmt.excluded.success_count,
-            "failure_count": tbl.c.failure_count + stmt.excluded.failure_count,
-            "updated_at": stmt.excluded.updated_at,
-        }
+    stmt = insert(AgentExecutionDailyStatsModel).values(rows)
+    tbl = AgentExecutionDailyStatsModel.__table__
+    excluded = stmt.excluded
+    execution_count = tbl.c.execution_count + excluded.execution_count
 
-        if exec_ms is not None:
-            update_set["total_execution_ms"] = (
-                func.coalesce(tbl.c.total_execution_ms, 0.0) + exec_ms
-            )
-            update_set["avg_execution_ms"] = (
-                (func.coalesce(tbl.c.total_execution_ms, 0.0) + exec_ms)
-                / (tbl.c.execution_count + 1)
-            )
-            update_set["min_execution_ms"] = func.least(
-                func.coalesce(tbl.c.min_execution_ms, exec_ms), exec_ms
-            )
-            update_set["max_execution_ms"] = func.greatest(
-                func.coalesce(tbl.c.max_execution_ms, exec_ms), exec_ms
-            )
+    update_set = {
+        "execution_count": execution_count,
+        "success_count": tbl.c.success_count + excluded.success_count,
+        "error_count": tbl.c.error_count + excluded.error_count,
+        "total_nodes_executed": tbl.c.total_nodes_executed + excluded.total_nodes_executed,
+        "rag_used_count": tbl.c.rag_used_count + excluded.rag_used_count,
+        "total_input_tokens": func.coalesce(tbl.c.total_input_tokens, 0) + excluded.total_input_tokens,
+        "total_output_tokens": func.coalesce(tbl.c.total_output_tokens, 0) + excluded.total_output_tokens,
+        "total_cost_usd": func.coalesce(tbl.c.total_cost_usd, 0.0) + excluded.total_cost_usd,
+        "total_response_ms": _add_nullable(tbl.c.total_response_ms, excluded.total_response_ms),
+        # NULL (kept as is) unless the batch has timed executions
+        "avg_response_ms": func.coalesce(
+            (func.coalesce(tbl.c.total_response_ms, 0.0) + excluded.total_response_ms) / execution_count,
+            tbl.c.avg_response_ms,
+        ),
+        # LEAST/GREATEST ignore NULLs
+        "min_response_ms": func.least(tbl.c.min_response_ms, excluded.min_response_ms),
+        "max_response_ms": func.greatest(tbl.c.max_response_ms, excluded.max_response_ms),
+        "total_success_rate_sum": _add_nullable(tbl.c.total_success_rate_sum, excluded.total_success_rate_sum),
+        "avg_success_rate": func.coalesce(
+            (func.coalesce(tbl.c.total_success_rate_sum, 0.0) + excluded.total_success_rate_sum) / execution_count,
+            tbl.c.avg_success_rate,
+        ),
+        "unique_conversations": tbl.c.unique_conversations + excluded.unique_conversations,
+        "finalized_conversations": tbl.c.finalized_conversations + excluded.finalized_conversations,
+        "in_progress_conversations": func.greatest(
+            tbl.c.in_progress_conversations + excluded.unique_conversations - excluded.finalized_conversations, 0
+        ),
+        "thumbs_up_count": tbl.c.thumbs_up_count + excluded.thumbs_up_count,
+        "thumbs_down_count": tbl.c.thumbs_down_count + excluded.thumbs_down_count,
+        # Only executions count as an aggregation (conversation/feedback events never did)
+        "last_aggregated_at": case(
+            (excluded.execution_count > 0, excluded.last_aggregated_at),
+            else_=tbl.c.last_aggregated_at,
+        ),
+        "updated_at": excluded.updated_at,
+    }
 
-        stmt = stmt.on_conflict_do_update(
-            constraint="uq_node_execution_daily_stats_agent_node_date",
-            set_=update_set,
-        )
-        await session.execute(stmt)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_agent_execution_daily_stats_agent_date",
+        set_=update_set,
+    )
+    await session.execute(stmt)
 
 
-async def _increment_conversation_counts(
-    session: AsyncSession, agent_id: UUID, event: str,
+async def _upsert_node_daily_stats(
+    session: AsyncSession, deltas: dict[tuple[UUID, str, date], _NodeDelta],
 ) -> None:
     """
-    Increment conversation counters on agent_execution_daily_stats.
-
-    event: "start" → unique_conversations += 1, in_progress_conversations += 1
-    event: "finalize" → finalized_conversations += 1, in_progress_conversations -= 1
+    Add the deltas to node_execution_daily_stats in one
+    INSERT ... ON CONFLICT DO UPDATE with atomic += increments.
     """
     now = datetime.now(timezone.utc)
-    stat_date = now.date()
-
-    row = {
-        "id": generate_sequential_uuid(),
-        "agent_id": agent_id,
-        "stat_date": stat_date,
-        "execution_count": 0,
-        "success_count": 0,
-        "error_count": 0,
-        "total_nodes_executed": 0,
-        "avg_success_rate": None,
-        "rag_used_count": 0,
-        "unique_conversations": 1 if event == "start" else 0,
-        "finalized_conversations": 1 if event == "finalize" else 0,
-        "in_progress_conversations": 1 if event == "start" else 0,
-        "thumbs_up_count": 0,
-        "thumbs_down_count": 0,
-        "last_aggregated_at": now,
-        "is_deleted": 0,
-        "created_at": now,
-        "updated_at": now,
-    }
+    rows = []
+    for (agent_id, node_type, stat_date), d in sorted(
+        deltas.items(), key=lambda item: (str(item[0][0]), item[0][1], item[0][2])
+    ):
+        rows.append({
+            "id": generate_sequential_uuid(),
+            "agent_id": agent_id,
+            "node_type": node_type,
+            "stat_date": stat_date,
+            "execution_count": d.execution_count,
+            "success_count": d.success_count,
+            "failure_count": d.failure_count,
+            "avg_execution_ms": (
+                d.total_execution_ms / d.execution_count if d.total_execution_ms is not None else None
+            ),
+            "min_execution_ms": d.min_execution_ms,
+            "max_execution_ms": d.max_execution_ms,
+            "total_execution_ms": d.total_execution_ms,
+            "is_deleted": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
 
-    stmt = insert(AgentExecutionDailyStatsModel).values(row)
-    tbl = AgentExecutionDailyStatsModel.__table__
+    stmt = insert(NodeExecutionDailyStatsModel).values(rows)
+    tbl = NodeExecutionDailyStatsModel.__table__
+    excluded = stmt.excluded
 
-    if event == "start":
-        update_set = {
-            "unique_conversations": tbl.c.unique_conversations + 1,
-            "in_progress_conversations": tbl.c.in_progress_conversations + 1,
-            "updated_at": stmt.excluded.updated_at,
-        }
-    else:  # finalize
-        update_set = {
-            "finalized_conversations": tbl.c.finalized_conversations + 1,
-            "in_progress_conversations": func.greatest(
-                tbl.c.in_progress_conversations - 1, 0
-            ),
-            "updated_at": stmt.excluded.updated_at,
-        }
+    update_set = {
+        "execution_count": tbl.c.execution_count + excluded.execution_count,
+        "success_count": tbl.c.success_count + excluded.success_count,
+        "failure_count": tbl.c.failure_count + excluded.failure_count,
+        "total_execution_ms": _add_nullable(tbl.c.total_execution_ms, excluded.total_execution_ms),
+        "avg_execution_ms": func.coalesce(
+            (func.coalesce(tbl.c.total_execution_ms, 0.0) + excluded.total_execution_ms)
+            / (tbl.c.execution_count + excluded.execution_count),
+            tbl.c.avg_execution_ms,
+        ),
+        "min_execution_ms": func.least(tbl.c.min_execution_ms, excluded.min_execution_ms),
+        "max_execution_ms": func.greatest(tbl.c.max_execution_ms, excluded.max_execution_ms),
+        "updated_at": excluded.updated_at,
+    }
 
     stmt = stmt.on_conflict_do_update(
-        constraint="uq_agent_execution_daily_stats_agent_date",
+        constraint="uq_node_execution_daily_stats_agent_node_date",
         set_=update_set,
     )
     await session.execute(stmt)
 
 
+async def _write_tenant_batch(
+    tenant_id: str,
+    agent_deltas: dict[tuple[UUID, date], _AgentDelta],
+    node_deltas: dict[tuple[UUID, str, date], _NodeDelta],
+) -> None:
+    from app.core.tenant_scope import set_tenant_context
+    from app.core.utils.db_connection_utils import create_tenant_request_scope
+    from app.dependencies.injector import injector
+
+    set_tenant_context(tenant_id)
+    async with create_tenant_request_scope():
+        session = injector.get(AsyncSession)
+        try:
+            if agent_deltas:
+                await _upsert_agent_daily_stats(session, agent_deltas)
+            if node_deltas:
+                await _upsert_node_daily_stats(session, node_deltas)
+            await session.commit()
+        finally:
+            await session.close()
+
+
 async def _get_agent_id_for_conversation(
     session: AsyncSession, conversation_id: UUID,
 ) -> UUID | None:
@@ -341,6 +473,151 @@ async def _get_agent_id_for_conversation(
     return result.scalar_one_or_none()
 
 
+class AnalyticsWriteBehind:
+    """
+    Accumulates analytics events and writes them in batches.
+
+    Events are folded into a _StatsBatch (or pushed to a shared Redis list when
+    use_redis is set); a flush runs flush_interval_ms after the first pending
+    event or as soon as max_events are pending. Failed writes are logged and
+    dropped — the Celery aggregation reconciles them.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = 1000,
+        max_events: int = 500,
+        enabled: bool = True,
+        use_redis: bool = False,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_events = max_events
+        self.enabled = enabled
+        self.use_redis = use_redis
+        self._batch = _StatsBatch()
+        self._pending = 0
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task] = set()
+        self.events = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+
+    async def add(self, event: dict[str, Any]) -> None:
+        """Queue one event (see _execution_event and _agent_event)"""
+        self.events += 1
+        if not self.enabled:
+            batch = _StatsBatch()
+            batch.add(event)
+            await self._write(batch)
+            return
+
+        if self.use_redis:
+            await self._get_redis().rpush(REDIS_EVENTS_KEY, json.dumps(event))
+        else:
+            self._batch.add(event)
+        self._pending += 1
+
+        if self._pending >= self.max_events:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Write all pending events"""
+        async with self._flush_lock:
+            self._pending = 0
+            if self.use_redis:
+                batch = await self._drain_redis()
+            else:
+                batch, self._batch = self._batch, _StatsBatch()
+            if batch:
+                self.flushes += 1
+                await self._write(batch)
+
+    async def _drain_redis(self) -> _StatsBatch:
+        batch = _StatsBatch()
+        redis = self._get_redis()
+        # Bounded so one flush cannot hold on to an ever-growing list
+        while len(batch) < self.max_events * 10:
+            raw_events = await redis.lpop(REDIS_EVENTS_KEY, self.max_events)
+            if not raw_events:
+                break
+            for raw in raw_events:
+                try:
+                    batch.add(json.loads(raw))
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Dropping malformed analytics event: %r", raw)
+        return batch
+
+    async def _write(self, batch: _StatsBatch) -> None:
+        for tenant_id in set(batch.agents) | set(batch.nodes):
+            agent_deltas = batch.agents.get(tenant_id, {})
+            node_deltas = batch.nodes.get(tenant_id, {})
+            try:
+                # Own task: the tenant context set for the write stays local to it
+                await asyncio.create_task(_write_tenant_batch(tenant_id, agent_deltas, node_deltas))
+                self.rows_written += len(agent_deltas) + len(node_deltas)
+                logger.debug(
+                    "Analytics flush for tenant %s: %d agent rows, %d node rows",
+                    tenant_id, len(agent_deltas), len(node_deltas),
+                )
+            except Exception:
+                self.failures += 1
+                logger.warning(
+                    "Incremental analytics update failed (Celery will reconcile)",
+                    exc_info=True,
+                )
+
+    def _get_redis(self):
+        from app.dependencies.dependency_injection import RedisString
+        from app.dependencies.injector import injector
+
+        return injector.get(RedisString)
+
+    async def close(self) -> None:
+        """Flush pending events (application shutdown)"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self.use_redis else "memory",
+            "pending_events": self._pending,
+            "events": self.events,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "avg_events_per_flush": round(self.events / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+_write_behind = AnalyticsWriteBehind(
+    flush_interval_ms=settings.ANALYTICS_FLUSH_INTERVAL_MS,
+    max_events=settings.ANALYTICS_FLUSH_MAX_EVENTS,
+    enabled=settings.ANALYTICS_WRITE_BEHIND_ENABLED,
+    use_redis=settings.ANALYTICS_WRITE_BEHIND_REDIS,
+)
+
+
+def get_analytics_write_behind() -> AnalyticsWriteBehind:
+    return _write_behind
+
+
 # ---------------------------------------------------------------------------
 # Public entry points (called via asyncio.create_task)
 # ---------------------------------------------------------------------------
@@ -349,27 +626,16 @@ async def _get_agent_id_for_conversation(
 async def update_stats_incrementally(agent_response: dict) -> None:
     """
     Fired after each agent_response_log is saved.
-    Increments execution counters and timing stats.
+    Queues the execution counters and timing stats.
     """
     try:
-        from app.core.utils.db_connection_utils import create_tenant_request_scope
-        from app.dependencies.injector import injector
+        from app.core.tenant_scope import get_tenant_context
 
         data = parse_agent_response_for_stats(agent_response)
         if data is None:
             return
 
-        async with create_tenant_request_scope():
-            session = injector.get(AsyncSession)
-            try:
-                await _increment_agent_daily_stats(session, data)
-                await _increment_node_daily_stats(session, data)
-                await session.commit()
-                logger.debug(
-                    "Incremental analytics update for agent %s", data["agent_id"]
-                )
-            finally:
-                await session.close()
+        await get_analytics_write_behind().add(_execution_event(get_tenant_context(), data))
 
     except Exception:
         logger.warning(
@@ -381,17 +647,11 @@ async def update_stats_incrementally(agent_response: dict) -> None:
 async def update_conversation_started(agent_id: UUID) -> None:
     """Fired when a new conversation starts. Increments unique + in_progress."""
     try:
-        from app.core.utils.db_connection_utils import create_tenant_request_scope
-        from app.dependencies.injector import injector
+        from app.core.tenant_scope import get_tenant_context
 
-        async with create_tenant_request_scope():
-            session = injector.get(AsyncSession)
-            try:
-                await _increment_conversation_counts(session, agent_id, "start")
-                await session.commit()
-                logger.debug("Conversation started for agent %s", agent_id)
-            finally:
-                await session.close()
+        await get_analytics_write_behind().add(
+            _agent_event(get_tenant_context(), agent_id, "conversation_started")
+        )
 
     except Exception:
         logger.warning(
@@ -400,27 +660,29 @@ async def update_conversation_started(agent_id: UUID) -> None:
         )
 
 
+async def _lookup_agent_id(conversation_id: UUID) -> UUID | None:
+    from app.core.utils.db_connection_utils import create_tenant_request_scope
+    from app.dependencies.injector import injector
+
+    async with create_tenant_request_scope():
+        session = injector.get(AsyncSession)
+        try:
+            return await _get_agent_id_for_conversation(session, conversation_id)
+        finally:
+            await session.close()
+
+
 async def update_conversation_finalized(conversation_id: UUID) -> None:
     """Fired when a conversation is finalized. Looks up agent_id, then increments."""
     try:
-        from app.core.utils.db_connection_utils import create_tenant_request_scope
-        from app.dependencies.injector import injector
+        from app.core.tenant_scope import get_tenant_context
 
-        async with create_tenant_request_scope():
-            session = injector.get(AsyncSession)
-            try:
-                agent_id = await _get_agent_id_for_conversation(
-                    session, conversation_id
-                )
-                if agent_id is None:
-                    return
-                await _increment_conversation_counts(session, agent_id, "finalize")
-                await session.commit()
-                logger.debug(
-                    "Conversation finalized for agent %s", agent_id
-                )
-            finally:
-                await session.close()
+        agent_id = await _lookup_agent_id(conversation_id)
+        if agent_id is None:
+            return
+        await get_analytics_write_behind().add(
+            _agent_event(get_tenant_context(), agent_id, "conversation_finalized")
+        )
 
     except Exception:
         logger.warning(
@@ -429,82 +691,19 @@ async def update_conversation_finalized(conversation_id: UUID) -> None:
         )
 
 
-async def _increment_thumbs(
-    session: AsyncSession, agent_id: UUID, is_thumbs_up: bool,
-) -> None:
-    """
-    Increment thumbs_up_count or thumbs_down_count on agent_execution_daily_stats.
-    """
-    now = datetime.now(timezone.utc)
-    stat_date = now.date()
-
-    row = {
-        "id": generate_sequential_uuid(),
-        "agent_id": agent_id,
-        "stat_date": stat_date,
-        "execution_count": 0,
-        "success_count": 0,
-        "error_count": 0,
-        "total_nodes_executed": 0,
-        "avg_success_rate": None,
-        "rag_used_count": 0,
-        "unique_conversations": 0,
-        "finalized_conversations": 0,
-        "in_progress_conversations": 0,
-        "thumbs_up_count": 1 if is_thumbs_up else 0,
-        "thumbs_down_count": 0 if is_thumbs_up else 1,
-        "last_aggregated_at": now,
-        "is_deleted": 0,
-        "created_at": now,
-        "updated_at": now,
-    }
-
-    stmt = insert(AgentExecutionDailyStatsModel).values(row)
-    tbl = AgentExecutionDailyStatsModel.__table__
-
-    if is_thumbs_up:
-        update_set = {
-            "thumbs_up_count": tbl.c.thumbs_up_count + 1,
-            "updated_at": stmt.excluded.updated_at,
-        }
-    else:
-        update_set = {
-            "thumbs_down_count": tbl.c.thumbs_down_count + 1,
-            "updated_at": stmt.excluded.updated_at,
-        }
-
-    stmt = stmt.on_conflict_do_update(
-        constraint="uq_agent_execution_daily_stats_agent_date",
-        set_=update_set,
-    )
-    await session.execute(stmt)
-
-
 async def update_feedback_given(
     conversation_id: UUID, is_thumbs_up: bool,
 ) -> None:
     """Fired when feedback is given on a message. Increments thumbs counters."""
     try:
-        from app.core.utils.db_connection_utils import create_tenant_request_scope
-        from app.dependencies.injector import injector
+        from app.core.tenant_scope import get_tenant_context
 
-        async with create_tenant_request_scope():
-            session = injector.get(AsyncSession)
-            try:
-                agent_id = await _get_agent_id_for_conversation(
-                    session, conversation_id
-                )
-                if agent_id is None:
-                    return
-                await _increment_thumbs(session, agent_id, is_thumbs_up)
-                await session.commit()
-                logger.debug(
-                    "Feedback (%s) recorded for agent %s",
-                    "thumbs_up" if is_thumbs_up else "thumbs_down",
-                    agent_id,
-                )
-            finally:
-                await session.close()
+        agent_id = await _lookup_agent_id(conversation_id)
+        if agent_id is None:
+            return
+        await get_analytics_write_behind().add(
+            _agent_event(get_tenant_context(), agent_id, "feedback", is_thumbs_up=is_thumbs_up)
+        )
 
     except Exception:
         logger.warning(
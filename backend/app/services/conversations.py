@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Sequence, Tuple
@@ -78,6 +79,13 @@ logger = logging.getLogger(__name__)
 conversation_id_key_builder_full = make_key_builder("conversation_id")
 
 
+@dataclass
+class InProgressAppendResult:
+    """Result of appending to an in-progress conversation (see ConversationService.append_in_progress_messages)"""
+    conversation: ConversationModel
+    new_messages: list[TranscriptMessageModel]
+
+
 @inject
 class ConversationService:
     def __init__(self, operator_statistics_service: OperatorStatisticsService,
@@ -261,23 +269,46 @@ class ConversationService:
         return conversation
 
 
+    async def append_in_progress_messages(self, conversation_id: UUID,
+            in_progress_conv_update: InProgConvTranscrUpdate) -> InProgressAppendResult:
+        """
+        Appends new transcript segments to an existing conversation and returns only the delta:
+        the conversation with its updated aggregates (messages not loaded) and the new messages
+        """
+        result = await self._append_in_progress_messages(conversation_id, in_progress_conv_update)
+        null_unloaded_attributes(result.conversation)
+        null_unloaded_attributes(result.new_messages)
+        return result
+
+
     async def update_in_progress_conversation(self, conversation_id: UUID,
             in_progress_conv_update: InProgConvTranscrUpdate) -> ConversationModel:
         """
-        Appends new transcript segments to an existing conversation
+        Appends new transcript segments to an existing conversation and returns it with all messages
         """
-        conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id)
+        result = await self._append_in_progress_messages(conversation_id, in_progress_conv_update)
+
+        full_conversation = await self.conversation_repo.fetch_conversation_by_id(result.conversation.id,
+                include_messages=True)
+        null_unloaded_attributes(full_conversation)
+        return full_conversation
+
+
+    async def _append_in_progress_messages(self, conversation_id: UUID,
+            in_progress_conv_update: InProgConvTranscrUpdate) -> InProgressAppendResult:
+        # The conversation row stays locked until the messages and aggregates are committed together,
+        # so concurrent appends neither reuse sequence numbers nor lose aggregate updates
+        conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id, for_update=True)
         if not conversation:
             raise AppException(ErrorKey.CONVERSATION_NOT_FOUND, status_code=404)
 
         if conversation.status == ConversationStatus.FINALIZED.value:
             raise AppException(ErrorKey.CONVERSATION_FINALIZED)
 
-        # Get only the count for sequence numbering
-        next_sequence = await self.transcript_message_repo.get_message_count(conversation_id)
-
-        # Save new messages
-        new_messages = await self.save_new_messages(conversation_id, in_progress_conv_update.messages, next_sequence)
+        next_sequence = await self.transcript_message_repo.get_latest_sequence_number(conversation_id) + 1
+        new_messages = [schema_to_transcript_message(segment, conversation_id, next_sequence + idx) for idx, segment in
+            enumerate(in_progress_conv_update.messages)]
+        await self.transcript_message_repo.add_messages(new_messages)
 
         # Convert new messages to schema format (filter MESSAGE type only)
         new_segment_inputs = [
@@ -298,25 +329,21 @@ class ConversationService:
         incremental_duration = calculate_duration_from_transcript(new_segment_inputs)
         conversation.duration = conversation.duration + incremental_duration
 
-        # Get all messages for transcript JSON (if needed for tone analysis)
-        all_messages = (await self.transcript_message_repo.get_messages_by_conversation_id(conversation_id, ))
-        hostility_limit = settings.HOSTILITY_SCORE_MESSAGE_COUNT
-        tone_messages = all_messages[-hostility_limit:]
-        transcript_json = transcript_messages_to_json(tone_messages,
-                exclude_fields={"feedback", "type", "sequence_number"})
-
-        # Update conversation
+        # Update conversation (commits the new messages and releases the lock)
         conversation.updated_by = get_current_user_id()
         conversation = await self.conversation_repo.update_conversation(conversation)
 
+        # Only the last messages are needed for tone analysis
+        tone_messages = await self.transcript_message_repo.get_last_messages(conversation_id,
+                settings.HOSTILITY_SCORE_MESSAGE_COUNT)
+        transcript_json = transcript_messages_to_json(tone_messages,
+                exclude_fields={"feedback", "type", "sequence_number"})
+
         # Perform partial tone check
         conversation = await self._analyze_in_progress_tone_and_mark(conversation, transcript_json,
                 llm_analyst_id=in_progress_conv_update.llm_analyst_id, )
 
-        full_conversation = await self.conversation_repo.fetch_conversation_by_id(conversation.id,
-                include_messages=True)
-        null_unloaded_attributes(full_conversation)
-        return full_conversation
+        return InProgressAppendResult(conversation=conversation, new_messages=new_messages)
 
 
     async def save_new_messages(self, conversation_id: UUID, input_messages: list[TranscriptSegmentInput],
@@ -540,15 +567,14 @@ class ConversationService:
 
 
     async def supervisor_takeover_conversation(self, conversation_id: UUID):
-        conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id)
+        conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id, for_update=True)
         self._validate_in_progress(conversation)
-        segments = [TranscriptSegmentInput(create_time=datetime.now(), start_time=0, end_time=0, speaker="", text="",
-                type="takeover", )]
-        transcript_update = InProgConvTranscrUpdate(messages=segments)
+        segment = TranscriptSegmentInput(create_time=datetime.now(), start_time=0, end_time=0, speaker="", text="",
+                type="takeover", )
 
-        # Get only the count for sequence numbering
-        next_sequence = await self.transcript_message_repo.get_message_count(conversation_id)
-        await self.save_new_messages(conversation_id, transcript_update.messages, next_sequence)
+        next_sequence = await self.transcript_message_repo.get_latest_sequence_number(conversation_id) + 1
+        await self.transcript_message_repo.add_messages(
+            [schema_to_transcript_message(segment, conversation_id, next_sequence)])
         conversation.supervisor_id = get_current_user_id()
         conversation.status = ConversationStatus.TAKE_OVER.value
         conversation = await self.conversation_repo.update_conversation(conversation)
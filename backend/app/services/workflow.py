@@ -55,17 +55,17 @@ class WorkflowService:
             setattr(orm_obj, field, value)
 
         updated = await self.repository.update(orm_obj)
-        from app.cache.redis_cache import invalidate_cache
+        from app.cache.redis_cache import invalidate_only_agent_cache
 
         if updated.agent:
-            await invalidate_cache("agents:get_by_id_full", updated.agent.id)
+            await invalidate_only_agent_cache(updated.agent.id)
         return WorkflowInDB.model_validate(updated, from_attributes=True)
 
     async def delete(self, workflow_id: UUID) -> None:
         orm_obj = await self.repository.get_by_id(workflow_id, eager=["agent"])
         if not orm_obj:
             raise AppException(status_code=404, error_key=ErrorKey.WORKFLOW_NOT_FOUND)
-        from app.cache.redis_cache import invalidate_cache
+        from app.cache.redis_cache import invalidate_only_agent_cache
         if orm_obj.agent:
-            await invalidate_cache("agents:get_by_id_full", orm_obj.agent.id)
+            await invalidate_only_agent_cache(orm_obj.agent.id)
         await self.repository.delete(orm_obj)
@@ -1,8 +1,14 @@
 import asyncio
+import functools
+import inspect
+import os
+import threading
+import time
 from celery import Task, shared_task
+from celery.signals import worker_process_shutdown, worker_shutdown
 from datetime import datetime
 import logging
-from typing import Callable, List, Any, Awaitable, Coroutine, Optional
+from typing import Callable, Dict, List, Any, Awaitable, Coroutine, Optional
 
 from app.services.tenant import TenantService
 from app.core.tenant_scope import set_tenant_context, clear_tenant_context
@@ -11,6 +17,54 @@ from app.core.config.settings import settings
 logger = logging.getLogger(__name__)
 
 
+# Worker-lifetime event loop, one per thread (solo/prefork workers run tasks on one thread)
+_loop_state = threading.local()
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_loop_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _loop_state.loop = loop
+    return loop
+
+
+def _cancel_leftover_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """Cancel tasks the coroutine left behind, as asyncio.run does before closing its loop."""
+    pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if not pending:
+        return
+    for task in pending:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+
+def _forget_worker_loop() -> None:
+    # The child of a fork must not drive the parent's loop (shared selector and pooled sockets)
+    _loop_state.loop = None
+
+
+os.register_at_fork(after_in_child=_forget_worker_loop)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_worker_loop(**kwargs) -> None:
+    """Close the pooled DB connections and the worker loop when the worker (process) exits."""
+    loop = getattr(_loop_state, "loop", None)
+    if loop is None or loop.is_closed() or loop.is_running():
+        return
+    from app.db.multi_tenant_session import multi_tenant_manager
+
+    try:
+        loop.run_until_complete(multi_tenant_manager.dispose_loop_engines())
+    except Exception as e:
+        logger.warning(f"Could not close database connections of the worker loop: {e}")
+    finally:
+        loop.close()
+        _loop_state.loop = None
+
+
 def run_async_in_celery(
     coro: Coroutine[Any, Any, Any],
     timeout: Optional[float] = None,
@@ -19,9 +73,12 @@ def run_async_in_celery(
     """
     Drive an async coroutine to completion inside a sync Celery task body.
 
-    Always creates a fresh event loop via ``asyncio.run`` so connection-pool
-    state (httpx, AsyncOpenAI, asyncpg) cannot leak across invocations in the
-    solo worker.
+    With ``CELERY_REUSE_EVENT_LOOP`` (default) every task of a worker process
+    runs on the same event loop, so the pooled DB connections, httpx clients
+    and Redis pools opened by one task are reused by the next. Tasks the
+    coroutine leaves running are cancelled when it returns, as with
+    ``asyncio.run``. Otherwise a fresh loop is created per task and the DB
+    engines opened on it are disposed before it closes.
 
     If ``timeout`` is provided, the coroutine is wrapped in ``asyncio.wait_for``
     so a hung downstream call raises ``asyncio.TimeoutError`` instead of
@@ -42,7 +99,25 @@ def run_async_in_celery(
             )
             raise
 
-    return asyncio.run(_runner())
+    if not settings.CELERY_REUSE_EVENT_LOOP:
+        async def _run_and_release() -> Any:
+            from app.db.multi_tenant_session import multi_tenant_manager
+
+            try:
+                return await _runner()
+            finally:
+                await multi_tenant_manager.dispose_loop_engines()
+
+        return asyncio.run(_run_and_release())
+
+    loop = _worker_loop()
+    if loop.is_running():
+        raise RuntimeError("run_async_in_celery() cannot be called from a running event loop")
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_runner())
+    finally:
+        _cancel_leftover_tasks(loop)
 
 
 class BaseTaskWithLogging(Task):
@@ -104,6 +179,7 @@ def create_task_wrapper(task_func: Callable[..., Awaitable[Any]]) -> Callable:
             wrapper = create_task_wrapper(my_task_async)
             return await run_task_for_all_tenants(wrapper, param1=param1)
     """
+    @functools.wraps(task_func)
     async def run_with_scope(**kwargs):
         """Inner wrapper that creates request scope and ensures cleanup"""
         from app.dependencies.injector import injector
@@ -135,6 +211,9 @@ def create_task_wrapper(task_func: Callable[..., Awaitable[Any]]) -> Callable:
 async def run_task_with_tenant_support(
     task_func: Callable[..., Awaitable[Any]],
     task_name: str,
+    *,
+    concurrency: Optional[int] = None,
+    tenant_timeout: Optional[float] = None,
     **kwargs
 ) -> dict:
     """
@@ -146,6 +225,8 @@ async def run_task_with_tenant_support(
     Args:
         task_func: The actual async task function to run
         task_name: Name of the task for logging purposes
+        concurrency: Databases processed at once (see run_task_for_all_tenants)
+        tenant_timeout: Seconds each database may take (see run_task_for_all_tenants)
         **kwargs: Arguments to pass to the task function
         
     Returns:
@@ -167,7 +248,9 @@ async def run_task_with_tenant_support(
         logger.info(f"Starting {task_name} task for all tenants...")
         
         wrapper = create_task_wrapper(task_func)
-        results = await run_task_for_all_tenants(wrapper, **kwargs)
+        results = await run_task_for_all_tenants(
+            wrapper, concurrency=concurrency, tenant_timeout=tenant_timeout, **kwargs
+        )
         
         logger.info(f"{task_name} completed for {len(results)} tenant(s)")
         return {
@@ -184,19 +267,50 @@ async def run_task_with_tenant_support(
         logger.info(f"{task_name} task finished.")
 
 
-async def run_task_for_all_tenants(task_func: Callable, **kwargs) -> List[dict]:
+# Seconds each database took in the last run of a task, by task and tenant slug.
+# The slowest start first, so one long tenant does not end up last in line.
+_tenant_durations: Dict[str, Dict[str, float]] = {}
+
+
+def _task_key(task_func: Callable) -> str:
+    func = inspect.unwrap(task_func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+async def run_task_for_all_tenants(
+    task_func: Callable,
+    *,
+    concurrency: Optional[int] = None,
+    tenant_timeout: Optional[float] = None,
+    **kwargs,
+) -> List[dict]:
     """
     Helper to run a task function for all active tenants and master database.
 
+    Up to ``concurrency`` databases are processed at once, each in its own
+    asyncio task, so the tenant context (and the request scope of
+    create_task_wrapper) of one tenant never leaks into another. A database
+    that runs longer than ``tenant_timeout`` seconds is cancelled and reported
+    as an error. Databases are started in a FIFO queue ordered by how long
+    they took in the previous run of the task, longest (and never seen) first.
+
     Args:
         task_func: Async function that runs the task logic
+        concurrency: Databases processed at once (default CELERY_TENANT_CONCURRENCY)
+        tenant_timeout: Seconds per database (default CELERY_TENANT_TIMEOUT_SECONDS, 0 = no limit)
         **kwargs: Arguments to pass to the task function
 
     Returns:
-        List of results for each tenant and master
+        List of results for master and each tenant, in that order, with the
+        ``duration_seconds`` each one took
     """
     results = []
+    background_task = settings.BACKGROUND_TASK
     settings.BACKGROUND_TASK = True
+    concurrency = max(1, concurrency or settings.CELERY_TENANT_CONCURRENCY)
+    if tenant_timeout is None:
+        tenant_timeout = settings.CELERY_TENANT_TIMEOUT_SECONDS or None
+    durations = _tenant_durations.setdefault(_task_key(task_func), {})
 
     try:
         from app.db.multi_tenant_session import multi_tenant_manager
@@ -204,92 +318,73 @@ async def run_task_for_all_tenants(task_func: Callable, **kwargs) -> List[dict]:
 
         session_factory = multi_tenant_manager.get_tenant_session_factory("master")
         async with session_factory() as session:
-            try:
-                repository = TenantRepository(session)
-                tenant_service = TenantService(repository=repository)
-                tenants = await tenant_service.get_all_tenants()
-
-                # First, run for master database (no tenant context)
-                try:
+            repository = TenantRepository(session)
+            tenant_service = TenantService(repository=repository)
+            tenants = await tenant_service.get_all_tenants()
+
+        # Master database first (no tenant context), then every tenant
+        targets = [{"tenant_id": "master", "tenant_name": "Master Database", "tenant_slug": "master"}]
+        targets += [
+            {"tenant_id": str(tenant.id), "tenant_name": tenant.name, "tenant_slug": tenant.slug}
+            for tenant in tenants
+        ]
+        if tenants:
+            logger.info(f"Running task for {len(tenants)} tenant(s), {concurrency} at a time")
+        else:
+            logger.info("No active tenants found")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_for(target: dict) -> Optional[dict]:
+            async with semaphore:
+                slug = target["tenant_slug"]
+                if slug == "master":
                     logger.info("Running task for master database")
                     clear_tenant_context()  # Ensure no tenant context
+                else:
+                    logger.info(f"Running task for tenant: {target['tenant_name']} ({slug})")
+                    set_tenant_context(str(slug))
 
-                    result = await task_func(**kwargs)
+                started = time.monotonic()
+                entry = None
+                try:
+                    result = await asyncio.wait_for(task_func(**kwargs), timeout=tenant_timeout)
                     if result:
-                        results.append(
-                            {
-                                "tenant_id": "master",
-                                "tenant_name": "Master Database",
-                                "tenant_slug": "master",
-                                "result": result,
-                            }
-                        )
+                        entry = {**target, "result": result}
+                except asyncio.TimeoutError:
+                    logger.error(f"Task for {target['tenant_name']} exceeded {tenant_timeout}s timeout; cancelled")
+                    entry = {**target, "error": f"Timed out after {tenant_timeout}s"}
                 except Exception as e:
-                    logger.error(
-                        f"Error running task for master database: {e}", exc_info=True
-                    )
-                    results.append(
-                        {
-                            "tenant_id": "master",
-                            "tenant_name": "Master Database",
-                            "tenant_slug": "master",
-                            "error": str(e),
-                        }
-                    )
-                finally:
-                    # Ensure tenant context is cleared after master run
-                    clear_tenant_context()
-
-                if not tenants:
-                    logger.info("No active tenants found")
-                    return results
-
-                logger.info(f"Running task for {len(tenants)} tenant(s)")
-
-                for tenant in tenants:
-                    try:
-                        # Set tenant context for this tenant
-                        set_tenant_context(str(tenant.slug))
-                        logger.info(
-                            f"Running task for tenant: {tenant.name} ({tenant.slug})"
-                        )
-
-                        # Run the task function with tenant context
-                        result = await task_func(**kwargs)
-                        if result:
-                            results.append(
-                                {
-                                    "tenant_id": str(tenant.id),
-                                    "tenant_name": tenant.name,
-                                    "tenant_slug": tenant.slug,
-                                    "result": result,
-                                }
-                            )
-
-                    except Exception as e:
-                        logger.error(
-                            f"Error running task for tenant {tenant.name}: {e}",
-                            exc_info=True,
-                        )
-                        results.append(
-                            {
-                                "tenant_id": str(tenant.id),
-                                "tenant_name": tenant.name,
-                                "tenant_slug": tenant.slug,
-                                "error": str(e),
-                            }
-                        )
-            finally:
-                # Clear tenant context after each tenant
-                clear_tenant_context()
-            # Session is automatically closed by the async context manager
+                    logger.error(f"Error running task for {target['tenant_name']}: {e}", exc_info=True)
+                    entry = {**target, "error": str(e)}
+
+                duration = time.monotonic() - started
+                durations[str(slug)] = duration
+                if entry is not None:
+                    entry["duration_seconds"] = round(duration, 3)
+                return entry
+
+        # Tasks reach the semaphore in creation order and it wakes waiters in FIFO order
+        order = sorted(
+            range(len(targets)),
+            key=lambda ix: -durations.get(str(targets[ix]["tenant_slug"]), float("inf")),
+        )
+        runs = {ix: asyncio.create_task(run_for(targets[ix])) for ix in order}
+        entries = await asyncio.gather(*(runs[ix] for ix in range(len(targets))))
+        results = [entry for entry in entries if entry is not None]
+
+        slowest = sorted(results, key=lambda entry: -entry["duration_seconds"])[:5]
+        logger.info(
+            "Slowest databases: "
+            + ", ".join(f"{entry['tenant_slug']} {entry['duration_seconds']:.1f}s" for entry in slowest)
+        )
 
     except Exception as e:
         logger.error(f"Error in run_task_for_all_tenants: {e}", exc_info=True)
     finally:
         # Ensure context is cleared
         clear_tenant_context()
-        # Reset BACKGROUND_TASK flag
-        settings.BACKGROUND_TASK = False
+        # Restore BACKGROUND_TASK flag (workers set it for their whole lifetime)
+        settings.BACKGROUND_TASK = background_task
 
     return results
@@ -7,6 +7,7 @@ from typing import Optional
 from uuid import UUID
 
 from app.api.v1.routes.agents import run_query_agent_logic
+from app.core.config.settings import settings
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.utils.enums.conversation_status_enum import ConversationStatus
@@ -27,6 +28,7 @@ from app.services.analytics_realtime import update_stats_incrementally
 from app.services.conversations import ConversationService
 from app.core.utils.custom_attributes import extract_custom_attributes
 from app.modules.workflow.engine.pii_anonymizer import PIIAnonymizer
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 from app.services.file_manager import FileManagerService
 from app.services.realtime_notifications import (
     emit_notification,
@@ -71,6 +73,43 @@ async def send_message_to_socket(
     )
 
 
+async def _relay_agent_stream(
+    channel: WorkflowEventChannel,
+    message_id: UUID,
+    conversation_id: UUID,
+    current_user_id: UUID,
+    tenant_id: str,
+) -> None:
+    """
+    Forward token deltas of the agent answer as partial-message frames, in order.
+
+    Frames carry the id of the final agent message, which is broadcast as a
+    regular "message" frame once the workflow completes and replaces the
+    partial text on the client (reconcile frame).
+    """
+    socket_connection_manager = injector.get(SocketConnectionManager)
+    seq = 0
+    async for event in channel.events():
+        seq += 1
+        try:
+            await socket_connection_manager.broadcast(
+                msg_type="message_delta",
+                payload={
+                    "id": str(message_id),
+                    "node_id": event.node_id,
+                    "speaker": "agent",
+                    "delta": event.text,
+                    "seq": seq,
+                },
+                room_id=conversation_id,
+                current_user_id=current_user_id,
+                required_topic="message",
+                tenant_id=tenant_id,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to relay streamed agent tokens: {e}")
+
+
 def _extract_spoken_text(agent_response: dict) -> str:
     """Extract the text the LLM generated before TTS converted it to audio."""
     try:
@@ -177,12 +216,28 @@ async def process_conversation_update_with_agent(
             model.metadata["audio_data"] = base64.b64encode(audio_bytes).decode("utf-8")
             model.metadata["audio_format"] = audio_format or "webm"
 
-        agent_response = await run_query_agent_logic(
-            agent_service,
-            str(agent.id),
-            session_message=model.messages[-1].text,
-            metadata=model.metadata,
-        )
+        # Partial frames and the final agent message share this id
+        agent_message_id = generate_sequential_uuid()
+        stream_channel = WorkflowEventChannel() if settings.CONVERSATION_STREAMING_ENABLED else None
+        relay_task = None
+        if stream_channel is not None:
+            relay_task = asyncio.create_task(
+                _relay_agent_stream(stream_channel, agent_message_id, conversation_id, current_user_id, tenant_id)
+            )
+
+        try:
+            agent_response = await run_query_agent_logic(
+                agent_service,
+                str(agent.id),
+                session_message=model.messages[-1].text,
+                metadata=model.metadata,
+                event_channel=stream_channel,
+            )
+        finally:
+            if stream_channel is not None:
+                # Deliver the remaining deltas before the reconcile frame below
+                stream_channel.close()
+                await relay_task
 
         # Set formatted agent message in transcript
         now = datetime.now(timezone.utc)
@@ -193,7 +248,7 @@ async def process_conversation_update_with_agent(
             response_output = agent_response.get("response", {})
             form_schema = response_output.get("form_schema", {}) if isinstance(response_output, dict) else {}
             transcript_object = TranscriptSegmentInput(
-                id=generate_sequential_uuid(),
+                id=agent_message_id,
                 create_time=now,
                 start_time=elapsed_seconds,
                 end_time=elapsed_seconds,
@@ -210,7 +265,7 @@ async def process_conversation_update_with_agent(
                 audio_fmt = agent_answer.get("format", "mp3")
                 spoken_text = _extract_spoken_text(agent_response)
                 transcript_object = TranscriptSegmentInput(
-                    id=generate_sequential_uuid(),
+                    id=agent_message_id,
                     create_time=now,
                     start_time=elapsed_seconds,
                     end_time=elapsed_seconds,
@@ -223,7 +278,7 @@ async def process_conversation_update_with_agent(
             else:
                 # Normal text response
                 transcript_object = TranscriptSegmentInput(
-                    id=generate_sequential_uuid(),
+                    id=agent_message_id,
                     create_time=now,
                     start_time=elapsed_seconds,
                     end_time=elapsed_seconds,
@@ -502,7 +557,7 @@ async def process_file_upload_from_chat(
             raise AppException(ErrorKey.CONVERSATION_NOT_FOUND)
 
         # update the conversation with the file data
-        await service.update_in_progress_conversation(conversation_id, model)
+        await service.append_in_progress_messages(conversation_id, model)
 
         # send the message to the socket
         await send_message_to_socket(message, conversation_id, current_user_id, tenant_id)
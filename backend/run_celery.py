@@ -87,6 +87,8 @@ if __name__ == "__main__":
     # main process, so a daemon thread here reflects worker liveness directly.
     if "worker" in sys.argv:
         _start_heartbeat_thread()
+        # Every task of this worker uses the Celery (small, loop-bound) DB pools
+        settings.BACKGROUND_TASK = True
 
     # Pass all command line arguments to Celery
     sys.argv[0] = 'celery'  # Replace script name with 'celery'
@@ -0,0 +1,88 @@
+"""
+Benchmark LEGRA ingestion I/O: segmented appends vs. whole-KB rewrites.
+
+Ingests N synthetic documents (random embeddings, no chunking/embedding model)
+into a temporary KB, once with SegmentStore appends and once with the previous
+pattern (load docs_meta.json + emb_matrix.npy, vstack, rewrite both per
+document). Segmented ingestion should grow linearly with N, the rewrite pattern
+quadratically.
+
+Usage (from backend/):
+    python scripts/benchmarks/legra_ingestion_benchmark.py
+    python scripts/benchmarks/legra_ingestion_benchmark.py --docs 100 200 400 800 --chunks 20 --dim 384
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.modules.data.providers.legra.storage import SegmentStore  # noqa: E402
+
+
+def make_document(rnd: np.random.Generator, doc_ix: int, chunks: int, dim: int):
+    doc_id = f"KB:bench#doc-{doc_ix}"
+    meta = [
+        {"kb_id": "bench", "doc_id": doc_id, "chunk_ix": ix, "text": f"chunk {ix} of document {doc_ix} " * 8}
+        for ix in range(chunks)
+    ]
+    return meta, rnd.standard_normal((chunks, dim), dtype=np.float32)
+
+
+def ingest_segmented(kb_dir: Path, docs: int, chunks: int, dim: int) -> float:
+    rnd = np.random.default_rng(0)
+    store = SegmentStore(kb_dir).open()
+    start = time.perf_counter()
+    for doc_ix in range(docs):
+        store.append(*make_document(rnd, doc_ix, chunks, dim))
+    store.compact()  # finalization materializes one segment
+    elapsed = time.perf_counter() - start
+    meta, emb = store.materialize()
+    assert len(meta) == len(emb) == docs * chunks
+    return elapsed
+
+
+def ingest_rewrite(kb_dir: Path, docs: int, chunks: int, dim: int) -> float:
+    rnd = np.random.default_rng(0)
+    kb_dir.mkdir(parents=True)
+    start = time.perf_counter()
+    for doc_ix in range(docs):
+        if (kb_dir / "docs_meta.json").exists():
+            with open(kb_dir / "docs_meta.json", encoding="utf-8") as f:
+                existing_meta = json.load(f)
+            existing_embs = np.load(kb_dir / "emb_matrix.npy")
+        else:
+            existing_meta, existing_embs = [], np.empty((0, dim), dtype=np.float32)
+        meta, emb = make_document(rnd, doc_ix, chunks, dim)
+        with open(kb_dir / "docs_meta.json", "w", encoding="utf-8") as f:
+            json.dump(existing_meta + meta, f, ensure_ascii=False, indent=2)
+        np.save(kb_dir / "emb_matrix.npy", np.vstack([existing_embs, emb]))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--chunks", type=int, default=20, help="Chunks per document")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    args = parser.parse_args()
+
+    print(f"{'docs':>6} {'segmented':>12} {'per doc':>10} {'rewrite':>12} {'per doc':>10}")
+    for docs in args.docs:
+        with tempfile.TemporaryDirectory() as tmp:
+            segmented = ingest_segmented(Path(tmp) / "segmented", docs, args.chunks, args.dim)
+            rewrite = ingest_rewrite(Path(tmp) / "rewrite", docs, args.chunks, args.dim)
+        print(
+            f"{docs:>6} {segmented:>11.2f}s {segmented / docs * 1000:>8.2f}ms "
+            f"{rewrite:>11.2f}s {rewrite / docs * 1000:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark LEGRA kNN graph construction: full vs. incremental finalize.
+
+For each corpus size, builds the neighbour lists of N synthetic clustered
+embeddings from scratch, then re-finalizes after adding and deleting a small
+share of the chunks with IncrementalKNN.update. Reports the previous
+exact scikit-learn build (fit + query all N, skipped above --sklearn-max-rows)
+and the recall of the approximate lists against exact neighbours on a sample.
+With --cluster, also times Leiden from singletons vs. warm-started from the
+previous communities.
+
+Usage (from backend/):
+    python scripts/benchmarks/legra_knn_graph_benchmark.py
+    python scripts/benchmarks/legra_knn_graph_benchmark.py --rows 10000 100000 1000000 --dim 384 --cluster
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.modules.data.providers.legra.graph.neighbors import IncrementalKNN  # noqa: E402
+
+
+def make_embeddings(rnd: np.random.Generator, rows: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    labels = rnd.integers(0, len(centers), rows)
+    return (centers[labels] + 0.5 * rnd.standard_normal((rows, dim), dtype=np.float32)).astype(np.float32)
+
+
+def sklearn_build(emb: np.ndarray, k: int) -> float:
+    from sklearn.neighbors import NearestNeighbors
+
+    start = time.perf_counter()
+    nbrs = NearestNeighbors(n_neighbors=k, metric="cosine").fit(emb)
+    nbrs.kneighbors(emb, n_neighbors=k)
+    return time.perf_counter() - start
+
+
+def recall(state, emb: np.ndarray, k: int, sample: np.ndarray) -> float:
+    """Share of the exact top-k neighbours (cosine) found for the sampled rows."""
+    normed = emb / (np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12)
+    positions = state.positions()
+    hits = 0
+    for row in sample:
+        sims = normed @ normed[row]
+        sims[row] = -np.inf
+        exact = set(np.argpartition(-sims, k)[:k].tolist())
+        found = set(positions[state.neighbors[row][state.neighbors[row] >= 0]].tolist())
+        hits += len(exact & found)
+    return hits / (k * len(sample))
+
+
+def cluster_times(full_state, updated_state) -> tuple[float, float]:
+    import igraph as ig
+
+    from app.modules.data.providers.legra.clustering import LeidenClusterer
+
+    clusterer = LeidenClusterer(resolution_parameter=0.5)
+    full_state.labels = np.asarray(
+        clusterer.find_partition(ig.Graph(n=len(full_state), edges=full_state.edges().tolist())), dtype=np.int64
+    )
+    graph = ig.Graph(n=len(updated_state), edges=updated_state.edges().tolist())
+    start = time.perf_counter()
+    clusterer.find_partition(graph)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    clusterer.find_partition(graph, initial_membership=updated_state.warm_start_labels(full_state))
+    return cold, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--neighbors", type=int, default=10)
+    parser.add_argument("--added", type=float, default=0.01, help="Share of chunks added before re-finalizing")
+    parser.add_argument("--deleted", type=float, default=0.005, help="Share of chunks deleted before re-finalizing")
+    parser.add_argument("--sklearn-max-rows", type=int, default=100_000)
+    parser.add_argument("--recall-sample", type=int, default=200)
+    parser.add_argument("--cluster", action="store_true", help="Also time cold vs. warm-started Leiden")
+    args = parser.parse_args()
+
+    knn = IncrementalKNN(n_neighbors=args.neighbors)
+    rnd = np.random.default_rng(0)
+    print(
+        f"{'rows':>9} {'sklearn':>9} {'full':>9} {'increment':>10} {'recall':>7}"
+        + (f" {'leiden':>9} {'warm':>9}" if args.cluster else "")
+    )
+    for rows in args.rows:
+        centers = rnd.standard_normal((max(rows // 500, 8), args.dim), dtype=np.float32)
+        emb = make_embeddings(rnd, rows, args.dim, centers)
+        keys = np.arange(rows, dtype=np.int64)
+
+        baseline = f"{sklearn_build(emb, args.neighbors):>8.2f}s" if rows <= args.sklearn_max_rows else f"{'-':>9}"
+
+        start = time.perf_counter()
+        full_state = knn.build(emb, keys)
+        full = time.perf_counter() - start
+
+        deleted = rnd.choice(rows, size=int(rows * args.deleted), replace=False)
+        kept = np.setdiff1d(np.arange(rows), deleted)
+        added = int(rows * args.added)
+        new_emb = np.vstack([emb[kept], make_embeddings(rnd, added, args.dim, centers)])
+        new_keys = np.concatenate([keys[kept], np.arange(rows, rows + added, dtype=np.int64)])
+        start = time.perf_counter()
+        updated = knn.update(full_state, new_emb, new_keys)
+        increment = time.perf_counter() - start
+
+        sample = rnd.choice(len(new_emb), size=min(args.recall_sample, len(new_emb)), replace=False)
+        line = (
+            f"{rows:>9} {baseline} {full:>8.2f}s {increment:>9.2f}s "
+            f"{recall(updated, new_emb, args.neighbors, sample):>7.3f}"
+        )
+        if args.cluster:
+            cold, warm = cluster_times(full_state, updated)
+            line += f" {cold:>8.2f}s {warm:>8.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
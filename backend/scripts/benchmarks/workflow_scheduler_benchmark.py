@@ -0,0 +1,166 @@
+"""
+Benchmark the workflow scheduler on synthetic DAGs with mocked node latencies.
+
+Compares the dependency-driven scheduler with the previous recursive fan-out
+(each completed node re-checks its successors and recurses, with joins running
+once the last branch arrives).
+
+Usage (from backend/):
+    python scripts/benchmarks/workflow_scheduler_benchmark.py --nodes 200 --runs 5
+    python scripts/benchmarks/workflow_scheduler_benchmark.py --nodes 200 --zero-latency
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.modules.workflow.engine.scheduler import (  # noqa: E402
+    SchedulerLimits,
+    WorkflowGraph,
+    WorkflowScheduler,
+)
+
+NODE_TYPES = {
+    "llmModelNode": (0.05, 0.20),
+    "sqlNode": (0.01, 0.05),
+    "pythonCodeNode": (0.005, 0.02),
+    "templateNode": (0.0, 0.001),
+}
+
+
+def build_dag(num_nodes: int, width: int, seed: int) -> tuple[WorkflowGraph, dict[str, float]]:
+    """Layered random DAG: every node depends on 1-3 nodes of the previous layer."""
+    rnd = random.Random(seed)
+    layers = [["n0"]]
+    count = 1
+    while count < num_nodes:
+        size = min(rnd.randint(1, width), num_nodes - count)
+        layers.append([f"n{count + i}" for i in range(size)])
+        count += size
+
+    edges = []
+    for previous, layer in zip(layers, layers[1:]):
+        for node_id in layer:
+            for source_id in rnd.sample(previous, k=min(len(previous), rnd.randint(1, 3))):
+                edges.append((source_id, node_id))
+        # Keep every previous node connected so nothing dangles
+        for source_id in previous:
+            if not any(s == source_id for s, _ in edges):
+                edges.append((source_id, rnd.choice(layer)))
+
+    nodes = [n for layer in layers for n in layer]
+    node_types = {n: rnd.choice(list(NODE_TYPES)) for n in nodes}
+    node_types["n0"] = "chatInputNode"
+    latencies = {n: rnd.uniform(*NODE_TYPES.get(node_types[n], (0.0, 0.0))) for n in nodes}
+
+    graph = WorkflowGraph(
+        node_types=node_types,
+        successors={n: [t for s, t in edges if s == n] for n in nodes},
+        required_sources={n: [s for s, t in edges if t == n] for n in nodes},
+    )
+    return graph, latencies
+
+
+class ExecutionBudgetExceeded(Exception):
+    pass
+
+
+async def run_scheduler(graph: WorkflowGraph, latencies: dict[str, float], limits: SchedulerLimits) -> int:
+    """Return the number of node executions."""
+    outputs: dict[str, dict] = {}
+    executions = 0
+
+    async def run_node(node_id: str, isolated: bool):
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(latencies[node_id])
+        outputs[node_id] = {"ok": True}
+        return outputs[node_id]
+
+    scheduler = WorkflowScheduler(graph, run_node, lambda n: n in outputs, limits=limits)
+    await scheduler.run("n0")
+    return executions
+
+
+async def run_recursive(graph: WorkflowGraph, latencies: dict[str, float]) -> int:
+    """
+    The previous algorithm: recurse into successors, gather, skip unsatisfied joins.
+
+    Every path that reaches a join after all of its inputs exist re-executes it, so
+    the execution count is capped to keep the benchmark finite.
+    """
+    outputs: dict[str, dict] = {}
+    executions = 0
+    budget = 20 * len(graph.node_types)
+
+    async def execute(node_id: str, visited: set, skip_check: bool = False):
+        nonlocal executions
+        if node_id in visited:
+            return
+        visited.add(node_id)
+        if not skip_check and any(s not in outputs for s in graph.required_sources[node_id]):
+            return
+        executions += 1
+        if executions > budget:
+            raise ExecutionBudgetExceeded()
+        await asyncio.sleep(latencies[node_id])
+        outputs[node_id] = {"ok": True}
+        results = await asyncio.gather(
+            *(execute(t, visited.copy()) for t in graph.successors[node_id]),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, ExecutionBudgetExceeded):
+                raise result
+
+    try:
+        await execute("n0", set(), skip_check=True)
+    except ExecutionBudgetExceeded:
+        pass
+    return executions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=200)
+    parser.add_argument("--width", type=int, default=12)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--llm-limit", type=int, default=0, help="Per-execution cap for llmModelNode")
+    parser.add_argument("--zero-latency", action="store_true", help="Measure pure scheduling overhead")
+    args = parser.parse_args()
+
+    limits = SchedulerLimits(max_concurrency=args.max_concurrency)
+    if args.llm_limit:
+        limits.node_type_limits["llmModelNode"] = args.llm_limit
+
+    results: dict[str, list[float]] = {"recursive": [], "scheduler": []}
+    executions: dict[str, list[int]] = {"recursive": [], "scheduler": []}
+    for run in range(args.runs):
+        graph, latencies = build_dag(args.nodes, args.width, seed=run)
+        if args.zero_latency:
+            latencies = dict.fromkeys(latencies, 0.0)
+        for name, factory in (
+            ("recursive", lambda: run_recursive(graph, latencies)),
+            ("scheduler", lambda: run_scheduler(graph, latencies, limits)),
+        ):
+            start = time.perf_counter()
+            executions[name].append(asyncio.run(factory()))
+            results[name].append(time.perf_counter() - start)
+
+    for name, timings in results.items():
+        print(
+            f"{name:>10}: median {statistics.median(timings) * 1000:8.1f} ms  "
+            f"min {min(timings) * 1000:8.1f} ms  max {max(timings) * 1000:8.1f} ms  "
+            f"node executions/run {statistics.median(executions[name]):.0f} (graph has {args.nodes})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark Redis fan-in for WebSocket relay nodes: websocket:* vs. per-room channels.
+
+Starts N subscriber "nodes", each serving a disjoint share of the rooms, then
+publishes messages to random rooms. With the pattern subscription every node
+receives (and has to decode) every message; with per-room subscriptions a node
+only receives the traffic of its own rooms. Needs a reachable Redis server.
+
+Usage (from backend/):
+    python scripts/benchmarks/ws_relay_fanin_benchmark.py --redis-url redis://localhost:6379/0
+    python scripts/benchmarks/ws_relay_fanin_benchmark.py --nodes 8 --rooms 400 --messages 20000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import redis.asyncio as aioredis
+
+CHANNEL_PREFIX = "websocket:bench:"
+
+
+async def run_node(redis_client, mode: str, rooms: list[str], stop: asyncio.Event, ready: asyncio.Event) -> dict:
+    """Receive until stopped; return received/delivered counts and decode time."""
+    pubsub = redis_client.pubsub()
+    own = set(rooms)
+    if mode == "pattern":
+        await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+    else:
+        await pubsub.subscribe(*(f"{CHANNEL_PREFIX}{room}" for room in rooms))
+    ready.set()
+
+    received = delivered = 0
+    decode_seconds = 0.0
+    try:
+        while not stop.is_set():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.2)
+            if not message or message["type"] not in ("message", "pmessage"):
+                continue
+            received += 1
+            start = time.perf_counter()
+            data = json.loads(message["data"])
+            decode_seconds += time.perf_counter() - start
+            if data["room_id"] in own:
+                delivered += 1
+    finally:
+        await pubsub.aclose()
+    return {"received": received, "delivered": delivered, "decode_seconds": decode_seconds}
+
+
+async def run_mode(redis_url: str, mode: str, args) -> list[dict]:
+    redis_client = aioredis.from_url(redis_url, decode_responses=True)
+    room_ids = [f"room-{i}" for i in range(args.rooms)]
+    stop = asyncio.Event()
+    readies = [asyncio.Event() for _ in range(args.nodes)]
+    nodes = [
+        asyncio.create_task(run_node(redis_client, mode, room_ids[n :: args.nodes], stop, readies[n]))
+        for n in range(args.nodes)
+    ]
+    await asyncio.gather(*(ready.wait() for ready in readies))
+
+    rnd = random.Random(0)
+    payload = {"text": "x" * args.payload_bytes}
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for i in range(args.messages):
+            room = rnd.choice(room_ids)
+            pipe.publish(f"{CHANNEL_PREFIX}{room}", json.dumps({"type": "message", "room_id": room, "payload": payload}))
+            if i % 500 == 499:
+                await pipe.execute()
+        await pipe.execute()
+
+    # Let the subscribers drain their buffers
+    await asyncio.sleep(args.drain_seconds)
+    stop.set()
+    results = await asyncio.gather(*nodes)
+    await redis_client.aclose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--drain-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for mode in ("pattern", "rooms"):
+        results = asyncio.run(run_mode(args.redis_url, mode, args))
+        received = sum(r["received"] for r in results)
+        delivered = sum(r["delivered"] for r in results)
+        decode_ms = sum(r["decode_seconds"] for r in results) * 1000
+        print(
+            f"{mode:>8}: received/node {received / args.nodes:9.0f}  "
+            f"delivered/node {delivered / args.nodes:8.0f}  "
+            f"wasted {100 * (received - delivered) / max(received, 1):5.1f}%  "
+            f"decode {decode_ms:8.1f} ms total"
+        )
+
+
+if __name__ == "__main__":
+    main()
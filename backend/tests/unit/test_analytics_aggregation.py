@@ -0,0 +1,178 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core.config.settings import settings
+from app.core.utils.quantile_sketch import QuantileSketch
+from app.repositories.analytics_aggregation import LogPosition
+from app.services.analytics_aggregation import AnalyticsAggregationService
+
+AGENT = uuid4()
+DAY_1 = datetime(2026, 3, 1, 9, tzinfo=timezone.utc)
+DAY_2 = DAY_1 + timedelta(days=1)
+
+
+class _FakeRepo:
+    """In-memory AnalyticsAggregationRepository"""
+
+    def __init__(self):
+        self.logs = []
+        self.conversations = {}
+        self.agent_rows = {}
+        self.node_rows = {}
+        self.checkpoint = None
+        self.batch_sizes = []
+
+    def add_log(self, logged_at, status="success", total_ms=100.0, nodes=(), thumbs_up=0):
+        conversation_id = uuid4()
+        self.conversations[conversation_id] = SimpleNamespace(
+            id=conversation_id, status="finalized", thumbs_up_count=thumbs_up, thumbs_down_count=0)
+        payload = {
+            "agent_id": str(AGENT),
+            "status": status,
+            "row_agent_response": {
+                "performance_metrics": {"totalExecutionTime": total_ms},
+                "state": {"nodeExecutionStatus": {
+                    str(i): {"type": node_type, "status": node_status, "time_taken": 10.0 * (i + 1)}
+                    for i, (node_type, node_status) in enumerate(nodes)
+                }},
+            },
+        }
+        self.logs.append(SimpleNamespace(id=uuid4(), logged_at=logged_at, conversation_id=conversation_id,
+                raw_response=json.dumps(payload)))
+
+    async def get_last_aggregation_timestamp(self):
+        return max((row["last_aggregated_at"] for row in self.agent_rows.values()), default=None)
+
+    async def get_earliest_log_timestamp(self):
+        return min((log.logged_at for log in self.logs), default=None)
+
+    async def get_affected_dates_since(self, since, until):
+        return sorted({log.logged_at.date() for log in self.logs if since <= log.logged_at <= until})
+
+    async def iter_response_log_batches(self, since, until, *, after=None, batch_size=5000):
+        rows = sorted((log for log in self.logs if since <= log.logged_at <= until),
+                key=lambda log: (log.logged_at, log.id))
+        if after is not None:
+            rows = [log for log in rows if (log.logged_at, log.id) > tuple(after)]
+        for start in range(0, len(rows), batch_size):
+            self.batch_sizes.append(len(rows[start:start + batch_size]))
+            yield rows[start:start + batch_size]
+
+    async def get_conversation_snapshots(self, conversation_ids):
+        return {c: self.conversations[c] for c in conversation_ids if c in self.conversations}
+
+    async def get_agent_aggregation_states(self, keys):
+        return {key: self.agent_rows[key]["aggregation_state"] for key in keys if key in self.agent_rows}
+
+    async def get_node_aggregation_states(self, keys):
+        return {key: self.node_rows[key]["aggregation_state"] for key in keys if key in self.node_rows}
+
+    async def upsert_agent_daily_stats(self, stats_list, *, commit=True):
+        for stats in stats_list:
+            self.agent_rows[(stats["agent_id"], stats["stat_date"])] = {
+                **stats, "last_aggregated_at": datetime.now(timezone.utc)}
+
+    async def upsert_node_daily_stats(self, stats_list, *, commit=True):
+        for stats in stats_list:
+            self.node_rows[(stats["agent_id"], stats["node_type"], stats["stat_date"])] = stats
+
+    async def save_checkpoint(self, position):
+        self.checkpoint = position
+
+    async def get_checkpoint(self):
+        return self.checkpoint
+
+
+def _recomputed(repo):
+    """Rows a from-scratch aggregation of all of repo's logs produces"""
+    fresh = _FakeRepo()
+    fresh.logs, fresh.conversations = list(repo.logs), repo.conversations
+    return fresh
+
+
+def _without_timestamps(rows):
+    return {key: {k: v for k, v in row.items() if k != "last_aggregated_at"} for key, row in rows.items()}
+
+
+@pytest.fixture(autouse=True)
+def aggregation_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_AGGREGATION_INCREMENTAL", True)
+    monkeypatch.setattr(settings, "ANALYTICS_AGGREGATION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "ANALYTICS_AGGREGATION_LAG_SECONDS", 0)
+
+
+class TestAnalyticsAggregationService:
+    @pytest.mark.asyncio
+    async def test_incremental_run_matches_full_recompute(self):
+        repo = _FakeRepo()
+        for minute, status in enumerate(["success", "error", "success"]):
+            repo.add_log(DAY_1 + timedelta(minutes=minute), status, 100.0 * (minute + 1),
+                    nodes=[("llm", "success"), ("tool", status)], thumbs_up=1)
+        service = AnalyticsAggregationService(repo)
+        await service.aggregate_daily_stats()
+        assert repo.checkpoint == LogPosition(repo.logs[-1].logged_at, repo.logs[-1].id)
+
+        repo.add_log(DAY_1 + timedelta(hours=1), "success", 50.0, nodes=[("llm", "error")])
+        repo.add_log(DAY_2, "success", 700.0, nodes=[("llm", "success")])
+        repo.batch_sizes.clear()
+        result = await service.aggregate_daily_stats()
+
+        assert result == {"agent_stats_upserted": 2, "node_stats_upserted": 2}
+        assert sum(repo.batch_sizes) == 2
+        fresh = _recomputed(repo)
+        await AnalyticsAggregationService(fresh).aggregate_daily_stats()
+        assert _without_timestamps(repo.agent_rows) == _without_timestamps(fresh.agent_rows)
+        assert repo.node_rows == fresh.node_rows
+
+        day_1 = repo.agent_rows[(AGENT, DAY_1.date())]
+        assert (day_1["execution_count"], day_1["success_count"], day_1["error_count"]) == (4, 3, 1)
+        assert (day_1["min_response_ms"], day_1["max_response_ms"], day_1["total_response_ms"]) == (50.0, 300.0, 650.0)
+        assert (day_1["unique_conversations"], day_1["finalized_conversations"], day_1["thumbs_up_count"]) == (4, 4, 3)
+        assert day_1["p50_response_ms"] == pytest.approx(100.0, rel=0.01)
+        llm = repo.node_rows[(AGENT, "llm", DAY_1.date())]
+        assert (llm["execution_count"], llm["failure_count"]) == (4, 1)
+
+    @pytest.mark.asyncio
+    async def test_rows_without_partial_aggregate_are_recomputed(self):
+        repo = _FakeRepo()
+        repo.add_log(DAY_1, nodes=[("llm", "success")])
+        service = AnalyticsAggregationService(repo)
+        await service.aggregate_daily_stats()
+        # Counters bumped by the realtime path carry no partial aggregate
+        repo.agent_rows[(AGENT, DAY_1.date())].update(execution_count=99, aggregation_state=None)
+
+        repo.add_log(DAY_1 + timedelta(minutes=5), nodes=[("llm", "success")])
+        await service.aggregate_daily_stats()
+
+        row = repo.agent_rows[(AGENT, DAY_1.date())]
+        assert row["execution_count"] == 2 and row["aggregation_state"]["execution_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_no_new_logs_is_a_no_op(self):
+        repo = _FakeRepo()
+        repo.add_log(DAY_1)
+        service = AnalyticsAggregationService(repo)
+        await service.aggregate_daily_stats()
+        checkpoint = repo.checkpoint
+
+        assert await service.aggregate_daily_stats() == {"agent_stats_upserted": 0, "node_stats_upserted": 0}
+        assert repo.checkpoint == checkpoint
+
+
+class TestQuantileSketch:
+    def test_quantiles_are_within_relative_accuracy_and_mergeable(self):
+        whole, low, high = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(1, 1001):
+            whole.add(value)
+            (low if value <= 500 else high).add(value)
+        low.merge(high)
+        restored = QuantileSketch.from_dict(low.to_dict())
+
+        assert restored.count == 1000
+        assert restored.quantile(0.95) == whole.quantile(0.95) == pytest.approx(950, rel=0.01)
+        assert restored.quantile(0.5) == pytest.approx(500, rel=0.01)
+        assert QuantileSketch().quantile(0.5) is None
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import date
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import analytics_realtime
+from app.services.analytics_realtime import AnalyticsWriteBehind, _execution_event, _agent_event
+
+AGENT = uuid4()
+
+
+def _execution(response_ms=100.0, is_success=True, nodes=None):
+    return _execution_event("tenant_a", {
+        "agent_id": AGENT,
+        "stat_date": date(2026, 1, 1),
+        "is_success": is_success,
+        "response_ms": response_ms,
+        "rag_used": False,
+        "total_nodes_executed": len(nodes or []),
+        "nodes": nodes or [],
+        "input_tokens": 10,
+        "output_tokens": 5,
+        "cost_usd": 0.5,
+    })
+
+
+class _FakeRedisList:
+    def __init__(self):
+        self.items = []
+
+    async def rpush(self, key, *values):
+        self.items.extend(values)
+
+    async def lpop(self, key, count):
+        popped, self.items = self.items[:count], self.items[count:]
+        return popped or None
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    calls = []
+
+    async def write(tenant_id, agent_deltas, node_deltas):
+        calls.append((tenant_id, agent_deltas, node_deltas))
+
+    monkeypatch.setattr(analytics_realtime, "_write_tenant_batch", write)
+    return calls
+
+
+class TestAnalyticsWriteBehind:
+    @pytest.mark.asyncio
+    async def test_events_are_aggregated_per_row(self, writes):
+        write_behind = AnalyticsWriteBehind(flush_interval_ms=60_000)
+        node = {"type": "llm", "is_success": True, "execution_ms": 20.0}
+
+        await write_behind.add(_execution(100.0, nodes=[node]))
+        await write_behind.add(_execution(300.0, is_success=False, nodes=[node, {**node, "is_success": False}]))
+        await write_behind.add(_execution(None))
+        await write_behind.add(_agent_event("tenant_a", AGENT, "conversation_started"))
+        await write_behind.add(_agent_event("tenant_b", AGENT, "feedback", is_thumbs_up=False))
+        await write_behind.close()
+
+        assert sorted(tenant for tenant, _, _ in writes) == ["tenant_a", "tenant_b"]
+        tenant_a = next(call for call in writes if call[0] == "tenant_a")
+        (agent_delta,) = [d for (agent_id, _), d in tenant_a[1].items() if agent_id == AGENT and d.execution_count]
+        assert (agent_delta.execution_count, agent_delta.success_count, agent_delta.error_count) == (3, 2, 1)
+        assert (agent_delta.total_response_ms, agent_delta.min_response_ms, agent_delta.max_response_ms) == (
+            400.0, 100.0, 300.0)
+        assert agent_delta.total_success_rate_sum == 1.5
+        assert agent_delta.total_input_tokens == 30 and agent_delta.total_cost_usd == 1.5
+        (node_delta,) = tenant_a[2].values()
+        assert (node_delta.execution_count, node_delta.failure_count, node_delta.total_execution_ms) == (3, 1, 60.0)
+        assert write_behind.get_cache_stats()["flushes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flushes_after_interval_or_max_events(self, writes):
+        write_behind = AnalyticsWriteBehind(flush_interval_ms=10, max_events=3)
+
+        await write_behind.add(_execution())
+        await asyncio.sleep(0.05)
+        assert len(writes) == 1
+
+        for _ in range(3):
+            await write_behind.add(_execution())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(writes) == 2
+        assert next(iter(writes[1][1].values())).execution_count == 3
+
+    @pytest.mark.asyncio
+    async def test_redis_buffer_is_drained_on_flush(self, writes, monkeypatch):
+        redis = _FakeRedisList()
+        write_behind = AnalyticsWriteBehind(flush_interval_ms=60_000, max_events=2, use_redis=True)
+        monkeypatch.setattr(write_behind, "_get_redis", lambda: redis)
+        # Left behind by another (restarted) worker
+        redis.items.append(analytics_realtime.json.dumps(_execution()))
+
+        await write_behind.add(_execution())
+        await write_behind.close()
+
+        assert redis.items == []
+        assert next(iter(writes[0][1].values())).execution_count == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_writes_every_event(self, writes):
+        write_behind = AnalyticsWriteBehind(enabled=False)
+
+        await write_behind.add(_execution())
+        await write_behind.add(_execution())
+
+        assert len(writes) == 2
+
+
+class TestUpsertStatements:
+    @pytest.mark.asyncio
+    async def test_one_multi_row_upsert_per_table(self):
+        batch = analytics_realtime._StatsBatch()
+        node = {"type": "llm", "is_success": True, "execution_ms": 20.0}
+        batch.add(_execution(nodes=[node]))
+        batch.add({**_execution(nodes=[node]), "agent_id": str(uuid4())})
+        statements = []
+
+        class _Session:
+            async def execute(self, stmt):
+                statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+        await analytics_realtime._upsert_agent_daily_stats(_Session(), batch.agents["tenant_a"])
+        await analytics_realtime._upsert_node_daily_stats(_Session(), batch.nodes["tenant_a"])
+
+        assert len(statements) == 2
+        assert all("ON CONFLICT ON CONSTRAINT" in sql for sql in statements)
+        assert statements[0].count("%(agent_id_m") == 2 and statements[1].count("%(node_type_m") == 2
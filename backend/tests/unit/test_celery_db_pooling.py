@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy.pool import NullPool
+
+from app.core.config.settings import settings
+from app.db.multi_tenant_session import MultiTenantSessionManager
+from app.tasks.base import close_worker_loop, run_async_in_celery
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(MultiTenantSessionManager, "_engines", {})
+    monkeypatch.setattr(MultiTenantSessionManager, "_session_factories", {})
+    monkeypatch.setattr(MultiTenantSessionManager, "_engine_loops", {})
+    monkeypatch.setattr(settings, "BACKGROUND_TASK", True)
+    yield MultiTenantSessionManager()
+    close_worker_loop()
+
+
+class TestRunAsyncInCelery:
+    def test_tasks_share_the_worker_loop_and_leftovers_are_cancelled(self, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_REUSE_EVENT_LOOP", True)
+        leftovers = []
+
+        async def task():
+            leftovers.append(asyncio.create_task(asyncio.sleep(60)))
+            return asyncio.get_running_loop()
+
+        try:
+            first = run_async_in_celery(task())
+            second = run_async_in_celery(task())
+        finally:
+            close_worker_loop()
+
+        assert first is second
+        assert all(leftover.cancelled() for leftover in leftovers)
+
+    def test_engines_follow_the_loop_when_it_is_not_reused(self, manager, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_REUSE_EVENT_LOOP", False)
+
+        async def task():
+            return manager.get_tenant_engine("acme"), manager.get_tenant_session_factory("acme")
+
+        engine, factory = run_async_in_celery(task())
+        # Disposed with its loop at the end of the task
+        assert not MultiTenantSessionManager._engines
+
+        next_engine, next_factory = run_async_in_celery(task())
+        assert next_engine is not engine
+        assert next_factory.kw["bind"] is next_engine
+
+    def test_celery_engines_use_a_small_pool(self, manager, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_DB_POOL_SIZE", 3)
+        monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+
+        async def engines():
+            return manager.get_tenant_engine("acme"), manager.get_tenant_engine("acme")
+
+        engine, same = run_async_in_celery(engines())
+
+        assert engine is same
+        assert engine.pool.size() == 3
+        monkeypatch.setattr(settings, "CELERY_DB_POOL_SIZE", 0)
+        assert isinstance(manager.get_tenant_engine("other").pool, NullPool)
@@ -0,0 +1,139 @@
+import pytest
+
+from app.core.utils.token_utils import ApproximateTokenCounter
+from app.modules.workflow.agents import memory
+from app.modules.workflow.agents.memory import (
+    InMemoryConversationMemory,
+    Message,
+    RedisConversationMemory,
+)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self._redis.round_trips += 1
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._commands]
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio for the conversation keys"""
+
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+        return len(self.lists[key])
+
+    def hsetnx(self, key, field, value):
+        return self.hashes.setdefault(key, {}).setdefault(field, str(value)) == str(value)
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    def expire(self, key, ttl):
+        return True
+
+    async def lrange(self, key, start, end):
+        self.round_trips += 1
+        values = self.lists.get(key, [])
+        return values[start:] if end == -1 else values[start:end + 1]
+
+    async def llen(self, key):
+        self.round_trips += 1
+        return len(self.lists.get(key, []))
+
+    async def hget(self, key, field):
+        self.round_trips += 1
+        return self.hashes.get(key, {}).get(field)
+
+
+class _CountingCounter(ApproximateTokenCounter):
+    def __init__(self):
+        self.calls = 0
+
+    def count_tokens(self, text):
+        self.calls += 1
+        return super().count_tokens(text)
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    counter = _CountingCounter()
+    monkeypatch.setattr(memory, "_token_counters", {"approx": counter})
+    monkeypatch.setattr("app.core.utils.token_utils.get_token_counter", lambda provider, model: counter)
+    return counter
+
+
+@pytest.fixture
+def redis_memory():
+    conversation = RedisConversationMemory("thread-1")
+    conversation.redis_client = _FakeRedis()
+    return conversation
+
+
+class TestRedisConversationMemory:
+    @pytest.mark.asyncio
+    async def test_append_is_a_single_round_trip(self, redis_memory, counter):
+        await redis_memory.add_user_message("hello")
+        await redis_memory.add_input_output("what time is it", "noon")
+
+        redis = redis_memory.redis_client
+        assert redis.round_trips == 2
+        info = redis.hashes[redis_memory._conversation_key]
+        assert info["thread_id"] == "thread-1" and info["executions_count"] == "0"
+        messages = await redis_memory.get_messages()
+        assert [(m["role"], m["content"]) for m in messages] == [
+            ("user", "hello"), ("user", "what time is it"), ("assistant", "noon"),
+        ]
+        assert "token_counts" not in messages[0]
+
+    @pytest.mark.asyncio
+    async def test_token_budget_uses_stored_counts(self, redis_memory, counter):
+        for content in ["a" * 40, "b" * 40, "c" * 40]:
+            await redis_memory.add_assistant_message(content)
+        counted_at_write = counter.calls
+
+        history = await redis_memory.get_chat_history_within_tokens(30, "anthropic", "claude")
+
+        assert counter.calls == counted_at_write == 3
+        assert [m["content"] for m in history] == ["b" * 40, "c" * 40]
+        assert "token_counts" not in history[0]
+
+    @pytest.mark.asyncio
+    async def test_messages_without_counts_are_counted_on_read(self, redis_memory, counter):
+        legacy = Message("user", "x" * 40).to_dict()
+        redis_memory.redis_client.lpush(redis_memory._message_key, memory.json.dumps(legacy))
+
+        history = await redis_memory.get_chat_history_within_tokens(100, "anthropic", "claude", as_string=True)
+
+        assert history == "User: " + "x" * 40
+        assert counter.calls == 1
+
+
+class TestInMemoryConversationMemory:
+    @pytest.mark.asyncio
+    async def test_token_counts_are_cached_per_message(self, counter):
+        conversation = InMemoryConversationMemory("thread-1")
+        await conversation.add_input_output("question", "answer")
+
+        await conversation.get_chat_history_within_tokens(100, "anthropic", "claude")
+        await conversation.get_chat_history_within_tokens(100, "anthropic", "claude")
+
+        assert counter.calls == 2
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.modules.data.providers import embedding_cache
+from app.modules.data.providers.embedding_cache import EmbeddingCache
+
+
+class _CountingEmbedder:
+    def __init__(self, fail=False):
+        self.calls = []
+        self._fail = fail
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self._fail:
+            return []
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def _cache(tmp_path, **kwargs):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), **kwargs)
+
+
+class TestEmbeddingCache:
+    @pytest.mark.asyncio
+    async def test_only_unseen_texts_are_embedded(self, tmp_path):
+        cache = _cache(tmp_path)
+        embed = _CountingEmbedder()
+
+        await cache.get_or_embed("hf:model", ["a", "bb"], embed)
+        vectors = await cache.get_or_embed("hf:model", ["a", "ccc", "bb", "ccc"], embed)
+
+        assert embed.calls == [["a", "bb"], ["ccc"]]
+        assert vectors == [[1.0, 0.5], [3.0, 0.5], [2.0, 0.5], [3.0, 0.5]]
+        stats = cache.get_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (2, 4, 3)
+
+    @pytest.mark.asyncio
+    async def test_keys_are_normalized_and_namespaced(self, tmp_path):
+        cache = _cache(tmp_path)
+        embed = _CountingEmbedder()
+
+        await cache.get_or_embed("hf:model:document", ["hello  world\n"], embed)
+        await cache.get_or_embed("hf:model:document", ["hello world"], embed)
+        await cache.get_or_embed("hf:model:query", ["hello world"], embed)
+
+        assert embed.calls == [["hello  world\n"], ["hello world"]]
+
+    @pytest.mark.asyncio
+    async def test_failed_embeddings_are_not_cached(self, tmp_path):
+        cache = _cache(tmp_path)
+
+        assert await cache.get_or_embed("ns", ["a"], _CountingEmbedder(fail=True)) == []
+        assert cache.get_cache_stats()["size"] == 0
+
+    def test_persists_across_instances(self, tmp_path):
+        encode_calls = []
+
+        def encode(texts):
+            encode_calls.append(list(texts))
+            return np.array([[len(t), 1.0] for t in texts])
+
+        _cache(tmp_path).get_or_encode("st:model", ["a", "b"], encode)
+        result = _cache(tmp_path).get_or_encode("st:model", ["a", "bb"], encode)
+
+        assert encode_calls == [["a", "b"], ["bb"]]
+        assert result.dtype == np.float32 and result.tolist() == [[1.0, 1.0], [2.0, 1.0]]
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path, monkeypatch):
+        clock = iter(range(1000, 10_000, 1000))
+        monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+        cache = _cache(tmp_path, max_entries=4)
+
+        for text in ["a", "b", "c", "d"]:
+            cache.put_many("ns", [text], [[1.0]])
+        cache.get_many("ns", ["a"])  # refreshes "a"
+        cache.put_many("ns", ["e"], [[1.0]])
+
+        cached = cache.get_many("ns", ["a", "b", "c", "d", "e"])
+        assert [v is not None for v in cached] == [True, False, False, True, True]
+        assert cache.get_cache_stats()["evictions"] == 2
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_passes_through(self, tmp_path):
+        cache = _cache(tmp_path, enabled=False)
+        embed = _CountingEmbedder()
+
+        await cache.get_or_embed("ns", ["a"], embed)
+        await cache.get_or_embed("ns", ["a"], embed)
+
+        assert embed.calls == [["a"], ["a"]]
+        assert not (tmp_path / "embeddings.sqlite3").exists()
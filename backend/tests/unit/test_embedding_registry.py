@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.modules.data.providers.vector.embedding.base import EmbeddingConfig
+from app.modules.data.providers.vector.embedding.registry import EmbeddingModelRegistry
+
+
+class _FakeEmbeddings:
+    def __init__(self, error=None):
+        self.calls = []
+        self._error = error
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self._error:
+            raise self._error
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def _registry(embeddings, **kwargs):
+    registry = EmbeddingModelRegistry(max_workers=1, batch_window_ms=20, **kwargs)
+    original_get = registry.get
+
+    def get(config):
+        model = original_get(config)
+        model._embeddings = embeddings
+        return model
+
+    registry.get = get
+    return registry
+
+
+def _config(**kwargs):
+    return EmbeddingConfig(type="huggingface", model_name="all-MiniLM-L6-v2", **kwargs)
+
+
+class TestEmbeddingModelRegistry:
+    def test_model_is_shared_across_equivalent_configs(self):
+        registry = _registry(_FakeEmbeddings())
+
+        first = registry.get(_config(batch_size=16))
+        second = registry.get(_config(batch_size=64))
+        other_device = registry.get(_config(device="cuda"))
+
+        assert first is second
+        assert first is not other_device
+        assert registry.get_cache_stats()["models"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_coalesced(self):
+        embeddings = _FakeEmbeddings()
+        model = _registry(embeddings).get(_config())
+
+        results = await asyncio.gather(
+            model.embed_query("a"),
+            model.embed_query("bbb"),
+            model.embed_documents(["cc", "dddd"]),
+        )
+
+        assert embeddings.calls == [["a", "bbb", "cc", "dddd"]]
+        assert results == [[1.0, 1.0], [3.0, 1.0], [[2.0, 1.0], [4.0, 1.0]]]
+        assert model.requests == 3 and model.batches == 1
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_flushed_without_waiting(self):
+        embeddings = _FakeEmbeddings()
+        model = _registry(embeddings, max_batch_size=2).get(_config())
+
+        await asyncio.gather(*(model.embed_query(text) for text in "abc"))
+        large = await model.embed_documents(["x", "y", "z"])
+
+        assert embeddings.calls == [["a", "b"], ["c"], ["x", "y", "z"]]
+        assert len(large) == 3
+
+    @pytest.mark.asyncio
+    async def test_encode_errors_reach_every_waiter(self):
+        model = _registry(_FakeEmbeddings(error=RuntimeError("oom"))).get(_config())
+
+        results = await asyncio.gather(
+            model.embed_query("a"), model.embed_query("b"), return_exceptions=True
+        )
+
+        assert [str(r) for r in results] == ["oom", "oom"]
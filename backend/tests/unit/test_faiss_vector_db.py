@@ -0,0 +1,147 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.modules.data.providers.vector.db.base import VectorDBConfig  # noqa: E402
+from app.modules.data.providers.vector.db.faiss import FaissVectorDB  # noqa: E402
+
+DIM = 8
+
+
+def _config(tmp_path, **kwargs):
+    return VectorDBConfig(type="faiss", collection_name="test", persist_directory=str(tmp_path), **kwargs)
+
+
+async def _db(config, dimension=DIM):
+    db = FaissVectorDB(config)
+    assert await db.initialize()
+    assert await db.create_collection(dimension)
+    return db
+
+
+def _chunks(doc_id, count, kb_id="kb-1", seed=0):
+    rnd = np.random.default_rng(seed)
+    ids = [f"{doc_id}_chunk_{i}" for i in range(count)]
+    metas = [{"doc_id": doc_id, "kb_id": kb_id, "chunk_index": i} for i in range(count)]
+    return ids, rnd.random((count, DIM)).tolist(), metas, [f"{doc_id} text {i}" for i in range(count)]
+
+
+class TestFaissVectorDB:
+    @pytest.mark.asyncio
+    async def test_delete_by_metadata_removes_only_that_document(self, tmp_path):
+        db = await _db(_config(tmp_path, index_type="flat"))
+        await db.add_vectors(*_chunks("doc-a", 5, seed=1))
+        await db.add_vectors(*_chunks("doc-b", 3, seed=2))
+
+        assert await db.delete_vectors_by_metadata({"doc_id": "doc-a"})
+
+        assert db.index.ntotal == 3
+        assert sorted(await db.get_all_ids({"kb_id": "kb-1"})) == [f"doc-b_chunk_{i}" for i in range(3)]
+        results = await db.search(_chunks("doc-a", 1, seed=1)[1][0], limit=10)
+        assert {r.metadata["doc_id"] for r in results} == {"doc-b"}
+        assert "doc-a" not in db.filter_index["doc_id"]
+
+    @pytest.mark.asyncio
+    async def test_re_adding_ids_replaces_vectors(self, tmp_path):
+        db = await _db(_config(tmp_path, index_type="flat"))
+        await db.add_vectors(*_chunks("doc-a", 4))
+        await db.add_vectors(*_chunks("doc-a", 4, seed=5))
+
+        assert db.index.ntotal == 4
+        assert await db.count() == 4
+        hits = await db.search(_chunks("doc-a", 1, seed=5)[1][0], limit=1)
+        assert hits[0].content == "doc-a text 0"
+
+    @pytest.mark.asyncio
+    async def test_failed_add_leaves_index_and_maps_untouched(self, tmp_path):
+        db = await _db(_config(tmp_path, index_type="flat"))
+        await db.add_vectors(*_chunks("doc-a", 3))
+        ids, vectors, metas, contents = _chunks("doc-b", 2, seed=5)
+
+        # doc-a_chunk_0 would be replaced, but the duplicate id fails the sidecar insert
+        assert not await db.add_vectors(["doc-a_chunk_0", *ids, ids[0]], [vectors[0], *vectors, vectors[1]],
+                                        [metas[0], *metas, metas[0]], [contents[0], *contents, contents[0]])
+        assert not await db.add_vectors(ids, [v[:4] for v in vectors], metas, contents)
+
+        assert db.index.ntotal == 3 and not db._tombstones
+        assert sorted(db.internal_ids) == sorted(db.id_map.values()) == [f"doc-a_chunk_{i}" for i in range(3)]
+        assert "doc-b" not in db.filter_index["doc_id"]
+        assert await db.count() == 3
+        hits = await db.search(_chunks("doc-a", 1)[1][0], limit=1)
+        assert hits[0].id == "doc-a_chunk_0" and hits[0].content == "doc-a text 0"
+
+        assert await db.add_vectors(ids, vectors, metas, contents)
+        assert db.index.ntotal == 5 and await db.count() == 5
+
+    @pytest.mark.asyncio
+    async def test_filtered_search_uses_candidates_of_the_kb(self, tmp_path):
+        db = await _db(_config(tmp_path, index_type="flat"))
+        await db.add_vectors(*_chunks("big", 200, kb_id="kb-big", seed=3))
+        await db.add_vectors(*_chunks("small", 2, kb_id="kb-small", seed=4))
+
+        results = await db.search(_chunks("big", 1, seed=3)[1][0], limit=5, filter_dict={"kb_id": "kb-small"})
+
+        assert [r.id for r in results] and {r.metadata["kb_id"] for r in results} == {"kb-small"}
+
+    @pytest.mark.asyncio
+    async def test_reload_replays_wal_and_checkpoint_truncates_it(self, tmp_path):
+        config = _config(tmp_path, index_type="flat", extra_params={"checkpoint_every": 1000})
+        db = await _db(config)
+        await db.add_vectors(*_chunks("doc-a", 5))
+        await db.add_vectors(*_chunks("doc-b", 5, seed=1))
+        await db.delete_vectors(["doc-a_chunk_0"])
+
+        index_file = tmp_path / f"{config.collection_name}.index"
+
+        # Nothing checkpointed yet: the index file is only written periodically
+        assert not os.path.exists(index_file)
+
+        reloaded = await _db(config)
+        assert reloaded.index.ntotal == 9
+        assert "doc-a_chunk_0" not in await reloaded.get_all_ids()
+        assert os.path.exists(index_file)
+        assert reloaded._db.execute("SELECT COUNT(*) FROM wal").fetchone()[0] == 0
+        reloaded.close()
+        db.close()
+
+    @pytest.mark.asyncio
+    async def test_hnsw_tombstones_are_compacted(self, tmp_path):
+        db = await _db(_config(tmp_path, index_type="hnsw"))
+        await db.add_vectors(*_chunks("doc-a", 10))
+        await db.add_vectors(*_chunks("doc-b", 10, seed=1))
+
+        await db.delete_vectors([f"doc-a_chunk_{i}" for i in range(5)])
+        assert db.index.ntotal == 20 and len(db._tombstones) == 5
+
+        await db.delete_vectors([f"doc-a_chunk_{i}" for i in range(5, 10)])
+        assert db.index.ntotal == 10 and not db._tombstones
+        results = await db.search(_chunks("doc-b", 1, seed=1)[1][0], limit=3)
+        assert {r.metadata["doc_id"] for r in results} == {"doc-b"}
+
+    @pytest.mark.asyncio
+    async def test_migrates_pickle_format(self, tmp_path):
+        config = _config(tmp_path, index_type="flat")
+        index = faiss.IndexFlatIP(DIM)
+        ids, vectors, metas, contents = _chunks("doc-a", 3)
+        vectors = np.array(vectors, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index.add(vectors)
+        faiss.write_index(index, str(tmp_path / f"{config.collection_name}.index"))
+        with open(tmp_path / f"{config.collection_name}_metadata.pkl", "wb") as f:
+            pickle.dump({
+                "id_map": dict(enumerate(ids)),
+                "metadata_map": dict(zip(ids, metas)),
+                "content_map": dict(zip(ids, contents)),
+                "next_id": 3,
+                "dimension": DIM,
+            }, f)
+
+        db = await _db(config)
+
+        assert db.index.ntotal == 3
+        assert (await db.get_by_ids(["doc-a_chunk_1"]))[0].content == "doc-a text 1"
+        assert not os.path.exists(tmp_path / f"{config.collection_name}_metadata.pkl")
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.core.config.settings import settings
+from app.core.exceptions.exception_classes import AppException
+from app.core.utils.enums.conversation_status_enum import ConversationStatus
+from app.db.models.conversation import ConversationModel
+import app.db.models.test_suite  # noqa: F401 (configures the ORM mappers)
+from app.repositories.conversations import ConversationRepository
+from app.repositories.transcript_message import TranscriptMessageRepository
+from app.schemas.conversation_transcript import InProgConvTranscrUpdate, TranscriptSegmentInput
+from app.services.conversations import ConversationService
+
+
+def _conversation(status=ConversationStatus.IN_PROGRESS.value):
+    return ConversationModel(id=uuid4(), status=status, word_count=10, agent_ratio=50, customer_ratio=50,
+            duration=5)
+
+
+def _update(*texts):
+    return InProgConvTranscrUpdate(messages=[
+        TranscriptSegmentInput(create_time=datetime.now(timezone.utc), start_time=i, end_time=i + 1,
+                speaker="agent", text=text) for i, text in enumerate(texts)])
+
+
+@pytest.fixture
+def repos():
+    conversation_repo = AsyncMock(spec=ConversationRepository)
+    conversation_repo.update_conversation.side_effect = lambda conversation: conversation
+    transcript_repo = AsyncMock(spec=TranscriptMessageRepository)
+    transcript_repo.add_messages.side_effect = lambda messages: messages
+    transcript_repo.get_latest_sequence_number.return_value = 41
+    transcript_repo.get_last_messages.return_value = []
+    return conversation_repo, transcript_repo
+
+
+@pytest.fixture
+def service(repos):
+    conversation_repo, transcript_repo = repos
+    service = ConversationService(operator_statistics_service=MagicMock(), conversation_repo=conversation_repo,
+            transcript_message_repo=transcript_repo, audit_log_repo=MagicMock(), recordings_repo=MagicMock(),
+            thread_rag=MagicMock(), file_manager_service=MagicMock(), gpt_kpi_analyzer_service=MagicMock(),
+            conversation_analysis_service=MagicMock(), llm_analyst_service=MagicMock(), )
+    service._analyze_in_progress_tone_and_mark = AsyncMock(side_effect=lambda conversation, *a, **kw: conversation)
+    return service
+
+
+class TestAppendInProgressMessages:
+    @pytest.mark.asyncio
+    async def test_returns_only_the_delta(self, service, repos):
+        conversation_repo, transcript_repo = repos
+        conversation = _conversation()
+        conversation_repo.fetch_conversation_by_id.return_value = conversation
+
+        result = await service.append_in_progress_messages(conversation.id, _update("hello there", "bye"))
+
+        conversation_repo.fetch_conversation_by_id.assert_awaited_once_with(conversation.id, for_update=True)
+        assert [m.sequence_number for m in result.new_messages] == [42, 43]
+        assert [m.text for m in result.new_messages] == ["hello there", "bye"]
+        assert result.conversation is conversation and conversation.word_count == 13
+        assert result.conversation.messages == []
+        transcript_repo.get_last_messages.assert_awaited_once_with(conversation.id,
+                settings.HOSTILITY_SCORE_MESSAGE_COUNT)
+        transcript_repo.get_messages_by_conversation_id.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_update_returns_the_full_conversation(self, service, repos):
+        conversation_repo, transcript_repo = repos
+        conversation = _conversation()
+        full_conversation = _conversation()
+        conversation_repo.fetch_conversation_by_id.side_effect = [conversation, full_conversation]
+
+        assert await service.update_in_progress_conversation(conversation.id, _update("hi")) is full_conversation
+        conversation_repo.fetch_conversation_by_id.assert_awaited_with(conversation.id, include_messages=True)
+
+    @pytest.mark.asyncio
+    async def test_finalized_conversation_is_rejected(self, service, repos):
+        conversation_repo, transcript_repo = repos
+        conversation = _conversation(status=ConversationStatus.FINALIZED.value)
+        conversation_repo.fetch_conversation_by_id.return_value = conversation
+
+        with pytest.raises(AppException):
+            await service.append_in_progress_messages(conversation.id, _update("hi"))
+        transcript_repo.add_messages.assert_not_awaited()
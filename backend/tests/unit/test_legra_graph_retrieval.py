@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+# The retrieval package pulls in the whole LEGRA stack (requirements-rag.txt)
+for module in ("faiss", "igraph", "annoy", "sentence_transformers"):
+    pytest.importorskip(module)
+
+from app.modules.data.providers.legra.graph import GraphExpansion, IncrementalKNN  # noqa: E402
+from app.modules.data.providers.legra.index.faiss_index import FaissFlatIndexer  # noqa: E402
+from app.modules.data.providers.legra.retrieval import NeighborRetriever  # noqa: E402
+
+QUERY = np.array([[1.0, 0.0, 0.0, 0.0]], dtype=np.float32)
+# a and b are each other's nearest neighbours; c is closer to the query than b but not linked to a
+EMB = np.array(
+    [
+        [0.8, 0.6, 0.0, 0.0],  # a
+        [0.6, 0.8, 0.0, 0.0],  # b
+        [0.62, 0.0, 0.785, 0.0],  # c
+        [0.0, 0.0, 1.0, 0.0],  # d
+        [0.0, 0.0, 0.0, 1.0],  # e
+    ],
+    dtype=np.float32,
+)
+
+
+class _QueryEmbedder:
+    def encode(self, texts):
+        return QUERY
+
+
+def _retriever(labels=None):
+    state = IncrementalKNN(n_neighbors=1).build(EMB, np.arange(len(EMB), dtype=np.int64))
+    indexer = FaissFlatIndexer(dim=EMB.shape[1])
+    indexer.build_index(EMB)
+    docs_meta = [{"doc_id": name, "chunk_ix": 0, "text": name} for name in "abcde"]
+    return NeighborRetriever(
+        embedder=_QueryEmbedder(),
+        indexer=indexer,
+        docs_meta=docs_meta,
+        expansion=GraphExpansion.build(state, EMB, labels),
+        emb_matrix=EMB,
+    )
+
+
+class TestGraphExpandedRetrieval:
+    def test_graph_mode_promotes_neighbours_of_strong_hits(self):
+        retriever = _retriever()
+
+        assert [r["doc_id"] for r in retriever.retrieve("q", 2)] == ["a", "c"]
+        assert [r["doc_id"] for r in retriever.retrieve("q", 2, mode="graph")] == ["a", "b"]
+        # No budget left after the seed search: plain top-k
+        assert [r["doc_id"] for r in retriever.retrieve("q", 2, mode="graph", budget_ms=0)] == ["a", "c"]
+
+    def test_adjacency_and_communities_round_trip(self, tmp_path):
+        retriever = _retriever(labels=np.array([0, 0, 1, 1, 2]))
+        retriever.expansion.save(tmp_path)
+        expansion = GraphExpansion.load(tmp_path)
+
+        origin, rows, weights = expansion.neighbors(np.array([0, 2]))
+        assert sorted(zip(origin.tolist(), rows.tolist())) == [(0, 1), (1, 3)]
+        assert weights[origin == 0] == pytest.approx([0.96], abs=1e-3)
+        communities, _ = expansion.nearest_communities(QUERY[0], 1)
+        assert communities.tolist() == [0]
+        assert expansion.members(np.array([1, 2]))[1].tolist() == [2, 3, 4]
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import app.modules.data.providers.legra.index_cache as index_cache
+from app.modules.data.providers.legra.index_cache import LegraIndexCache
+
+
+class _CountingCache(LegraIndexCache):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.loads = []
+
+    def _load(self, kb_id):
+        self.loads.append(kb_id)
+        return object()
+
+
+def _write_version(kb_dir, generation):
+    # Same write pattern as Legra.save: temp file renamed into place
+    tmp = kb_dir / "version.json.tmp"
+    tmp.write_text(json.dumps({"generation": generation}))
+    tmp.replace(kb_dir / "version.json")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_cache, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+class TestLegraIndexCache:
+    def test_reuses_snapshot_until_version_changes(self, data_dir):
+        kb_dir = data_dir / "kb-1"
+        kb_dir.mkdir()
+        _write_version(kb_dir, 1)
+        cache = _CountingCache(max_size=4)
+
+        first = cache.get("kb-1")
+        assert cache.get("kb-1") is first
+        assert cache.loads == ["kb-1"]
+
+        _write_version(kb_dir, 2)
+        assert cache.get("kb-1") is not first
+        stats = cache.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["stale"] == 1
+        assert len(cache.loads) == 2
+
+    def test_falls_back_to_data_file_stats(self, data_dir):
+        kb_dir = data_dir / "kb-legacy"
+        kb_dir.mkdir()
+        (kb_dir / "docs_meta.json").write_text("[]")
+        cache = _CountingCache(max_size=4)
+
+        first = cache.get("kb-legacy")
+        assert cache.get("kb-legacy") is first
+
+        (kb_dir / "faiss_index.bin").write_bytes(b"index")
+        assert cache.get("kb-legacy") is not first
+
+    def test_missing_kb_raises_and_is_dropped(self, data_dir):
+        kb_dir = data_dir / "kb-2"
+        kb_dir.mkdir()
+        _write_version(kb_dir, 1)
+        cache = _CountingCache(max_size=4)
+        cache.get("kb-2")
+
+        (kb_dir / "version.json").unlink()
+        kb_dir.rmdir()
+
+        with pytest.raises(FileNotFoundError):
+            cache.get("kb-2")
+        assert cache.get_cache_stats()["size"] == 0
+
+    def test_lru_eviction(self, data_dir):
+        for kb_id in ("a", "b"):
+            (data_dir / kb_id).mkdir()
+            _write_version(data_dir / kb_id, 1)
+        cache = _CountingCache(max_size=1)
+
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.get_cache_stats()
+        assert stats["size"] == 1
+        assert stats["evictions"] == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("igraph")
+
+from app.modules.data.providers.legra.graph.neighbors import IncrementalKNN, KNNState, row_keys  # noqa: E402
+
+
+def _neighbor_rows(state):
+    pos = state.positions()
+    return [sorted(pos[row[row >= 0]].tolist()) for row in state.neighbors]
+
+
+class TestIncrementalKNN:
+    def test_update_matches_full_build_after_adds_and_deletes(self):
+        rnd = np.random.default_rng(0)
+        emb = rnd.standard_normal((300, 16)).astype(np.float32)
+        knn = IncrementalKNN(n_neighbors=5)
+        previous = knn.build(emb[:250], np.arange(250, dtype=np.int64))
+
+        # Drop 20 rows and add 50 new ones
+        kept = np.setdiff1d(np.arange(250), np.arange(0, 200, 10))
+        rows = np.concatenate([kept, np.arange(250, 300)])
+        updated = knn.update(previous, emb[rows], rows.astype(np.int64))
+        rebuilt = knn.build(emb[rows], rows.astype(np.int64))
+
+        assert _neighbor_rows(updated) == _neighbor_rows(rebuilt)
+        assert updated.previous_rows[: len(kept)].tolist() == kept.tolist()
+        assert (updated.previous_rows[len(kept):] == -1).all()
+
+    def test_state_round_trips_and_warm_starts_labels(self, tmp_path):
+        meta = [{"doc_id": f"d{ix // 4}", "chunk_ix": ix % 4, "text": f"t{ix}"} for ix in range(40)]
+        rnd = np.random.default_rng(1)
+        emb = np.repeat(np.eye(4, 8, dtype=np.float32), 10, axis=0) + 0.01 * rnd.standard_normal((40, 8)).astype(
+            np.float32
+        )
+        knn = IncrementalKNN(n_neighbors=3)
+        state = knn.build(emb, row_keys(meta))
+        state.labels = np.repeat(np.arange(4), 10)
+        state.save(tmp_path)
+
+        loaded = KNNState.load(tmp_path)
+        assert loaded is not None
+        assert _neighbor_rows(loaded) == _neighbor_rows(state)
+        assert loaded.labels.tolist() == state.labels.tolist()
+
+        # A new chunk close to the third group joins that group's community
+        new_meta = meta + [{"doc_id": "new", "chunk_ix": 0, "text": "new"}]
+        new_emb = np.vstack([emb, np.eye(4, 8, dtype=np.float32)[2:3]])
+        updated = knn.update(loaded, new_emb, row_keys(new_meta))
+        labels = updated.warm_start_labels(loaded)
+
+        assert labels[:40] == state.labels.tolist()
+        assert labels[40] == 2
+        assert knn.update(None, emb, row_keys(meta)).warm_start_labels(None) is None
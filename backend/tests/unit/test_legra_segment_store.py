@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import app.modules.data.providers.legra.storage as storage
+from app.modules.data.providers.legra.storage import SegmentStore
+
+
+def _doc(doc_id, chunks=3, dim=4, value=0.0):
+    meta = [{"kb_id": "kb", "doc_id": doc_id, "chunk_ix": ix, "text": f"{doc_id}-{ix}"} for ix in range(chunks)]
+    return meta, np.full((chunks, dim), value, dtype=np.float32)
+
+
+def _append_and_compact(kb_path, worker):
+    # Run in a child process: a fresh SegmentStore, as in another API or Celery process
+    store = SegmentStore(kb_path)
+    for ix in range(10):
+        store.append(*_doc(f"w{worker}-{ix}", value=float(worker)))
+        if ix % 3 == 2:
+            store.compact()
+
+
+class TestSegmentStore:
+    def test_appends_are_segments_and_materialize_in_order(self, tmp_path):
+        store = SegmentStore(tmp_path / "kb").open()
+        store.append(*_doc("a", value=1.0))
+        store.append(*_doc("b", value=2.0))
+
+        meta, emb = store.materialize()
+        assert [m["doc_id"] for m in meta] == ["a"] * 3 + ["b"] * 3
+        assert emb.shape == (6, 4)
+        assert emb[0, 0] == 1.0 and emb[-1, 0] == 2.0
+        assert store.stats()["segments"] == 2
+        # Earlier segments are never rewritten by later appends
+        assert len(list((tmp_path / "kb" / "segments").glob("*.npy"))) == 2
+
+    def test_tombstone_hides_only_older_rows(self, tmp_path):
+        store = SegmentStore(tmp_path / "kb").open()
+        store.append(*_doc("a", value=1.0))
+        store.append(*_doc("b", value=2.0))
+
+        assert store.delete_document("a") is True
+        assert store.delete_document("missing") is False
+        store.append(*_doc("a", chunks=2, value=3.0))  # re-ingested document
+
+        meta, emb = store.materialize()
+        assert [m["doc_id"] for m in meta] == ["b"] * 3 + ["a"] * 2
+        assert emb[-1, 0] == 3.0
+        assert store.stats()["dead_rows"] == 3
+
+        # A second instance (other worker) replays the same log
+        assert sorted(SegmentStore(tmp_path / "kb").document_ids()) == ["a", "b"]
+
+    def test_compaction_merges_live_rows(self, tmp_path):
+        store = SegmentStore(tmp_path / "kb").open()
+        for doc_id in ("a", "b", "c"):
+            store.append(*_doc(doc_id))
+        store.delete_document("b")
+
+        before = store.materialize()
+        other = SegmentStore(tmp_path / "kb")
+        other.document_ids()  # replayed before the log is swapped
+        store.compact()
+
+        meta, emb = store.materialize()
+        assert [m["doc_id"] for m in meta] == [m["doc_id"] for m in before[0]]
+        np.testing.assert_array_equal(emb, before[1])
+        assert store.stats() == {"segments": 1, "documents": 2, "rows": 6, "live_rows": 6, "dead_rows": 0}
+        assert len(list((tmp_path / "kb" / "segments").iterdir())) == 2
+        assert sorted(other.document_ids()) == ["a", "c"]
+
+    def test_compaction_thresholds(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage, "COMPACTION_MAX_SEGMENTS", 2)
+        store = SegmentStore(tmp_path / "kb").open()
+        store.append(*_doc("a"))
+        store.append(*_doc("b"))
+        assert store.needs_compaction() is False
+
+        store.append(*_doc("c"))
+        assert store.needs_compaction() is True
+
+    def test_imports_legacy_snapshot(self, tmp_path):
+        kb_dir = tmp_path / "kb"
+        kb_dir.mkdir()
+        meta, emb = _doc("legacy", value=5.0)
+        (kb_dir / "docs_meta.json").write_text(json.dumps(meta))
+        np.save(kb_dir / "emb_matrix.npy", emb)
+
+        store = SegmentStore(kb_dir).open()
+        store.append(*_doc("new"))
+
+        assert store.document_ids() == ["legacy", "new"]
+        assert store.materialize()[1][0, 0] == 5.0
+
+    def test_uncommitted_segment_is_ignored(self, tmp_path):
+        store = SegmentStore(tmp_path / "kb").open()
+        store.append(*_doc("a"))
+        # Files written but the log record never appended (crash before commit)
+        store._write_segment_files(2, *_doc("b"))
+
+        assert SegmentStore(tmp_path / "kb").document_ids() == ["a"]
+
+    def test_append_rejects_mismatched_rows(self, tmp_path):
+        store = SegmentStore(tmp_path / "kb")
+        meta, emb = _doc("a")
+        with pytest.raises(ValueError):
+            store.append(meta, emb[:1])
+
+    def test_processes_do_not_lose_each_others_segments(self, tmp_path):
+        kb_path = tmp_path / "kb"
+        SegmentStore(kb_path).open()
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_append_and_compact, args=(kb_path, worker)) for worker in range(4)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+        assert [process.exitcode for process in workers] == [0, 0, 0, 0]
+
+        store = SegmentStore(kb_path)
+        meta, emb = store.materialize()
+        assert sorted(store.document_ids()) == sorted(f"w{worker}-{ix}" for worker in range(4) for ix in range(10))
+        assert len(meta) == len(emb) == 120
@@ -0,0 +1,90 @@
+import httpx
+import pytest
+
+from app.core.tenant_scope import set_tenant_context
+from app.modules.workflow.llm.client_pool import ChatModelPool, provider_fingerprint
+from app.modules.workflow.llm.provider import build_chat_model
+
+
+class _Factory:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return object()
+
+
+class TestChatModelPool:
+    @pytest.mark.asyncio
+    async def test_reuses_model_for_unchanged_provider(self):
+        set_tenant_context("master")
+        pool = ChatModelPool(max_size=10)
+        factory = _Factory()
+        fingerprint = provider_fingerprint("openai", "gpt-4o", {"api_key": "enc"})
+
+        first = await pool.get_or_create("p-1", fingerprint, factory)
+        second = await pool.get_or_create("p-1", fingerprint, factory)
+
+        assert first is second
+        assert factory.calls == 1
+        stats = pool.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_when_provider_config_changes(self):
+        set_tenant_context("master")
+        pool = ChatModelPool(max_size=10)
+        factory = _Factory()
+
+        first = await pool.get_or_create("p-1", provider_fingerprint("openai", "gpt-4o", {"api_key": "a"}), factory)
+        second = await pool.get_or_create("p-1", provider_fingerprint("openai", "gpt-4o", {"api_key": "b"}), factory)
+
+        assert first is not second
+        assert pool.get_cache_stats()["stale"] == 1
+
+    @pytest.mark.asyncio
+    async def test_entries_are_tenant_scoped_and_invalidated(self):
+        pool = ChatModelPool(max_size=10)
+        factory = _Factory()
+        fingerprint = provider_fingerprint("anthropic", "claude", {})
+
+        set_tenant_context("tenant_a")
+        model_a = await pool.get_or_create("p-1", fingerprint, factory)
+        set_tenant_context("tenant_b")
+        model_b = await pool.get_or_create("p-1", fingerprint, factory)
+        assert model_a is not model_b
+
+        assert pool.invalidate("p-1") is True
+        await pool.get_or_create("p-1", fingerprint, factory)
+        assert factory.calls == 3
+
+        set_tenant_context("tenant_a")
+        assert await pool.get_or_create("p-1", fingerprint, factory) is model_a
+        set_tenant_context("master")
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_and_shared_http_client(self):
+        set_tenant_context("master")
+        pool = ChatModelPool(max_size=1)
+        factory = _Factory()
+
+        await pool.get_or_create("p-1", "fp", factory)
+        await pool.get_or_create("p-2", "fp", factory)
+
+        assert pool.shared_http_client() is pool.shared_http_client()
+        stats = pool.get_cache_stats()
+        assert stats["size"] == 1
+        assert stats["evictions"] == 1
+        assert stats["http_clients"] == 1
+
+    @pytest.mark.asyncio
+    async def test_openai_compatible_models_report_usage_when_streaming(self):
+        pytest.importorskip("langchain_openai")
+        async with httpx.AsyncClient() as client:
+            shared = await build_chat_model("openai", {"api_key": "sk-test"}, "gpt-4o-mini", http_async_client=client)
+            vllm = await build_chat_model("vllm", {"base_url": "http://vllm:8000/v1"}, "llama")
+
+        assert shared.stream_usage is True
+        assert vllm.stream_usage is True
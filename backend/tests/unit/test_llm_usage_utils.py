@@ -46,5 +46,13 @@ class TestExtractUsageFromAIMessage:
         result = extract_usage_from_aimessage(MockMessage())
         assert result == {"input_tokens": 8, "output_tokens": 12, "total_tokens": 20}
 
+    def test_streamed_chunk_uses_usage_metadata(self):
+        class MockChunk:
+            response_metadata = {"finish_reason": "stop", "model_name": "gpt-4o-mini"}
+            usage_metadata = {"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}
+
+        result = extract_usage_from_aimessage(MockChunk())
+        assert result == {"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}
+
     def test_none_message_returns_none(self):
         assert extract_usage_from_aimessage(None) is None
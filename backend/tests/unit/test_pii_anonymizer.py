@@ -5,7 +5,7 @@ from __future__ import annotations
 import json
 from unittest.mock import MagicMock, patch
 
-from app.modules.workflow.engine.pii_anonymizer import PIIAnonymizer
+from app.modules.workflow.engine.pii_anonymizer import PIIAnonymizer, PIIMaskCache
 
 
 def _make_analyzer_result(start: int, end: int, entity_type: str, score: float = 1.0):
@@ -116,6 +116,47 @@ class TestMask:
         json.dumps(token_map)  # must not raise
 
 
+class TestMaskCache:
+    def test_repeated_text_is_analyzed_once(self):
+        original = "My email is alice@example.com"
+        cache = PIIMaskCache(max_size=10)
+        svc = PIIAnonymizer(cache=cache)
+        analyzer = MagicMock()
+        analyzer.analyze.return_value = [
+            _make_analyzer_result(start=12, end=29, entity_type="EMAIL_ADDRESS")
+        ]
+
+        with patch(
+            "app.modules.workflow.engine.pii_anonymizer._get_engines",
+            return_value=analyzer,
+        ):
+            first = svc.mask(original)
+            second = svc.mask(original)
+            svc.mask("no pii here")
+            svc.mask("no pii here")
+
+        assert first == second
+        assert analyzer.analyze.call_count == 2
+        assert cache.get_cache_stats()["hits"] == 2
+
+    def test_redact_replaces_overlapping_detections_once(self):
+        svc = PIIAnonymizer(cache=PIIMaskCache(max_size=10))
+        analyzer = MagicMock()
+        analyzer.analyze.return_value = [
+            _make_analyzer_result(5, 17, "PHONE_NUMBER", score=0.9),
+            _make_analyzer_result(5, 17, "US_DRIVER_LICENSE", score=0.4),
+            _make_analyzer_result(21, 36, "EMAIL_ADDRESS"),
+        ]
+
+        with patch(
+            "app.modules.workflow.engine.pii_anonymizer._get_engines",
+            return_value=analyzer,
+        ):
+            redacted = svc.redact("Call 555-867-5309 or bob@example.com now")
+
+        assert redacted == "Call [REDACTED] or [REDACTED] now"
+
+
 class TestUnmask:
     def test_returns_original_on_empty_text(self):
         assert PIIAnonymizer().unmask("", {"items": []}) == ""
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from app.core.config.settings import settings
+from app.modules.workflow.sandbox_pool import SandboxProcessPool, WorkerTimeout
+from app.modules.workflow.utils import _prepare_pooled_process, _reset_pooled_process, _run_pooled_job
+
+
+def _pid_job(fail=False):
+    # Identifies the worker process that ran the job
+    return {"error": "failed"} if fail else {"result": os.getpid()}
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def factory(size=1, max_jobs=1, timeout=30.0, runner=_run_pooled_job):
+        pool = SandboxProcessPool(
+            _prepare_pooled_process,
+            runner,
+            size=size,
+            max_jobs=max_jobs,
+            timeout=timeout,
+            reset=_reset_pooled_process,
+        )
+        pools.append(pool)
+        return pool
+
+    yield factory
+    for pool in pools:
+        pool.close()
+
+
+class TestSandboxProcessPool:
+    def test_runs_code_in_sandbox(self, make_pool):
+        pool = make_pool()
+
+        response = pool.run(("def executable_function(params):\n    return params['x'] * 2", {"x": 21}, True))
+
+        assert response["result"] == 42
+        assert "not allowed" in pool.run(("import os", {}, False))["error"]
+
+    def test_workers_are_reused_up_to_max_jobs_and_recycled_on_error(self, make_pool):
+        pool = make_pool(max_jobs=2, runner=_pid_job)
+
+        first, second, third = (pool.run(())["result"] for _ in range(3))
+        assert first == second != third
+        assert pool.run((True,))["error"] == "failed"
+        assert pool.run(())["result"] != third
+        assert pool.get_cache_stats()["recycled"] == 2
+
+    def test_later_runs_do_not_see_module_state_of_earlier_runs(self, make_pool):
+        pool = make_pool(max_jobs=5)
+        leak = (
+            "import json\njson.leak = params['secret']\njson.JSONDecoder.leak = params['secret']\n"
+            "json.dumps = len\nresult = 1",
+            {"secret": "tenantA-token"},
+            False,
+        )
+        read = (
+            "import json\nresult = []\n"
+            "for owner in (json, json.JSONDecoder):\n"
+            "    try:\n        result.append(owner.leak)\n    except AttributeError:\n        result.append(None)\n"
+            "result.append(json.dumps([1]))",
+            {},
+            False,
+        )
+
+        assert pool.run(leak, tenant="a")["result"] == 1
+        assert pool.run(read, tenant="a")["result"] == [None, None, "[1]"]
+        # Same process both times: the state was reset, not the worker replaced
+        assert pool.get_cache_stats()["recycled"] == 0
+
+    def test_default_pool_does_not_carry_object_state_or_options_over(self, make_pool):
+        pd = pytest.importorskip("pandas")
+        pool = make_pool(max_jobs=settings.PYTHON_EXEC_WORKER_MAX_JOBS)
+        default_rows = pd.get_option("display.max_rows")
+        leak = (
+            "import json\nimport pandas as pd\njson._default_encoder.leak = params['s']\n"
+            "pd.set_option('display.max_rows', 3)\nresult = 1",
+            {"s": "user1-secret"},
+            False,
+        )
+        read = (
+            "import json\nimport pandas as pd\n"
+            "try:\n    leaked = json._default_encoder.leak\nexcept AttributeError:\n    leaked = None\n"
+            "result = [leaked, pd.get_option('display.max_rows')]",
+            {},
+            False,
+        )
+
+        assert pool.run(leak, tenant="a")["result"] == 1
+        assert pool.run(read, tenant="a")["result"] == [None, default_rows]
+
+    def test_workers_are_not_shared_between_tenants(self, make_pool):
+        pool = make_pool(max_jobs=10, runner=_pid_job)
+
+        tenant_a = pool.run((), tenant="a")["result"]
+        assert pool.run((), tenant="a")["result"] == tenant_a
+        tenant_b = pool.run((), tenant="b")["result"]
+        assert tenant_b != tenant_a
+        assert pool.run((), tenant="a")["result"] not in (tenant_a, tenant_b)
+        assert pool.get_cache_stats()["tenant_switches"] >= 1
+
+    def test_timed_out_worker_is_killed(self, make_pool):
+        pool = make_pool(timeout=0.5)
+
+        with pytest.raises(WorkerTimeout):
+            pool.run(("while True:\n    pass", {}, False))
+
+        assert pool.run(("result = 1", {}, False))["result"] == 1
+        assert pool.get_cache_stats()["timeouts"] == 1
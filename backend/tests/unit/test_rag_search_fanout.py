@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from app.modules.data.config import AgentRAGConfig
+from app.modules.data.providers import SearchResult
+from app.modules.data.search import reciprocal_rank_fusion
+from app.modules.data.service import AgentRAGService
+
+
+class _FakeProvider:
+    def __init__(self, name, results, delay=0.0, error=None):
+        self.name = name
+        self._results = results
+        self._delay = delay
+        self._error = error
+
+    async def search(self, query, limit=5, *args, **kwargs):
+        await asyncio.sleep(self._delay)
+        if self._error:
+            raise self._error
+        return [r.model_copy() for r in self._results]
+
+
+def _result(doc_id, score, source="vector"):
+    return SearchResult(id=doc_id, content=doc_id, score=score, source=source)
+
+
+def _service(*providers):
+    service = AgentRAGService(AgentRAGConfig(knowledge_base_id="kb-1"))
+    service.data_provider = list(providers)
+    service._initialized = True
+    return service
+
+
+class TestSearchFanOut:
+    @pytest.mark.asyncio
+    async def test_providers_are_searched_concurrently(self):
+        service = _service(
+            _FakeProvider("vector", [_result("a", 0.9)], delay=0.2),
+            _FakeProvider("legra", [_result("b", 0.8, "legra")], delay=0.2),
+        )
+
+        start = time.perf_counter()
+        response = await service.search_detailed("q", limit=5, merge_strategy="score")
+
+        assert time.perf_counter() - start < 0.35
+        assert [r.id for r in response.results] == ["a", "b"]
+        assert [t.source for t in response.sources] == ["kb-1/vector", "kb-1/legra"]
+        assert all(t.status == "ok" and t.latency_ms >= 150 for t in response.sources)
+        assert response.partial is False
+
+    @pytest.mark.asyncio
+    async def test_slow_and_failing_providers_yield_partial_results(self):
+        service = _service(
+            _FakeProvider("vector", [_result("a", 0.9)]),
+            _FakeProvider("legra", [_result("b", 1.0, "legra")], delay=1.0),
+            _FakeProvider("lightrag", [], error=RuntimeError("down")),
+        )
+
+        response = await service.search_detailed("q", limit=5, merge_strategy="score", timeout=0.1)
+
+        assert [r.id for r in response.results] == ["a"]
+        assert [t.status for t in response.sources] == ["ok", "timeout", "error"]
+        assert response.sources[2].error == "down"
+        assert response.partial is True
+
+    @pytest.mark.asyncio
+    async def test_score_merge_keeps_best_duplicate_and_limit(self):
+        service = _service(
+            _FakeProvider("vector", [_result("a", 0.5), _result("b", 0.7), _result("c", 0.1)]),
+            _FakeProvider("legra", [_result("a", 0.9, "legra")]),
+        )
+
+        results = await service.search("q", limit=2)
+
+        assert [(r.id, r.score) for r in results] == [("a", 0.9), ("b", 0.7)]
+
+
+class TestReciprocalRankFusion:
+    def test_documents_ranked_by_several_providers_win(self):
+        fused = reciprocal_rank_fusion(
+            {
+                "vector": [_result("a", 0.99), _result("b", 0.98), _result("c", 0.97)],
+                "legra": [_result("b", 1.0, "legra"), _result("c", 0.9, "legra")],
+            },
+            limit=2,
+        )
+
+        assert [r.id for r in fused] == ["b", "c"]
+        assert fused[0].metadata["provider_score"] == 0.98
@@ -0,0 +1,77 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
+from app.db.multi_tenant_session import multi_tenant_manager
+from app.tasks import base
+from app.tasks.base import run_task_for_all_tenants
+
+TENANTS = [SimpleNamespace(id=ix, name=f"Tenant {slug}", slug=slug) for ix, slug in enumerate(["a", "b", "c"])]
+
+
+@pytest.fixture(autouse=True)
+def tenants(monkeypatch):
+    @asynccontextmanager
+    async def session():
+        yield None
+
+    class _TenantService:
+        def __init__(self, repository):
+            pass
+
+        async def get_all_tenants(self):
+            return TENANTS
+
+    monkeypatch.setattr(multi_tenant_manager, "get_tenant_session_factory", lambda tenant: session)
+    monkeypatch.setattr(base, "TenantService", _TenantService)
+    monkeypatch.setattr(base, "_tenant_durations", {})
+
+
+class TestRunTaskForAllTenants:
+    def test_tenants_run_concurrently_in_their_own_context(self):
+        running, peak = set(), []
+
+        async def task(delay):
+            tenant = get_tenant_context()
+            running.add(tenant)
+            peak.append(len(running))
+            await asyncio.sleep({"b": 10}.get(tenant, delay))
+            running.discard(tenant)
+            if tenant == "c":
+                raise ValueError("boom")
+            # The context must still be this tenant's after the others ran
+            return {"tenant": get_tenant_context()}
+
+        results = asyncio.run(run_task_for_all_tenants(task, concurrency=2, tenant_timeout=0.2, delay=0.01))
+
+        assert max(peak) == 2
+        assert [entry["tenant_slug"] for entry in results] == ["master", "a", "b", "c"]
+        assert results[0]["result"] == {"tenant": "master"}
+        assert results[1]["result"] == {"tenant": "a"}
+        assert results[2]["error"] == "Timed out after 0.2s"
+        assert results[3]["error"] == "boom"
+        assert 0.2 <= results[2]["duration_seconds"] < 1
+        assert get_tenant_context() == "master"
+
+    def test_slowest_tenants_start_first_on_the_next_run(self, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_TENANT_CONCURRENCY", 1)
+        started = []
+
+        async def task():
+            tenant = get_tenant_context()
+            started.append(tenant)
+            await asyncio.sleep({"b": 0.05, "c": 0.02}.get(tenant, 0))
+            return {"ok": True}
+
+        asyncio.run(run_task_for_all_tenants(task))
+        assert started == ["master", "a", "b", "c"]
+
+        started.clear()
+        results = asyncio.run(run_task_for_all_tenants(task))
+        assert started[:2] == ["b", "c"]
+        # Results keep the master-then-tenants order
+        assert [entry["tenant_slug"] for entry in results] == ["master", "a", "b", "c"]
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.modules.data.providers import SearchResult
+from app.modules.workflow.agents import rag
+from app.modules.workflow.agents.rag import ThreadScopedRAG
+
+
+class _FakeService:
+    created = []
+
+    def __init__(self, config):
+        self.chat_id = config.knowledge_base_id
+        self.closed = False
+        self.release = None
+        _FakeService.created.append(self)
+
+    async def initialize(self):
+        return True
+
+    def is_initialized(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+    async def search(self, query, limit=5):
+        if self.release:
+            await self.release.wait()
+        return [SearchResult(id="m1", content=f"{self.chat_id}: hello", score=0.9, source="vector")]
+
+    async def delete_by_metadata(self, filter_dict):
+        return {"vector": True}
+
+
+@pytest.fixture
+def thread_rag(monkeypatch):
+    _FakeService.created = []
+    monkeypatch.setattr(rag, "AgentRAGService", _FakeService)
+    instance = ThreadScopedRAG()
+    instance._max_services = 2
+    instance._idle_ttl = 0
+    return instance
+
+
+class TestThreadScopedRAG:
+    @pytest.mark.asyncio
+    async def test_retrieve_returns_search_results(self, thread_rag):
+        docs = await thread_rag.retrieve("chat-1", "hi")
+
+        assert docs == [{"content": "chat-1: hello", "metadata": {}}]
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_service_is_closed_and_rehydrated(self, thread_rag):
+        for chat_id in ["a", "b", "a", "c"]:
+            await thread_rag.retrieve(chat_id, "q")
+
+        first_a, b, c = _FakeService.created
+        assert b.closed and not first_a.closed and not c.closed
+        assert list(thread_rag._services) == ["a", "c"]
+
+        await thread_rag.retrieve("b", "q")
+        assert _FakeService.created[-1].chat_id == "b" and not _FakeService.created[-1].closed
+        stats = thread_rag.get_cache_stats()
+        assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 4, 2)
+
+    @pytest.mark.asyncio
+    async def test_idle_services_expire(self, thread_rag):
+        thread_rag._idle_ttl = 60
+        await thread_rag.retrieve("a", "q")
+        thread_rag._services["a"].last_used -= 120
+
+        await thread_rag.retrieve("b", "q")
+
+        assert _FakeService.created[0].closed
+        assert list(thread_rag._services) == ["b"]
+        assert thread_rag.get_cache_stats()["expirations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_services_in_use_are_not_evicted(self, thread_rag):
+        thread_rag._max_services = 1
+        await thread_rag._get_service("a")
+        _FakeService.created[0].release = asyncio.Event()
+
+        pending = asyncio.create_task(thread_rag.retrieve("a", "q"))
+        await asyncio.sleep(0)
+        await thread_rag.retrieve("b", "q")
+
+        assert not _FakeService.created[0].closed
+        _FakeService.created[0].release.set()
+        assert await pending
+        await thread_rag.retrieve("c", "q")
+        assert _FakeService.created[0].closed
+
+    @pytest.mark.asyncio
+    async def test_purge_evicts_the_chat(self, thread_rag):
+        assert await thread_rag.purge_chat("a") == {"vector": True}
+
+        assert _FakeService.created[0].closed
+        assert "a" not in thread_rag._services
+        assert rag.get_thread_rag_stats()["tenants"] >= 1
@@ -0,0 +1,31 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.modules.websockets.frames import decode_relay_message, encode_client_frame, encode_relay_message
+
+
+class TestWebsocketFrames:
+    def test_relay_message_round_trip_keeps_frame_verbatim(self):
+        payload = {"text": "line 1\nline 2", "at": datetime(2026, 3, 1, 9, tzinfo=timezone.utc), "id": uuid4()}
+        frame = encode_client_frame("message", payload)
+
+        relayed = encode_relay_message(
+            frame, msg_type="message", room_id="conv-1", tenant_id="master", required_topic="message"
+        )
+        decoded = decode_relay_message(relayed.encode())
+
+        assert decoded.frame == frame
+        assert (decoded.msg_type, decoded.room_id, decoded.tenant_id, decoded.required_topic) == (
+            "message", "conv-1", "master", "message")
+        # Same values as the previous json.dumps(..., default=str) encoding
+        assert json.loads(frame) == json.loads(json.dumps({"type": "message", "payload": payload}, default=str))
+
+    def test_previous_single_object_format_is_accepted(self):
+        data = json.dumps({"type": "statistics", "payload": {"count": 3}, "required_topic": None,
+                "room_id": "dashboard", "tenant_id": None})
+
+        decoded = decode_relay_message(data)
+
+        assert (decoded.msg_type, decoded.room_id, decoded.tenant_id) == ("statistics", "dashboard", None)
+        assert json.loads(decoded.frame) == {"type": "statistics", "payload": {"count": 3}}
@@ -0,0 +1,77 @@
+from app.core.tenant_scope import set_tenant_context
+from app.modules.workflow.engine.workflow_cache import CompiledWorkflowCache, workflow_fingerprint
+
+
+def _workflow(updated_at="2025-01-01T00:00:00"):
+    return {
+        "id": "wf-1",
+        "version": "1.0",
+        "updated_at": updated_at,
+        "nodes": [
+            {"id": "in", "type": "chatInputNode", "data": {}},
+            {"id": "tpl", "type": "templateNode", "data": {}},
+            {"id": "out", "type": "chatOutputNode", "data": {}},
+        ],
+        "edges": [
+            {"source": "in", "target": "tpl"},
+            {"source": "tpl", "target": "out"},
+        ],
+    }
+
+
+class TestCompiledWorkflowCache:
+    def test_reuses_engine_for_same_version(self):
+        set_tenant_context("master")
+        cache = CompiledWorkflowCache(max_size=10)
+
+        first = cache.get_engine("agent-1", _workflow())
+        second = cache.get_engine("agent-1", _workflow())
+
+        assert first is second
+        assert first.topological_order == ["in", "tpl", "out"]
+        stats = cache.get_cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_recompiles_when_workflow_changes(self):
+        set_tenant_context("master")
+        cache = CompiledWorkflowCache(max_size=10)
+
+        first = cache.get_engine("agent-1", _workflow())
+        second = cache.get_engine("agent-1", _workflow(updated_at="2025-02-01T00:00:00"))
+
+        assert first is not second
+        assert cache.get_cache_stats()["stale"] == 1
+
+    def test_entries_are_tenant_scoped_and_invalidated(self):
+        cache = CompiledWorkflowCache(max_size=10)
+
+        set_tenant_context("tenant_a")
+        engine_a = cache.get_engine("agent-1", _workflow())
+        set_tenant_context("tenant_b")
+        engine_b = cache.get_engine("agent-1", _workflow())
+        assert engine_a is not engine_b
+
+        assert cache.invalidate("agent-1") is True
+        set_tenant_context("tenant_a")
+        assert cache.get_engine("agent-1", _workflow()) is engine_a
+        set_tenant_context("master")
+
+    def test_lru_eviction(self):
+        set_tenant_context("master")
+        cache = CompiledWorkflowCache(max_size=1)
+
+        cache.get_engine("agent-1", _workflow())
+        cache.get_engine("agent-2", _workflow())
+
+        stats = cache.get_cache_stats()
+        assert stats["size"] == 1
+        assert stats["evictions"] == 1
+
+    def test_fingerprint_falls_back_to_content_hash(self):
+        workflow = _workflow(updated_at=None)
+        changed = _workflow(updated_at=None)
+        changed["edges"] = changed["edges"][:1]
+
+        assert workflow_fingerprint(workflow) == workflow_fingerprint(_workflow(updated_at=None))
+        assert workflow_fingerprint(workflow) != workflow_fingerprint(changed)
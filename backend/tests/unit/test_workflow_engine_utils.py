@@ -1,4 +1,9 @@
-from app.modules.workflow.engine.utils import get_nested_value, replace_config_vars
+from app.modules.workflow.engine.utils import (
+    _replace_config_vars_json,
+    compile_config_template,
+    get_nested_value,
+    replace_config_vars,
+)
 from app.modules.workflow.engine.workflow_state import WorkflowState
 
 
@@ -33,3 +38,50 @@ class TestReplaceConfigVars:
         assert replacements["source.prediction[0].label"] == "Not Available"
         assert '"prediction": 3891' in resolved["pythonScript"]
         assert '"label": "Not Available"' in resolved["pythonScript"]
+
+
+class TestConfigTemplatePlan:
+    def _state(self):
+        state = WorkflowState(workflow={"nodes": [], "edges": []})
+        state.set_value("user", {"name": "Ada", "tags": ["a", "b"]})
+        state.set_value("greeting", 'Hi "there"\n')
+        return state
+
+    def test_matches_json_path(self):
+        config = {
+            "systemPrompt": "Say {{greeting}} to {{user.name}}",
+            "payload": "{{user}}",
+            "code": "data = {{user}}\nprint(data)",
+            "tools": [{"name": "static", "args": ["x", 1]}],
+            "pythonScript": [1, ["{{user.tags}}"]],
+        }
+        state = self._state()
+
+        expected = _replace_config_vars_json(config, state, source_output=None)
+        plan = compile_config_template(config)
+        actual = replace_config_vars(config, state, source_output=None, plan=plan)
+
+        assert actual == expected
+
+    def test_static_subtrees_are_shared(self):
+        config = {"prompt": "{{greeting}}", "tools": [{"name": "static"}]}
+        plan = compile_config_template(config)
+
+        resolved, replacements = replace_config_vars(config, self._state(), source_output=None, plan=plan)
+
+        assert resolved["tools"] is config["tools"]
+        assert resolved["prompt"] == 'Hi "there"\n'
+        assert replacements == {"greeting": 'Hi "there"\n'}
+
+    def test_config_without_variables_is_returned_as_is(self):
+        config = {"prompt": "no variables here"}
+
+        resolved, replacements = replace_config_vars(config, self._state(), source_output=None)
+
+        assert resolved is config
+        assert replacements == {}
+
+    def test_variables_in_keys_use_json_path(self):
+        config = {"{{greeting}}": "value"}
+
+        assert compile_config_template(config).supported is False
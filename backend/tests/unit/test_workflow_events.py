@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.modules.workflow.agents.agent_utils import with_stream_usage
+from app.modules.workflow.engine.nodes.llm_model_node import LLMModelNode
+from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
+from app.modules.workflow.engine.workflow_state import WorkflowState
+
+
+def _workflow():
+    return {
+        "id": "wf-stream",
+        "version": "1.0",
+        "nodes": [
+            {"id": "in", "type": "chatInputNode", "data": {}},
+            {"id": "router", "type": "routerNode", "data": {}},
+            {"id": "llm", "type": "llmModelNode", "data": {}},
+            {"id": "agent", "type": "agentNode", "data": {}},
+            {"id": "summary", "type": "llmModelNode", "data": {}},
+            {"id": "out", "type": "chatOutputNode", "data": {}},
+        ],
+        "edges": [
+            {"source": "in", "target": "router"},
+            {"source": "router", "target": "llm"},
+            {"source": "router", "target": "summary"},
+            {"source": "summary", "target": "agent"},
+            {"source": "llm", "target": "out"},
+            {"source": "agent", "target": "out"},
+        ],
+    }
+
+
+class _StreamingModel:
+    """Chat model double that streams two chunks, the last one carrying the usage"""
+
+    async def astream(self, messages):
+        yield AIMessageChunk(content="Hel", response_metadata={"model_name": "gpt-4o-mini"})
+        yield AIMessageChunk(
+            content="lo",
+            response_metadata={"finish_reason": "stop"},
+            usage_metadata={"input_tokens": 12, "output_tokens": 2, "total_tokens": 14},
+        )
+
+    async def ainvoke(self, messages):
+        raise AssertionError("the streamed response must be used")
+
+
+class _Injector:
+    def get(self, cls):
+        async def get_model(provider_id):
+            return _StreamingModel()
+
+        async def get_by_id(provider_id):
+            return SimpleNamespace(llm_model_provider="OpenAI", llm_model="gpt-4o-mini")
+
+        return SimpleNamespace(get_model=get_model, get_by_id=get_by_id)
+
+
+async def _collect(channel):
+    return [(event.node_id, event.text) async for event in channel.events()]
+
+
+class TestWorkflowEventChannel:
+    @pytest.mark.asyncio
+    async def test_coalesces_queued_deltas_per_node(self):
+        channel = WorkflowEventChannel()
+        for text in ("Hel", "lo", " wor"):
+            channel.emit_delta("llm", text)
+        channel.emit_delta("agent", "x")
+        channel.emit_delta("llm", "ld")
+        channel.close()
+        channel.emit_delta("llm", "ignored")
+
+        assert await _collect(channel) == [("llm", "Hello wor"), ("agent", "x"), ("llm", "ld")]
+        assert channel.deltas_emitted == 5
+
+    @pytest.mark.asyncio
+    async def test_consumer_receives_deltas_while_producer_runs(self):
+        channel = WorkflowEventChannel()
+
+        async def produce():
+            for text in ("a", "b", "c"):
+                channel.emit_delta("llm", text)
+                await asyncio.sleep(0.001)
+            channel.close()
+
+        received, _ = await asyncio.gather(_collect(channel), produce())
+
+        assert "".join(text for _, text in received) == "abc"
+        assert len(received) == 3
+
+
+class TestStreamingNodes:
+    def test_only_llm_and_agent_nodes_feeding_chat_output_stream(self):
+        engine = WorkflowEngine(_workflow())
+
+        assert engine.workflow["streaming_nodes"] == frozenset({"llm", "agent"})
+
+    def test_state_forwards_tokens_of_streaming_nodes_only(self):
+        engine = WorkflowEngine(_workflow())
+        state = WorkflowState(workflow=engine.workflow, thread_id="t-1")
+        state.emit_token("llm", "dropped")  # no channel attached
+
+        channel = WorkflowEventChannel()
+        state.event_channel = channel
+        state.emit_token("llm", "kept")
+        state.emit_token("summary", "internal")
+
+        assert state.is_streaming_node("llm")
+        assert not state.is_streaming_node("summary")
+        assert channel.deltas_emitted == 1
+
+    @pytest.mark.asyncio
+    async def test_streamed_llm_node_records_token_usage(self, monkeypatch):
+        import app.dependencies.injector as injector_module
+
+        monkeypatch.setattr(injector_module, "injector", _Injector())
+        engine = WorkflowEngine(_workflow())
+        state = WorkflowState(workflow=engine.workflow, thread_id="t-1")
+        state.event_channel = WorkflowEventChannel()
+        node = LLMModelNode("llm", {"id": "llm", "data": {}}, state)
+
+        assert await node.process({"providerId": "p-1", "userPrompt": "hi"}) == "Hello"
+        assert state.event_channel.deltas_emitted == 2
+        assert state.llm_usage == [
+            {"input_tokens": 12, "output_tokens": 2, "provider": "openai", "model": "gpt-4o-mini", "node_id": "llm"}
+        ]
+
+    def test_openai_models_stream_usage(self):
+        openai = pytest.importorskip("langchain_openai")
+        model = openai.ChatOpenAI(api_key="sk-test", base_url="http://vllm:8000/v1")
+
+        assert not model.stream_usage
+        assert with_stream_usage(model).stream_usage is True
+        plain = _StreamingModel()
+        assert with_stream_usage(plain) is plain
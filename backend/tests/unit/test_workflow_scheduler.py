@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from app.modules.workflow.engine.scheduler import SchedulerLimits, WorkflowGraph, WorkflowScheduler
+
+
+class _Paused(BaseException):
+    pass
+
+
+def _graph(edges, node_types=None, custom_join_nodes=None):
+    nodes = sorted({n for edge in edges for n in edge})
+    successors = {n: [t for s, t in edges if s == n] for n in nodes}
+    required_sources = {n: [s for s, t in edges if t == n] for n in nodes}
+    return WorkflowGraph(
+        node_types=node_types or {n: "node" for n in nodes},
+        successors=successors,
+        required_sources=required_sources,
+        custom_join_nodes=custom_join_nodes or set(),
+    )
+
+
+class _Runner:
+    def __init__(self, delays=None, outputs=None, fail=(), pause=()):
+        self.delays = delays or {}
+        self.outputs = outputs or {}
+        self.fail = set(fail)
+        self.pause = set(pause)
+        self.results = {}
+        self.calls = []
+        self.completed = []
+        self.running = 0
+        self.max_running = 0
+
+    async def run(self, node_id, isolated):
+        self.calls.append(node_id)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(node_id, 0))
+            if node_id in self.pause:
+                raise _Paused()
+            if node_id in self.fail:
+                raise RuntimeError(f"{node_id} failed")
+            output = self.outputs.get(node_id, {"node": node_id})
+            self.results[node_id] = output
+            self.completed.append(node_id)
+            return output
+        finally:
+            self.running -= 1
+
+    def has_output(self, node_id):
+        return self.results.get(node_id) is not None
+
+
+def _scheduler(graph, runner, limits=None, is_ready=None):
+    return WorkflowScheduler(
+        graph=graph,
+        run_node=runner.run,
+        has_output=runner.has_output,
+        is_ready=is_ready,
+        limits=limits,
+        deferred_exceptions=(_Paused,),
+    )
+
+
+@pytest.mark.asyncio
+async def test_join_runs_once_after_all_branches():
+    graph = _graph([("in", "a"), ("in", "b"), ("a", "join"), ("b", "join"), ("join", "out")])
+    runner = _Runner(delays={"a": 0.01, "b": 0.02})
+
+    await _scheduler(graph, runner).run("in")
+
+    assert runner.calls.count("join") == 1
+    assert runner.calls.index("join") > runner.calls.index("b")
+    assert runner.calls[-1] == "out"
+
+
+@pytest.mark.asyncio
+async def test_router_selection_and_skipped_branch():
+    graph = _graph([("in", "router"), ("router", "yes"), ("router", "no")])
+    runner = _Runner(outputs={"router": {"route": "true", "next_nodes": ["yes"]}})
+
+    await _scheduler(graph, runner).run("in")
+
+    assert "yes" in runner.calls
+    assert "no" not in runner.calls
+
+
+@pytest.mark.asyncio
+async def test_failed_branch_blocks_join_but_not_siblings():
+    graph = _graph([("in", "a"), ("in", "b"), ("a", "join"), ("b", "join"), ("b", "c")])
+    runner = _Runner(fail={"a"})
+
+    await _scheduler(graph, runner).run("in")
+
+    assert "join" not in runner.calls
+    assert "c" in runner.calls
+
+
+@pytest.mark.asyncio
+async def test_custom_join_uses_node_check():
+    graph = _graph(
+        [("in", "a"), ("in", "b"), ("a", "agg"), ("b", "agg")],
+        custom_join_nodes={"agg"},
+    )
+    runner = _Runner(delays={"b": 0.05})
+
+    def any_source_ready(node_id):
+        return any(runner.has_output(s) for s in graph.required_sources[node_id])
+
+    await _scheduler(graph, runner, is_ready=any_source_ready).run("in")
+
+    assert runner.calls.count("agg") == 1
+    assert runner.completed.index("agg") < runner.completed.index("b")
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limits():
+    fan_out = [("in", f"n{i}") for i in range(10)]
+    node_types = {"in": "chatInputNode", **{f"n{i}": "llmModelNode" if i % 2 else "sqlNode" for i in range(10)}}
+    graph = _graph(fan_out, node_types=node_types)
+
+    runner = _Runner(delays={f"n{i}": 0.01 for i in range(10)})
+    await _scheduler(graph, runner, limits=SchedulerLimits(max_concurrency=3)).run("in")
+    assert runner.max_running == 3
+    assert len(runner.calls) == 11
+
+    runner = _Runner(delays={f"n{i}": 0.01 for i in range(10)})
+    limits = SchedulerLimits(node_type_limits={"sqlNode": 1, "llmModelNode": 2})
+    await _scheduler(graph, runner, limits=limits).run("in")
+    assert runner.max_running == 3
+    assert len(runner.calls) == 11
+
+
+@pytest.mark.asyncio
+async def test_pause_is_raised_after_in_flight_work():
+    graph = _graph([("in", "hitl"), ("in", "other"), ("hitl", "after")])
+    runner = _Runner(pause={"hitl"}, delays={"other": 0.01})
+
+    with pytest.raises(_Paused):
+        await _scheduler(graph, runner).run("in")
+
+    assert "other" in runner.results
+    assert "after" not in runner.calls
@@ -15,6 +15,10 @@ class Settings(BaseSettings):
     REDIS_SSL: bool = False
     REDIS_OVERRIDE_URL: Optional[str] = None
 
+    # "rooms": SUBSCRIBE only to the channels of rooms with local connections;
+    # "pattern": PSUBSCRIBE websocket:* and receive every room's traffic
+    WS_REDIS_SUBSCRIBE_MODE: str = "rooms"
+
     # Backend
     BACKEND_URL: str = "http://localhost:8000"
     WS_INTERNAL_SECRET: str = "websocket-internal-secret"
@@ -28,6 +32,13 @@ class Settings(BaseSettings):
     HEARTBEAT_INTERVAL: int = 30  # seconds between pings
     HEARTBEAT_TIMEOUT: int = 10  # seconds to wait for pong
 
+    # Outgoing frames: per-connection send queue size, seconds a single send may take before
+    # the connection is dropped, and what to do when a slow client's queue is full:
+    # "drop_oldest" (skip frames) or "close" (disconnect the client)
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT: float = 10.0
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+
     # Auth cache
     AUTH_CACHE_MAX_SIZE: int = 10000
 
@@ -4,25 +4,45 @@ import asyncio
 import json
 import logging
 import time
-from typing import Hashable
+from typing import Callable, Hashable
 
 from fastapi import WebSocket
 
 from auth.models import AuthenticatedUser
+from config import settings
 from connections.models import Connection
 
 logger = logging.getLogger(__name__)
 
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
 
 class ConnectionManager:
     """
     Manages WebSocket rooms with multi-tenant isolation.
     Connections are stored in-memory per room (tenant_id:room_id).
+
+    Sending never blocks the caller: every connection has a bounded send queue
+    drained by its own writer task, so a broadcast only enqueues the frame and one
+    slow client cannot stall delivery to the rest of the room. When a queue is full
+    the oldest frame is dropped, or the client disconnected, per
+    WS_SLOW_CONSUMER_POLICY.
     """
 
     def __init__(self):
-        self._rooms: dict[str, list[Connection]] = {}
+        # room -> id(websocket) -> connection, and the reverse index for O(1) removal
+        self._rooms: dict[str, dict[int, Connection]] = {}
+        self._socket_rooms: dict[int, dict[str, Connection]] = {}
         self._lock = asyncio.Lock()
+        self._closing: set[asyncio.Task] = set()
+        self._dropped_frames = 0
+        self._slow_consumers_closed = 0
+        self._room_listeners: list[tuple[Callable[[str], None], Callable[[str], None]]] = []
+
+    def add_room_listener(self, on_opened: Callable[[str], None], on_closed: Callable[[str], None]) -> None:
+        """Get notified when a room gets its first local connection and when its last one leaves."""
+        self._room_listeners.append((on_opened, on_closed))
 
     def _tenant_aware_room_id(self, room_id: Hashable, tenant_id: str | None) -> str:
         if tenant_id:
@@ -46,10 +66,18 @@ class ConnectionManager:
             topics=topics,
             connected_at=now,
             last_pong=now,
+            send_queue=asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE),
         )
+        conn.writer = asyncio.create_task(self._write_loop(conn))
         ta_room = self._tenant_aware_room_id(room_id, user.tenant_id)
         async with self._lock:
-            self._rooms.setdefault(ta_room, []).append(conn)
+            self._remove(websocket, ta_room)
+            if ta_room not in self._rooms:
+                self._rooms[ta_room] = {}
+                for on_opened, _ in self._room_listeners:
+                    on_opened(ta_room)
+            self._rooms[ta_room][id(websocket)] = conn
+            self._socket_rooms.setdefault(id(websocket), {})[ta_room] = conn
             logger.info(
                 f"[CONNECT] room={ta_room} user={user.user_id} topics={topics} "
                 f"total_in_room={len(self._rooms[ta_room])}"
@@ -64,25 +92,76 @@ class ConnectionManager:
     ) -> None:
         async with self._lock:
             if room_id is not None:
-                ta_room = self._tenant_aware_room_id(room_id, tenant_id)
-                conns = self._rooms.get(ta_room, [])
-                self._rooms[ta_room] = [c for c in conns if c.websocket is not websocket]
-                if not self._rooms[ta_room]:
-                    del self._rooms[ta_room]
-                    logger.debug(f"Room {ta_room} removed (empty)")
+                self._remove(websocket, self._tenant_aware_room_id(room_id, tenant_id))
             else:
-                # Search all rooms
-                to_remove = []
-                for key, conns in self._rooms.items():
-                    filtered = [c for c in conns if c.websocket is not websocket]
-                    if len(filtered) < len(conns):
-                        if filtered:
-                            self._rooms[key] = filtered
-                        else:
-                            to_remove.append(key)
-                for key in to_remove:
+                self._remove(websocket)
+
+    def _remove(self, websocket: WebSocket, ta_room: str | None = None) -> None:
+        """Remove the websocket from one room (or all its rooms) and stop the writers."""
+        socket_rooms = self._socket_rooms.get(id(websocket))
+        if not socket_rooms:
+            return
+        for key in [ta_room] if ta_room is not None else list(socket_rooms):
+            conn = socket_rooms.pop(key, None)
+            if conn is None:
+                continue
+            if conn.writer is not None and conn.writer is not asyncio.current_task():
+                conn.writer.cancel()
+            room = self._rooms.get(key)
+            if room is not None:
+                room.pop(id(websocket), None)
+                if not room:
                     del self._rooms[key]
                     logger.debug(f"Room {key} removed (empty)")
+                    for _, on_closed in self._room_listeners:
+                        on_closed(key)
+        if not socket_rooms:
+            del self._socket_rooms[id(websocket)]
+
+    async def _write_loop(self, conn: Connection) -> None:
+        """Drain the connection's send queue; a failed or timed-out send drops the connection."""
+        try:
+            while True:
+                message = await conn.send_queue.get()
+                await asyncio.wait_for(conn.websocket.send_text(message), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"[SEND] Failed to send to user {conn.user_id}: {exc!r}")
+            self._remove(conn.websocket)
+
+    def _enqueue(self, conn: Connection, message: str) -> None:
+        queue = conn.send_queue
+        if not queue.full():
+            queue.put_nowait(message)
+            return
+
+        conn.dropped_frames += 1
+        self._dropped_frames += 1
+        if settings.WS_SLOW_CONSUMER_POLICY == "close":
+            logger.warning(
+                f"[SEND] Closing slow consumer user={conn.user_id} queued={queue.qsize()} "
+                f"dropped={conn.dropped_frames}"
+            )
+            self._slow_consumers_closed += 1
+            self._remove(conn.websocket)
+            task = asyncio.create_task(self._close_quietly(conn.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            queue.get_nowait()
+            queue.put_nowait(message)
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer")
+        except Exception:
+            pass
+
+    def send_json(self, conn: Connection, data: dict) -> None:
+        """Queue a frame for a single connection."""
+        self._enqueue(conn, json.dumps(data, default=str))
 
     async def broadcast_to_room(
         self,
@@ -91,39 +170,73 @@ class ConnectionManager:
         payload: dict,
         required_topic: str | None = None,
     ) -> None:
-        message = json.dumps({"type": msg_type, "payload": payload}, default=str)
-        targets = list(self._rooms.get(tenant_aware_room_id, []))
+        if tenant_aware_room_id not in self._rooms:
+            return
+        await self.broadcast_frame(
+            tenant_aware_room_id,
+            json.dumps({"type": msg_type, "payload": payload}, default=str),
+            required_topic=required_topic,
+            msg_type=msg_type,
+        )
 
-        if not targets:
+    async def broadcast_frame(
+        self,
+        tenant_aware_room_id: str,
+        frame: str,
+        required_topic: str | None = None,
+        msg_type: str | None = None,
+    ) -> None:
+        """Queue an already serialized frame; every recipient shares the same string."""
+        room = self._rooms.get(tenant_aware_room_id)
+        if not room:
             return
 
         logger.debug(
-            f"[BROADCAST] room={tenant_aware_room_id} targets={len(targets)} "
+            f"[BROADCAST] room={tenant_aware_room_id} targets={len(room)} "
             f"type={msg_type} topic={required_topic}"
         )
 
-        for conn in targets:
+        for conn in list(room.values()):
             if required_topic and required_topic not in conn.topics:
                 continue
-            try:
-                await conn.websocket.send_text(message)
-            except Exception as exc:
-                logger.warning(f"[BROADCAST] Failed to send to user {conn.user_id}: {exc}")
-                await self.disconnect(conn.websocket)
+            self._enqueue(conn, frame)
+        # Let the writers pick the frame up before the next broadcast is queued
+        await asyncio.sleep(0)
+
+    async def close(self) -> None:
+        """Stop all writer tasks (on shutdown)."""
+        async with self._lock:
+            writers = [
+                conn.writer for rooms in self._socket_rooms.values() for conn in rooms.values() if conn.writer
+            ]
+            for writer in writers:
+                writer.cancel()
+            self._rooms.clear()
+            self._socket_rooms.clear()
+        await asyncio.gather(*writers, *self._closing, return_exceptions=True)
 
     def get_stats(self) -> dict:
         total = 0
+        queued = 0
+        max_queue_depth = 0
         by_tenant: dict[str, int] = {}
         for conns in self._rooms.values():
-            for conn in conns:
+            for conn in conns.values():
                 total += 1
                 by_tenant[conn.tenant_id] = by_tenant.get(conn.tenant_id, 0) + 1
+                depth = conn.send_queue.qsize()
+                queued += depth
+                max_queue_depth = max(max_queue_depth, depth)
         return {
             "total_connections": total,
             "rooms_count": len(self._rooms),
             "connections_by_tenant": by_tenant,
+            "queued_frames": queued,
+            "max_send_queue_depth": max_queue_depth,
+            "dropped_frames": self._dropped_frames,
+            "slow_consumers_closed": self._slow_consumers_closed,
         }
 
     @property
-    def rooms(self) -> dict[str, list[Connection]]:
+    def rooms(self) -> dict[str, dict[int, Connection]]:
         return self._rooms
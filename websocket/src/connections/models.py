@@ -1,3 +1,4 @@
+import asyncio
 from dataclasses import dataclass, field
 from fastapi import WebSocket
 
@@ -11,3 +12,7 @@ class Connection:
     topics: set[str] = field(default_factory=set)
     connected_at: float = 0.0
     last_pong: float = 0.0
+    # Outgoing frames, drained by the connection's own writer task (see ConnectionManager)
+    send_queue: asyncio.Queue | None = None
+    writer: asyncio.Task | None = None
+    dropped_frames: int = 0
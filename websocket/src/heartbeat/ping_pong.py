@@ -22,7 +22,7 @@ async def heartbeat_loop(manager: ConnectionManager):
             now = time.time()
 
             for room_id, connections in list(manager.rooms.items()):
-                for conn in list(connections):
+                for conn in list(connections.values()):
                     # Check if connection missed the last pong
                     if now - conn.last_pong > interval + timeout:
                         logger.info(
@@ -36,17 +36,14 @@ async def heartbeat_loop(manager: ConnectionManager):
                         await manager.disconnect(conn.websocket)
                         continue
 
-                    # Send ping
-                    try:
-                        await conn.websocket.send_json({"type": "ping"})
-                        # Note: browser WebSocket protocol-level ping/pong is handled
-                        # automatically by uvicorn. This is an application-level ping
-                        # for connection liveness detection. The client should respond
-                        # with {"type": "pong"} or the protocol-level pong suffices
-                        # to keep last_pong updated.
-                    except Exception:
-                        logger.debug(f"[HEARTBEAT] Ping failed for user={conn.user_id}")
-                        await manager.disconnect(conn.websocket)
+                    # Queue a ping; the connection's writer task sends it (a failed
+                    # send drops the connection there)
+                    manager.send_json(conn, {"type": "ping"})
+                    # Note: browser WebSocket protocol-level ping/pong is handled
+                    # automatically by uvicorn. This is an application-level ping
+                    # for connection liveness detection. The client should respond
+                    # with {"type": "pong"} or the protocol-level pong suffices
+                    # to keep last_pong updated.
 
         except asyncio.CancelledError:
             logger.info("Heartbeat loop cancelled")
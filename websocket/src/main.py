@@ -45,6 +45,7 @@ async def lifespan(app: FastAPI):
     app.state.manager = manager
     app.state.verifier = verifier
     app.state.publisher = publisher
+    app.state.subscriber = subscriber
     app.state.redis = redis_client
 
     logger.info(f"websocket service ready on port {settings.WS_PORT}")
@@ -64,6 +65,7 @@ async def lifespan(app: FastAPI):
         # Stop subscriber and verifier
         await subscriber.stop()
         await verifier.stop()
+        await manager.close()
 
         # Close Redis
         await redis_client.close()
@@ -3,15 +3,24 @@ import json
 import logging
 
 import redis.asyncio as aioredis
+from config import settings
 from connections.manager import ConnectionManager
 
 logger = logging.getLogger(__name__)
 
+CHANNEL_PREFIX = "websocket:"
+CHANNEL_PATTERN = f"{CHANNEL_PREFIX}*"
+
 
 class RedisSubscriber:
     """
-    Subscribes to Redis websocket:* channels and delivers messages
+    Subscribes to Redis websocket:{tenant_id}:{room_id} channels and delivers messages
     to local WebSocket connections via ConnectionManager.
+
+    Only the channels of rooms with local connections are subscribed: a room's channel
+    is subscribed when its first connection joins and unsubscribed when the last one
+    leaves, so a node does not receive (and decode) traffic for rooms it does not
+    serve. WS_REDIS_SUBSCRIBE_MODE=pattern subscribes to websocket:* instead.
     """
 
     def __init__(self, redis_client: aioredis.Redis, manager: ConnectionManager):
@@ -19,6 +28,14 @@ class RedisSubscriber:
         self._manager = manager
         self._task: asyncio.Task | None = None
         self._shutdown = asyncio.Event()
+        self._pattern = settings.WS_REDIS_SUBSCRIBE_MODE == "pattern"
+        self._channels: set[str] = set()
+        self._pubsub = None
+        self._command_lock = asyncio.Lock()
+        self._pending: set[asyncio.Task] = set()
+        self._received = 0
+        if not self._pattern:
+            manager.add_room_listener(self._room_opened, self._room_closed)
 
     async def start(self):
         self._shutdown.clear()
@@ -36,14 +53,64 @@ class RedisSubscriber:
                 pass
         logger.info("Redis subscriber stopped")
 
+    def get_stats(self) -> dict:
+        return {
+            "redis_subscribe_mode": "pattern" if self._pattern else "rooms",
+            "redis_subscribed_channels": len(self._channels),
+            "redis_messages_received": self._received,
+        }
+
+    # ------------ room subscriptions -------------------------------------------------
+
+    def _room_opened(self, tenant_aware_room_id: str) -> None:
+        channel = f"{CHANNEL_PREFIX}{tenant_aware_room_id}"
+        self._channels.add(channel)
+        self._schedule("subscribe", channel)
+
+    def _room_closed(self, tenant_aware_room_id: str) -> None:
+        channel = f"{CHANNEL_PREFIX}{tenant_aware_room_id}"
+        self._channels.discard(channel)
+        self._schedule("unsubscribe", channel)
+
+    def _schedule(self, command: str, channel: str) -> None:
+        # Without a live pubsub the loop subscribes to all current channels once connected
+        if self._pubsub is None:
+            return
+        task = asyncio.create_task(self._run_command(self._pubsub, command, channel))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _run_command(self, pubsub, command: str, channel: str) -> None:
+        # The lock keeps (un)subscribes of a room in the order its connections came and went
+        async with self._command_lock:
+            if pubsub is not self._pubsub:
+                return
+            try:
+                await getattr(pubsub, command)(channel)
+            except Exception as exc:
+                logger.warning(f"Redis {command} {channel} failed: {exc}")
+
+    async def _subscribe_all(self, pubsub) -> None:
+        async with self._command_lock:
+            if self._pattern:
+                await pubsub.psubscribe(CHANNEL_PATTERN)
+                logger.info(f"Subscribed to Redis pattern: {CHANNEL_PATTERN}")
+                return
+            await pubsub.connect()
+            self._pubsub = pubsub
+            if self._channels:
+                await pubsub.subscribe(*self._channels)
+            logger.info(f"Subscribed to {len(self._channels)} Redis room channels")
+
+    # ------------ receive loop -------------------------------------------------
+
     async def _subscribe_loop(self):
         backoff = 1
         while not self._shutdown.is_set():
             pubsub = None
             try:
                 pubsub = self._redis.pubsub()
-                await pubsub.psubscribe("websocket:*")
-                logger.info("Subscribed to Redis pattern: websocket:*")
+                await self._subscribe_all(pubsub)
                 backoff = 1  # Reset on successful subscribe
 
                 while not self._shutdown.is_set():
@@ -52,7 +119,7 @@ class RedisSubscriber:
                             ignore_subscribe_messages=True,
                             timeout=1.0,
                         )
-                        if message and message["type"] == "pmessage":
+                        if message and message["type"] in ("message", "pmessage"):
                             await self._handle_message(message)
                     except asyncio.TimeoutError:
                         continue
@@ -69,31 +136,39 @@ class RedisSubscriber:
                 await asyncio.sleep(min(backoff, 30))
                 backoff = min(backoff * 2, 30)
             finally:
+                self._pubsub = None
                 if pubsub:
                     try:
-                        await pubsub.punsubscribe("websocket:*")
+                        if self._pattern:
+                            await pubsub.punsubscribe(CHANNEL_PATTERN)
+                        else:
+                            await pubsub.unsubscribe()
                         await pubsub.close()
                     except Exception:
                         pass
 
     async def _handle_message(self, message: dict):
+        self._received += 1
         try:
-            data = json.loads(message["data"])
-            msg_type = data.get("type")
-            payload = data.get("payload", {})
-            required_topic = data.get("required_topic")
-            room_id = data.get("room_id")
-            tenant_id = data.get("tenant_id")
+            # New format: a routing header line followed by the client frame, which the
+            # publisher serialized once and which is forwarded without re-encoding
+            header, separator, frame = message["data"].partition("\n")
+            data = json.loads(header)
+            if not separator:
+                # Previous format: a single object with the routing fields and payload
+                frame = json.dumps({"type": data.get("type"), "payload": data.get("payload", {})}, default=str)
 
+            tenant_id = data.get("tenant_id")
+            room_id = data.get("room_id")
             tenant_aware_room_id = (
                 f"{tenant_id}:{room_id}" if tenant_id else str(room_id)
             )
 
-            await self._manager.broadcast_to_room(
+            await self._manager.broadcast_frame(
                 tenant_aware_room_id=tenant_aware_room_id,
-                msg_type=msg_type,
-                payload=payload,
-                required_topic=required_topic,
+                frame=frame,
+                required_topic=data.get("required_topic"),
+                msg_type=data.get("type"),
             )
         except Exception as exc:
             logger.error(f"Error handling Redis message: {exc}")
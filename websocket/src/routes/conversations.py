@@ -38,7 +38,7 @@ async def ws_conversation(
                 )
     except WebSocketDisconnect:
         logger.debug(f"WebSocket disconnected: conversation={conversation_id} tenant={tenant_id}")
-        await manager.disconnect(websocket, conversation_id, tenant_id)
+        await manager.disconnect(websocket)
     except Exception as exc:
         logger.exception(f"Unexpected WebSocket error: {exc}")
-        await manager.disconnect(websocket, conversation_id, tenant_id)
+        await manager.disconnect(websocket)
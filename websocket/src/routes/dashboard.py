@@ -36,7 +36,7 @@ async def ws_dashboard(
             conn.last_pong = time.time()
     except WebSocketDisconnect:
         logger.debug(f"Dashboard WebSocket disconnected: tenant={tenant_id}")
-        await manager.disconnect(websocket, DASHBOARD_ROOM, tenant_id)
+        await manager.disconnect(websocket)
     except Exception as exc:
         logger.exception(f"Unexpected dashboard WebSocket error: {exc}")
-        await manager.disconnect(websocket, DASHBOARD_ROOM, tenant_id)
+        await manager.disconnect(websocket)
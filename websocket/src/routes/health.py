@@ -17,7 +17,7 @@ async def ready(request: Request):
     dependencies (WebSocket connection manager) instead of WS connection stats.
     """
     manager = request.app.state.manager
-    stats = manager.get_stats()
+    stats = {**manager.get_stats(), **request.app.state.subscriber.get_stats()}
     return {"service": "websocket", "status": "ready", **stats}
 
 